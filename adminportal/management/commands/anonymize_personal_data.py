@@ -15,7 +15,9 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         email = options["email"].strip().lower()
         dry_run = options["dry_run"]
-        stamp = timezone.now().strftime("%Y%m%d%H%M")
+        # ``update()`` setzt ``auto_now`` nicht; neues ``updated_at`` für Änderungs-Feed und iCal-Cache
+        now = timezone.now()
+        stamp = now.strftime("%Y%m%d%H%M")
         anon_email = f"anonymized-{stamp}@example.invalid"
 
         customers = Customer.objects.filter(email__iexact=email)
@@ -48,6 +50,7 @@ class Command(BaseCommand):
             insurer_contact="",
             insurer_contact_phone="",
             insurer_contact_email="",
+            updated_at=now,
         )
         bookings.update(
             customer_name="Anonymized User",
@@ -55,6 +58,7 @@ class Command(BaseCommand):
             customer_phone="",
             customer_address="",
             driver_license_number="",
+            updated_at=now,
         )
         portal_customers.update(
             first_name="Anonymized",
@@ -66,6 +70,7 @@ class Command(BaseCommand):
             postal_code="",
             company="",
             notes="Anonymized",
+            updated_at=now,
         )
 
         self.stdout.write(self.style.SUCCESS("Anonymisierung abgeschlossen."))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from main.models import DamagePhoto, DamageReport
+from main.utils.media import storage_key
+
+
+class Command(BaseCommand):
+    help = "Ersetzt gespeicherte Medien-URLs (DamagePhoto.file_url, DamageReport.documents) durch Storage-Keys."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Nur anzeigen, keine Änderungen")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+        batch_size = options["batch_size"]
+
+        photos = []
+        for photo in DamagePhoto.objects.exclude(file_url="").only("id", "image", "file_url").iterator(chunk_size=batch_size):
+            if not photo.image:
+                photo.image.name = storage_key(photo.file_url)
+            photo.file_url = ""
+            photos.append(photo)
+
+        reports = []
+        for report in DamageReport.objects.exclude(documents=[]).only("id", "documents").iterator(chunk_size=batch_size):
+            keys = [storage_key(doc) for doc in report.documents or []]
+            if keys != report.documents:
+                report.documents = keys
+                reports.append(report)
+
+        if not dry_run:
+            with transaction.atomic():
+                DamagePhoto.objects.bulk_update(photos, ["image", "file_url"], batch_size=batch_size)
+                DamageReport.objects.bulk_update(reports, ["documents"], batch_size=batch_size)
+
+        prefix = "[Dry-Run] " if dry_run else ""
+        self.stdout.write(self.style.SUCCESS(f"{prefix}Fotos: {len(photos)}, Schadenmeldungen mit Dokumenten: {len(reports)}"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from main.models import DamagePhoto
+from main.utils.phash import CHUNK_FIELDS
+
+
+class Command(BaseCommand):
+    help = "Berechnet fehlende perzeptuelle Hashes (Duplikatsuche) für bestehende Schadenfotos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        fields = ["phash", *CHUNK_FIELDS]
+        hashed = failed = 0
+        batch = []
+        photos = DamagePhoto.objects.filter(phash__isnull=True).exclude(image="").only("id", "image", *fields)
+        for photo in photos.iterator(chunk_size=batch_size):
+            if photo.compute_phash():
+                batch.append(photo)
+                hashed += 1
+            else:
+                failed += 1
+            photo.image.close()
+            if len(batch) >= batch_size:
+                DamagePhoto.objects.bulk_update(batch, fields)
+                batch = []
+        if batch:
+            DamagePhoto.objects.bulk_update(batch, fields)
+        self.stdout.write(self.style.SUCCESS(f"Hashes berechnet: {hashed}, nicht lesbar: {failed}"))
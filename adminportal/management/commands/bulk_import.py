@@ -0,0 +1,59 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from adminportal.utils.bulk_import import CHUNK_SIZE, FORMATS, IMPORTERS, detect_format, run_import, write_error_report
+
+
+class Command(BaseCommand):
+    help = (
+        "Importiert Fahrzeuge, Kunden oder historische Buchungen aus CSV/JSON/JSON Lines "
+        "(blockweise, Duplikate werden übersprungen oder mit --update aktualisiert)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORTERS))
+        parser.add_argument("path", help="Importdatei oder '-' für stdin")
+        parser.add_argument("--format", choices=FORMATS, help="Standard: aus der Dateiendung, sonst csv")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+        parser.add_argument("--update", action="store_true", help="Vorhandene Datensätze aktualisieren statt überspringen")
+        parser.add_argument("--dry-run", action="store_true", help="Nur prüfen, nichts speichern")
+        parser.add_argument("--errors", help="Pfad für den Fehlerbericht (Standard: <datei>.errors.csv)")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or detect_format(path)
+        try:
+            if path == "-":
+                result = self._import(sys.stdin.buffer, fmt, options)
+            else:
+                with open(path, "rb") as handle:
+                    result = self._import(handle, fmt, options)
+        except FileNotFoundError:
+            raise CommandError(f"Datei nicht gefunden: {path}")
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        summary = result.summary()
+        prefix = "Testlauf" if result.dry_run else "Import"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix} {summary['kind']}: {summary['rows']} Zeilen, {summary['created']} neu, "
+                f"{summary['updated']} aktualisiert, {summary['skipped']} übersprungen, {summary['failed']} fehlerhaft"
+            )
+        )
+        if result.errors:
+            report_path = options["errors"] or (f"{path}.errors.csv" if path != "-" else "import.errors.csv")
+            with open(report_path, "w", encoding="utf-8", newline="") as report:
+                write_error_report(result.errors, report)
+            self.stdout.write(self.style.WARNING(f"Fehlerbericht: {report_path}"))
+
+    def _import(self, stream, fmt, options):
+        return run_import(
+            options["kind"],
+            stream,
+            fmt=fmt,
+            update=options["update"],
+            dry_run=options["dry_run"],
+            chunk_size=options["chunk_size"],
+        )
@@ -2,6 +2,7 @@ import json
 from django.core.management.base import BaseCommand
 
 from adminportal.models import Customer as PortalCustomer
+from config.db_router import read_from_replica
 from main.models import Customer, DamageReport, Booking
 
 
@@ -11,6 +12,7 @@ class Command(BaseCommand):
     def add_arguments(self, parser):
         parser.add_argument("--email", required=True, help="E-Mail-Adresse des Kunden")
 
+    @read_from_replica()
     def handle(self, *args, **options):
         email = options["email"].strip().lower()
 
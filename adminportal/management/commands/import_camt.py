@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from adminportal.utils.payments import import_camt, write_unmatched_report
+
+
+class Command(BaseCommand):
+    help = (
+        "Gleicht Gutschriften aus einer Bankdatei (ISO 20022 camt.053/camt.054) mit offenen Rechnungen ab "
+        "und markiert sie als bezahlt (QR-Referenz oder Rechnungsnummer plus Betrag)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="camt-XML-Datei")
+        parser.add_argument("--dry-run", action="store_true", help="Nur abgleichen, nichts verbuchen")
+        parser.add_argument("--report", help="Pfad für den Bericht der nicht zugeordneten Gutschriften (Standard: <datei>.unmatched.csv)")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            with open(path, "rb") as handle:
+                result = import_camt(handle, dry_run=options["dry_run"], source_name=path.rsplit("/", 1)[-1])
+        except FileNotFoundError:
+            raise CommandError(f"Datei nicht gefunden: {path}")
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        summary = result.summary()
+        prefix = "Testlauf" if result.dry_run else "Import"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{prefix}: {summary['transactions']} Buchungen, {summary['matched']} zugeordnet "
+                f"(CHF {summary['matched_total']}), {summary['unmatched']} nicht zugeordnet, {summary['ignored']} ignoriert"
+            )
+        )
+        if result.unmatched:
+            report_path = options["report"] or f"{path}.unmatched.csv"
+            with open(report_path, "w", encoding="utf-8", newline="") as report:
+                write_unmatched_report(result.unmatched, report)
+            self.stdout.write(self.style.WARNING(f"Nicht zugeordnet: {report_path}"))
@@ -0,0 +1,132 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from django.utils.dateparse import parse_date
+
+from perf.loadgen import TIME_BLOCKS, LoadGenerator, LoadProfile, StepFailed, db_double_bookings, next_saturday
+
+
+class Command(BaseCommand):
+    help = (
+        "Lasttest gegen einen laufenden Server: Mietablauf und Schadenmeldung (mit Uploads) parallel "
+        "mit einstellbaren Raten. Meldet Durchsatz, Latenz-Perzentile, Fehlerquoten und Doppelbuchungen. "
+        "Legt echte Buchungen/Schadenmeldungen an – nur gegen lokale oder Staging-Datenbanken."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--rental-rate", type=float, default=1.0, help="Gestartete Mietabläufe pro Sekunde")
+        parser.add_argument("--claim-rate", type=float, default=0.5, help="Gestartete Schadenmeldungen pro Sekunde")
+        parser.add_argument("--duration", type=float, default=60, help="Dauer der Startphase in Sekunden")
+        parser.add_argument("--concurrency", type=int, default=20, help="Maximal gleichzeitig laufende Abläufe")
+        parser.add_argument(
+            "--date",
+            action="append",
+            dest="dates",
+            help="Buchungsdatum (YYYY-MM-DD, mehrfach möglich); Standard: nächster Samstag",
+        )
+        parser.add_argument(
+            "--transporter",
+            action="append",
+            type=int,
+            dest="transporters",
+            help="Transporter-ID (mehrfach möglich); Standard: alle auf /mietfahrzeuge/",
+        )
+        parser.add_argument(
+            "--time-block",
+            action="append",
+            choices=sorted(TIME_BLOCKS),
+            dest="time_blocks",
+            help="Zeitblock (mehrfach möglich); Standard: zufällig aus allen",
+        )
+        parser.add_argument("--photos", type=int, default=2, help="Schadenfotos pro Meldung (max. 5)")
+        parser.add_argument("--think-time", type=float, default=0.0, help="Pause zwischen den Schritten in Sekunden")
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--seed", type=int)
+        parser.add_argument("--json", dest="json_path", help="Bericht zusätzlich als JSON schreiben")
+        parser.add_argument(
+            "--skip-db-check",
+            action="store_true",
+            help="Doppelbuchungen nicht in der DB suchen (Server nutzt eine andere Datenbank)",
+        )
+
+    def handle(self, *args, **options):
+        dates = []
+        for raw in options["dates"] or []:
+            day = parse_date(raw)
+            if day is None:
+                raise CommandError(f"Ungültiges Datum: {raw}")
+            dates.append(day)
+        if not 0 <= options["photos"] <= 5:
+            raise CommandError("--photos muss zwischen 0 und 5 liegen.")
+
+        profile = LoadProfile(
+            base_url=options["base_url"],
+            rental_rate=options["rental_rate"],
+            claim_rate=options["claim_rate"],
+            duration=options["duration"],
+            concurrency=options["concurrency"],
+            booking_dates=dates or [next_saturday()],
+            transporter_ids=options["transporters"] or [],
+            time_blocks=tuple(options["time_blocks"] or TIME_BLOCKS),
+            photos=options["photos"],
+            think_time=options["think_time"],
+            timeout=options["timeout"],
+            seed=options["seed"],
+        )
+        self.stdout.write(
+            f"Lasttest gegen {profile.base_url}: {profile.rental_rate}/s Mietabläufe, "
+            f"{profile.claim_rate}/s Schadenmeldungen, {profile.duration:g} s, bis {profile.concurrency} parallel"
+        )
+        try:
+            report = LoadGenerator(profile).run()
+        except StepFailed as exc:
+            raise CommandError(f"Lasttest nicht gestartet: {exc}")
+
+        if not options["skip_db_check"]:
+            try:
+                report["db_double_bookings"] = [
+                    {"first": first, "second": second}
+                    for first, second in db_double_bookings(profile.booking_dates, profile.transporter_ids)
+                ]
+            except DatabaseError as exc:
+                self.stderr.write(f"DB-Prüfung übersprungen: {exc}")
+
+        self._print_report(report)
+        if options["json_path"]:
+            with open(options["json_path"], "w") as fh:
+                json.dump(report, fh, indent=2, sort_keys=True, default=str)
+            self.stdout.write(f"Bericht geschrieben: {options['json_path']}")
+
+    def _print_report(self, report):
+        self.stdout.write("")
+        self.stdout.write(f"{'Schritt':<32}{'n':>6}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'Fehler':>8}")
+        for step, stats in report["steps"].items():
+            self.stdout.write(
+                f"{step:<32}{stats['count']:>6}{stats['p50_ms']:>9.0f}{stats['p95_ms']:>9.0f}"
+                f"{stats['p99_ms']:>9.0f}{stats['max_ms']:>9.0f}{stats['errors']:>8}"
+            )
+        self.stdout.write("")
+        for flow, outcomes in sorted(report["flows"].items()):
+            summary = ", ".join(f"{name} {count}" for name, count in sorted(outcomes.items()))
+            self.stdout.write(f"{flow}: {summary}")
+        self.stdout.write(
+            f"Dauer {report['elapsed_s']} s, {report['requests']} Requests ({report['requests_per_s']}/s), "
+            f"{report['completed_flows_per_min']} abgeschlossene Abläufe/min"
+        )
+        self.stdout.write(
+            f"Fehlerquote: {report['request_error_rate']:.2%} der Requests, {report['flow_error_rate']:.2%} der Abläufe"
+        )
+        self.stdout.write(f"Startverzug p95: {report['start_lag']['p95_ms']:.0f} ms")
+        for error in report["errors"]:
+            self.stdout.write(f"  {error}")
+
+        anomalies = report["double_bookings"] + report.get("db_double_bookings", [])
+        if anomalies:
+            for anomaly in anomalies:
+                self.stdout.write(self.style.ERROR(f"Doppelbuchung: {anomaly['first']} / {anomaly['second']}"))
+        elif report["request_error_rate"]:
+            self.stdout.write(self.style.WARNING("Keine Doppelbuchungen, aber fehlerhafte Requests."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Keine Doppelbuchungen, keine Fehler."))
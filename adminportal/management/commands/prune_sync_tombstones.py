@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.changes import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = "Löscht Tombstones des API-Änderungs-Feeds, die älter als SYNC_TOMBSTONE_DAYS sind."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.SYNC_TOMBSTONE_DAYS)
+
+    def handle(self, *args, **options):
+        count = prune_tombstones(days=options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Tombstones gelöscht: {count}"))
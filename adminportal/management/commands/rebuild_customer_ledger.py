@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from adminportal.utils.ledger import rebuild_customer_ledgers
+
+
+class Command(BaseCommand):
+    help = "Baut die Kundenkonten (Umsatz, offener Betrag, Aktivität, Anzahl Buchungen/Meldungen) komplett neu auf."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = rebuild_customer_ledgers(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Kundenkonten aktualisiert: {count}"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from adminportal.utils.fleet_stats import rebuild_fleet_stats
+
+
+class Command(BaseCommand):
+    help = "Baut die Tagesauslastung pro Transporter (Halbtage, Umsatz, Extras) aus allen Buchungen neu auf."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = rebuild_fleet_stats(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Tagesauslastung neu aufgebaut: {count} Transporter-Tage"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from adminportal.utils.invoice_lines import rebuild_invoice_lines
+
+
+class Command(BaseCommand):
+    help = "Baut die Rechnungspositionen (Portal- und API-Rechnungen) aus den gespeicherten items neu auf."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        count = rebuild_invoice_lines(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rechnungspositionen neu aufgebaut: {count}"))
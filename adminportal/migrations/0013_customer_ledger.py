@@ -0,0 +1,61 @@
+# Generated by Django 4.2.23 on 2026-10-19 12:05
+
+import adminportal.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminportal', '0012_portalsettings_rental_extras'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerLedger',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger', serialize=False, to='adminportal.customer')),
+                ('revenue_chf', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('open_balance_chf', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('invoice_count', models.PositiveIntegerField(default=0)),
+                ('booking_count', models.PositiveIntegerField(default=0)),
+                ('report_count', models.PositiveIntegerField(default=0)),
+                ('last_activity_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Kundenkonto',
+                'verbose_name_plural': 'Kundenkonten',
+            },
+        ),
+        migrations.AlterField(
+            model_name='portalsettings',
+            name='rental_extras',
+            field=models.JSONField(blank=True, default=adminportal.models.PortalSettings._default_rental_extras),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['created_at'], name='portal_customer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['last_name', 'first_name'], name='portal_customer_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['source'], name='portal_customer_source_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerledger',
+            index=models.Index(fields=['-revenue_chf'], name='portal_ledger_revenue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerledger',
+            index=models.Index(fields=['-open_balance_chf'], name='portal_ledger_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerledger',
+            index=models.Index(fields=['-last_activity_at'], name='portal_ledger_activity_idx'),
+        ),
+    ]
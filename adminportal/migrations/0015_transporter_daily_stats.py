@@ -0,0 +1,37 @@
+# Generated by Django 4.2.23 on 2026-10-19 12:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0026_booking_slot_exclusion'),
+        ('adminportal', '0014_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransporterDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('booked_slots', models.PositiveSmallIntegerField(default=0)),
+                ('booking_count', models.PositiveSmallIntegerField(default=0)),
+                ('revenue_chf', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('extras_revenue_chf', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('transporter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='main.transporter')),
+            ],
+            options={
+                'verbose_name': 'Tagesauslastung',
+                'verbose_name_plural': 'Tagesauslastungen',
+                'indexes': [models.Index(fields=['date'], name='portal_fleet_stats_date_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='transporterdailystats',
+            constraint=models.UniqueConstraint(fields=('transporter', 'date'), name='portal_fleet_stats_unique_day'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 12:34
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adminportal', '0015_transporter_daily_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='portal_customer_email_up_idx'),
+        ),
+    ]
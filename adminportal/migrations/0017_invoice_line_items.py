@@ -0,0 +1,53 @@
+# Generated by Django 4.2.23 on 2026-10-19 12:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0027_damagephoto_phash'),
+        ('adminportal', '0016_customer_email_upper_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='net_amount_chf',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='vat_amount_chf',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=10),
+        ),
+        migrations.CreateModel(
+            name='InvoiceLineItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('description', models.CharField(blank=True, max_length=255)),
+                ('category', models.CharField(choices=[('damage-report', 'Schadenmeldung'), ('rental', 'Vermietung'), ('other', 'Sonstiges')], default='other', max_length=20)),
+                ('quantity', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('unit_price', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('line_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('vat_rate', models.DecimalField(decimal_places=2, default=0, max_digits=5)),
+                ('net_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('vat_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('gross_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('api_invoice', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='main.invoice')),
+                ('invoice', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='line_items', to='adminportal.invoice')),
+            ],
+            options={
+                'verbose_name': 'Rechnungsposition',
+                'verbose_name_plural': 'Rechnungspositionen',
+                'ordering': ['position'],
+                'indexes': [models.Index(fields=['invoice', 'position'], name='portal_line_invoice_idx'), models.Index(fields=['api_invoice', 'position'], name='portal_line_api_invoice_idx'), models.Index(fields=['category'], name='portal_line_category_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='invoicelineitem',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('api_invoice__isnull', True), ('invoice__isnull', False)), models.Q(('api_invoice__isnull', False), ('invoice__isnull', True)), _connector='OR'), name='portal_line_item_one_invoice'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations, models
+
+
+QR_CHECK_TABLE = (0, 9, 4, 6, 8, 2, 7, 1, 3, 5)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("adminportal", "0017_invoice_line_items"),
+    ]
+
+    def _populate_references(apps, schema_editor):
+        # Eigene Kopie der Prüfziffer-Berechnung, damit die Migration nicht vom App-Code abhängt
+        Invoice = apps.get_model("adminportal", "Invoice")
+        pending = []
+        for invoice in Invoice.objects.filter(payment_reference="").only("pk").iterator():
+            base = f"{invoice.pk:026d}"
+            carry = 0
+            for digit in base:
+                carry = QR_CHECK_TABLE[(carry + int(digit)) % 10]
+            invoice.payment_reference = base + str((10 - carry) % 10)
+            pending.append(invoice)
+        Invoice.objects.bulk_update(pending, ["payment_reference"], batch_size=500)
+
+    def _noop(apps, schema_editor):
+        pass
+
+    operations = [
+        migrations.AddField(
+            model_name="invoice",
+            name="payment_reference",
+            field=models.CharField(blank=True, db_index=True, max_length=27),
+        ),
+        migrations.RunPython(_populate_references, _noop),
+    ]
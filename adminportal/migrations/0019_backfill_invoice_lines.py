@@ -0,0 +1,43 @@
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+class Migration(migrations.Migration):
+    """
+    Füllt Positionen und Summen für Rechnungen aus der Zeit vor 0017 nach (wie ``rebuild_invoice_lines``,
+    aber nur für Rechnungen ohne Positionen). Ohne das zeigen Vorschau und PDF keine Positionen und
+    CHF 0.00 Zwischensumme/MwSt, und der MwSt-Bericht fehlt die ganze Historie.
+    """
+
+    dependencies = [
+        ("main", "0027_damagephoto_phash"),
+        ("adminportal", "0018_invoice_payment_reference"),
+    ]
+
+    def _backfill(apps, schema_editor):
+        # Nur die reine Berechnung aus dem App-Code; gelesen/geschrieben wird über die historischen Modelle
+        from adminportal.utils.invoice_lines import api_lines, portal_invoice_lines
+
+        Invoice = apps.get_model("adminportal", "Invoice")
+        ApiInvoice = apps.get_model("main", "Invoice")
+        InvoiceLineItem = apps.get_model("adminportal", "InvoiceLineItem")
+
+        pending, changed = [], []
+        for invoice in Invoice.objects.filter(line_items__isnull=True).order_by("pk").iterator(chunk_size=BATCH_SIZE):
+            lines, (net, vat, gross) = portal_invoice_lines(invoice)
+            invoice.net_amount_chf, invoice.vat_amount_chf, invoice.amount_chf = net, vat, gross
+            changed.append(invoice)
+            pending.extend(InvoiceLineItem(invoice=invoice, **line) for line in lines)
+        for invoice in ApiInvoice.objects.filter(line_items__isnull=True).order_by("pk").iterator(chunk_size=BATCH_SIZE):
+            lines = api_lines(invoice.items, invoice.discount, invoice.type)[0]
+            pending.extend(InvoiceLineItem(api_invoice=invoice, **line) for line in lines)
+        InvoiceLineItem.objects.bulk_create(pending, batch_size=BATCH_SIZE)
+        Invoice.objects.bulk_update(changed, ["net_amount_chf", "vat_amount_chf", "amount_chf"], batch_size=BATCH_SIZE)
+
+    def _noop(apps, schema_editor):
+        pass
+
+    operations = [
+        migrations.RunPython(_backfill, _noop),
+    ]
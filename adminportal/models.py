@@ -1,7 +1,10 @@
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Upper
 from django.utils import timezone
 
-from main.models import DamageReport, Booking, DAMAGE_PART_CODES, INSURER_CHOICES, INSURER_OTHER, INSURER_NO
+from main.models import DamageReport, Booking, Transporter, DAMAGE_PART_CODES, INSURER_CHOICES, INSURER_OTHER, INSURER_NO
+from main.models import Invoice as ApiInvoice
 
 
 class Customer(models.Model):
@@ -25,12 +28,80 @@ class Customer(models.Model):
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at"], name="portal_customer_created_idx"),
+            models.Index(fields=["last_name", "first_name"], name="portal_customer_name_idx"),
+            models.Index(fields=["source"], name="portal_customer_source_idx"),
+            # Duplikatsuche (Massenimport) und Kundenkonten vergleichen E-Mails ohne Gross-/Kleinschreibung
+            models.Index(Upper("email"), name="portal_customer_email_up_idx"),
+        ]
+
     def __str__(self):
         if self.company:
             return self.company
         return f"{self.first_name} {self.last_name}".strip() or self.email
 
 
+class CustomerLedger(models.Model):
+    """
+    Denormalisierte Kennzahlen pro Kunde (Umsatz, offener Betrag, Aktivität, Anzahl Buchungen/Meldungen).
+    Wird über Signals aus ``adminportal.signals`` nachgeführt und mit ``rebuild_customer_ledger`` neu aufgebaut.
+    """
+
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name="ledger")
+    revenue_chf = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    open_balance_chf = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    invoice_count = models.PositiveIntegerField(default=0)
+    booking_count = models.PositiveIntegerField(default=0)
+    report_count = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Kundenkonto"
+        verbose_name_plural = "Kundenkonten"
+        indexes = [
+            models.Index(fields=["-revenue_chf"], name="portal_ledger_revenue_idx"),
+            models.Index(fields=["-open_balance_chf"], name="portal_ledger_open_idx"),
+            models.Index(fields=["-last_activity_at"], name="portal_ledger_activity_idx"),
+        ]
+
+    def __str__(self):
+        return f"Kundenkonto {self.customer_id}"
+
+
+class TransporterDailyStats(models.Model):
+    """
+    Tagesauslastung pro Transporter: gebuchte Halbtage (Vormittag/Nachmittag = 1, Ganzer Tag = 2),
+    Umsatz und Anteil Extras. Wird über Signals aus ``adminportal.signals`` nachgeführt und mit
+    ``rebuild_fleet_stats`` neu aufgebaut.
+    """
+
+    SLOTS_PER_DAY = 2
+
+    transporter = models.ForeignKey(Transporter, on_delete=models.CASCADE, related_name="daily_stats")
+    date = models.DateField()
+    booked_slots = models.PositiveSmallIntegerField(default=0)
+    booking_count = models.PositiveSmallIntegerField(default=0)
+    revenue_chf = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    extras_revenue_chf = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Tagesauslastung"
+        verbose_name_plural = "Tagesauslastungen"
+        constraints = [
+            models.UniqueConstraint(fields=["transporter", "date"], name="portal_fleet_stats_unique_day"),
+        ]
+        indexes = [
+            models.Index(fields=["date"], name="portal_fleet_stats_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.transporter_id} {self.date}"
+
+
 class Invoice(models.Model):
     STATUS_CHOICES = [
         ("draft", "Entwurf"),
@@ -49,26 +120,56 @@ class Invoice(models.Model):
     vat_rate = models.DecimalField(max_digits=4, decimal_places=2, default=7.7)
     vat_included = models.BooleanField(default=True)
     amount_chf = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Zwischengespeicherte Summen der Positionen (``amount_chf`` = Bruttobetrag)
+    net_amount_chf = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    vat_amount_chf = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="draft")
     issue_date = models.DateField(default=timezone.localdate)
     due_date = models.DateField(null=True, blank=True)
     payment_date = models.DateField(null=True, blank=True)
     payment_method = models.CharField(max_length=30, blank=True)
+    # QR-Referenz für Einzahlungen, Abgleich der Bankgutschriften (camt.054) über diesen Index
+    payment_reference = models.CharField(max_length=27, blank=True, db_index=True)
     payment_events = models.JSONField(default=list, blank=True)
     reminder_level = models.PositiveSmallIntegerField(default=0)
     last_reminded_at = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "-issue_date"], name="portal_invoice_status_idx"),
+            models.Index(fields=["-issue_date"], name="portal_invoice_issue_idx"),
+            models.Index(fields=["due_date"], name="portal_invoice_due_idx"),
+            models.Index(
+                fields=["due_date"],
+                name="portal_invoice_open_due_idx",
+                condition=Q(status__in=["pending", "overdue"]),
+            ),
+        ]
+
     def __str__(self):
         return self.invoice_number
 
     def save(self, *args, **kwargs):
+        from adminportal.utils.invoice_lines import TOTAL_SOURCE_FIELDS, apply_portal_totals
+
         if not self.invoice_number:
             self.invoice_number = self.generate_invoice_number()
         if not self.due_date and self.issue_date:
             self.due_date = self.issue_date + timezone.timedelta(days=30)
-        return super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or TOTAL_SOURCE_FIELDS & set(update_fields):
+            apply_portal_totals(self)
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "amount_chf", "net_amount_chf", "vat_amount_chf"}
+        super().save(*args, **kwargs)
+        if not self.payment_reference:
+            from adminportal.utils.payments import qr_reference
+
+            # Die Referenz leitet sich aus der ID ab und ist erst nach dem ersten Speichern bekannt
+            self.payment_reference = qr_reference(self.pk)
+            type(self).objects.filter(pk=self.pk).update(payment_reference=self.payment_reference)
 
     @classmethod
     def generate_invoice_number(cls):
@@ -107,6 +208,54 @@ class Invoice(models.Model):
         self.payment_events = events
 
 
+class InvoiceLineItem(models.Model):
+    """
+    Normalisierte Rechnungsposition mit Decimal-Beträgen (netto, MwSt, brutto) für Portal-Rechnungen
+    (``invoice``) und API-Rechnungen (``api_invoice``). Wird beim Speichern der Rechnung aus
+    ``items`` neu geschrieben (``adminportal.signals``) und mit ``rebuild_invoice_lines`` neu aufgebaut;
+    MwSt- und Umsatzberichte aggregieren direkt auf dieser Tabelle.
+    """
+
+    CATEGORY_CHOICES = ApiInvoice.INVOICE_TYPES
+
+    invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, null=True, blank=True, related_name="line_items")
+    api_invoice = models.ForeignKey(ApiInvoice, on_delete=models.CASCADE, null=True, blank=True, related_name="line_items")
+    position = models.PositiveSmallIntegerField(default=0)
+    description = models.CharField(max_length=255, blank=True)
+    category = models.CharField(max_length=20, choices=CATEGORY_CHOICES, default="other")
+    quantity = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    unit_price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    line_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    vat_rate = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    net_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    vat_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    gross_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Rechnungsposition"
+        verbose_name_plural = "Rechnungspositionen"
+        ordering = ["position"]
+        constraints = [
+            models.CheckConstraint(
+                check=Q(invoice__isnull=False, api_invoice__isnull=True) | Q(invoice__isnull=True, api_invoice__isnull=False),
+                name="portal_line_item_one_invoice",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["invoice", "position"], name="portal_line_invoice_idx"),
+            models.Index(fields=["api_invoice", "position"], name="portal_line_api_invoice_idx"),
+            models.Index(fields=["category"], name="portal_line_category_idx"),
+        ]
+
+    def __str__(self):
+        return self.description or f"Position {self.position}"
+
+    @property
+    def total(self):
+        """Positionsbetrag wie erfasst (Menge × Einzelpreis), wie ``total`` in ``items``."""
+        return self.line_total
+
+
 class PortalSettings(models.Model):
     def _default_damage_parts():
         return [{"name": label, "active": True} for _, label in DAMAGE_PART_CODES]
@@ -204,6 +353,9 @@ class AuditLog(models.Model):
     metadata = models.JSONField(default=dict, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["-created_at"], name="auditlog_created_idx")]
+
     def __str__(self):
         return f"{self.created_at:%Y-%m-%d %H:%M} · {self.action}"
 
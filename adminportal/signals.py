@@ -0,0 +1,91 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from adminportal.models import Customer, Invoice
+from adminportal.utils.fleet_stats import booking_keys, schedule_fleet_stats_refresh
+from adminportal.utils.invoice_lines import API_SOURCE_FIELDS, TOTAL_SOURCE_FIELDS, sync_line_items
+from adminportal.utils.ledger import schedule_ledger_refresh
+from adminportal.utils.live import publish_on_commit
+from adminportal.utils.timeline import invalidate_booking_calendar
+from main.models import Booking, DamageReport
+from main.models import Invoice as ApiInvoice
+
+
+def _loaded(instance, field):
+    # Zurückgestellte Felder (``only()``/``defer()``) nicht nachladen – sonst eine Query pro Instanz
+    return instance.__dict__.get(field)
+
+
+@receiver(post_init, sender=Invoice)
+def _remember_invoice_customer(sender, instance, **kwargs):
+    instance._ledger_customer_id = _loaded(instance, "customer_id")
+
+
+@receiver(post_save, sender=Invoice)
+@receiver(post_delete, sender=Invoice)
+def invoice_changed(sender, instance, **kwargs):
+    schedule_ledger_refresh(customer_ids=[instance.customer_id, getattr(instance, "_ledger_customer_id", None)])
+    instance._ledger_customer_id = instance.customer_id
+    publish_on_commit("invoice", id=instance.pk, status=instance.status, deleted="created" not in kwargs)
+
+
+@receiver(post_save, sender=Invoice)
+def portal_invoice_lines_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or TOTAL_SOURCE_FIELDS & set(update_fields):
+        sync_line_items(instance)
+
+
+@receiver(post_save, sender=ApiInvoice)
+def api_invoice_lines_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or API_SOURCE_FIELDS & set(update_fields):
+        sync_line_items(instance)
+
+
+STATS_FIELDS = ("transporter_id", "date", "time_slot", "pickup_date", "return_date", "status")
+
+
+@receiver(post_init, sender=Booking)
+def _remember_booking_state(sender, instance, **kwargs):
+    instance._ledger_email = _loaded(instance, "customer_email")
+    loaded = instance.__dict__
+    # Belegte Tage vor der Änderung; bei zurückgestellten Feldern unbekannt (dann nur neue Tage)
+    instance._stats_keys = booking_keys(instance) if all(field in loaded for field in STATS_FIELDS) else set()
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def booking_changed(sender, instance, **kwargs):
+    schedule_ledger_refresh(emails=[instance.customer_email, getattr(instance, "_ledger_email", "")])
+    instance._ledger_email = instance.customer_email
+    # Nach dem Löschen fehlt die Buchung in der Neuberechnung, ihre Tage werden dadurch frei
+    keys = booking_keys(instance)
+    schedule_fleet_stats_refresh(keys | getattr(instance, "_stats_keys", set()))
+    instance._stats_keys = keys
+    invalidate_booking_calendar()
+    publish_on_commit(
+        "booking",
+        id=instance.pk,
+        status=instance.status,
+        payment_status=instance.payment_status,
+        date=instance.date,
+        transporter=instance.transporter_id,
+        deleted="created" not in kwargs,
+    )
+
+
+@receiver(post_init, sender=DamageReport)
+def _remember_report_email(sender, instance, **kwargs):
+    instance._ledger_email = _loaded(instance, "email")
+
+
+@receiver(post_save, sender=DamageReport)
+@receiver(post_delete, sender=DamageReport)
+def damage_report_changed(sender, instance, **kwargs):
+    schedule_ledger_refresh(emails=[instance.email, getattr(instance, "_ledger_email", "")])
+    instance._ledger_email = instance.email
+    publish_on_commit("damagereport", id=instance.pk, status=instance.status, deleted="created" not in kwargs)
+
+
+@receiver(post_save, sender=Customer)
+def customer_saved(sender, instance, **kwargs):
+    schedule_ledger_refresh(customer_ids=[instance.pk])
@@ -1,3 +1,540 @@
-from django.test import TestCase
+import io
+import tempfile
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.apps import apps as django_apps
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+
+from adminportal.models import Customer, CustomerLedger, Invoice, InvoiceLineItem, TransporterDailyStats
+from adminportal.utils.bulk_import import run_import
+from adminportal.utils.fleet_stats import rebuild_fleet_stats
+from adminportal.utils.gdpr import anonymize_personal_data
+from adminportal.utils.ical import FLEET_SCOPE, feed_token, transporter_scope
+from adminportal.utils.live import broker, event_stream
+from adminportal.utils.payments import import_camt, is_qr_reference
+from adminportal.utils.timeline import BookingWindow, month_calendar
+from adminportal.utils.vat_report import quarter_of, vat_report
+from config import db_router, metrics
+from config.middleware import DatabaseRoutingMiddleware
+from main.models import Booking, Transporter
+from main.models import Customer as MainCustomer, Invoice as MainInvoice
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        metrics.reset_samples()
+        cache.clear()
+
+    def test_fingerprint_ignores_literals(self):
+        first, normalized = metrics.fingerprint_sql("SELECT * FROM main_booking WHERE id IN (1, 2, 3) AND status = 'pending'")
+        second, _ = metrics.fingerprint_sql("SELECT * FROM main_booking WHERE id IN (7) AND status = 'confirmed'")
+        self.assertEqual(first, second)
+        self.assertNotIn("pending", normalized)
+
+    def test_server_timing_header_and_sample(self):
+        resp = self.client.get(reverse("home"))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("db;dur=", resp["Server-Timing"])
+        self.assertIn("total;dur=", resp["Server-Timing"])
+        sample = metrics.recent_samples(limit=1)[0]
+        self.assertEqual(sample["path"], "/")
+        self.assertEqual(sample["route"], "/")
+        self.assertGreater(sample["template_ms"], 0)
+
+    def test_summary_groups_by_route_and_counts_get_many(self):
+        token = metrics.activate(metrics.RequestMetrics())
+        try:
+            cache.set("a", 1)
+            cache.get_many(["a", "b", "c"])
+            cache.get_or_set("d", 4)
+            current = metrics.current_metrics()
+            self.assertEqual((current.cache_hits, current.cache_misses), (1, 3))
+        finally:
+            metrics.deactivate(token)
+
+        samples = [
+            {**metrics.RequestMetrics("GET", f"/portal/buchungen/{pk}/").as_dict(), "route": "/portal/buchungen/<int:pk>/"}
+            for pk in (1, 2)
+        ]
+        rows = metrics.path_summary(samples)
+        self.assertEqual([(row["route"], row["count"]) for row in rows], [("/portal/buchungen/<int:pk>/", 2)])
+
+    def test_metrics_page_requires_admin_role(self):
+        employee = User.objects.create_user(username="mitarbeiter", password="Test-12345", is_staff=True)
+        employee.groups.add(Group.objects.get_or_create(name="employee")[0])
+        self.client.force_login(employee)
+        self.assertEqual(self.client.get(reverse("portal_metrics")).status_code, 302)
+
+        admin = User.objects.create_user(username="chef", password="Test-12345", is_staff=True)
+        admin.groups.add(Group.objects.get_or_create(name="admin")[0])
+        self.client.force_login(admin)
+        resp = self.client.get(reverse("portal_metrics"))
+        self.assertContains(resp, "Langsame Queries")
+
+
+class CustomerLedgerTests(TestCase):
+    def setUp(self):
+        self.customer = Customer.objects.create(first_name="Erika", last_name="Muster", email="Erika@Example.com")
+
+    def test_invoice_and_booking_writes_update_ledger(self):
+        transporter = Transporter.objects.create(name="Van", kennzeichen="SO-1", verfuegbar_ab=timezone.localdate(), preis_chf=100)
+        with self.captureOnCommitCallbacks(execute=True):
+            Invoice.objects.create(invoice_number="RE-T-1", customer=self.customer, amount_chf=Decimal("200.00"), status="paid")
+            invoice = Invoice.objects.create(invoice_number="RE-T-2", customer=self.customer, amount_chf=Decimal("50.00"), status="pending")
+            Booking.objects.create(
+                transporter=transporter,
+                date=timezone.localdate(),
+                time_slot="MORNING",
+                customer_name="Erika Muster",
+                customer_email="erika@example.com",
+                driver_license_number="X1",
+            )
+        ledger = CustomerLedger.objects.get(customer=self.customer)
+        self.assertEqual(ledger.revenue_chf, Decimal("250.00"))
+        self.assertEqual(ledger.open_balance_chf, Decimal("50.00"))
+        self.assertEqual(ledger.booking_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            invoice.status = "paid"
+            invoice.save()
+        ledger.refresh_from_db()
+        self.assertEqual(ledger.open_balance_chf, Decimal("0.00"))
+
+    def test_rebuild_command(self):
+        CustomerLedger.objects.all().delete()
+        Invoice.objects.bulk_create([Invoice(invoice_number="RE-T-3", customer=self.customer, amount_chf=Decimal("80.00"))])
+        call_command("rebuild_customer_ledger", stdout=io.StringIO())
+        self.assertEqual(CustomerLedger.objects.get(customer=self.customer).revenue_chf, Decimal("80.00"))
+
+
+class BookingTimelineTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.transporter = Transporter.objects.create(name="Van", kennzeichen="SO-2", verfuegbar_ab=self.today, preis_chf=100)
+        for slot in ["MORNING", "AFTERNOON"]:
+            Booking.objects.create(
+                transporter=self.transporter,
+                date=self.today,
+                time_slot=slot,
+                customer_name=f"Kunde {slot}",
+                customer_email="kunde@example.com",
+                driver_license_number="X1",
+            )
+
+    def test_grid_keeps_both_half_days(self):
+        window = BookingWindow(self.today, self.today)
+        cell = window.grid([self.transporter])[0]["slots"][0]
+        self.assertEqual(cell["morning"].customer_name, "Kunde MORNING")
+        self.assertEqual(cell["afternoon"].customer_name, "Kunde AFTERNOON")
+        self.assertIsNone(cell["fullday"])
+
+    def test_month_calendar_cached_until_booking_write(self):
+        first = month_calendar(self.today.year, self.today.month)
+        with self.assertNumQueries(0):
+            month_calendar(self.today.year, self.today.month)
+        other = Transporter.objects.create(name="Van 2", kennzeichen="SO-3", verfuegbar_ab=self.today, preis_chf=100)
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                transporter=other,
+                date=self.today,
+                time_slot="FULLDAY",
+                customer_name="Neu",
+                customer_email="neu@example.com",
+                driver_license_number="X2",
+            )
+            # Bis zum Commit bleibt die alte Version gültig
+            self.assertEqual(month_calendar(self.today.year, self.today.month)["html"], first["html"])
+        second = month_calendar(self.today.year, self.today.month)
+        self.assertNotIn(f"BU-{booking.pk}", first["html"])
+        self.assertIn(f"BU-{booking.pk}", second["html"])
+
+
+@mock.patch("config.db_router.replica_configured", return_value=True)
+class ReplicaRoutingTests(TestCase):
+    def setUp(self):
+        self.router = db_router.PrimaryReplicaRouter()
+
+    def _in_request(self, func, pinned=False):
+        token = db_router.begin_request(pinned=pinned)
+        try:
+            return func()
+        finally:
+            db_router.end_request(token)
+
+    def test_reads_use_replica_only_inside_block(self, _configured):
+        def run():
+            outside = self.router.db_for_read(Booking)
+            with db_router.read_from_replica():
+                inside = self.router.db_for_read(Booking)
+            return outside, inside
+
+        self.assertEqual(self._in_request(run), (None, db_router.REPLICA_ALIAS))
+
+    def test_write_and_pin_keep_reads_on_primary(self, _configured):
+        def write_then_read():
+            self.router.db_for_write(Booking)
+            with db_router.read_from_replica():
+                return self.router.db_for_read(Booking)
+
+        def read():
+            with db_router.read_from_replica():
+                return self.router.db_for_read(Booking)
+
+        self.assertIsNone(self._in_request(write_then_read))
+        self.assertIsNone(self._in_request(read, pinned=True))
+
+    def test_live_refresh_bypasses_replica(self, _configured):
+        view = db_router.replica_view(lambda request: self.router.db_for_read(Booking))
+        factory = RequestFactory()
+        self.assertEqual(self._in_request(lambda: view(factory.get("/"))), db_router.REPLICA_ALIAS)
+        self.assertIsNone(self._in_request(lambda: view(factory.get("/", HTTP_X_REQUESTED_WITH="live"))))
+
+    def test_middleware_sets_pin_cookie_after_write(self, _configured):
+        def view(request):
+            Transporter.objects.create(name="Van", kennzeichen="SO-9", verfuegbar_ab=timezone.localdate(), preis_chf=100)
+            return HttpResponse("ok")
+
+        response = DatabaseRoutingMiddleware(view)(RequestFactory().post("/"))
+        self.assertIn(db_router.PIN_COOKIE, response.cookies)
+        response = DatabaseRoutingMiddleware(lambda request: HttpResponse("ok"))(RequestFactory().get("/"))
+        self.assertNotIn(db_router.PIN_COOKIE, response.cookies)
+
+
+class FleetStatsTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.transporter = Transporter.objects.create(name="Van", kennzeichen="SO-5", verfuegbar_ab=self.today, preis_chf=100)
+
+    def _book(self, **kwargs):
+        data = {
+            "transporter": self.transporter,
+            "date": self.today,
+            "time_slot": "MORNING",
+            "customer_name": "Kunde",
+            "customer_email": "kunde@example.com",
+            "driver_license_number": "X1",
+            "total_price": Decimal("60.00"),
+        }
+        data.update(kwargs)
+        with self.captureOnCommitCallbacks(execute=True):
+            return Booking.objects.create(**data)
+
+    def _stats(self):
+        return {
+            row.date: (row.booked_slots, row.booking_count, row.revenue_chf)
+            for row in TransporterDailyStats.objects.filter(transporter=self.transporter)
+        }
+
+    def test_half_days_ranges_and_moves_update_incrementally(self):
+        self._book(time_slot="MORNING")
+        self._book(time_slot="AFTERNOON", total_price=Decimal("40.00"))
+        tomorrow = self.today + timedelta(days=1)
+        trip = self._book(
+            date=tomorrow,
+            time_slot="FULLDAY",
+            pickup_date=tomorrow,
+            return_date=tomorrow + timedelta(days=2),
+            total_price=Decimal("300.00"),
+        )
+        self.assertEqual(self._stats()[self.today], (2, 2, Decimal("100.00")))
+        self.assertEqual(self._stats()[tomorrow + timedelta(days=2)], (2, 1, Decimal("100.00")))
+
+        trip.status = "cancelled"
+        with self.captureOnCommitCallbacks(execute=True):
+            trip.save()
+        self.assertEqual(set(self._stats()), {self.today})
+
+        snapshot = self._stats()
+        rebuild_fleet_stats()
+        self.assertEqual(self._stats(), snapshot)
+
+    def test_utilization_page_and_deletes(self):
+        booking = self._book(time_slot="FULLDAY")
+        user = User.objects.create_user(username="mgr", password="pass12345")
+        user.groups.add(Group.objects.get_or_create(name="manager")[0])
+        self.client.force_login(user)
+        response = self.client.get(reverse("portal_utilization"), {"month": self.today.strftime("%Y-%m")})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["rows"][0]["booked_slots"], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.delete()
+        self.assertEqual(self._stats(), {})
+
+
+class BulkImportTests(TestCase):
+    def test_booking_import_dedupes_and_checks_conflicts(self):
+        day = timezone.localdate() - timedelta(days=30)
+        transporter = Transporter.objects.create(name="Van", kennzeichen="ZH 100", verfuegbar_ab=day, preis_chf=100)
+        Booking.objects.create(
+            transporter=transporter,
+            date=day,
+            time_slot="MORNING",
+            customer_name="Alt",
+            customer_email="alt@example.com",
+            driver_license_number="X1",
+        )
+        source = io.BytesIO(
+            (
+                "transporter;date;time_slot;customer_name;customer_email;total_price\n"
+                f"zh 100;{day:%d.%m.%Y};MORNING;Alt;alt@example.com;80\n"  # bereits vorhanden
+                f"ZH 100;{day.isoformat()};Nachmittag;Neu;neu@example.com;80,50\n"
+                f"ZH 100;{day.isoformat()};FULLDAY;Konflikt;k@example.com;150\n"
+                f"ZH 999;{day.isoformat()};MORNING;Unbekannt;nobody;10\n"
+            ).encode("utf-8")
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            result = run_import("bookings", source, fmt="csv")
+
+        self.assertEqual(result.summary()["created"], 1)
+        self.assertEqual(result.skipped, 1)
+        self.assertEqual(result.failed_rows, 2)
+        self.assertEqual({error["field"] for error in result.errors}, {"", "transporter", "customer_email"})
+        booking = Booking.objects.get(customer_email="neu@example.com")
+        self.assertEqual((booking.time_slot, booking.total_price), ("AFTERNOON", Decimal("80.50")))
+        self.assertEqual(TransporterDailyStats.objects.get(transporter=transporter, date=day).booked_slots, 2)
+
+    def test_api_imports_customers_with_error_report(self):
+        Customer.objects.create(first_name="Anna", last_name="Muster", email="Anna@Example.com")
+        staff = User.objects.create_user(username="importer", password="pass12345", is_staff=True)
+        client = Client()
+        client.force_login(staff)
+        payload = (
+            '[{"first_name": "Anna", "last_name": "Muster", "email": "anna@example.com", "city": "Bern"},'
+            ' {"last_name": "Neu", "phone": "044 123 45 67"},'
+            ' {"last_name": "Falsch", "phone": "12"}]'
+        )
+        upload = io.BytesIO(payload.encode("utf-8"))
+        upload.name = "kunden.json"
+        with tempfile.TemporaryDirectory() as media_root, self.settings(MEDIA_ROOT=media_root):
+            response = client.post(reverse("bulk-import", args=["customers"]), {"file": upload, "update": "true"})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["created"], data["updated"], data["failed"]), (1, 1, 1))
+        self.assertEqual(data["errors"][0]["field"], "phone")
+        self.assertTrue(data["error_report"])
+        self.assertEqual(Customer.objects.get(last_name="Muster").city, "Bern")
+
+
+class InvoiceLineItemTests(TestCase):
+    def test_line_items_match_totals_and_feed_vat_report(self):
+        day = timezone.localdate()
+        customer = Customer.objects.create(first_name="Eva", last_name="Beispiel", email="eva@example.com")
+        invoice = Invoice.objects.create(
+            customer=customer,
+            status="pending",
+            vat_rate=Decimal("8.1"),
+            items=[
+                {"description": "Arbeit", "quantity": 3, "unit_price": 33.33},
+                {"description": "Material", "quantity": 1, "unit_price": 10.01},
+            ],
+            issue_date=day,
+        )
+        Invoice.objects.create(customer=customer, status="cancelled", amount_chf=Decimal("500"), issue_date=day)
+        api_customer = MainCustomer.objects.create(
+            first_name="Eva", last_name="Beispiel", email="eva@example.com", phone="0791234567",
+            address="Weg 1", city="Olten", postal_code="4600",
+        )
+        MainInvoice.objects.create(
+            customer=api_customer,
+            invoice_date=day,
+            type="rental",
+            items=[{"description": "Miete", "quantity": 1, "unitPrice": 100, "vatRate": 2.6, "total": 100}],
+            discount=Decimal("10"),
+        )
+
+        lines = list(invoice.line_items.all())
+        self.assertEqual(invoice.amount_chf, Decimal("110.00"))
+        self.assertEqual(sum(line.net_amount for line in lines), invoice.net_amount_chf)
+        self.assertEqual(sum(line.vat_amount for line in lines), invoice.vat_amount_chf)
+        self.assertEqual(sum(line.gross_amount for line in lines), invoice.amount_chf)
+
+        year, quarter = quarter_of(day)
+        with self.assertNumQueries(4):
+            report = vat_report(year, quarter)
+        rates = {row["vat_rate"]: row for row in report["rates"]}
+        self.assertEqual(rates[Decimal("8.1")]["vat"], invoice.vat_amount_chf)
+        self.assertEqual(rates[Decimal("2.6")]["vat"], Decimal("2.60"))
+        self.assertEqual(report["totals"]["invoices"], 2)  # stornierte Rechnung zählt nicht
+        self.assertEqual(report["totals"]["gross"], invoice.amount_chf + Decimal("92.60"))
+        self.assertEqual({row["category"] for row in report["categories"]}, {"other", "rental"})
+
+        invoice.status = "cancelled"
+        invoice.save(update_fields=["status"])
+        self.assertEqual(InvoiceLineItem.objects.filter(invoice=invoice).count(), 2)
+        self.assertEqual(vat_report(year, quarter)["totals"]["invoices"], 1)
+
+    def test_migration_backfills_invoices_without_lines(self):
+        customer = Customer.objects.create(first_name="Eva", last_name="Beispiel", email="eva@example.com")
+        invoice = Invoice.objects.create(
+            customer=customer,
+            vat_rate=Decimal("8.1"),
+            items=[{"description": "Arbeit", "quantity": 2, "unit_price": 50}],
+            issue_date=timezone.localdate(),
+        )
+        expected = (invoice.net_amount_chf, invoice.vat_amount_chf, invoice.amount_chf)
+        # Stand vor 0017: keine Positionen, Summen auf dem Default
+        InvoiceLineItem.objects.all().delete()
+        Invoice.objects.filter(pk=invoice.pk).update(net_amount_chf=0, vat_amount_chf=0)
+
+        import_module("adminportal.migrations.0019_backfill_invoice_lines").Migration._backfill(django_apps, None)
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.net_amount_chf, invoice.vat_amount_chf, invoice.amount_chf), expected)
+        self.assertEqual([line.description for line in invoice.line_items.all()], ["Arbeit"])
+
+
+CAMT_054 = """<?xml version="1.0" encoding="UTF-8"?>
+<Document xmlns="urn:iso:std:iso:20022:tech:xsd:camt.054.001.08">
+  <BkToCstmrDbtCdtNtfctn><Ntfctn>
+    <Ntry>
+      <Amt Ccy="CHF">{total}</Amt><CdtDbtInd>CRDT</CdtDbtInd>
+      <BookgDt><Dt>2026-10-15</Dt></BookgDt><AcctSvcrRef>SAMMEL-1</AcctSvcrRef>
+      <NtryDtls>
+        <TxDtls>
+          <Refs><AcctSvcrRef>TX-1</AcctSvcrRef></Refs>
+          <Amt Ccy="CHF">{amount}</Amt><CdtDbtInd>CRDT</CdtDbtInd>
+          <RmtInf><Strd><CdtrRefInf><Ref>{reference}</Ref></CdtrRefInf></Strd></RmtInf>
+        </TxDtls>
+        <TxDtls>
+          <Refs><AcctSvcrRef>TX-2</AcctSvcrRef></Refs>
+          <Amt Ccy="CHF">12.00</Amt><CdtDbtInd>CRDT</CdtDbtInd>
+          <RltdPties><Dbtr><Nm>Unbekannt AG</Nm></Dbtr></RltdPties>
+          <RmtInf><Ustrd>Danke</Ustrd></RmtInf>
+        </TxDtls>
+      </NtryDtls>
+    </Ntry>
+    <Ntry>
+      <Amt Ccy="CHF">99.00</Amt><CdtDbtInd>DBIT</CdtDbtInd>
+      <BookgDt><Dt>2026-10-15</Dt></BookgDt>
+    </Ntry>
+  </Ntfctn></BkToCstmrDbtCdtNtfctn>
+</Document>
+"""
+
+
+class PaymentImportTests(TestCase):
+    def test_camt_credits_match_reference_and_amount(self):
+        customer = Customer.objects.create(first_name="Urs", last_name="Zahler", email="urs@example.com")
+        invoice = Invoice.objects.create(customer=customer, status="pending", amount_chf=Decimal("120.00"))
+        self.assertTrue(is_qr_reference(invoice.payment_reference))
+        camt = CAMT_054.format(total="132.00", amount="120.00", reference=invoice.payment_reference).encode("utf-8")
+
+        result = import_camt(io.BytesIO(camt), dry_run=True, source_name="gutschriften.xml")
+        self.assertEqual(result.summary()["matched"], 1)
+        self.assertEqual(result.ignored, 1)
+        self.assertEqual([row["reason"] for row in result.unmatched], ["Keine Referenz"])
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.status, "pending")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            import_camt(io.BytesIO(camt), source_name="gutschriften.xml")
+        invoice.refresh_from_db()
+        self.assertEqual((invoice.status, str(invoice.payment_date)), ("paid", "2026-10-15"))
+        self.assertEqual(invoice.payment_events[-1]["kind"], "paid")
+        self.assertEqual(CustomerLedger.objects.get(customer=customer).open_balance_chf, Decimal("0"))
+
+        again = import_camt(io.BytesIO(camt), dry_run=True)
+        self.assertIn("bereits bezahlt", again.unmatched[0]["reason"])
+
+    def test_truncated_file_books_nothing(self):
+        customer = Customer.objects.create(first_name="Urs", last_name="Zahler", email="urs@example.com")
+        invoice = Invoice.objects.create(customer=customer, status="pending", amount_chf=Decimal("120.00"))
+        camt = CAMT_054.format(total="132.00", amount="120.00", reference=invoice.payment_reference).encode("utf-8")
+        truncated = camt[: camt.index(b"<Amt Ccy=\"CHF\">99.00")]
+        with self.assertRaises(ValueError):
+            import_camt(io.BytesIO(truncated), source_name="abgeschnitten.xml", chunk_size=1)
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.status, "pending")
+
+
+class IcalFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        day = timezone.localdate() + timedelta(days=2)
+        self.transporter = Transporter.objects.create(name="Sprinter", kennzeichen="ZH 1", verfuegbar_ab=day, preis_chf=100)
+        self.booking = Booking.objects.create(
+            transporter=self.transporter, date=day, time_slot="MORNING",
+            customer_name="Kurt Kunde", customer_email="kurt@example.com", driver_license_number="X",
+        )
+        self.url = reverse("portal_ical_feed", args=[feed_token(FLEET_SCOPE)])
+
+    def test_feed_is_signed_and_revalidated_with_etag(self):
+        self.assertEqual(self.client.get(reverse("portal_ical_feed", args=[FLEET_SCOPE + ":x"])).status_code, 404)
+        response = self.client.get(self.url)
+        self.assertEqual(response["Content-Type"], "text/calendar; charset=utf-8")
+        self.assertIn(b"SUMMARY:Sprinter: Kurt Kunde", response.content)
+        self.assertIn(b"DTSTART;TZID=Europe/Zurich:", response.content)
+
+        with self.assertNumQueries(2):
+            cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        # Änderung → nur die geänderte Buchung wird neu gerendert, gelöschte fallen heraus
+        other = Booking.objects.create(
+            transporter=self.transporter, date=self.booking.date, time_slot="AFTERNOON",
+            customer_name="Lea Later", customer_email="lea@example.com", driver_license_number="Y",
+        )
+        self.booking.delete()
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotIn(b"Kurt Kunde", changed.content)
+        self.assertIn(f"UID:booking-{other.pk}@".encode(), changed.content)
+
+        scoped = self.client.get(reverse("portal_ical_feed", args=[feed_token(transporter_scope(self.transporter.pk + 1))]))
+        self.assertNotIn(b"BEGIN:VEVENT", scoped.content)
+
+    def test_anonymisation_and_transporter_rename_rebuild_events(self):
+        self.assertIn(b"kurt@example.com", self.client.get(self.url).content)
+        self.transporter.name = "Crafter"
+        self.transporter.save()
+        self.assertIn(b"SUMMARY:Crafter: Kurt Kunde", self.client.get(self.url).content)
+        anonymize_personal_data("kurt@example.com")
+        content = self.client.get(self.url).content
+        self.assertNotIn(b"kurt@example.com", content)
+        self.assertIn(b"SUMMARY:Crafter: Anonymized User", content)
+
+
+class LiveEventTests(TestCase):
+    def test_signals_publish_after_commit_and_stream_replays(self):
+        day = timezone.localdate()
+        transporter = Transporter.objects.create(name="Van", kennzeichen="ZH 7", verfuegbar_ab=day, preis_chf=100)
+        before = broker.publish("ping", {})
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                transporter=transporter, date=day, time_slot="MORNING",
+                customer_name="Live", customer_email="live@example.com", driver_license_number="X",
+            )
+            self.assertEqual(broker.since(before), [])
+        self.assertEqual([(kind, data["id"]) for _, kind, data in broker.since(before)], [("booking", booking.pk)])
+
+        async def consume():
+            stream = event_stream(last_id=before, max_seconds=1, heartbeat=0.05)
+            chunks = [await stream.__anext__(), await stream.__anext__()]  # retry + verpasstes Event
+            broker.publish("invoice", {"id": 5})
+            chunks.append(await stream.__anext__())
+            await stream.aclose()
+            return chunks
+
+        retry, replayed, pushed = async_to_sync(consume)()
+        self.assertTrue(retry.startswith("retry:"))
+        self.assertIn("event: booking", replayed)
+        self.assertIn('event: invoice\ndata: {"id": 5}', pushed)
+
+    def test_wsgi_request_gets_fallback(self):
+        staff = User.objects.create_user(username="live", password="pass12345", is_staff=True)
+        self.assertEqual(self.client.get(reverse("portal_live_events")).status_code, 403)
+        self.client.force_login(staff)
+        response = self.client.get(reverse("portal_live_events"))
+        self.assertEqual(response.content, b"event: unsupported\ndata: {}\n\n")
@@ -16,6 +16,8 @@ urlpatterns = [
     path("rechnungen/neu/", views.invoice_new_customer, name="portal_invoice_new_customer"),
     path("rechnungen/neu/<int:customer_id>/", views.invoice_new_details, name="portal_invoice_new_details"),
     path("rechnungen/export/", views.invoice_export, name="portal_invoice_export"),
+    path("rechnungen/mwst/", views.vat_report_view, name="portal_vat_report"),
+    path("rechnungen/zahlungen/", views.payment_import_view, name="portal_payment_import"),
     path("rechnungen/<int:pk>/pdf/", views.invoice_pdf, name="portal_invoice_pdf"),
     path("rechnungen/<int:pk>/preview/", views.invoice_preview, name="portal_invoice_preview"),
     path("rechnungen/<int:pk>/send/", views.invoice_send_email, name="portal_invoice_send_email"),
@@ -25,7 +27,11 @@ urlpatterns = [
     path("rechnungen/<int:pk>/paid/", views.invoice_mark_paid, name="portal_invoice_mark_paid"),
     path("rechnungen/<int:pk>/reminder/", views.invoice_raise_reminder, name="portal_invoice_raise_reminder"),
     path("zeitplan/", views.schedule, name="portal_schedule"),
+    path("kalender/<str:token>.ics", views.ical_feed, name="portal_ical_feed"),
+    path("live/", views.live_events, name="portal_live_events"),
     path("verfuegbarkeit/", views.availability, name="portal_availability"),
     path("einstellungen/", views.settings_view, name="portal_settings"),
+    path("auslastung/", views.utilization, name="portal_utilization"),
+    path("metriken/", views.metrics_view, name="portal_metrics"),
     path("schadenmeldungen/<int:pk>/", views.damage_report_detail, name="portal_damage_report_detail"),
 ]
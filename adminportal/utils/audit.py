@@ -2,13 +2,29 @@ from adminportal.models import AuditLog
 from main.utils.security import get_client_ip
 
 
-def log_audit(action, request=None, actor=None, metadata=None):
+def _request_details(request):
     ip_address = get_client_ip(request) if request else None
     user_agent = request.META.get("HTTP_USER_AGENT", "")[:255] if request else ""
+    return ip_address or None, user_agent
+
+
+def log_audit(action, request=None, actor=None, metadata=None):
+    ip_address, user_agent = _request_details(request)
     AuditLog.objects.create(
         action=action,
         actor=actor,
-        ip_address=ip_address or None,
+        ip_address=ip_address,
         user_agent=user_agent,
         metadata=metadata or {},
     )
+
+
+def log_audit_batch(action, entries, request=None, actor=None):
+    """Mehrere Einträge derselben Aktion mit einem INSERT (``entries`` = Liste von Metadaten)."""
+    ip_address, user_agent = _request_details(request)
+    AuditLog.objects.bulk_create(
+        [
+            AuditLog(action=action, actor=actor, ip_address=ip_address, user_agent=user_agent, metadata=metadata)
+            for metadata in entries
+        ]
+    )
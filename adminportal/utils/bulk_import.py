@@ -0,0 +1,659 @@
+"""
+Massenimport für Fahrzeuge (``Vehicle``), Kunden (``adminportal.Customer``) und historische Buchungen.
+
+Die Quelle (CSV, JSON-Array oder JSON Lines) wird zeilenweise gelesen und in Blöcken verarbeitet:
+pro Block werden die Zeilen mit den bestehenden Validatoren geprüft, Duplikate über indexierte
+Felder mit einer Abfrage gesucht und neue bzw. geänderte Datensätze per ``bulk_create``/
+``bulk_update`` in einer Transaktion geschrieben. Da dabei keine Signals laufen, werden
+Kundenkonten, Tagesauslastung und Caches pro Block explizit nachgeführt.
+Fehlerhafte Zeilen landen im Ergebnis und können als CSV-Fehlerbericht geschrieben werden.
+"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Upper
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from adminportal.models import Customer
+from adminportal.utils.fleet_stats import booking_keys, schedule_fleet_stats_refresh
+from adminportal.utils.ledger import schedule_ledger_refresh
+from adminportal.utils.live import publish_on_commit
+from adminportal.utils.timeline import invalidate_booking_calendar
+from api.validators import (
+    clean_plate,
+    clean_vin,
+    validate_driver_license,
+    validate_phone,
+    validate_pickup_return,
+)
+from main.models import Booking, Transporter, Vehicle
+from main.utils.page_cache import invalidate_public_content
+
+CHUNK_SIZE = 1000
+FORMATS = ("csv", "json", "jsonl")
+REPORT_FIELDS = ["row", "field", "message", "data"]
+
+
+# --- Quelle lesen ---------------------------------------------------------------------------
+
+def _text(stream):
+    if isinstance(stream, io.TextIOBase):
+        return stream
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+
+def _csv_rows(stream):
+    first = stream.readline()
+    if not first:
+        return
+    # Excel-Exporte aus der Schweiz verwenden meist ";" als Trennzeichen
+    delimiter = ";" if first.count(";") > first.count(",") else ","
+    lines = _chain_first(first, stream)
+    reader = csv.DictReader(lines, delimiter=delimiter)
+    for row in reader:
+        if any((value or "").strip() for value in row.values() if isinstance(value, str)):
+            yield reader.line_num, row
+
+
+def _chain_first(first, stream):
+    yield first
+    yield from stream
+
+
+def _jsonl_rows(stream):
+    for line_no, line in enumerate(stream, start=1):
+        if line.strip():
+            yield line_no, json.loads(line)
+
+
+def _json_array_rows(stream, read_size=65536):
+    """Objekte eines JSON-Arrays einzeln dekodieren, ohne die ganze Datei zu laden."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    started = False
+    index = 0
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in " \t\r\n,":
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != "[":
+                raise ValueError("JSON-Import erwartet ein Array von Objekten.")
+            started = True
+            position += 1
+            continue
+        if position < len(buffer) and buffer[position] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                if buffer[position:].strip():
+                    raise
+                return
+            chunk = stream.read(read_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        index += 1
+        yield index, item
+        position = end
+
+
+def read_rows(stream, fmt="csv"):
+    """``(zeile, dict)`` aus einer CSV-, JSON- oder JSON-Lines-Quelle (Text- oder Binärstrom)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unbekanntes Format: {fmt}")
+    stream = _text(stream)
+    if fmt == "csv":
+        return _csv_rows(stream)
+    if fmt == "jsonl":
+        return _jsonl_rows(stream)
+    return _json_array_rows(stream)
+
+
+def detect_format(filename, default="csv"):
+    name = (filename or "").lower()
+    for fmt in ("jsonl", "json", "csv"):
+        if name.endswith(f".{fmt}"):
+            return fmt
+    if name.endswith(".ndjson"):
+        return "jsonl"
+    return default
+
+
+def _chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+# --- Feldwerte ------------------------------------------------------------------------------
+
+def _str(row, field, max_length=None, required=False):
+    value = row.get(field)
+    value = "" if value is None else str(value).strip()
+    if required and not value:
+        raise ValidationError({field: "Pflichtfeld fehlt."})
+    if max_length and len(value) > max_length:
+        raise ValidationError({field: f"Höchstens {max_length} Zeichen erlaubt."})
+    return value
+
+
+def _date(row, field, required=False):
+    raw = _str(row, field, required=required)
+    if not raw:
+        return None
+    parsed = parse_date(raw)
+    if parsed is None:
+        try:
+            parsed = datetime.strptime(raw, "%d.%m.%Y").date()
+        except ValueError:
+            raise ValidationError({field: "Ungültiges Datum (JJJJ-MM-TT oder TT.MM.JJJJ)."})
+    return parsed
+
+
+def _decimal(row, field, default=None):
+    raw = _str(row, field).replace("'", "").replace(" ", "")
+    if not raw:
+        return default
+    try:
+        return Decimal(raw.replace(",", ".") if raw.count(",") == 1 and "." not in raw else raw)
+    except InvalidOperation:
+        raise ValidationError({field: "Ungültiger Betrag."})
+
+
+def _int(row, field, default=None):
+    raw = _str(row, field).replace("'", "")
+    if not raw:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValidationError({field: "Ganze Zahl erwartet."})
+    if value < 0:
+        raise ValidationError({field: "Darf nicht negativ sein."})
+    return value
+
+
+def _choice(row, field, choices, default=None):
+    raw = _str(row, field)
+    if not raw:
+        if default is None:
+            raise ValidationError({field: "Pflichtfeld fehlt."})
+        return default
+    for value, label in choices:
+        if raw.lower() in (value.lower(), str(label).lower()):
+            return value
+    raise ValidationError({field: f"Unbekannter Wert '{raw}'."})
+
+
+def _field_errors(exc):
+    if hasattr(exc, "error_dict"):
+        return [(field, message) for field, messages in exc.message_dict.items() for message in messages]
+    return [("", message) for message in exc.messages]
+
+
+def _run_checks(checks):
+    """Alle Feldprüfungen einer Zeile ausführen und Fehler gesammelt melden."""
+    values, errors = {}, {}
+    for field, check in checks:
+        try:
+            values[field] = check()
+        except ValidationError as exc:
+            for name, message in _field_errors(exc):
+                errors.setdefault(name or field, []).append(message)
+    if errors:
+        raise ValidationError(errors)
+    return values
+
+
+def _validated(field, validator, value):
+    try:
+        validator(value)
+    except ValidationError as exc:
+        raise ValidationError({field: exc.messages})
+    return value
+
+
+# --- Ergebnis -------------------------------------------------------------------------------
+
+class ImportResult:
+    def __init__(self, kind, dry_run=False):
+        self.kind = kind
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors = []
+
+    def add_error(self, line, exc, row):
+        data = json.dumps(row, ensure_ascii=False, default=str)
+        for field, message in _field_errors(exc):
+            self.errors.append({"row": line, "field": field, "message": message, "data": data})
+
+    @property
+    def failed_rows(self):
+        return len({error["row"] for error in self.errors})
+
+    def summary(self):
+        return {
+            "kind": self.kind,
+            "dry_run": self.dry_run,
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "failed": self.failed_rows,
+        }
+
+
+def write_error_report(errors, fileobj):
+    """Fehlerbericht als CSV (``row, field, message, data``) in ein Text-Dateiobjekt schreiben."""
+    writer = csv.DictWriter(fileobj, fieldnames=REPORT_FIELDS, delimiter=";")
+    writer.writeheader()
+    writer.writerows(errors)
+    return len(errors)
+
+
+# --- Importer -------------------------------------------------------------------------------
+
+class BulkImporter:
+    """
+    Basis: ``clean(row)`` liefert Modellwerte oder wirft ``ValidationError``, ``key(values)`` den
+    Duplikatschlüssel, ``existing(items)`` die vorhandenen Datensätze eines Blocks (eine Abfrage).
+    """
+
+    model = None
+    kind = ""
+    update_fields = []
+
+    def __init__(self, update=False, dry_run=False, chunk_size=CHUNK_SIZE):
+        self.update = update
+        self.dry_run = dry_run
+        self.chunk_size = chunk_size
+
+    def prepare_chunk(self, rows):
+        """Verweise eines Blocks vorab auflösen (z. B. Transporter per Kennzeichen)."""
+
+    def clean(self, row):
+        raise NotImplementedError
+
+    def key(self, values):
+        raise NotImplementedError
+
+    def existing(self, items):
+        raise NotImplementedError
+
+    def check_chunk(self, items, existing, result):
+        """Blockweite Prüfungen (z. B. Buchungskonflikte); liefert die verbleibenden Zeilen."""
+        return items
+
+    def after_write(self, created, updated):
+        """Abgeleitete Daten nachführen, die sonst Signals aktualisieren."""
+
+    def run(self, rows):
+        result = ImportResult(self.kind, dry_run=self.dry_run)
+        seen = set()
+        for chunk in _chunked(rows, self.chunk_size):
+            self.prepare_chunk([row for _, row in chunk])
+            items = []
+            for line, row in chunk:
+                result.rows += 1
+                if not isinstance(row, dict):
+                    result.add_error(line, ValidationError("Zeile ist kein Objekt."), row)
+                    continue
+                try:
+                    values = self.clean(row)
+                except ValidationError as exc:
+                    result.add_error(line, exc, row)
+                    continue
+                key = self.key(values)
+                if key in seen:
+                    result.add_error(line, ValidationError("Doppelt in der Importdatei."), row)
+                    continue
+                seen.add(key)
+                items.append((line, row, key, values))
+            if items:
+                self._write_chunk(items, result)
+        return result
+
+    def _write_chunk(self, items, result):
+        with transaction.atomic():
+            existing = self.existing(items)
+            items = self.check_chunk(items, existing, result)
+            new, changed = [], []
+            for _, _, key, values in items:
+                obj = existing.get(key)
+                if obj is None:
+                    new.append(self.model(**values))
+                elif self.update:
+                    for field, value in values.items():
+                        setattr(obj, field, value)
+                    changed.append(obj)
+                else:
+                    result.skipped += 1
+            result.created += len(new)
+            result.updated += len(changed)
+            if self.dry_run:
+                return
+            created = self.model.objects.bulk_create(new, batch_size=self.chunk_size)
+            if changed:
+                fields = list(self.update_fields)
+                if any(field.name == "updated_at" for field in self.model._meta.concrete_fields):
+                    now = timezone.now()
+                    for obj in changed:
+                        obj.updated_at = now
+                    fields.append("updated_at")
+                self.model.objects.bulk_update(changed, fields, batch_size=self.chunk_size)
+            self.after_write(created, changed)
+
+
+class VehicleImporter(BulkImporter):
+    model = Vehicle
+    kind = "vehicles"
+    update_fields = [
+        "type", "license_plate", "brand", "model", "year", "mileage", "volume", "payload", "features",
+        "daily_rate", "half_day_rate", "vin", "insurance_number", "next_service", "status",
+    ]
+
+    def clean(self, row):
+        return _run_checks([
+            ("type", lambda: _choice(row, "type", Vehicle.VEHICLE_TYPES)),
+            ("license_plate", lambda: clean_plate(_str(row, "license_plate", required=True))),
+            ("brand", lambda: _str(row, "brand", 50, required=True)),
+            ("model", lambda: _str(row, "model", 50, required=True)),
+            ("year", lambda: _int(row, "year")),
+            ("mileage", lambda: _int(row, "mileage", default=0)),
+            ("volume", lambda: _decimal(row, "volume")),
+            ("payload", lambda: _int(row, "payload")),
+            ("features", lambda: self._features(row.get("features"))),
+            ("daily_rate", lambda: _decimal(row, "daily_rate", default=Decimal("0"))),
+            ("half_day_rate", lambda: _decimal(row, "half_day_rate", default=Decimal("0"))),
+            ("vin", lambda: clean_vin(_str(row, "vin"), allow_iso=True)),
+            ("insurance_number", lambda: _str(row, "insurance_number", 64)),
+            ("next_service", lambda: _date(row, "next_service")),
+            ("status", lambda: _choice(row, "status", Vehicle.VEHICLE_STATUSES, default="available")),
+        ])
+
+    @staticmethod
+    def _features(value):
+        if isinstance(value, list):
+            return [str(item).strip() for item in value if str(item).strip()]
+        return [part.strip() for part in str(value or "").split("|") if part.strip()]
+
+    def key(self, values):
+        return values["license_plate"]
+
+    def existing(self, items):
+        # Bestand kann noch in alter Schreibweise vorliegen ("ZH-111") → auch Originalwerte suchen
+        plates = {key for _, _, key, _ in items} | {_str(row, "license_plate").upper() for _, row, _, _ in items}
+        found = {}
+        for vehicle in Vehicle.objects.filter(license_plate__in=plates):
+            try:
+                found.setdefault(clean_plate(vehicle.license_plate), vehicle)
+            except ValidationError:
+                found.setdefault(vehicle.license_plate, vehicle)
+        return found
+
+    def after_write(self, created, updated):
+        if created or updated:
+            invalidate_public_content()
+
+
+class CustomerImporter(BulkImporter):
+    model = Customer
+    kind = "customers"
+    update_fields = ["first_name", "last_name", "company", "email", "phone", "address", "city", "postal_code", "source", "notes"]
+
+    def clean(self, row):
+        values = _run_checks([
+            ("first_name", lambda: _str(row, "first_name", 80)),
+            ("last_name", lambda: _str(row, "last_name", 80)),
+            ("company", lambda: _str(row, "company", 120)),
+            ("email", lambda: _validated("email", validate_email, _str(row, "email")) if _str(row, "email") else ""),
+            ("phone", lambda: _validated("phone", validate_phone, _str(row, "phone", 50))),
+            ("address", lambda: _str(row, "address", 200)),
+            ("city", lambda: _str(row, "city", 120)),
+            ("postal_code", lambda: _str(row, "postal_code", 20)),
+            ("source", lambda: _choice(row, "source", Customer.SOURCE_CHOICES, default="manual")),
+            ("notes", lambda: _str(row, "notes")),
+        ])
+        if not (values["email"] or values["last_name"] or values["company"]):
+            raise ValidationError("E-Mail, Nachname oder Firma erforderlich.")
+        return values
+
+    def key(self, values):
+        if values["email"]:
+            return ("email", values["email"].upper())
+        return ("name", values["last_name"].upper(), values["first_name"].upper(), values["company"].upper())
+
+    def existing(self, items):
+        keys = [key for _, _, key, _ in items]
+        emails = {key[1] for key in keys if key[0] == "email"}
+        names = [values for _, _, key, values in items if key[0] == "name"]
+        query = Q()
+        if emails:
+            query |= Q(email_key__in=emails)
+        if names:
+            query |= Q(last_name__in={values["last_name"] for values in names})
+        found = {}
+        for customer in Customer.objects.annotate(email_key=Upper("email")).filter(query).order_by("pk"):
+            if customer.email:
+                found.setdefault(("email", customer.email_key), customer)
+            found.setdefault(
+                ("name", customer.last_name.upper(), customer.first_name.upper(), customer.company.upper()),
+                customer,
+            )
+        return found
+
+    def after_write(self, created, updated):
+        schedule_ledger_refresh(customer_ids=[customer.pk for customer in [*created, *updated]])
+
+
+def _claims(time_slot, booking_date, pickup_date, return_date):
+    """Belegte ``(tag, slot)``; Zeiträume belegen jeden Tag ganz (wie ``booking_range_conflict_exists``)."""
+    if pickup_date and return_date:
+        days = (return_date - pickup_date).days + 1
+        return [(pickup_date + timedelta(days=offset), "FULLDAY") for offset in range(days)]
+    return [(booking_date, time_slot)]
+
+
+def _conflicts(slot, taken):
+    return bool(taken) and (slot == "FULLDAY" or "FULLDAY" in taken or slot in taken)
+
+
+class BookingImporter(BulkImporter):
+    """
+    Historische Buchungen: Transporter per ``transporter`` (Kennzeichen), Fahrzeug optional per
+    ``vehicle`` (Kontrollschild). Konflikte werden blockweise gegen Bestand und Importdatei geprüft;
+    stornierte Buchungen belegen nichts.
+    """
+
+    model = Booking
+    kind = "bookings"
+    update_fields = [
+        "vehicle", "pickup_date", "return_date", "customer_name", "customer_email", "customer_phone",
+        "customer_address", "driver_license_number", "status", "payment_status", "payment_method",
+        "total_price", "admin_notes",
+    ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._transporters = {}
+        self._vehicles = {}
+        self._claimed = {}
+
+    def prepare_chunk(self, rows):
+        kennzeichen = {_str(row, "transporter").upper() for row in rows if isinstance(row, dict)} - set(self._transporters)
+        if kennzeichen:
+            for pk, value in Transporter.objects.annotate(key=Upper("kennzeichen")).filter(key__in=kennzeichen).values_list("pk", "key"):
+                self._transporters[value] = pk
+        plates = set()
+        for row in rows:
+            if isinstance(row, dict) and _str(row, "vehicle"):
+                raw = _str(row, "vehicle").upper()
+                plates.add(raw)
+                try:
+                    plates.add(clean_plate(raw))
+                except ValidationError:
+                    pass
+        plates -= set(self._vehicles)
+        if plates:
+            for pk, plate in Vehicle.objects.filter(license_plate__in=plates).values_list("pk", "license_plate"):
+                self._vehicles[plate.upper()] = pk
+
+    def _transporter_id(self, row):
+        value = _str(row, "transporter", required=True).upper()
+        if value not in self._transporters:
+            raise ValidationError({"transporter": f"Transporter '{value}' nicht gefunden."})
+        return self._transporters[value]
+
+    def _vehicle_id(self, row):
+        value = _str(row, "vehicle").upper()
+        if not value:
+            return None
+        for candidate in (value, self._safe_plate(value)):
+            if candidate in self._vehicles:
+                return self._vehicles[candidate]
+        raise ValidationError({"vehicle": f"Fahrzeug '{value}' nicht gefunden."})
+
+    @staticmethod
+    def _safe_plate(value):
+        try:
+            return clean_plate(value)
+        except ValidationError:
+            return value
+
+    def clean(self, row):
+        values = _run_checks([
+            ("transporter_id", lambda: self._transporter_id(row)),
+            ("vehicle_id", lambda: self._vehicle_id(row)),
+            ("date", lambda: _date(row, "date") or _date(row, "pickup_date", required=True)),
+            ("time_slot", lambda: _choice(row, "time_slot", Booking.TIME_SLOTS, default="FULLDAY")),
+            ("pickup_date", lambda: _date(row, "pickup_date")),
+            ("return_date", lambda: _date(row, "return_date")),
+            ("customer_name", lambda: _str(row, "customer_name", 100, required=True)),
+            ("customer_email", lambda: _validated("customer_email", validate_email, _str(row, "customer_email", required=True))),
+            ("customer_phone", lambda: _validated("customer_phone", validate_phone, _str(row, "customer_phone", 50))),
+            ("customer_address", lambda: _str(row, "customer_address", 255)),
+            ("driver_license_number", lambda: _validated(
+                "driver_license_number", validate_driver_license, _str(row, "driver_license_number", 100)
+            )),
+            ("status", lambda: _choice(row, "status", Booking.STATUS_CHOICES, default="completed")),
+            ("payment_status", lambda: _choice(row, "payment_status", Booking.PAYMENT_STATUS_CHOICES, default="paid")),
+            ("payment_method", lambda: _choice(row, "payment_method", Booking.PAYMENT_METHOD_CHOICES, default="CASH")),
+            ("total_price", lambda: _decimal(row, "total_price", default=Decimal("0"))),
+            ("admin_notes", lambda: _str(row, "admin_notes")),
+        ])
+        try:
+            validate_pickup_return(values["pickup_date"], values["return_date"])
+        except ValidationError as exc:
+            raise ValidationError({"return_date": exc.messages})
+        return values
+
+    def key(self, values):
+        return (values["transporter_id"], values["date"], values["time_slot"])
+
+    def existing(self, items):
+        transporter_ids = {key[0] for _, _, key, _ in items}
+        dates = {key[1] for _, _, key, _ in items}
+        bookings = Booking.objects.filter(transporter_id__in=transporter_ids, date__in=dates)
+        return {(booking.transporter_id, booking.date, booking.time_slot): booking for booking in bookings}
+
+    def _occupied(self, items, existing):
+        """Bestehende Belegung der betroffenen Transporter/Fahrzeuge im Zeitraum des Blocks (eine Abfrage)."""
+        days = [day for _, _, _, values in items for day, _ in _claims(
+            values["time_slot"], values["date"], values["pickup_date"], values["return_date"]
+        )]
+        start, end = min(days), max(days)
+        transporter_ids = {values["transporter_id"] for _, _, _, values in items}
+        vehicle_ids = {values["vehicle_id"] for _, _, _, values in items if values["vehicle_id"]}
+        updated_pks = [booking.pk for booking in existing.values()] if self.update else []
+        span = Q(date__range=(start, end)) | Q(
+            pickup_date__isnull=False, return_date__isnull=False, pickup_date__lte=end, return_date__gte=start
+        )
+        rows = (
+            Booking.objects.filter(span)
+            .filter(Q(transporter_id__in=transporter_ids) | Q(vehicle_id__in=vehicle_ids))
+            .exclude(status="cancelled")
+            .exclude(pk__in=updated_pks)
+            .values_list("transporter_id", "vehicle_id", "date", "time_slot", "pickup_date", "return_date")
+        )
+        occupied = {}
+        for transporter_id, vehicle_id, booking_date, time_slot, pickup_date, return_date in rows:
+            for day, slot in _claims(time_slot, booking_date, pickup_date, return_date):
+                occupied.setdefault(("transporter", transporter_id, day), set()).add(slot)
+                if vehicle_id:
+                    occupied.setdefault(("vehicle", vehicle_id, day), set()).add(slot)
+        return occupied
+
+    def check_chunk(self, items, existing, result):
+        occupied = self._occupied(items, existing)
+        accepted = []
+        for line, row, key, values in items:
+            if key in existing and not self.update:
+                accepted.append((line, row, key, values))
+                continue
+            if values["status"] == "cancelled":
+                accepted.append((line, row, key, values))
+                continue
+            claims = []
+            for day, slot in _claims(values["time_slot"], values["date"], values["pickup_date"], values["return_date"]):
+                claims.append((("transporter", values["transporter_id"], day), slot))
+                if values["vehicle_id"]:
+                    claims.append((("vehicle", values["vehicle_id"], day), slot))
+            if any(
+                _conflicts(slot, occupied.get(target, set()) | self._claimed.get(target, set()))
+                for target, slot in claims
+            ):
+                result.add_error(line, ValidationError("Buchung kollidiert mit bestehender Reservierung."), row)
+                continue
+            for target, slot in claims:
+                self._claimed.setdefault(target, set()).add(slot)
+            accepted.append((line, row, key, values))
+        return accepted
+
+    def after_write(self, created, updated):
+        bookings = [*created, *updated]
+        if not bookings:
+            return
+        schedule_ledger_refresh(emails=[booking.customer_email for booking in bookings])
+        keys = set()
+        for booking in bookings:
+            keys |= booking_keys(booking) | getattr(booking, "_stats_keys", set())
+        schedule_fleet_stats_refresh(keys)
+        invalidate_booking_calendar()
+        publish_on_commit("booking", ids=[booking.pk for booking in bookings])
+
+
+IMPORTERS = {
+    VehicleImporter.kind: VehicleImporter,
+    CustomerImporter.kind: CustomerImporter,
+    BookingImporter.kind: BookingImporter,
+}
+
+
+def run_import(kind, stream, fmt="csv", update=False, dry_run=False, chunk_size=CHUNK_SIZE):
+    """Import ausführen und ``ImportResult`` zurückgeben (``kind``: vehicles, customers, bookings)."""
+    try:
+        importer_class = IMPORTERS[kind]
+    except KeyError:
+        raise ValueError(f"Unbekannter Importtyp: {kind}")
+    importer = importer_class(update=update, dry_run=dry_run, chunk_size=chunk_size)
+    return importer.run(read_rows(stream, fmt))
@@ -1,10 +1,14 @@
 import json
 from django.utils import timezone
 
+from config.db_router import read_from_replica
+
 from adminportal.models import Customer as PortalCustomer, Invoice as PortalInvoice
 from main.models import Customer as MainCustomer, DamageReport, Booking
+from adminportal.utils.ledger import refresh_ledgers_for_emails
 
 
+@read_from_replica()
 def export_personal_data(email: str) -> dict:
     normalized = email.strip().lower()
     return {
@@ -20,7 +24,10 @@ def export_personal_data(email: str) -> dict:
 
 def anonymize_personal_data(email: str, dry_run: bool = False) -> dict:
     normalized = email.strip().lower()
-    stamp = timezone.now().strftime("%Y%m%d%H%M")
+    # ``update()`` setzt ``auto_now`` nicht – ohne neues ``updated_at`` liefern Änderungs-Feed und
+    # iCal-Cache die alten Personendaten weiter aus
+    now = timezone.now()
+    stamp = now.strftime("%Y%m%d%H%M")
     anon_email = f"anonymized-{stamp}@example.invalid"
 
     customers = MainCustomer.objects.filter(email__iexact=normalized)
@@ -59,6 +66,7 @@ def anonymize_personal_data(email: str, dry_run: bool = False) -> dict:
         insurer_contact="",
         insurer_contact_phone="",
         insurer_contact_email="",
+        updated_at=now,
     )
     bookings.update(
         customer_name="Anonymized User",
@@ -66,6 +74,7 @@ def anonymize_personal_data(email: str, dry_run: bool = False) -> dict:
         customer_phone="",
         customer_address="",
         driver_license_number="",
+        updated_at=now,
     )
     portal_customers.update(
         first_name="Anonymized",
@@ -77,7 +86,9 @@ def anonymize_personal_data(email: str, dry_run: bool = False) -> dict:
         postal_code="",
         company="",
         notes="Anonymized",
+        updated_at=now,
     )
+    refresh_ledgers_for_emails([anon_email])
     return summary
 
 
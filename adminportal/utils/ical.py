@@ -0,0 +1,263 @@
+"""
+iCalendar-Feeds (``.ics``) für Disposition und Transporter.
+
+- ``flotte``: alle Buchungen plus Reparaturtermine aus Schadenmeldungen
+- ``transporter-<id>``: Buchungen eines Transporters
+
+Die Feeds sind über signierte URLs ohne Login abonnierbar (``feed_token``). Pro Feed liegt der
+zuletzt erzeugte Stand im Cache (ein VEVENT-Block pro Buchung/Meldung). Bei jeder Abfrage wird
+nur ``Max(updated_at)``/``Count`` gelesen; neu gerendert werden nur die seither geänderten Zeilen,
+gelöschte oder aus dem Zeitfenster gefallene Einträge werden über die Anzahl erkannt.
+"""
+import hashlib
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from main.models import Booking, DamageReport, Transporter
+
+FLEET_SCOPE = "flotte"
+HORIZON_DAYS = 30
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+CALENDAR_TZ = "Europe/Zurich"
+SLOT_HOURS = {"MORNING": ("08:00", "12:00"), "AFTERNOON": ("13:00", "17:00"), "FULLDAY": ("08:00", "17:00")}
+BOOKING_STATUS = {"pending": "TENTATIVE", "cancelled": "CANCELLED"}
+
+VTIMEZONE = (
+    "BEGIN:VTIMEZONE",
+    f"TZID:{CALENDAR_TZ}",
+    "BEGIN:DAYLIGHT",
+    "TZOFFSETFROM:+0100",
+    "TZOFFSETTO:+0200",
+    "TZNAME:CEST",
+    "DTSTART:19700329T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=-1SU",
+    "END:DAYLIGHT",
+    "BEGIN:STANDARD",
+    "TZOFFSETFROM:+0200",
+    "TZOFFSETTO:+0100",
+    "TZNAME:CET",
+    "DTSTART:19701025T030000",
+    "RRULE:FREQ=YEARLY;BYMONTH=10;BYDAY=-1SU",
+    "END:STANDARD",
+    "END:VTIMEZONE",
+)
+
+
+# --- Signierte Feed-URLs --------------------------------------------------------------------
+
+def _signer():
+    # ICAL_FEED_KEY ändern macht alle bisher verteilten Feed-URLs ungültig
+    return signing.Signer(salt=f"adminportal.ical:{getattr(settings, 'ICAL_FEED_KEY', '')}")
+
+
+def transporter_scope(transporter_id):
+    return f"transporter-{int(transporter_id)}"
+
+
+def feed_token(scope):
+    return _signer().sign(scope)
+
+
+def feed_title(scope):
+    if scope == FLEET_SCOPE:
+        return "Disposition Flotte"
+    transporter_id = int(scope[len("transporter-"):])
+    name = Transporter.objects.filter(pk=transporter_id).values_list("name", flat=True).first()
+    return f"Transporter {name or transporter_id}"
+
+
+def scope_from_token(token):
+    """Feed-Bereich aus dem signierten Token oder ``None`` bei ungültiger Signatur/Bereich."""
+    try:
+        scope = _signer().unsign(token)
+    except signing.BadSignature:
+        return None
+    if scope == FLEET_SCOPE or (scope.startswith("transporter-") and scope[len("transporter-"):].isdigit()):
+        return scope
+    return None
+
+
+# --- iCalendar-Text -------------------------------------------------------------------------
+
+def _escape(value):
+    return (
+        str(value or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """Zeilen nach RFC 5545 auf 75 Oktette umbrechen."""
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line
+    parts, current = [], b""
+    for char in line:
+        encoded = char.encode("utf-8")
+        if len(current) + len(encoded) > (75 if not parts else 74):
+            parts.append(current.decode("utf-8"))
+            current = b""
+        current += encoded
+    parts.append(current.decode("utf-8"))
+    return "\r\n ".join(parts)
+
+
+def _local(day, hhmm):
+    try:
+        clock = time.fromisoformat(hhmm)
+    except (TypeError, ValueError):
+        clock = time(8)
+    return f"TZID={CALENDAR_TZ}:{datetime.combine(day, clock):%Y%m%dT%H%M%S}"
+
+
+def _stamp(value):
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ") if value else "19700101T000000Z"
+
+
+def _event(uid, start, end, summary, description, status, changed):
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        f"DTSTAMP:{_stamp(changed)}",
+        f"LAST-MODIFIED:{_stamp(changed)}",
+        f"DTSTART;{start}",
+        f"DTEND;{end}",
+        f"SUMMARY:{_escape(summary)}",
+        f"DESCRIPTION:{_escape(description)}",
+        f"STATUS:{status}",
+        "END:VEVENT",
+    ]
+    return "\r\n".join(_fold(line) for line in lines)
+
+
+def booking_event(booking):
+    slot_start, slot_end = SLOT_HOURS.get(booking.time_slot, SLOT_HOURS["FULLDAY"])
+    first = booking.pickup_date or booking.date
+    last = max(booking.return_date or first, first)
+    start = _local(first, booking.pickup_time or slot_start)
+    end = _local(last, booking.return_time or slot_end)
+    description = "\n".join(
+        filter(
+            None,
+            [
+                f"{booking.get_time_slot_display()}, {booking.get_status_display()}",
+                booking.customer_phone,
+                booking.customer_email,
+                booking.additional_notes,
+            ],
+        )
+    )
+    return _event(
+        f"booking-{booking.pk}@{settings.ICAL_UID_DOMAIN}",
+        start,
+        end,
+        f"{booking.transporter.name}: {booking.customer_name}",
+        description,
+        BOOKING_STATUS.get(booking.status, "CONFIRMED"),
+        booking.updated_at,
+    )
+
+
+def repair_event(report):
+    name = report.company_name or " ".join(filter(None, [report.first_name, report.last_name])) or report.email
+    vehicle = " ".join(filter(None, [report.car_brand, report.car_model, report.plate]))
+    last = max(report.repair_end or report.repair_start, report.repair_start)
+    return _event(
+        f"repair-{report.pk}@{settings.ICAL_UID_DOMAIN}",
+        f"VALUE=DATE:{report.repair_start:%Y%m%d}",
+        f"VALUE=DATE:{last + timedelta(days=1):%Y%m%d}",
+        f"Reparatur: {vehicle or name}",
+        "\n".join(filter(None, [name, report.phone, report.assigned_mechanic, report.get_status_display()])),
+        "CANCELLED" if report.status == "cancelled" else "CONFIRMED",
+        report.updated_at,
+    )
+
+
+# --- Quellen und inkrementeller Aufbau -----------------------------------------------------
+
+def _sources(scope):
+    """``(Präfix, Queryset, Renderer, select_related)`` pro Quelle eines Feeds, beschränkt auf das Zeitfenster."""
+    horizon = timezone.localdate() - timedelta(days=HORIZON_DAYS)
+    bookings = Booking.objects.filter(Q(date__gte=horizon) | Q(return_date__gte=horizon))
+    if scope == FLEET_SCOPE:
+        reports = DamageReport.objects.filter(repair_start__isnull=False).filter(
+            Q(repair_start__gte=horizon) | Q(repair_end__gte=horizon)
+        )
+        return [
+            ("booking", bookings, booking_event, ["transporter"]),
+            ("repair", reports, repair_event, []),
+        ]
+    transporter_id = int(scope[len("transporter-"):])
+    return [("booking", bookings.filter(transporter_id=transporter_id), booking_event, ["transporter"])]
+
+
+def _fingerprints(sources):
+    fingerprints = []
+    for _, queryset, _, related in sources:
+        aggregates = {"latest": Max("updated_at"), "count": Count("id")}
+        if "transporter" in related:
+            # Der Transportername steht in SUMMARY – Umbenennen muss die Buchungen neu rendern
+            aggregates["transporter_latest"] = Max("transporter__updated_at")
+        fingerprints.append(queryset.order_by().aggregate(**aggregates))
+    return fingerprints
+
+
+def feed_state(scope):
+    """
+    Aktueller Stand eines Feeds: ``{"etag", "last_modified", "body"}``. ``body`` wird nur bei
+    Änderungen neu zusammengesetzt, und dann nur aus den geänderten Buchungen/Meldungen.
+    """
+    sources = _sources(scope)
+    fingerprints = _fingerprints(sources)
+    key = f"ical:feed:{scope}"
+    state = cache.get(key) or {"fingerprints": None, "events": {}, "body": None, "etag": None}
+    if state["fingerprints"] != fingerprints or state["body"] is None:
+        previous = state["fingerprints"] or [None] * len(sources)
+        events = dict(state["events"])
+        for (prefix, queryset, render, related), before, now in zip(sources, previous, fingerprints):
+            changed = queryset.select_related(*related) if related else queryset
+            if before and before["latest"]:
+                # ``>=``: Zeilen mit identischem Zeitstempel wie beim letzten Aufbau nochmals rendern
+                since = Q(updated_at__gte=before["latest"])
+                if before.get("transporter_latest"):
+                    since |= Q(transporter__updated_at__gte=before["transporter_latest"])
+                changed = changed.filter(since)
+            for obj in changed:
+                events[f"{prefix}-{obj.pk}"] = render(obj)
+            if sum(1 for uid in events if uid.startswith(f"{prefix}-")) != now["count"]:
+                # Gelöscht oder aus dem Zeitfenster gefallen
+                current = {f"{prefix}-{pk}" for pk in queryset.values_list("pk", flat=True)}
+                events = {uid: text for uid, text in events.items() if not uid.startswith(f"{prefix}-") or uid in current}
+        body = "\r\n".join(
+            [
+                "BEGIN:VCALENDAR",
+                "VERSION:2.0",
+                "PRODID:-//Roberts Lackwerk//Disposition//DE",
+                "CALSCALE:GREGORIAN",
+                "METHOD:PUBLISH",
+                _fold(f"X-WR-CALNAME:{_escape(feed_title(scope))}"),
+                f"X-WR-TIMEZONE:{CALENDAR_TZ}",
+                *VTIMEZONE,
+                *[events[uid] for uid in sorted(events)],
+                "END:VCALENDAR",
+                "",
+            ]
+        )
+        etag = hashlib.sha1(body.encode("utf-8")).hexdigest()
+        state = {"fingerprints": fingerprints, "events": events, "body": body, "etag": etag}
+        cache.set(key, state, FEED_CACHE_TIMEOUT)
+    latest = [fingerprint["latest"] for fingerprint in fingerprints if fingerprint["latest"]]
+    return {
+        "etag": state["etag"],
+        "last_modified": max(latest) if latest else None,
+        "body": state["body"],
+    }
@@ -0,0 +1,213 @@
+"""
+Rechnungspositionen: Berechnung und normalisierte Ablage (``InvoiceLineItem``).
+
+Portal-Rechnungen rechnen mit einem MwSt-Satz pro Rechnung (inkl. oder zzgl. MwSt), API-Rechnungen
+mit einem Satz pro Position zzgl. MwSt und optionalem Rabatt. Die Summen pro Rechnung werden auf
+Rechnungsebene gerundet wie bisher; Rundungsdifferenzen landen auf der letzten Position, damit die
+Summe der Positionen immer den gespeicherten Rechnungsbeträgen entspricht.
+"""
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+from django.db import transaction
+
+from adminportal.models import Invoice, InvoiceLineItem
+from main.models import Invoice as ApiInvoice
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0")
+CATEGORIES = {value for value, _ in InvoiceLineItem.CATEGORY_CHOICES}
+# Änderungen an diesen Feldern erfordern neue Summen/Positionen
+TOTAL_SOURCE_FIELDS = {"items", "vat_rate", "vat_included", "amount_chf", "related_booking", "related_report"}
+API_SOURCE_FIELDS = {"items", "discount", "type", "subtotal", "vat_amount", "total_amount"}
+
+
+def to_decimal(value, default=ZERO):
+    try:
+        return Decimal(str(value)) if value not in (None, "") else default
+    except (InvalidOperation, ValueError):
+        return default
+
+
+def _q(value):
+    return value.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _balance(lines, field, total):
+    """Rundungsrest eines Betrags auf die letzte Position legen."""
+    if lines:
+        lines[-1][field] += total - sum((line[field] for line in lines), ZERO)
+
+
+def portal_lines(items, vat_rate, vat_included, category="other"):
+    """
+    Positionen einer Portal-Rechnung → ``(lines, (netto, mwst, brutto))``.
+    Die Summen entsprechen der bisherigen Rechnung auf Rechnungsebene.
+    """
+    rate = to_decimal(vat_rate)
+    divisor = Decimal("1") + rate / Decimal("100")
+    lines = []
+    subtotal = ZERO
+    for position, item in enumerate(items or [], start=1):
+        quantity = to_decimal(item.get("quantity"))
+        unit_price = to_decimal(item.get("unit_price", item.get("unitPrice")))
+        amount = quantity * unit_price
+        subtotal += amount
+        line_total = _q(amount)
+        if vat_included:
+            net = _q(line_total / divisor) if divisor else line_total
+            vat = line_total - net
+        else:
+            net = line_total
+            vat = _q(line_total * rate / Decimal("100"))
+        lines.append(
+            {
+                "position": position,
+                "description": str(item.get("description") or "")[:255],
+                "category": item.get("category") if item.get("category") in CATEGORIES else category,
+                "quantity": quantity,
+                "unit_price": _q(unit_price),
+                "line_total": line_total,
+                "vat_rate": rate,
+                "net_amount": net,
+                "vat_amount": vat,
+            }
+        )
+
+    if vat_included:
+        net_total = _q(subtotal / divisor) if divisor else subtotal
+        vat_total = _q(subtotal - net_total)
+        gross_total = _q(subtotal)
+    else:
+        net_total = _q(subtotal)
+        vat_total = _q(subtotal * rate / Decimal("100"))
+        gross_total = _q(subtotal + vat_total)
+    _balance(lines, "net_amount", net_total)
+    _balance(lines, "vat_amount", vat_total)
+    for line in lines:
+        line["gross_amount"] = line["net_amount"] + line["vat_amount"]
+    return lines, (net_total, vat_total, gross_total)
+
+
+def invoice_totals(items, vat_rate, vat_included):
+    """``(netto, mwst, brutto)`` für Entwürfe und Vorschauen ohne gespeicherte Rechnung."""
+    return portal_lines(items, vat_rate, vat_included)[1]
+
+
+def portal_category(invoice):
+    if invoice.related_booking_id:
+        return "rental"
+    if invoice.related_report_id:
+        return "damage-report"
+    return "other"
+
+
+def portal_invoice_lines(invoice):
+    """
+    Positionen einer gespeicherten Portal-Rechnung. Rechnungen ohne Positionen (nur Betrag)
+    erhalten eine Pauschalposition, damit sie in den Berichten nicht fehlen.
+    """
+    items = invoice.items or []
+    if not items and invoice.amount_chf:
+        # ``amount_chf`` ist der Bruttobetrag → als Betrag inkl. MwSt aufteilen
+        flat = [{"description": invoice.description or "Pauschal", "quantity": 1, "unit_price": invoice.amount_chf}]
+        return portal_lines(flat, invoice.vat_rate, True, portal_category(invoice))
+    return portal_lines(items, invoice.vat_rate, invoice.vat_included, portal_category(invoice))
+
+
+def apply_portal_totals(invoice):
+    """Setzt die zwischengespeicherten Summen einer Portal-Rechnung (vor dem Speichern)."""
+    net, vat, gross = portal_invoice_lines(invoice)[1]
+    invoice.net_amount_chf, invoice.vat_amount_chf, invoice.amount_chf = net, vat, gross
+
+
+def api_lines(items, discount=ZERO, category="other"):
+    """
+    Positionen einer API-Rechnung (``quantity``, ``unitPrice``, ``vatRate``, ``total``) →
+    ``(lines, (netto, mwst, brutto))``; ein Rabatt wird als eigene Position ohne MwSt geführt.
+    """
+    lines = []
+    vat_total = ZERO
+    for position, item in enumerate(items or [], start=1):
+        quantity = to_decimal(item.get("quantity"))
+        unit_price = to_decimal(item.get("unitPrice", item.get("unit_price")))
+        rate = to_decimal(item.get("vatRate", item.get("vat_rate")))
+        line_total = _q(to_decimal(item.get("total"), quantity * unit_price))
+        vat = line_total * rate / Decimal("100")
+        vat_total += vat
+        lines.append(
+            {
+                "position": position,
+                "description": str(item.get("description") or "")[:255],
+                "category": item.get("category") if item.get("category") in CATEGORIES else category,
+                "quantity": quantity,
+                "unit_price": _q(unit_price),
+                "line_total": line_total,
+                "vat_rate": rate,
+                "net_amount": line_total,
+                "vat_amount": _q(vat),
+            }
+        )
+    vat_total = _q(vat_total)
+    _balance(lines, "vat_amount", vat_total)
+    discount = to_decimal(discount)
+    if discount:
+        lines.append(
+            {
+                "position": len(lines) + 1,
+                "description": "Rabatt",
+                "category": category,
+                "quantity": Decimal("1"),
+                "unit_price": -discount,
+                "line_total": -discount,
+                "vat_rate": ZERO,
+                "net_amount": -discount,
+                "vat_amount": ZERO,
+            }
+        )
+    for line in lines:
+        line["gross_amount"] = line["net_amount"] + line["vat_amount"]
+    net_total = sum((line["net_amount"] for line in lines), ZERO)
+    return lines, (net_total, vat_total, net_total + vat_total)
+
+
+def _line_objects(invoice, lines):
+    owner = {"api_invoice": invoice} if isinstance(invoice, ApiInvoice) else {"invoice": invoice}
+    return [InvoiceLineItem(**owner, **line) for line in lines]
+
+
+def lines_for(invoice):
+    if isinstance(invoice, ApiInvoice):
+        return api_lines(invoice.items, invoice.discount, invoice.type)[0]
+    return portal_invoice_lines(invoice)[0]
+
+
+def sync_line_items(invoice):
+    """Ersetzt die Positionen einer Rechnung (Portal oder API) durch die aktuellen ``items``."""
+    owner = "api_invoice" if isinstance(invoice, ApiInvoice) else "invoice"
+    with transaction.atomic():
+        InvoiceLineItem.objects.filter(**{owner: invoice}).delete()
+        InvoiceLineItem.objects.bulk_create(_line_objects(invoice, lines_for(invoice)))
+
+
+def rebuild_invoice_lines(batch_size=500):
+    """Baut alle Positionen neu auf und korrigiert die Summen der Portal-Rechnungen."""
+    created = 0
+    with transaction.atomic():
+        InvoiceLineItem.objects.all().delete()
+        for model in (Invoice, ApiInvoice):
+            pending, changed = [], []
+            for invoice in model.objects.order_by("pk").iterator(chunk_size=batch_size):
+                if model is Invoice:
+                    before = (invoice.net_amount_chf, invoice.vat_amount_chf, invoice.amount_chf)
+                    apply_portal_totals(invoice)
+                    if before != (invoice.net_amount_chf, invoice.vat_amount_chf, invoice.amount_chf):
+                        changed.append(invoice)
+                pending.extend(_line_objects(invoice, lines_for(invoice)))
+                if len(pending) >= batch_size:
+                    created += len(InvoiceLineItem.objects.bulk_create(pending))
+                    pending = []
+            if pending:
+                created += len(InvoiceLineItem.objects.bulk_create(pending))
+            if changed:
+                Invoice.objects.bulk_update(changed, ["net_amount_chf", "vat_amount_chf", "amount_chf"], batch_size=batch_size)
+    return created
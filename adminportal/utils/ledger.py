@@ -0,0 +1,120 @@
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import Upper
+
+from adminportal.models import Customer, CustomerLedger, Invoice
+from main.models import Booking, DamageReport
+
+OPEN_INVOICE_STATUSES = ["pending", "overdue"]
+LEDGER_FIELDS = [
+    "revenue_chf",
+    "open_balance_chf",
+    "invoice_count",
+    "booking_count",
+    "report_count",
+    "last_activity_at",
+    "updated_at",
+]
+
+
+def _email_key(email):
+    return (email or "").strip().upper()
+
+
+def _grouped_by_email(qs, email_field, activity_field, emails):
+    qs = qs.annotate(email_key=Upper(email_field))
+    if emails is not None:
+        qs = qs.filter(email_key__in=emails)
+    rows = qs.values("email_key").annotate(count=Count("id"), last=Max(activity_field))
+    return {row["email_key"]: row for row in rows}
+
+
+def refresh_customer_ledgers(customer_ids=None, batch_size=500):
+    """
+    Berechnet die Kundenkonten für die angegebenen Kunden (oder alle) neu.
+    Pro Quelle läuft genau eine gruppierte Abfrage, geschrieben wird per Upsert.
+    """
+    customers = Customer.objects.all()
+    if customer_ids is not None:
+        customer_ids = {pk for pk in customer_ids if pk}
+        if not customer_ids:
+            return 0
+        customers = customers.filter(pk__in=customer_ids)
+    rows = list(customers.values_list("id", "email", "created_at"))
+    if not rows:
+        return 0
+
+    emails = None
+    invoice_qs = Invoice.objects.all()
+    if customer_ids is not None:
+        emails = {_email_key(email) for _, email, _ in rows if _email_key(email)}
+        invoice_qs = invoice_qs.filter(customer_id__in=[pk for pk, _, _ in rows])
+
+    invoice_totals = {
+        row["customer_id"]: row
+        for row in invoice_qs.values("customer_id").annotate(
+            revenue=Sum("amount_chf"),
+            open=Sum("amount_chf", filter=Q(status__in=OPEN_INVOICE_STATUSES)),
+            count=Count("id"),
+            last=Max("updated_at"),
+        )
+    }
+    booking_totals = _grouped_by_email(Booking.objects.all(), "customer_email", "updated_at", emails)
+    report_totals = _grouped_by_email(DamageReport.objects.all(), "email", "created_at", emails)
+
+    ledgers = []
+    for pk, email, created_at in rows:
+        key = _email_key(email)
+        invoices = invoice_totals.get(pk, {})
+        bookings = booking_totals.get(key, {}) if key else {}
+        reports = report_totals.get(key, {}) if key else {}
+        activity = [value for value in (created_at, invoices.get("last"), bookings.get("last"), reports.get("last")) if value]
+        ledgers.append(
+            CustomerLedger(
+                customer_id=pk,
+                revenue_chf=invoices.get("revenue") or 0,
+                open_balance_chf=invoices.get("open") or 0,
+                invoice_count=invoices.get("count", 0),
+                booking_count=bookings.get("count", 0),
+                report_count=reports.get("count", 0),
+                last_activity_at=max(activity) if activity else None,
+            )
+        )
+    CustomerLedger.objects.bulk_create(
+        ledgers,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["customer"],
+        update_fields=LEDGER_FIELDS,
+    )
+    return len(ledgers)
+
+
+def refresh_ledgers_for_emails(emails):
+    keys = {_email_key(email) for email in emails if _email_key(email)}
+    if not keys:
+        return 0
+    customer_ids = (
+        Customer.objects.annotate(email_key=Upper("email")).filter(email_key__in=keys).values_list("id", flat=True)
+    )
+    return refresh_customer_ledgers(list(customer_ids))
+
+
+def schedule_ledger_refresh(customer_ids=(), emails=()):
+    """Aktualisiert die Kundenkonten nach dem Commit der laufenden Transaktion."""
+    customer_ids = {pk for pk in customer_ids if pk}
+    emails = {_email_key(email) for email in emails if _email_key(email)}
+
+    def _refresh():
+        if customer_ids:
+            refresh_customer_ledgers(customer_ids)
+        if emails:
+            refresh_ledgers_for_emails(emails)
+
+    if customer_ids or emails:
+        transaction.on_commit(_refresh)
+
+
+def rebuild_customer_ledgers(batch_size=500):
+    with transaction.atomic():
+        return refresh_customer_ledgers(batch_size=batch_size)
@@ -0,0 +1,113 @@
+"""
+Live-Updates für das Portal (Server-Sent Events unter ASGI).
+
+Signals melden Änderungen an Buchungen, Schadenmeldungen und Rechnungen nach dem Commit an den
+``broker``; jede offene ``EventSource``-Verbindung hat eine eigene asyncio-Queue. Der Broker lebt
+im Prozess – mit mehreren ASGI-Workern erreicht ein Event nur die Clients desselben Workers. Für
+diesen Fall den Broker durch Redis-Pub/Sub mit derselben Schnittstelle (``publish``/``subscribe``)
+ersetzen.
+
+Verbindungen werden nach ``LIVE_STREAM_MAX_SECONDS`` beendet (Django 4.2 erkennt abgebrochene
+Verbindungen bei Streams nicht); der Browser verbindet sich mit ``Last-Event-ID`` neu und erhält
+verpasste Events aus dem Ringpuffer.
+"""
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+
+RECENT_EVENTS = 200
+
+
+class LiveBroker:
+    def __init__(self, history=RECENT_EVENTS):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._recent = deque(maxlen=history)
+        self._ids = itertools.count(1)
+
+    def publish(self, kind, data):
+        """Thread-sicher: darf aus synchronen Views/Signals (Worker-Threads) aufgerufen werden."""
+        with self._lock:
+            event = (next(self._ids), kind, data)
+            self._recent.append(event)
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # Event-Loop bereits beendet
+                self.unsubscribe((loop, queue))
+        return event[0]
+
+    def subscribe(self):
+        subscription = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def since(self, last_id):
+        """Events nach ``last_id``; ``None``, wenn der Ringpuffer nicht mehr so weit zurückreicht."""
+        with self._lock:
+            if self._recent and self._recent[0][0] > last_id + 1:
+                return None
+            return [event for event in self._recent if event[0] > last_id]
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+
+broker = LiveBroker()
+
+
+def publish_on_commit(kind, **data):
+    """Event erst nach erfolgreichem Commit senden (Clients laden sonst den alten Stand)."""
+    transaction.on_commit(lambda: broker.publish(kind, data))
+
+
+def format_event(event):
+    event_id, kind, data = event
+    return f"id: {event_id}\nevent: {kind}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def event_stream(last_id=None, max_seconds=None, heartbeat=None):
+    """SSE-Stream: verpasste Events, danach neue Events und Heartbeats bis zur maximalen Dauer."""
+    max_seconds = settings.LIVE_STREAM_MAX_SECONDS if max_seconds is None else max_seconds
+    heartbeat = settings.LIVE_HEARTBEAT_SECONDS if heartbeat is None else heartbeat
+    subscription = broker.subscribe()
+    _, queue = subscription
+    deadline = time.monotonic() + max_seconds
+    try:
+        yield f"retry: {settings.LIVE_RETRY_MS}\n\n"
+        sent = 0
+        if last_id is not None:
+            missed = broker.since(last_id)
+            if missed is None:
+                yield "event: reload\ndata: {}\n\n"
+            for event in missed or []:
+                sent = event[0]
+                yield format_event(event)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=min(heartbeat, remaining))
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if event[0] > sent:
+                # Bereits aus dem Ringpuffer gesendete Events nicht doppelt ausliefern
+                yield format_event(event)
+    finally:
+        broker.unsubscribe(subscription)
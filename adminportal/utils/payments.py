@@ -0,0 +1,312 @@
+"""
+Zahlungsabgleich aus Bankdateien (ISO 20022 camt.053 Kontoauszug / camt.054 Gutschriftsanzeige).
+
+Die XML-Datei wird mit ``iterparse`` Buchung für Buchung gelesen (jede ``Ntry`` wird nach der
+Verarbeitung geleert), damit auch grosse Monatsauszüge nicht komplett im Speicher liegen.
+Gutschriften werden über die QR-Referenz (``Invoice.payment_reference``, indexiert) oder – falls
+keine strukturierte Referenz vorhanden ist – über eine Rechnungsnummer im Mitteilungstext und den
+Betrag zugeordnet. Treffer werden blockweise in einer Transaktion als bezahlt markiert.
+"""
+import csv
+import re
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from xml.etree.ElementTree import ParseError, iterparse
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from adminportal.models import Invoice
+from adminportal.utils.audit import log_audit_batch
+from adminportal.utils.ledger import schedule_ledger_refresh
+from adminportal.utils.live import publish_on_commit
+
+CHUNK_SIZE = 200
+PAYABLE_STATUSES = ("pending", "overdue")
+QR_CHECK_TABLE = (0, 9, 4, 6, 8, 2, 7, 1, 3, 5)
+INVOICE_NUMBER_RE = re.compile(r"\b[A-Z]{2}-\d{2}-\d{4,}\b")
+
+
+# --- QR-Referenz ----------------------------------------------------------------------------
+
+def qr_check_digit(digits):
+    """Prüfziffer nach Modulo 10 rekursiv (QR-Referenz / ESR)."""
+    carry = 0
+    for digit in digits:
+        carry = QR_CHECK_TABLE[(carry + int(digit)) % 10]
+    return str((10 - carry) % 10)
+
+
+def qr_reference(number):
+    """27-stellige QR-Referenz zu einer fortlaufenden Nummer (z. B. Rechnungs-ID)."""
+    base = f"{int(number):026d}"
+    return base + qr_check_digit(base)
+
+
+def normalize_reference(value):
+    return re.sub(r"\s", "", value or "")
+
+
+def is_qr_reference(value):
+    return bool(re.fullmatch(r"\d{27}", value or "")) and qr_check_digit(value[:26]) == value[26]
+
+
+# --- camt lesen -----------------------------------------------------------------------------
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def _children(elem, name):
+    return [child for child in elem if _local(child.tag) == name]
+
+
+def _first(elem, *path):
+    for name in path:
+        if elem is None:
+            return None
+        found = _children(elem, name)
+        elem = found[0] if found else None
+    return elem
+
+
+def _text(elem, *path):
+    node = _first(elem, *path)
+    return (node.text or "").strip() if node is not None and node.text else ""
+
+
+def _amount(elem, *path):
+    node = _first(elem, *path)
+    if node is None or not node.text:
+        return None, ""
+    try:
+        return Decimal(node.text.strip()), node.get("Ccy", "")
+    except InvalidOperation:
+        return None, node.get("Ccy", "")
+
+
+def _date(elem, name):
+    value = _text(elem, name, "Dt") or _text(elem, name, "DtTm")[:10]
+    return parse_date(value) if value else None
+
+
+def _transactions(entry):
+    """Buchungen einer ``Ntry``: eine pro ``TxDtls`` (Sammelbuchung) oder die Buchung selbst."""
+    indicator = _text(entry, "CdtDbtInd")
+    reversal = _text(entry, "RvslInd").lower() == "true"
+    booking_date = _date(entry, "BookgDt") or _date(entry, "ValDt")
+    entry_amount, entry_currency = _amount(entry, "Amt")
+    entry_ref = _text(entry, "AcctSvcrRef")
+    details = [tx for ntry_details in _children(entry, "NtryDtls") for tx in _children(ntry_details, "TxDtls")]
+    for tx in details or [None]:
+        amount, currency = (None, "")
+        if tx is not None:
+            amount, currency = _amount(tx, "Amt")
+            if amount is None:
+                amount, currency = _amount(tx, "AmtDtls", "TxAmt", "Amt")
+        if amount is None and len(details) <= 1:
+            amount, currency = entry_amount, entry_currency
+        remittance = _first(tx, "RmtInf") if tx is not None else None
+        yield {
+            "credit": (_text(tx, "CdtDbtInd") if tx is not None and _text(tx, "CdtDbtInd") else indicator) == "CRDT",
+            "reversal": reversal,
+            "amount": amount,
+            "currency": currency,
+            "booking_date": booking_date,
+            "reference": normalize_reference(_text(remittance, "Strd", "CdtrRefInf", "Ref")),
+            "message": " ".join(
+                (node.text or "").strip() for node in _children(remittance, "Ustrd")
+            ) if remittance is not None else "",
+            "bank_ref": (
+                (_text(tx, "Refs", "AcctSvcrRef") or _text(tx, "Refs", "EndToEndId")) if tx is not None else ""
+            ) or entry_ref,
+            "debtor": (
+                _text(tx, "RltdPties", "Dbtr", "Nm") or _text(tx, "RltdPties", "Dbtr", "Pty", "Nm")
+            ) if tx is not None else "",
+        }
+
+
+def iter_camt_transactions(source):
+    """Alle Buchungen einer camt.053/054-Datei (Pfad oder Binärstrom), ohne die Datei ganz zu laden."""
+    try:
+        for _, elem in iterparse(source, events=("end",)):
+            if _local(elem.tag) == "Ntry":
+                yield from _transactions(elem)
+                elem.clear()
+    except ParseError as exc:
+        raise ValueError(f"Keine gültige camt-Datei: {exc}")
+
+
+# --- Abgleich -------------------------------------------------------------------------------
+
+class ReconcileResult:
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+        self.transactions = 0
+        self.ignored = 0
+        self.matched = []
+        self.unmatched = []
+
+    def summary(self):
+        return {
+            "dry_run": self.dry_run,
+            "transactions": self.transactions,
+            "ignored": self.ignored,
+            "matched": len(self.matched),
+            "unmatched": len(self.unmatched),
+            "matched_total": sum((row["amount"] for row in self.matched), Decimal("0")),
+        }
+
+
+def write_unmatched_report(rows, handle):
+    """Nicht zugeordnete Gutschriften als CSV (Semikolon, wie die übrigen Portal-Exporte)."""
+    writer = csv.writer(handle, delimiter=";")
+    writer.writerow(["Buchungsdatum", "Betrag", "Währung", "Referenz", "Mitteilung", "Auftraggeber", "Bankreferenz", "Grund"])
+    for row in rows:
+        writer.writerow(
+            [
+                row["booking_date"] or "",
+                row["amount"] if row["amount"] is not None else "",
+                row["currency"],
+                row["reference"],
+                row["message"],
+                row["debtor"],
+                row["bank_ref"],
+                row["reason"],
+            ]
+        )
+
+
+def _unmatched(result, tx, reason):
+    result.unmatched.append({**tx, "reason": reason})
+
+
+def _lookup(transactions):
+    """Rechnungen zu Referenzen und Rechnungsnummern eines Blocks (eine Abfrage)."""
+    references = {tx["reference"] for tx in transactions if is_qr_reference(tx["reference"])}
+    numbers = {number for tx in transactions for number in INVOICE_NUMBER_RE.findall(tx["message"].upper())}
+    if not references and not numbers:
+        return {}, {}
+    invoices = Invoice.objects.filter(payment_reference__in=references) | Invoice.objects.filter(invoice_number__in=numbers)
+    invoices = list(invoices.select_related("customer"))
+    by_reference = {invoice.payment_reference: invoice for invoice in invoices if invoice.payment_reference}
+    by_number = {invoice.invoice_number: invoice for invoice in invoices}
+    return by_reference, by_number
+
+
+def _match(tx, by_reference, by_number):
+    if tx["reference"]:
+        return by_reference.get(tx["reference"])
+    for number in INVOICE_NUMBER_RE.findall(tx["message"].upper()):
+        if number in by_number:
+            return by_number[number]
+    return None
+
+
+def _apply(matches, source_name, actor=None, request=None):
+    """Markiert die zugeordneten Rechnungen eines Blocks als bezahlt (eine Transaktion)."""
+    with transaction.atomic():
+        locked = Invoice.objects.select_for_update().in_bulk([invoice.pk for invoice, _ in matches])
+        changed = []
+        now = timezone.now()
+        for invoice, tx in matches:
+            current = locked.get(invoice.pk)
+            if current is None or current.status not in PAYABLE_STATUSES:
+                continue
+            current.status = "paid"
+            current.payment_date = tx["booking_date"] or timezone.localdate()
+            current.payment_method = "Überweisung"
+            current.add_event("paid", f"Bankimport {source_name}: {tx['bank_ref'] or tx['reference']}".strip())
+            current.updated_at = now
+            changed.append((current, tx))
+        if not changed:
+            return 0
+        Invoice.objects.bulk_update(
+            [invoice for invoice, _ in changed],
+            ["status", "payment_date", "payment_method", "payment_events", "updated_at"],
+        )
+        log_audit_batch(
+            "invoice_paid_bank_import",
+            [
+                {"invoice": invoice.invoice_number, "amount": str(tx["amount"]), "bank_ref": tx["bank_ref"], "file": source_name}
+                for invoice, tx in changed
+            ],
+            request=request,
+            actor=actor,
+        )
+        # bulk_update löst keine Signals aus
+        schedule_ledger_refresh(customer_ids=[invoice.customer_id for invoice, _ in changed])
+        publish_on_commit("invoice", ids=[invoice.pk for invoice, _ in changed], status="paid")
+    return len(changed)
+
+
+def reconcile(transactions, dry_run=False, source_name="", actor=None, request=None, chunk_size=CHUNK_SIZE):
+    """
+    Gleicht Gutschriften mit offenen Rechnungen ab. Belastungen und Stornobuchungen werden ignoriert,
+    nicht zuordenbare Gutschriften landen mit Grund in ``unmatched``.
+    """
+    result = ReconcileResult(dry_run=dry_run)
+    claimed = set()
+    iterator = iter(transactions)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return result
+        credits = []
+        for tx in chunk:
+            result.transactions += 1
+            if not tx["credit"] or tx["reversal"]:
+                result.ignored += 1
+            else:
+                credits.append(tx)
+        by_reference, by_number = _lookup(credits)
+        matches = []
+        for tx in credits:
+            if tx["amount"] is None:
+                _unmatched(result, tx, "Betrag fehlt")
+                continue
+            if tx["currency"] and tx["currency"] != "CHF":
+                _unmatched(result, tx, f"Währung {tx['currency']}")
+                continue
+            if not tx["reference"] and not INVOICE_NUMBER_RE.search(tx["message"].upper()):
+                _unmatched(result, tx, "Keine Referenz")
+                continue
+            invoice = _match(tx, by_reference, by_number)
+            if invoice is None:
+                _unmatched(result, tx, "Referenz unbekannt")
+            elif invoice.pk in claimed:
+                _unmatched(result, tx, f"Rechnung {invoice.invoice_number} mehrfach in der Datei")
+            elif invoice.status == "paid":
+                _unmatched(result, tx, f"Rechnung {invoice.invoice_number} bereits bezahlt")
+            elif invoice.status not in PAYABLE_STATUSES:
+                _unmatched(result, tx, f"Rechnung {invoice.invoice_number} ist {invoice.get_status_display()}")
+            elif tx["amount"] != invoice.amount_chf:
+                _unmatched(result, tx, f"Betrag weicht ab (Rechnung {invoice.invoice_number}: CHF {invoice.amount_chf})")
+            else:
+                claimed.add(invoice.pk)
+                matches.append((invoice, tx))
+                result.matched.append({**tx, "invoice": invoice})
+        if matches and not dry_run:
+            _apply(matches, source_name, actor=actor, request=request)
+
+
+def import_camt(source, dry_run=False, source_name="", actor=None, request=None, chunk_size=CHUNK_SIZE):
+    """
+    Abgleich einer camt-Datei. Vor dem Verbuchen wird sie einmal ganz gelesen (ohne DB-Zugriffe):
+    bei einer abgeschnittenen oder defekten Datei wird so gar nichts verbucht statt der Blöcke vor
+    dem Fehler.
+    """
+    if not dry_run:
+        for _ in iter_camt_transactions(source):
+            pass
+        if hasattr(source, "seek"):
+            source.seek(0)
+    return reconcile(
+        iter_camt_transactions(source),
+        dry_run=dry_run,
+        source_name=source_name,
+        actor=actor,
+        request=request,
+        chunk_size=chunk_size,
+    )
@@ -0,0 +1,126 @@
+"""
+Kalender/Timeline für Buchungen.
+
+``BookingWindow`` lädt alle Buchungen eines Zeitraums mit einer Abfrage und stellt daraus
+die Tagesliste (Zeitplan), das Slot-Raster pro Transporter (Timeline) und die Monatsansicht bereit.
+Gerenderte Monatskalender werden gecacht; Buchungs-Schreibzugriffe erhöhen nach dem Commit die
+Cache-Version. Ohne geteilten Cache sieht das nur der schreibende Worker, die übrigen liefern bis zum
+Ablauf von ``PUBLIC_PAGE_CACHE_SECONDS`` noch den alten Kalender.
+"""
+import calendar
+import uuid
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.template.loader import render_to_string
+
+from main.models import Booking
+
+SLOT_ORDER = {"MORNING": 0, "AFTERNOON": 1, "FULLDAY": 2}
+CALENDAR_VERSION_KEY = "booking-calendar:version"
+
+
+class BookingWindow:
+    def __init__(self, start, end, q=None, status=None, transporter_id=None, queryset=None):
+        self.start = start
+        self.end = end
+        qs = queryset if queryset is not None else Booking.objects.select_related("transporter")
+        qs = qs.filter(date__range=(start, end))
+        if q:
+            qs = qs.filter(Q(customer_name__icontains=q) | Q(transporter__name__icontains=q))
+        if status:
+            qs = qs.filter(status=status)
+        if transporter_id:
+            qs = qs.filter(transporter_id=transporter_id)
+        self.bookings = sorted(qs, key=lambda b: (b.date, SLOT_ORDER.get(b.time_slot, 9), b.transporter_id, b.id))
+
+    @property
+    def dates(self):
+        days = []
+        day = self.start
+        while day <= self.end:
+            days.append(day)
+            day += timedelta(days=1)
+        return days
+
+    def by_day(self):
+        grouped = {}
+        for booking in self.bookings:
+            grouped.setdefault(booking.date, []).append(booking)
+        return grouped
+
+    def grid(self, transporters):
+        """
+        Raster pro Transporter und Tag. Jede Zelle kennt Vormittag, Nachmittag und Ganztag getrennt,
+        damit zwei Halbtagesbuchungen am selben Tag beide sichtbar bleiben.
+        """
+        slots = {}
+        for booking in self.bookings:
+            cell = slots.setdefault((booking.transporter_id, booking.date), {})
+            cell[booking.time_slot] = booking
+        rows = []
+        dates = self.dates
+        for transporter in transporters:
+            cells = []
+            for day in dates:
+                cell = slots.get((transporter.id, day), {})
+                cells.append(
+                    {
+                        "date": day,
+                        "fullday": cell.get("FULLDAY"),
+                        "morning": cell.get("MORNING"),
+                        "afternoon": cell.get("AFTERNOON"),
+                        "free": not cell,
+                    }
+                )
+            rows.append({"transporter": transporter, "slots": cells})
+        return rows
+
+
+def month_bounds(year, month):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def calendar_version():
+    version = cache.get(CALENDAR_VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        cache.add(CALENDAR_VERSION_KEY, version, None)
+        version = cache.get(CALENDAR_VERSION_KEY) or version
+    return version
+
+
+def invalidate_booking_calendar():
+    """Neue Cache-Version nach dem Commit – vorher würde ein paralleler Request den alten Stand neu cachen."""
+    transaction.on_commit(lambda: cache.set(CALENDAR_VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def month_calendar(year, month):
+    """Navigationsdaten und gerenderter Monatskalender (HTML aus dem Cache, falls vorhanden)."""
+    month_start, month_end = month_bounds(year, month)
+    prev_month = month_start - timedelta(days=1)
+    next_month = month_end + timedelta(days=1)
+    meta = {
+        "year": year,
+        "month": month,
+        "label": month_start.strftime("%B %Y"),
+        "prev_month": prev_month.month,
+        "prev_year": prev_month.year,
+        "next_month": next_month.month,
+        "next_year": next_month.year,
+    }
+    key = f"booking-calendar:{calendar_version()}:{year}-{month:02d}"
+    html = cache.get(key)
+    if html is None:
+        window = BookingWindow(month_start, month_end, queryset=Booking.objects.only("id", "date", "time_slot", "status", "transporter_id"))
+        by_day = {day.day: items for day, items in window.by_day().items()}
+        html = render_to_string(
+            "adminportal/partials/booking_calendar.html",
+            {"weeks": calendar.monthcalendar(year, month), "bookings_by_day": by_day},
+        )
+        cache.set(key, html, settings.PUBLIC_PAGE_CACHE_SECONDS)
+    meta["html"] = html
+    return meta
@@ -0,0 +1,86 @@
+"""
+MwSt- und Umsatzberichte auf Basis der Rechnungspositionen (``InvoiceLineItem``).
+
+Die Aggregation läuft komplett in SQL über Portal- und API-Rechnungen zusammen: Datum und Status
+kommen per ``Coalesce`` aus der jeweiligen Rechnung. Entwürfe und stornierte Rechnungen zählen nicht.
+``basis="invoiced"`` (vereinbartes Entgelt) ordnet nach Rechnungsdatum, ``basis="paid"``
+(vereinnahmtes Entgelt) nach Zahlungsdatum und nur bezahlte Rechnungen.
+"""
+from datetime import date, timedelta
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+from adminportal.models import InvoiceLineItem
+
+EXCLUDED_STATUSES = ["draft", "cancelled"]
+BASES = ("invoiced", "paid")
+
+
+def quarter_bounds(year, quarter):
+    start = date(year, 3 * (quarter - 1) + 1, 1)
+    end = date(year + 1, 1, 1) if quarter == 4 else date(year, 3 * quarter + 1, 1)
+    return start, end - timedelta(days=1)
+
+
+def quarter_of(day):
+    return day.year, (day.month - 1) // 3 + 1
+
+
+def _lines(start, end, basis="invoiced"):
+    if basis not in BASES:
+        raise ValueError(f"basis muss {' oder '.join(BASES)} sein")
+    if basis == "paid":
+        doc_date = Coalesce(F("invoice__payment_date"), F("api_invoice__payment_date"))
+    else:
+        doc_date = Coalesce(F("invoice__issue_date"), F("api_invoice__invoice_date"))
+    qs = InvoiceLineItem.objects.annotate(
+        doc_date=doc_date,
+        doc_status=Coalesce(F("invoice__status"), F("api_invoice__status")),
+    ).filter(doc_date__range=(start, end))
+    if basis == "paid":
+        return qs.filter(doc_status="paid")
+    return qs.exclude(doc_status__in=EXCLUDED_STATUSES)
+
+
+def _sums():
+    return {
+        "net": Sum("net_amount"),
+        "vat": Sum("vat_amount"),
+        "gross": Sum("gross_amount"),
+        "invoices": Count("invoice", distinct=True) + Count("api_invoice", distinct=True),
+    }
+
+
+def vat_summary(start, end, basis="invoiced"):
+    """Umsatz und MwSt pro Steuersatz im Zeitraum plus Gesamtzeile."""
+    qs = _lines(start, end, basis)
+    rows = list(qs.values("vat_rate").annotate(**_sums()).order_by("-vat_rate"))
+    totals = qs.aggregate(**_sums())
+    return {"start": start, "end": end, "basis": basis, "rates": rows, "totals": totals}
+
+
+def revenue_by_category(start, end, basis="invoiced", group="month"):
+    """Netto-/Bruttoumsatz pro Kategorie (Vermietung, Schadenmeldung, Sonstiges), optional pro Monat."""
+    qs = _lines(start, end, basis)
+    keys = ["category"]
+    if group == "month":
+        qs = qs.annotate(period=TruncMonth("doc_date"))
+        keys = ["period", "category"]
+    return list(qs.values(*keys).annotate(**_sums()).order_by(*keys))
+
+
+def vat_report(year, quarter, basis="invoiced"):
+    """Quartalsbericht für die MwSt-Abrechnung: Steuersätze, Kategorien und Monate."""
+    start, end = quarter_bounds(year, quarter)
+    report = vat_summary(start, end, basis)
+    report.update(
+        {
+            "year": year,
+            "quarter": quarter,
+            "categories": revenue_by_category(start, end, basis, group=None),
+            "months": revenue_by_category(start, end, basis, group="month"),
+        }
+    )
+    return report
+
@@ -1,25 +1,30 @@
 import io
 import csv
-import calendar
 import json
 from decimal import Decimal, ROUND_HALF_UP
-from datetime import date
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.utils import timezone
-from django.db.models import Q, Count, Avg, Sum, DecimalField, Value
-from django.db.models.functions import Coalesce
+from django.db.models import Q, Count, Avg, F, Sum
+from django.core.paginator import Paginator
 from datetime import timedelta
-from django.http import HttpResponse, JsonResponse
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from django.conf import settings
 from reportlab.lib.pagesizes import A4
 
 from main.models import DamageReport, Booking, Transporter, Vehicle
+from main.utils.media import attach_photo_urls, document_links
+from main.utils.phash import near_duplicates
+from main.utils.roles import has_any_role, is_staff_member
 from main.utils.rental_extras import normalize_rental_extras
-from .models import Customer, Invoice, PortalSettings
+from .models import Customer, Invoice, InvoiceLineItem, PortalSettings, TransporterDailyStats
 from .forms import (
     CustomerForm,
     InvoiceForm,
@@ -31,14 +36,23 @@ from .forms import (
 from main.utils.emailing import resolve_admin_recipients, send_templated_mail
 from adminportal.utils.audit import log_audit
 from adminportal.utils.gdpr import export_personal_data, anonymize_personal_data, delete_personal_data
+from adminportal.utils.fleet_stats import utilization_by_transporter, utilization_series
+from adminportal.utils.ical import FLEET_SCOPE, feed_state, feed_token, scope_from_token, transporter_scope
+from adminportal.utils.invoice_lines import invoice_totals
+from adminportal.utils.live import event_stream
+from adminportal.utils.payments import import_camt
+from adminportal.utils.vat_report import BASES as VAT_BASES, quarter_of, vat_report
+from adminportal.utils.timeline import BookingWindow, month_bounds, month_calendar
+from config import metrics as request_metrics
+from config.db_router import replica_view
+from config.metrics import track
+
+
+CUSTOMERS_PER_PAGE = 50
 
 
 def _is_staff(user):
-    if not user.is_authenticated:
-        return False
-    if user.is_staff:
-        return True
-    return user.groups.filter(name__in=["admin", "manager", "employee"]).exists()
+    return is_staff_member(user)
 
 
 def _has_role(user, roles):
@@ -46,7 +60,7 @@ def _has_role(user, roles):
         return False
     if user.is_superuser:
         return True
-    return user.groups.filter(name__in=roles).exists()
+    return has_any_role(user, roles)
 
 
 def _base_context(active_tab: str):
@@ -87,49 +101,11 @@ def _invoice_contact_details():
     }
 
 
-def _invoice_totals(items, vat_rate):
-    def to_decimal(value):
-        try:
-            return Decimal(str(value))
-        except Exception:
-            return Decimal("0")
-
-    subtotal = Decimal("0")
-    for item in items or []:
-        qty = to_decimal(item.get("quantity") or 0)
-        unit_price = to_decimal(item.get("unit_price") or 0)
-        subtotal += (qty * unit_price)
-    vat_amount = (subtotal * Decimal(str(vat_rate)) / Decimal("100")).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    total = (subtotal + vat_amount).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    return (
-        subtotal.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP),
-        vat_amount,
-        total,
-    )
-
-
-def _invoice_totals_with_included(items, vat_rate, vat_included):
-    subtotal = Decimal("0")
-    for item in items or []:
-        qty = Decimal(str(item.get("quantity") or 0))
-        unit_price = Decimal(str(item.get("unit_price") or 0))
-        subtotal += (qty * unit_price)
-    if vat_included:
-        divisor = Decimal("1") + (Decimal(str(vat_rate)) / Decimal("100"))
-        net_subtotal = (subtotal / divisor).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP) if divisor != 0 else subtotal
-        vat_amount = (subtotal - net_subtotal).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        total = subtotal.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    else:
-        net_subtotal = subtotal.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        vat_amount = (subtotal * Decimal(str(vat_rate)) / Decimal("100")).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        total = (subtotal + vat_amount).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-    return net_subtotal, vat_amount, total
-
-
 @login_required
 @user_passes_test(_is_staff)
 def dashboard(request):
     ctx = _base_context("dashboard")
+    ctx["live_refresh"] = True
     ctx.update(
         {
             "recent_reports": DamageReport.objects.order_by("-created_at")[:3],
@@ -184,7 +160,9 @@ def damage_reports(request):
         "from": date_from or "",
         "to": date_to or "",
     }
-    ctx["reports"] = qs.order_by("-created_at")[:200]
+    reports = list(qs.order_by("-created_at")[:200])
+    attach_photo_urls(photo for report in reports for photo in report.photos.all())
+    ctx["reports"] = reports
     return render(request, "adminportal/damage_reports.html", ctx)
 
 
@@ -231,30 +209,7 @@ def bookings(request):
     cal_year = int(year) if year and year.isdigit() else today.year
     cal_month = int(month) if month and month.isdigit() else today.month
     cal_month = max(1, min(12, cal_month))
-    month_start = date(cal_year, cal_month, 1)
-    month_end = date(cal_year, cal_month, calendar.monthrange(cal_year, cal_month)[1])
-
-    month_bookings = Booking.objects.select_related("transporter").filter(
-        date__gte=month_start, date__lte=month_end
-    )
-    bookings_by_day = {}
-    for booking in month_bookings:
-        bookings_by_day.setdefault(booking.date.day, []).append(booking)
-
-    cal_weeks = calendar.monthcalendar(cal_year, cal_month)
-    prev_month = month_start - timedelta(days=1)
-    next_month = month_end + timedelta(days=1)
-    ctx["calendar"] = {
-        "weeks": cal_weeks,
-        "year": cal_year,
-        "month": cal_month,
-        "label": month_start.strftime("%B %Y"),
-        "prev_month": prev_month.month,
-        "prev_year": prev_month.year,
-        "next_month": next_month.month,
-        "next_year": next_month.year,
-        "bookings_by_day": bookings_by_day,
-    }
+    ctx["calendar"] = month_calendar(cal_year, cal_month)
     return render(request, "adminportal/bookings.html", ctx)
 
 
@@ -284,6 +239,7 @@ def vehicles(request):
 
 @login_required
 @user_passes_test(_is_staff)
+@replica_view
 def customers(request):
     ctx = _base_context("customers")
     q = request.GET.get("q")
@@ -306,8 +262,14 @@ def customers(request):
         qs = qs.order_by("-last_name", "-first_name")
     elif sort == "oldest":
         qs = qs.order_by("created_at")
+    elif sort == "revenue":
+        qs = qs.order_by(F("ledger__revenue_chf").desc(nulls_last=True), "-id")
+    elif sort == "open_balance":
+        qs = qs.order_by(F("ledger__open_balance_chf").desc(nulls_last=True), "-id")
+    elif sort == "activity":
+        qs = qs.order_by(F("ledger__last_activity_at").desc(nulls_last=True), "-id")
     else:
-        qs = qs.order_by("-created_at")
+        qs = qs.order_by("-created_at", "-id")
     if request.method == "POST":
         form = CustomerForm(request.POST)
         if form.is_valid():
@@ -329,19 +291,24 @@ def customers(request):
     form.fields["notes"].widget.attrs.update({"placeholder": "Interne Notizen zum Kunden...", "class": "fig-customer-input"})
 
     ctx["customer_form"] = form
-    ctx["customers"] = qs.annotate(
-        total_revenue=Coalesce(
-            Sum("invoices__amount_chf"),
-            Value(0),
-            output_field=DecimalField(max_digits=10, decimal_places=2),
-        )
+    page = Paginator(
+        qs.annotate(
+            total_revenue=F("ledger__revenue_chf"),
+            open_balance=F("ledger__open_balance_chf"),
+            booking_count=F("ledger__booking_count"),
+            report_count=F("ledger__report_count"),
+            last_activity_at=F("ledger__last_activity_at"),
+        ),
+        CUSTOMERS_PER_PAGE,
+    ).get_page(request.GET.get("page"))
+    ctx["customers"] = page
+    ctx["page_obj"] = page
+    ctx["customer_stats"] = base_qs.aggregate(
+        total=Count("id"),
+        damage_reports=Count("id", filter=Q(source="damage-report")),
+        rentals=Count("id", filter=Q(source="rental")),
+        manual=Count("id", filter=Q(source="manual")),
     )
-    ctx["customer_stats"] = {
-        "total": base_qs.count(),
-        "damage_reports": base_qs.filter(source="damage-report").count(),
-        "rentals": base_qs.filter(source="rental").count(),
-        "manual": base_qs.filter(source="manual").count(),
-    }
     ctx["today"] = timezone.localdate()
     ctx["filter"] = {"q": q or "", "source": source or "", "sort": sort or ""}
     return render(request, "adminportal/customers.html", ctx)
@@ -357,8 +324,12 @@ def customer_detail(request, pk):
     bookings = Booking.objects.select_related("transporter").filter(customer_email__iexact=email).order_by("-date", "-created_at")
     invoices = Invoice.objects.filter(customer=customer).order_by("-created_at")
 
-    total_revenue = sum([inv.amount_chf for inv in invoices]) if invoices else 0
-    open_amount = sum([inv.amount_chf for inv in invoices if inv.status in ["pending", "overdue"]]) if invoices else 0
+    sums = invoices.aggregate(
+        total=Sum("amount_chf"),
+        open=Sum("amount_chf", filter=Q(status__in=["pending", "overdue"])),
+    )
+    total_revenue = sums["total"] or 0
+    open_amount = sums["open"] or 0
 
     ctx = _base_context("customers")
     ctx.update(
@@ -382,6 +353,7 @@ def customer_detail(request, pk):
 
 @login_required
 @user_passes_test(_is_staff)
+@replica_view
 def customer_export(request, pk):
     customer = get_object_or_404(Customer, pk=pk)
     payload = export_personal_data(customer.email or "")
@@ -429,7 +401,12 @@ def invoices(request):
 
     ctx["invoice_form"] = form
     ctx["invoice_created"] = request.GET.get("created") == "1"
-    qs = Invoice.objects.select_related("customer").order_by("-created_at")
+    today = timezone.localdate()
+    month_start = today.replace(day=1)
+    # Überfällige in einem UPDATE markieren statt pro Rechnung zu speichern
+    Invoice.objects.filter(status="pending", due_date__lt=today).update(status="overdue")
+
+    qs = Invoice.objects.select_related("customer", "related_report", "related_booking").order_by("-created_at")
     if q:
         qs = qs.filter(
             Q(invoice_number__icontains=q)
@@ -453,12 +430,6 @@ def invoices(request):
         qs = qs.filter(issue_date__lte=date_to)
 
     invoices = list(qs[:200])
-    today = timezone.localdate()
-    month_start = today.replace(day=1)
-    for inv in invoices:
-        if inv.status == "pending" and inv.due_date and inv.due_date < today:
-            inv.status = "overdue"
-            inv.save(update_fields=["status"])
     ctx["invoices"] = invoices
     ctx["filter"] = {
         "q": q or "",
@@ -467,24 +438,15 @@ def invoices(request):
         "from": date_from or "",
         "to": date_to or "",
     }
-    paid_this_month = sum(
-        [
-            inv.amount_chf
-            for inv in invoices
-            if inv.status == "paid" and inv.payment_date and inv.payment_date >= month_start
-        ]
+    # Kennzahlen über alle gefilterten Rechnungen in einer Abfrage (nicht nur die angezeigten 200)
+    stats = qs.order_by().aggregate(
+        total_amount=Sum("amount_chf"),
+        paid_total=Sum("amount_chf", filter=Q(status="paid")),
+        open_total=Sum("amount_chf", filter=Q(status__in=["pending", "overdue"])),
+        overdue_total=Sum("amount_chf", filter=Q(status="overdue")),
+        paid_this_month=Sum("amount_chf", filter=Q(status="paid", payment_date__gte=month_start)),
     )
-    paid_total = sum([inv.amount_chf for inv in invoices if inv.status == "paid"])
-    open_total = sum([inv.amount_chf for inv in invoices if inv.status in ["pending", "overdue"]])
-    overdue_total = sum([inv.amount_chf for inv in invoices if inv.status == "overdue"])
-    total_amount = sum([inv.amount_chf for inv in invoices])
-    ctx["invoice_stats"] = {
-        "total_amount": total_amount,
-        "paid_total": paid_total,
-        "open_total": open_total,
-        "overdue_total": overdue_total,
-        "paid_this_month": paid_this_month,
-    }
+    ctx["invoice_stats"] = {key: value or 0 for key, value in stats.items()}
     return render(request, "adminportal/invoices.html", ctx)
 
 
@@ -531,6 +493,7 @@ def invoice_new_details(request, customer_id):
 
 @login_required
 @user_passes_test(_is_staff)
+@replica_view
 def invoice_export(request):
     q = request.GET.get("q")
     status = request.GET.get("status")
@@ -609,17 +572,15 @@ def invoice_export(request):
 @user_passes_test(_is_staff)
 def invoice_preview(request, pk):
     invoice = get_object_or_404(Invoice.objects.select_related("customer"), pk=pk)
-    subtotal, vat_amount, total_amount = _invoice_totals_with_included(
-        invoice.items, invoice.vat_rate, getattr(invoice, "vat_included", True)
-    )
     ctx = _base_context("invoices")
     ctx.update(
         {
             "invoice": invoice,
+            "line_items": invoice.line_items.all(),
             "contact": _invoice_contact_details(),
-            "subtotal": subtotal,
-            "vat_amount": vat_amount,
-            "total_amount": total_amount,
+            "subtotal": invoice.net_amount_chf,
+            "vat_amount": invoice.vat_amount_chf,
+            "total_amount": invoice.amount_chf,
         }
     )
     return render(request, "adminportal/invoice_preview.html", ctx)
@@ -672,7 +633,7 @@ def invoice_preview_draft(request, customer_id):
     }
     request.session["invoice_draft"] = draft_payload
 
-    subtotal, vat_amount, total_amount = _invoice_totals_with_included(normalized_items, vat_rate, vat_included)
+    subtotal, vat_amount, total_amount = invoice_totals(normalized_items, vat_rate, vat_included)
     ctx = _base_context("invoices")
     ctx.update(
         {
@@ -686,6 +647,7 @@ def invoice_preview_draft(request, customer_id):
                 "customer": customer,
                 "vat_included": vat_included,
             },
+            "line_items": normalized_items,
             "contact": _invoice_contact_details(),
             "subtotal": subtotal,
             "vat_amount": vat_amount,
@@ -708,7 +670,6 @@ def invoice_create_from_draft(request, customer_id):
     customer = get_object_or_404(Customer, pk=customer_id)
     vat_rate = Decimal(str(draft.get("vat_rate") or "7.7"))
     vat_included = bool(draft.get("vat_included", True))
-    subtotal, vat_amount, total_amount = _invoice_totals_with_included(draft.get("items") or [], vat_rate, vat_included)
 
     invoice = Invoice(
         customer=customer,
@@ -716,7 +677,6 @@ def invoice_create_from_draft(request, customer_id):
         issue_date=draft.get("issue_date") or timezone.localdate().isoformat(),
         due_date=draft.get("due_date") or None,
         description=draft.get("notes") or "",
-        amount_chf=total_amount,
         status="pending",
         items=draft.get("items") or [],
         vat_rate=vat_rate,
@@ -775,6 +735,7 @@ def invoice_send_email(request, pk):
     return redirect("portal_invoice_preview", pk=pk)
 
 
+@track("pdf")
 def _render_invoice_pdf(invoice, buffer):
     contact = _invoice_contact_details()
     p = canvas.Canvas(buffer, pagesize=A4)
@@ -833,19 +794,17 @@ def _render_invoice_pdf(invoice, buffer):
 
     p.setFont("Helvetica", 9)
     y -= 14
-    for item in invoice.items or []:
-        p.drawString(40, y, str(item.get("description") or "-")[:40])
-        p.drawRightString(340, y, str(item.get("quantity") or 0))
-        p.drawRightString(440, y, f"CHF {item.get('unit_price', 0):.2f}")
-        p.drawRightString(540, y, f"CHF {item.get('total', 0):.2f}")
+    for item in invoice.line_items.all():
+        p.drawString(40, y, (item.description or "-")[:40])
+        p.drawRightString(340, y, f"{item.quantity.normalize():f}")
+        p.drawRightString(440, y, f"CHF {item.unit_price:.2f}")
+        p.drawRightString(540, y, f"CHF {item.line_total:.2f}")
         y -= 14
         if y < 120:
             p.showPage()
             y = height - 60
 
-    subtotal, vat_amount, total_amount = _invoice_totals_with_included(
-        invoice.items, invoice.vat_rate, getattr(invoice, "vat_included", True)
-    )
+    subtotal, vat_amount, total_amount = invoice.net_amount_chf, invoice.vat_amount_chf, invoice.amount_chf
     y -= 10
     p.line(320, y, 540, y)
     y -= 16
@@ -931,31 +890,17 @@ def invoice_pdf(request, pk):
 
 @login_required
 @user_passes_test(_is_staff)
+@replica_view
 def schedule(request):
     ctx = _base_context("schedule")
+    ctx["live_refresh"] = True
     q = request.GET.get("q")
     transporter_id = request.GET.get("transporter")
     status = request.GET.get("status")
     date_from = request.GET.get("from")
     date_to = request.GET.get("to")
 
-    qs = Booking.objects.select_related("transporter").order_by("date", "time_slot")
-    if q:
-        qs = qs.filter(Q(customer_name__icontains=q) | Q(transporter__name__icontains=q))
-    if transporter_id:
-        qs = qs.filter(transporter_id=transporter_id)
-    if status:
-        qs = qs.filter(status=status)
-    if date_from:
-        qs = qs.filter(date__gte=date_from)
-    if date_to:
-        qs = qs.filter(date__lte=date_to)
-
-    grouped = {}
-    for booking in qs[:300]:
-        grouped.setdefault(booking.date, []).append(booking)
-
-    # Timeline (14 Tage ab Startdatum)
+    # Timeline (14 Tage ab Startdatum, max. 31 Tage)
     try:
         start_date = timezone.datetime.fromisoformat(date_from).date() if date_from else timezone.localdate()
     except Exception:
@@ -964,27 +909,20 @@ def schedule(request):
         end_date = timezone.datetime.fromisoformat(date_to).date() if date_to else start_date + timedelta(days=13)
     except Exception:
         end_date = start_date + timedelta(days=13)
-
-    timeline_dates = []
-    d = start_date
-    while d <= end_date and len(timeline_dates) < 31:
-        timeline_dates.append(d)
-        d += timedelta(days=1)
-
-    bookings_in_range = qs.filter(date__range=(start_date, end_date)).select_related("transporter")
-    booking_map = {(b.transporter_id, b.date): b for b in bookings_in_range}
-
-    timeline_rows = []
-    for transporter in Transporter.objects.all().order_by("name"):
-        slots = []
-        for day in timeline_dates:
-            slots.append(booking_map.get((transporter.id, day)))
-        timeline_rows.append({"transporter": transporter, "slots": slots})
-
-    ctx["grouped_bookings"] = grouped
-    ctx["timeline_dates"] = timeline_dates
-    ctx["timeline_rows"] = timeline_rows
-    ctx["transporters"] = Transporter.objects.all().order_by("name")
+    end_date = max(start_date, min(end_date, start_date + timedelta(days=30)))
+
+    window = BookingWindow(start_date, end_date, q=q, status=status, transporter_id=transporter_id)
+    transporters = list(Transporter.objects.all().order_by("name"))
+    timeline_transporters = [t for t in transporters if str(t.id) == transporter_id] if transporter_id else transporters
+
+    ctx["grouped_bookings"] = window.by_day()
+    ctx["timeline_dates"] = window.dates
+    ctx["timeline_rows"] = window.grid(timeline_transporters)
+    ctx["transporters"] = transporters
+    ctx["ical_feeds"] = [
+        {"label": "Gesamte Flotte inkl. Reparaturen", "url": _ical_feed_url(request, FLEET_SCOPE)},
+        *[{"label": t.name, "url": _ical_feed_url(request, transporter_scope(t.id))} for t in transporters],
+    ]
     ctx["filter"] = {
         "q": q or "",
         "status": status or "",
@@ -995,10 +933,58 @@ def schedule(request):
     return render(request, "adminportal/schedule.html", ctx)
 
 
+def _is_staff_request(request):
+    return request.user.is_authenticated and _is_staff(request.user)
+
+
+async def live_events(request):
+    """
+    Server-Sent Events für Zeitplan, Verfügbarkeit und Dashboard. Nur unter ASGI; unter WSGI
+    würde der Stream einen Worker dauerhaft belegen, der Client fällt dann auf Neuladen zurück.
+    """
+    if not await sync_to_async(_is_staff_request)(request):
+        return HttpResponse(status=403)
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse("event: unsupported\ndata: {}\n\n", content_type="text/event-stream")
+    try:
+        last_id = int(request.headers.get("Last-Event-ID") or "")
+    except ValueError:
+        last_id = None
+    response = StreamingHttpResponse(event_stream(last_id=last_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Proxy (nginx) soll den Stream nicht puffern
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def _ical_feed_url(request, scope):
+    return request.build_absolute_uri(reverse("portal_ical_feed", args=[feed_token(scope)]))
+
+
+def ical_feed(request, token):
+    """Abonnierbarer Kalender (signierte URL statt Login); Kalender-Apps fragen mit ETag nach."""
+    scope = scope_from_token(token)
+    if scope is None:
+        raise Http404
+    feed = feed_state(scope)
+    etag = quote_etag(feed["etag"])
+    last_modified = int(feed["last_modified"].timestamp()) if feed["last_modified"] else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = HttpResponse(feed["body"], content_type="text/calendar; charset=utf-8")
+        response["Content-Disposition"] = f'inline; filename="{scope}.ics"'
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, max_age=settings.ICAL_FEED_MAX_AGE)
+    return response
+
+
 @login_required
 @user_passes_test(_is_staff)
 def availability(request):
     ctx = _base_context("availability")
+    ctx["live_refresh"] = True
     date_str = request.GET.get("date") or ""
     try:
         target_date = timezone.datetime.fromisoformat(date_str).date() if date_str else timezone.localdate()
@@ -1029,10 +1015,157 @@ def settings_view(request):
     return render(request, "adminportal/settings.html", ctx)
 
 
+@login_required
+@user_passes_test(lambda u: _has_role(u, ["admin", "manager"]))
+@replica_view
+def utilization(request):
+    ctx = _base_context("utilization")
+    today = timezone.localdate()
+    try:
+        year, month = (int(part) for part in (request.GET.get("month") or "").split("-"))
+        month_start, month_end = month_bounds(year, month)
+    except ValueError:
+        month_start, month_end = month_bounds(today.year, today.month)
+
+    rows = utilization_by_transporter(month_start, month_end)
+    fleet_size = Transporter.objects.count()
+    capacity = fleet_size * TransporterDailyStats.SLOTS_PER_DAY
+    days = {row["period"]: row for row in utilization_series(month_start, month_end)}
+    daily = []
+    day = month_start
+    while day <= month_end:
+        row = days.get(day, {})
+        slots = row.get("booked_slots") or 0
+        daily.append(
+            {
+                "date": day,
+                "booked_slots": slots,
+                "revenue_chf": row.get("revenue_chf") or 0,
+                "percent": round(slots * 100 / capacity) if capacity else 0,
+            }
+        )
+        day += timedelta(days=1)
+
+    year_start = (month_start - timedelta(days=335)).replace(day=1)
+    monthly = utilization_series(year_start, month_end, group="month")
+    max_revenue = max((row["revenue_chf"] or 0 for row in monthly), default=0)
+    for row in monthly:
+        row["percent"] = round((row["revenue_chf"] or 0) * 100 / max_revenue) if max_revenue else 0
+
+    prev_month = month_start - timedelta(days=1)
+    next_month = month_end + timedelta(days=1)
+    ctx.update(
+        {
+            "month_start": month_start,
+            "prev_month": prev_month.strftime("%Y-%m"),
+            "next_month": next_month.strftime("%Y-%m"),
+            "rows": rows,
+            "daily": daily,
+            "monthly": monthly,
+            "totals": {
+                "booked_slots": sum(row["booked_slots"] for row in rows),
+                "revenue_chf": sum((row["revenue_chf"] for row in rows), Decimal("0")),
+                "extras_revenue_chf": sum((row["extras_revenue_chf"] for row in rows), Decimal("0")),
+                "utilization": round(sum(row["booked_slots"] for row in rows) * 100 / (capacity * len(daily)), 1)
+                if capacity
+                else 0,
+            },
+        }
+    )
+    return render(request, "adminportal/utilization.html", ctx)
+
+
+@login_required
+@user_passes_test(lambda u: _has_role(u, ["admin", "manager"]))
+@replica_view
+def vat_report_view(request):
+    today = timezone.localdate()
+    try:
+        year, quarter = (int(part) for part in (request.GET.get("quarter") or "").upper().split("-Q"))
+        if not 1 <= quarter <= 4:
+            raise ValueError
+    except ValueError:
+        year, quarter = quarter_of(today)
+    basis = request.GET.get("basis") if request.GET.get("basis") in VAT_BASES else "invoiced"
+    report = vat_report(year, quarter, basis)
+
+    if request.GET.get("format") == "csv":
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = f'attachment; filename="mwst_{year}_Q{quarter}.csv"'
+        writer = csv.writer(response, delimiter=";")
+        writer.writerow(["Abschnitt", "Schlüssel", "Netto CHF", "MwSt CHF", "Brutto CHF", "Rechnungen"])
+        for row in report["rates"]:
+            writer.writerow(["MwSt-Satz", f"{row['vat_rate']} %", row["net"], row["vat"], row["gross"], row["invoices"]])
+        for row in report["categories"]:
+            writer.writerow(["Kategorie", row["category"], row["net"], row["vat"], row["gross"], row["invoices"]])
+        for row in report["months"]:
+            writer.writerow([f"Monat {row['period']:%m.%Y}", row["category"], row["net"], row["vat"], row["gross"], row["invoices"]])
+        totals = report["totals"]
+        writer.writerow(["Total", "", totals["net"] or 0, totals["vat"] or 0, totals["gross"] or 0, totals["invoices"] or 0])
+        return response
+
+    prev_year, prev_quarter = (year, quarter - 1) if quarter > 1 else (year - 1, 4)
+    next_year, next_quarter = (year, quarter + 1) if quarter < 4 else (year + 1, 1)
+    categories = dict(InvoiceLineItem.CATEGORY_CHOICES)
+    for row in report["categories"] + report["months"]:
+        row["label"] = categories.get(row["category"], row["category"])
+    ctx = _base_context("invoices")
+    ctx.update(
+        {
+            "report": report,
+            "quarter_param": f"{year}-Q{quarter}",
+            "prev_quarter": f"{prev_year}-Q{prev_quarter}",
+            "next_quarter": f"{next_year}-Q{next_quarter}",
+            "basis": basis,
+        }
+    )
+    return render(request, "adminportal/vat_report.html", ctx)
+
+
+@login_required
+@user_passes_test(lambda u: _has_role(u, ["admin", "manager"]))
+def payment_import_view(request):
+    """Bankdatei (camt.053/054) hochladen: Testlauf mit Bericht oder Zahlungen verbuchen."""
+    ctx = _base_context("invoices")
+    if request.method == "POST":
+        upload = request.FILES.get("statement")
+        dry_run = request.POST.get("apply") != "1"
+        if not upload:
+            ctx["error"] = "Bitte eine camt.053- oder camt.054-Datei auswählen."
+        else:
+            try:
+                result = import_camt(upload, dry_run=dry_run, source_name=upload.name, actor=request.user, request=request)
+            except ValueError as exc:
+                ctx["error"] = str(exc)
+            else:
+                ctx.update({"result": result, "summary": result.summary(), "filename": upload.name})
+    return render(request, "adminportal/payment_import.html", ctx)
+
+
+@login_required
+@user_passes_test(lambda u: _has_role(u, ["admin"]))
+def metrics_view(request):
+    if request.method == "POST" and request.POST.get("action") == "reset":
+        request_metrics.reset_samples()
+        return redirect("portal_metrics")
+    ctx = _base_context("metrics")
+    samples = request_metrics.recent_samples()
+    ctx.update(
+        {
+            "samples": samples[:50],
+            "sample_count": len(samples),
+            "path_summary": request_metrics.path_summary(samples)[:30],
+            "slow_queries": request_metrics.slow_query_summary(),
+            "slow_query_ms": getattr(settings, "SLOW_QUERY_MS", 100),
+        }
+    )
+    return render(request, "adminportal/metrics.html", ctx)
+
+
 @login_required
 @user_passes_test(_is_staff)
 def damage_report_detail(request, pk):
-    report = get_object_or_404(DamageReport, pk=pk)
+    report = get_object_or_404(DamageReport.objects.prefetch_related("photos"), pk=pk)
     if request.method == "POST":
         form = DamageReportUpdateForm(request.POST, instance=report)
         if form.is_valid():
@@ -1042,7 +1175,19 @@ def damage_report_detail(request, pk):
     else:
         form = DamageReportUpdateForm(instance=report)
     ctx = _base_context("damage_reports")
-    ctx.update({"report": report, "form": form})
+    photos = report.photos.all()
+    duplicates = near_duplicates(photos, exclude_report_id=report.pk)
+    attach_photo_urls([*photos, *(match for items in duplicates.values() for match, _ in items)])
+    ctx.update(
+        {
+            "report": report,
+            "form": form,
+            "documents": document_links(report.documents),
+            "photo_duplicates": [
+                {"photo": photo, "matches": duplicates[photo.pk]} for photo in photos if photo.pk in duplicates
+            ],
+        }
+    )
     return render(request, "adminportal/damage_report_detail.html", ctx)
 
 
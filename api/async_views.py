@@ -0,0 +1,104 @@
+"""
+Async-Endpunkte der API (Verfügbarkeit, Uploads, Stripe).
+
+DRF 3.15 kennt keine async Views. ``AsyncAPIView`` übernimmt Request-Aufbau, Authentifizierung,
+Berechtigungen, Throttling und Fehlerbehandlung von ``APIView``; nur die Handler (``get``/``post``)
+sind Koroutinen. Unter ASGI (``config.asgi``) hält ein Request während DB-, Storage- oder
+Stripe-Aufrufen damit keinen Worker-Thread; unter WSGI laufen dieselben Views weiterhin
+(Django führt sie pro Request in einem eigenen Event-Loop aus).
+
+Regeln für Handler:
+- ORM nur über die async Methoden (``aget``, ``afirst``, ``aexists``, ``asave`` …)
+- Storage und externe Dienste über ``main.utils.aio.run_io``
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.utils.dateparse import parse_date
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from main.models import Transporter, Vehicle
+from .throttling import TokenBucketThrottle
+from .validators import abooking_range_conflict_exists, abooking_slot_conflict_exists
+
+
+class AsyncAPIView(APIView):
+    """``APIView`` mit async Handlern; ``initial`` (Auth, Permissions, Throttles) läuft im Request-Thread."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class BookingAvailabilityView(AsyncAPIView):
+    """
+    Verfügbarkeit eines Transporters/Fahrzeugs.
+    GET ?transporter=<id>|vehicle=<id> mit pickup_date/return_date oder date/time_slot
+    """
+
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "availability"
+
+    async def get(self, request):
+        transporter_id = request.query_params.get("transporter")
+        vehicle_id = request.query_params.get("vehicle")
+        pickup_date = parse_date(request.query_params.get("pickup_date") or "")
+        return_date = parse_date(request.query_params.get("return_date") or "")
+        booking_date = parse_date(request.query_params.get("date") or "")
+        time_slot = request.query_params.get("time_slot")
+
+        if not transporter_id and not vehicle_id:
+            return Response(
+                {"detail": "transporter oder vehicle erforderlich."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        transporter = await Transporter.objects.filter(pk=transporter_id).afirst() if transporter_id else None
+        vehicle = await Vehicle.objects.filter(pk=vehicle_id).afirst() if vehicle_id else None
+        if transporter_id and not transporter:
+            return Response({"detail": "Transporter nicht gefunden."}, status=status.HTTP_404_NOT_FOUND)
+        if vehicle_id and not vehicle:
+            return Response({"detail": "Fahrzeug nicht gefunden."}, status=status.HTTP_404_NOT_FOUND)
+
+        if pickup_date and return_date:
+            conflict = await abooking_range_conflict_exists(
+                transporter=transporter,
+                vehicle=vehicle,
+                pickup_date=pickup_date,
+                return_date=return_date,
+            )
+            return Response({"available": not conflict})
+
+        if booking_date and time_slot and transporter:
+            conflict = await abooking_slot_conflict_exists(
+                transporter=transporter,
+                booking_date=booking_date,
+                time_slot=time_slot,
+            )
+            return Response({"available": not conflict})
+
+        return Response(
+            {"detail": "Ungültige Parameter. Nutze pickup_date/return_date oder date/time_slot."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
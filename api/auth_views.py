@@ -6,6 +6,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from adminportal.utils.audit import log_audit
+from main.utils.roles import is_staff_member, user_roles
 from main.utils.security import get_client_ip, is_rate_limited, register_failed_attempt, reset_rate_limit
 
 
@@ -27,7 +28,7 @@ class LoginView(APIView):
             register_failed_attempt(rate_key)
             log_audit("api_login_failed", request=request, metadata={"username": username})
             return Response({"detail": "Ungültige Anmeldedaten oder keine Berechtigung"}, status=status.HTTP_401_UNAUTHORIZED)
-        has_access = user.is_staff or user.groups.filter(name__in=["admin", "manager", "employee"]).exists()
+        has_access = is_staff_member(user)
         if not has_access:
             register_failed_attempt(rate_key)
             log_audit("api_login_denied", request=request, actor=user, metadata={"username": username})
@@ -39,7 +40,7 @@ class LoginView(APIView):
             {
                 "username": user.username,
                 "is_staff": user.is_staff,
-                "groups": list(user.groups.values_list("name", flat=True)),
+                "groups": sorted(user_roles(user)),
             }
         )
 
@@ -63,7 +64,7 @@ class MeView(APIView):
                 {
                     "username": user.username,
                     "is_staff": user.is_staff,
-                    "groups": list(user.groups.values_list("name", flat=True)),
+                    "groups": sorted(user_roles(user)),
                 }
             )
         return Response({"authenticated": False})
@@ -0,0 +1,119 @@
+"""
+Änderungs-Feed für die SPA und Offline-Clients: ``GET /api/<ressource>/changes/?token=...``.
+
+Liefert die seit dem Sync-Token angelegten/geänderten Datensätze (über den Index auf
+``(updated_at, id)``) und die IDs gelöschter Datensätze (``Tombstone``). Ohne Token beginnt
+ein vollständiger Abgleich. Die Antwort enthält ein neues, opakes Token; solange ``has_more``
+gesetzt ist, sofort mit diesem Token weiterblättern.
+
+Änderungen der letzten ``SYNC_LAG_SECONDS`` werden erst beim nächsten Abruf ausgeliefert, damit
+Transaktionen, die beim Abruf noch offen waren (älteres ``updated_at``, später sichtbar), nicht
+übersprungen werden. Tombstones werden nach ``SYNC_TOMBSTONE_DAYS`` gelöscht; ältere Tokens
+erhalten 410 und müssen neu abgleichen.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from main.models import Booking, DamageReport, Invoice, Tombstone, Vehicle
+
+# Modelle mit Änderungs-Feed; Löschungen werden in ``api.signals`` als Tombstone erfasst
+SYNCED_MODELS = (Booking, DamageReport, Invoice, Vehicle)
+TOKEN_SALT = "api.changes"
+
+
+def resource_name(model):
+    return model._meta.label_lower
+
+
+def make_token(resource, since, after_id=None):
+    return signing.dumps({"r": resource, "t": since.isoformat(), "i": after_id}, salt=TOKEN_SALT, compress=True)
+
+
+def read_token(token, resource):
+    """``(since, after_id)`` aus dem Token; ``ValueError`` bei ungültigem Token oder fremder Ressource."""
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT)
+    except signing.BadSignature:
+        raise ValueError("Ungültiges Sync-Token.")
+    since = parse_datetime(data.get("t") or "")
+    if data.get("r") != resource or since is None:
+        raise ValueError("Ungültiges Sync-Token.")
+    return since, data.get("i")
+
+
+def prune_tombstones(days=None):
+    days = settings.SYNC_TOMBSTONE_DAYS if days is None else days
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=timezone.now() - timedelta(days=days)).delete()
+    return deleted
+
+
+class ChangeFeedMixin:
+    """
+    ViewSet-Mixin: ``changes``-Action mit Serializer, Berechtigungen und Feldauswahl des ViewSets
+    (``?fields=``, ``?view=compact`` wie bei der Liste).
+    """
+
+    @action(detail=False, methods=["get"])
+    def changes(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        resource = resource_name(queryset.model)
+        token = request.query_params.get("token")
+        since, after_id = None, None
+        if token:
+            try:
+                since, after_id = read_token(token, resource)
+            except ValueError as exc:
+                return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            if since < timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_DAYS):
+                return Response(
+                    {"detail": "Sync-Token abgelaufen, bitte vollständig neu abgleichen."},
+                    status=status.HTTP_410_GONE,
+                )
+
+        cutoff = timezone.now() - timedelta(seconds=settings.SYNC_LAG_SECONDS)
+        try:
+            limit = max(1, min(int(request.query_params.get("limit") or settings.SYNC_PAGE_SIZE), settings.SYNC_PAGE_SIZE))
+        except ValueError:
+            limit = settings.SYNC_PAGE_SIZE
+
+        changed = queryset.filter(updated_at__lte=cutoff)
+        if since is not None:
+            after = Q(updated_at__gt=since)
+            if after_id is not None:
+                after |= Q(updated_at=since, pk__gt=after_id)
+            changed = changed.filter(after)
+        rows = list(changed.order_by("updated_at", "pk")[: limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        if has_more:
+            upper = rows[-1].updated_at
+            next_token = make_token(resource, upper, rows[-1].pk)
+        else:
+            upper = cutoff
+            next_token = make_token(resource, cutoff)
+
+        deleted = []
+        if since is not None:
+            deleted = list(
+                Tombstone.objects.filter(resource=resource, deleted_at__gt=since, deleted_at__lte=upper)
+                .order_by("deleted_at")
+                .values_list("object_id", flat=True)
+            )
+
+        return Response(
+            {
+                "results": self.get_serializer(rows, many=True).data,
+                "deleted": deleted,
+                "token": next_token,
+                "has_more": has_more,
+            }
+        )
@@ -0,0 +1,72 @@
+"""
+Bedingte GETs (ETag/Last-Modified) für selten geänderte API-Ressourcen.
+
+Der Fingerabdruck einer Tabelle ist ``Max(updated_at)`` und ``Count`` (eine Aggregat-Query,
+erkennt auch Löschungen). Das ETag bildet ihn zusammen mit Pfad, Query-String, Host und
+``Accept`` ab; stimmt es mit ``If-None-Match`` überein, antwortet die View mit 304, bevor
+Queryset und Serializer laufen. Bei signierten Medien-URLs (S3) wechselt das ETag zusätzlich
+mit jedem Signatur-Zeitfenster, damit Clients keine abgelaufenen Bild-URLs behalten.
+"""
+import hashlib
+import time
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from config.db_router import read_from_replica
+from main.utils.media import signature_ttl
+
+
+def table_fingerprint(model):
+    return model.objects.order_by().aggregate(latest=Max("updated_at"), count=Count("pk"))
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest())
+
+
+class ConditionalGetMixin:
+    """
+    ViewSet-Mixin: ``list``/``retrieve`` mit ETag/Last-Modified aus dem Tabellen-Fingerabdruck.
+    Clients revalidieren bei jedem Aufruf (``Cache-Control: no-cache``), laden aber nur bei
+    Änderungen neu.
+    """
+
+    def conditional_validators(self, request):
+        model = self.get_queryset().model
+        fingerprint = table_fingerprint(model)
+        ttl = signature_ttl()
+        window = int(time.time() // ttl) if ttl else 0
+        etag = make_etag(
+            model._meta.label_lower,
+            fingerprint["latest"].isoformat() if fingerprint["latest"] else "",
+            fingerprint["count"],
+            window,
+            request.get_host(),
+            request.get_full_path(),
+            request.META.get("HTTP_ACCEPT", ""),
+        )
+        last_modified = int(fingerprint["latest"].timestamp()) if fingerprint["latest"] else None
+        return etag, last_modified
+
+    def _conditional(self, request, handler, *args, **kwargs):
+        etag, last_modified = self.conditional_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified)
+            patch_cache_control(response, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        # Validatoren und Liste aus derselben Quelle: mit ``ReplicaListMixin`` käme die Liste sonst von
+        # der (evtl. verzögerten) Replica, das ETag von der Primary – der alte Stand bliebe gecacht
+        with read_from_replica():
+            return self._conditional(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(request, super().retrieve, *args, **kwargs)
@@ -0,0 +1,70 @@
+import io
+from uuid import uuid4
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from rest_framework import status, views
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.response import Response
+
+from adminportal.utils.audit import log_audit
+from adminportal.utils.bulk_import import FORMATS, IMPORTERS, detect_format, run_import, write_error_report
+from config.metrics import track
+from main.utils.media import signed_urls
+from .permissions import AdminOrReadOnly
+
+MAX_ERRORS_IN_RESPONSE = 100
+
+
+class BulkImportView(views.APIView):
+    """
+    Massenimport (``vehicles``, ``customers``, ``bookings``).
+    POST multipart: { file: <csv|json|jsonl>, format?, update?, dry_run? }
+
+    Antwort: Zusammenfassung, die ersten Fehler und – falls vorhanden – ein signierter Link
+    auf den vollständigen Fehlerbericht (CSV). Sehr grosse Dateien besser per ``manage.py bulk_import``.
+    """
+
+    parser_classes = [MultiPartParser, FormParser]
+    permission_classes = [AdminOrReadOnly]
+
+    def post(self, request, kind):
+        if kind not in IMPORTERS:
+            return Response({"detail": f"Unbekannter Importtyp: {kind}"}, status=status.HTTP_404_NOT_FOUND)
+        upload = request.FILES.get("file")
+        if not upload:
+            return Response({"detail": "Keine Datei übermittelt."}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.data.get("format") or detect_format(upload.name)
+        if fmt not in FORMATS:
+            return Response({"detail": f"format muss {', '.join(FORMATS)} sein."}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            result = run_import(
+                kind,
+                upload,
+                fmt=fmt,
+                update=_flag(request.data.get("update")),
+                dry_run=_flag(request.data.get("dry_run")),
+            )
+        except ValueError as exc:
+            return Response({"detail": f"Datei nicht lesbar: {exc}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = result.summary()
+        data["errors"] = result.errors[:MAX_ERRORS_IN_RESPONSE]
+        data["error_report"] = _store_error_report(kind, result.errors) if result.errors else None
+        log_audit("bulk_import", request=request, actor=request.user, metadata={**result.summary(), "file": upload.name})
+        return Response(data)
+
+
+def _flag(value):
+    return str(value or "").lower() in ("1", "true", "yes", "on")
+
+
+def _store_error_report(kind, errors):
+    buffer = io.StringIO()
+    write_error_report(errors, buffer)
+    name = f"imports/errors/{timezone.now():%Y/%m}/{uuid4().hex}_{kind}.csv"
+    with track("storage"):
+        key = default_storage.save(name, ContentFile(buffer.getvalue().encode("utf-8")))
+    return signed_urls([key]).get(key, "")
@@ -1,36 +1,57 @@
+import json
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control
 from rest_framework import permissions, views
 from rest_framework.response import Response
 
+from .conditional import make_etag
 from .pricing import EXTRA_PRICES, KM_PACKAGE_PRICES, INSURANCE_PRICES
 
 
+def meta_options():
+    return {
+        "extras": EXTRA_PRICES,
+        "km_packages": {
+            "prices": KM_PACKAGE_PRICES,
+            "descriptions": {
+                "100km": "100 km inklusive",
+                "200km": "200 km inklusive",
+                "unlimited": "Unbegrenzt Kilometer",
+            },
+        },
+        "insurance": {
+            "prices": INSURANCE_PRICES,
+            "descriptions": {
+                "basic": "Basis-Versicherung (SB 1000)",
+                "full": "Vollkasko (SB 500)",
+                "premium": "Premium (SB 0, Glas/Unterboden inkl.)",
+            },
+        },
+        "roles": ["admin", "manager", "employee"],
+    }
+
+
+@lru_cache(maxsize=1)
+def meta_options_version():
+    # Die Optionen ändern sich nur mit einem Deploy – einmal pro Prozess berechnen
+    return make_etag(json.dumps(meta_options(), sort_keys=True, default=str))
+
+
 class MetaOptionsView(views.APIView):
     """
     Liefert Konstanten für das Frontend (Extras, km-Pakete, Versicherungen).
+    Lange cachebar (``META_OPTIONS_MAX_AGE``), danach genügt meist ein 304.
     """
 
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
-        return Response(
-            {
-                "extras": EXTRA_PRICES,
-                "km_packages": {
-                    "prices": KM_PACKAGE_PRICES,
-                    "descriptions": {
-                        "100km": "100 km inklusive",
-                        "200km": "200 km inklusive",
-                        "unlimited": "Unbegrenzt Kilometer",
-                    },
-                },
-                "insurance": {
-                    "prices": INSURANCE_PRICES,
-                    "descriptions": {
-                        "basic": "Basis-Versicherung (SB 1000)",
-                        "full": "Vollkasko (SB 500)",
-                        "premium": "Premium (SB 0, Glas/Unterboden inkl.)",
-                    },
-                },
-                "roles": ["admin", "manager", "employee"],
-            }
-        )
+        etag = make_etag(meta_options_version(), request.META.get("HTTP_ACCEPT", ""))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(meta_options())
+        response["ETag"] = etag
+        patch_cache_control(response, public=True, max_age=settings.META_OPTIONS_MAX_AGE)
+        return response
@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from main.utils.roles import has_any_role, is_staff_member
+
 
 class AdminOrReadOnly(permissions.BasePermission):
     """Allow safe methods to everyone, write operations only to staff."""
@@ -10,10 +12,7 @@ class AdminOrReadOnly(permissions.BasePermission):
         return bool(
             request.user
             and request.user.is_authenticated
-            and (
-                request.user.is_staff
-                or request.user.groups.filter(name__in=["admin", "manager"]).exists()
-            )
+            and (request.user.is_staff or has_any_role(request.user, ["admin", "manager"]))
         )
 
 
@@ -26,25 +25,11 @@ class StaffOrPostOnly(permissions.BasePermission):
     def has_permission(self, request, view):
         if request.method == "POST":
             return True
-        return bool(
-            request.user
-            and request.user.is_authenticated
-            and (
-                request.user.is_staff
-                or request.user.groups.filter(name__in=["admin", "manager", "employee"]).exists()
-            )
-        )
+        return is_staff_member(request.user)
 
 
 class StaffOnly(permissions.BasePermission):
     """Allow access to staff or users in admin/manager/employee groups."""
 
     def has_permission(self, request, view):
-        return bool(
-            request.user
-            and request.user.is_authenticated
-            and (
-                request.user.is_staff
-                or request.user.groups.filter(name__in=["admin", "manager", "employee"]).exists()
-            )
-        )
+        return is_staff_member(request.user)
@@ -0,0 +1,23 @@
+"""
+JSON-Renderer der REST-API.
+
+Ist ``orjson`` installiert, wird damit serialisiert (deutlich schneller bei grossen Listen);
+Typen, die orjson nicht kennt, übernimmt der Encoder von DRF. Ohne orjson – oder wenn der Client
+eingerückte Ausgabe anfordert – gilt das Verhalten des Standard-``JSONRenderer``.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:  # optional
+    import orjson
+except ImportError:  # pragma: no cover - abhängig von der Installation
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Datums-/Zeitwerte wie DRF formatieren, nicht im orjson-eigenen Format
+        option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        return orjson.dumps(data, default=JSONEncoder().default, option=option)
@@ -1,7 +1,9 @@
 from decimal import Decimal, ROUND_HALF_UP
 
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
+from rest_framework.settings import api_settings
 
 from main.models import (
     Booking,
@@ -20,11 +22,15 @@ from .validators import (
     validate_required_booking_fields,
     validate_booking_conflict,
     validate_booking_range_conflict,
+    booking_overlap_guard,
 )
 from .pricing import calculate_total_price
+from .sparse import SparseFieldsMixin
+from adminportal.utils.invoice_lines import api_lines
+from main.utils.media import attach_photo_urls, document_links, signed_urls, storage_key
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = [
@@ -54,10 +60,25 @@ class DamagePhotoSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "uploaded_at", "file_url"]
 
     def get_file_url(self, obj):
-        return getattr(obj, "public_url", None) or obj.file_url or (obj.image.url if obj.image else None)
+        return obj.public_url or None
 
 
-class DamageReportSerializer(serializers.ModelSerializer):
+class SignedMediaListSerializer(serializers.ListSerializer):
+    """Signiert Foto- und Dokument-URLs aller Schadenmeldungen einer Liste in einem Durchgang."""
+
+    def to_representation(self, data):
+        items = list(data.all() if hasattr(data, "all") else data)
+        fields = self.child.fields
+        if "photos" in fields:
+            attach_photo_urls(photo for item in items for photo in item.photos.all())
+        if "documents" in fields:
+            self.child.context["document_urls"] = signed_urls(
+                storage_key(doc) for item in items for doc in item.documents or []
+            )
+        return super().to_representation(items)
+
+
+class DamageReportSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     photos = DamagePhotoSerializer(many=True, read_only=True)
     customer = CustomerSerializer(read_only=True)
     customer_id = serializers.PrimaryKeyRelatedField(
@@ -108,6 +129,15 @@ class DamageReportSerializer(serializers.ModelSerializer):
             "photos",
         ]
         read_only_fields = ["id", "admin_notes", "created_at", "photos"]
+        list_serializer_class = SignedMediaListSerializer
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Gespeichert werden Storage-Keys, ausgeliefert signierte URLs
+        if "documents" in data:
+            urls = self.context.get("document_urls")
+            data["documents"] = [link["url"] for link in document_links(instance.documents, urls=urls)]
+        return data
 
     def validate(self, attrs):
         # Minimal required fields for public submission
@@ -133,7 +163,38 @@ class DamageReportSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class VehicleSerializer(serializers.ModelSerializer):
+class DamageReportCompactSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Listenansicht: Stammdaten und Status, Fotos/Kunde nur per ``?expand=photos,customer``."""
+
+    expandable_fields = {
+        "photos": ("photos", lambda: DamagePhotoSerializer(many=True, read_only=True)),
+        "customer": ("customer_detail", lambda: CustomerSerializer(source="customer", read_only=True)),
+    }
+
+    class Meta:
+        model = DamageReport
+        fields = [
+            "id",
+            "customer",
+            "first_name",
+            "last_name",
+            "company_name",
+            "email",
+            "phone",
+            "car_brand",
+            "car_model",
+            "plate",
+            "damage_type",
+            "accident_date",
+            "insurer",
+            "status",
+            "created_at",
+        ]
+        read_only_fields = fields
+        list_serializer_class = SignedMediaListSerializer
+
+
+class VehicleSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Vehicle
         fields = [
@@ -157,7 +218,9 @@ class VehicleSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "photo"]
 
 
-class TransporterSerializer(serializers.ModelSerializer):
+class TransporterSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    image = serializers.ImageField(source="bild", read_only=True)
+
     class Meta:
         model = Transporter
         fields = [
@@ -174,7 +237,7 @@ class TransporterSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "image"]
 
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     transporter_detail = TransporterSerializer(source="transporter", read_only=True)
     vehicle_detail = VehicleSerializer(source="vehicle", read_only=True)
     customer_detail = CustomerSerializer(source="customer", read_only=True)
@@ -266,7 +329,7 @@ class BookingSerializer(serializers.ModelSerializer):
             extras=validated_data.get("extras"),
         )
         validated_data["total_price"] = total_price
-        return super().create(validated_data)
+        return self._save_guarded(super().create, validated_data)
 
     def update(self, instance, validated_data):
         total_price = calculate_total_price(
@@ -278,10 +341,71 @@ class BookingSerializer(serializers.ModelSerializer):
             extras=validated_data.get("extras", instance.extras),
         )
         validated_data["total_price"] = total_price
-        return super().update(instance, validated_data)
+        return self._save_guarded(super().update, instance, validated_data)
+
+    def _save_guarded(self, save, *args):
+        # Verlorenes Rennen gegen eine parallele Buchung → gleiche Antwort wie die Prüfung in validate()
+        try:
+            with booking_overlap_guard():
+                return save(*args)
+        except DjangoValidationError as exc:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: exc.messages})
 
 
-class InvoiceSerializer(serializers.ModelSerializer):
+class BookingCompactSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Listenansicht ohne verschachtelte Objekte; Details per ``?expand=transporter,vehicle,customer``."""
+
+    expandable_fields = {
+        "transporter": ("transporter_detail", lambda: TransporterSerializer(source="transporter", read_only=True)),
+        "vehicle": ("vehicle_detail", lambda: VehicleSerializer(source="vehicle", read_only=True)),
+        "customer": ("customer_detail", lambda: CustomerSerializer(source="customer", read_only=True)),
+    }
+
+    class Meta:
+        model = Booking
+        fields = [
+            "id",
+            "transporter",
+            "vehicle",
+            "customer",
+            "date",
+            "time_slot",
+            "pickup_date",
+            "return_date",
+            "customer_name",
+            "customer_email",
+            "status",
+            "payment_status",
+            "total_price",
+            "created_at",
+        ]
+        read_only_fields = fields
+
+
+class InvoiceCompactSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Listenansicht ohne Positionen; Kunde per ``?expand=customer``."""
+
+    expandable_fields = {
+        "customer": ("customer_detail", lambda: CustomerSerializer(source="customer", read_only=True)),
+    }
+
+    class Meta:
+        model = Invoice
+        fields = [
+            "id",
+            "invoice_number",
+            "customer",
+            "invoice_date",
+            "due_date",
+            "total_amount",
+            "status",
+            "payment_date",
+            "type",
+        ]
+        read_only_fields = fields
+
+
+class InvoiceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     customer_detail = CustomerSerializer(source="customer", read_only=True)
 
     def _to_decimal(self, value, field_name):
@@ -292,8 +416,6 @@ class InvoiceSerializer(serializers.ModelSerializer):
 
     def _normalize_items(self, items):
         normalized = []
-        subtotal = Decimal("0.00")
-        vat_amount = Decimal("0.00")
         for item in items or []:
             quantity = self._to_decimal(item.get("quantity", 0), "items.quantity")
             unit_price = self._to_decimal(item.get("unitPrice", item.get("unit_price", 0)), "items.unitPrice")
@@ -303,9 +425,6 @@ class InvoiceSerializer(serializers.ModelSerializer):
             if quantity < 0 or unit_price < 0 or vat_rate < 0 or line_total < 0:
                 raise ValidationError("Rechnungspositionen dürfen keine negativen Werte enthalten.")
 
-            subtotal += line_total
-            vat_amount += (line_total * vat_rate / Decimal("100"))
-
             normalized.append(
                 {
                     **item,
@@ -316,8 +435,8 @@ class InvoiceSerializer(serializers.ModelSerializer):
                 }
             )
 
-        subtotal = subtotal.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
-        vat_amount = vat_amount.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+        # Gleiche Rechnung wie die gespeicherten Positionen (``InvoiceLineItem``)
+        subtotal, vat_amount, _ = api_lines(normalized)[1]
         return normalized, subtotal, vat_amount
 
     def _apply_totals(self, attrs):
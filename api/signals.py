@@ -1,7 +1,10 @@
 from django.contrib.auth.models import Group
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_delete, post_migrate
 from django.dispatch import receiver
 
+from main.models import Tombstone
+from .changes import SYNCED_MODELS, resource_name
+
 
 @receiver(post_migrate)
 def ensure_default_groups(sender, **kwargs):
@@ -9,3 +12,11 @@ def ensure_default_groups(sender, **kwargs):
         return
     for name in ["admin", "manager", "employee"]:
         Group.objects.get_or_create(name=name)
+
+
+def record_tombstone(sender, instance, **kwargs):
+    Tombstone.objects.create(resource=resource_name(sender), object_id=instance.pk)
+
+
+for _model in SYNCED_MODELS:
+    post_delete.connect(record_tombstone, sender=_model, dispatch_uid=f"tombstone-{resource_name(_model)}")
@@ -0,0 +1,116 @@
+"""
+Sparse Fieldsets für die REST-API.
+
+- ``?fields=id,status`` liefert nur die genannten Felder (oberste Ebene).
+- ``?expand=transporter,customer`` ergänzt erweiterbare, verschachtelte Felder (``expandable_fields``).
+- ``?view=compact`` nutzt in Listen den schlanken ``list_serializer_class`` des ViewSets.
+
+``select_related``/``prefetch_related`` werden aus den tatsächlich ausgegebenen Feldern abgeleitet
+(``related_lookups`` am ViewSet), damit weder Joins für nicht ausgegebene Felder noch N+1 entstehen.
+"""
+from rest_framework import serializers
+
+
+def _split(value):
+    return [part.strip() for part in (value or "").split(",") if part.strip()]
+
+
+class FieldSelection:
+    def __init__(self, fields=None, expand=None):
+        self.fields = set(fields or [])
+        self.expand = set(expand or [])
+
+    @classmethod
+    def from_request(cls, request):
+        params = request.query_params if request is not None else {}
+        return cls(_split(params.get("fields")), _split(params.get("expand")))
+
+    def __bool__(self):
+        return bool(self.fields or self.expand)
+
+
+class SparseFieldsMixin:
+    """
+    Serializer-Mixin: wertet die ``FieldSelection`` aus dem Kontext aus, aber nur auf oberster
+    Ebene (bzw. für die Elemente einer Liste) – verschachtelte Serializer bleiben vollständig.
+    """
+
+    # expand-Name → (Feldname, Factory für das Feld)
+    expandable_fields = {}
+
+    def _is_root(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.context.get("field_selection")
+        if not selection or not self._is_root():
+            return fields
+        expanded = set()
+        for name in selection.expand:
+            if name in self.expandable_fields:
+                field_name, factory = self.expandable_fields[name]
+                fields.setdefault(field_name, factory())
+                expanded.add(field_name)
+        if selection.fields:
+            keep = selection.fields | expanded
+            # Schreibfelder bleiben erhalten, sonst würde ?fields= Validierung/Speichern verändern
+            fields = {name: field for name, field in fields.items() if name in keep or field.write_only}
+        return fields
+
+
+def rendered_fields(serializer_class, selection):
+    """
+    Namen der Felder, die ``serializer_class`` bei dieser Auswahl ausgibt und die das verknüpfte
+    Objekt laden (Primärschlüssel-Felder wie ``customer`` im kompakten Serializer brauchen keinen Join).
+    """
+    serializer = serializer_class(context={"field_selection": selection})
+    return {
+        name
+        for name, field in serializer.fields.items()
+        if not field.write_only and not isinstance(field, serializers.PrimaryKeyRelatedField)
+    }
+
+
+class SparseFieldsViewSetMixin:
+    """
+    ViewSet-Mixin: Feldauswahl im Serializer-Kontext, kompakte Listen-Serializer und
+    automatisches ``select_related``/``prefetch_related`` für die ausgegebenen Felder.
+    """
+
+    list_serializer_class = None
+    # Ausgabefeld → ("select" | "prefetch", Lookup)
+    related_lookups = {}
+
+    def get_field_selection(self):
+        if not hasattr(self, "_field_selection"):
+            self._field_selection = FieldSelection.from_request(getattr(self, "request", None))
+        return self._field_selection
+
+    def get_serializer_class(self):
+        if (
+            self.action in ("list", "changes")
+            and self.list_serializer_class is not None
+            and self.request.query_params.get("view") == "compact"
+        ):
+            return self.list_serializer_class
+        return super().get_serializer_class()
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["field_selection"] = self.get_field_selection()
+        return context
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.related_lookups:
+            return queryset
+        fields = rendered_fields(self.get_serializer_class(), self.get_field_selection())
+        select = [lookup for name, (kind, lookup) in self.related_lookups.items() if kind == "select" and name in fields]
+        prefetch = [lookup for name, (kind, lookup) in self.related_lookups.items() if kind == "prefetch" and name in fields]
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
@@ -0,0 +1,87 @@
+from datetime import timedelta
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from adminportal.utils.fleet_stats import utilization_by_transporter, utilization_series
+from adminportal.utils.vat_report import BASES, quarter_of, vat_report
+from config.db_router import read_from_replica
+from .permissions import StaffOnly
+
+MAX_RANGE_DAYS = 731
+
+
+class UtilizationStatsView(APIView):
+    """
+    Auslastung und Umsatz aus der Tagesauslastung (``TransporterDailyStats``).
+
+    ``?start=&end=`` (Default: aktueller Monat), ``group=day|month|transporter``, optional ``transporter=<id>``.
+    """
+
+    permission_classes = [StaffOnly]
+
+    @staticmethod
+    def _date(params, name, default):
+        """Datum aus dem Query-String; falsches Format und unmögliche Daten (2026-13-40) → ``ValueError``."""
+        raw = params.get(name)
+        if not raw:
+            return default
+        value = parse_date(raw)
+        if value is None:
+            raise ValueError(raw)
+        return value
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            start = self._date(params, "start", timezone.localdate().replace(day=1))
+            end = self._date(params, "end", None)
+            transporter_id = int(params["transporter"]) if params.get("transporter") else None
+        except ValueError:
+            return Response(
+                {"detail": "start/end müssen Daten (JJJJ-MM-TT) sein, transporter eine Zahl"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if end is None:
+            end = (start.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+        group = params.get("group") or "day"
+        if end < start or (end - start).days > MAX_RANGE_DAYS:
+            return Response({"detail": f"Ungültiger Zeitraum (max. {MAX_RANGE_DAYS} Tage)"}, status=status.HTTP_400_BAD_REQUEST)
+        if group not in ("day", "month", "transporter"):
+            return Response({"detail": "group muss day, month oder transporter sein"}, status=status.HTTP_400_BAD_REQUEST)
+
+        with read_from_replica():
+            if group == "transporter":
+                results = utilization_by_transporter(start, end)
+            else:
+                results = utilization_series(start, end, group=group, transporter_id=transporter_id)
+        return Response({"start": start, "end": end, "group": group, "results": results})
+
+
+class VatReportView(APIView):
+    """
+    Quartalsbericht MwSt/Umsatz aus den Rechnungspositionen.
+
+    ``?year=&quarter=`` (Default: aktuelles Quartal), ``basis=invoiced|paid``.
+    """
+
+    permission_classes = [StaffOnly]
+
+    def get(self, request):
+        year, quarter = quarter_of(timezone.localdate())
+        try:
+            year = int(request.query_params.get("year") or year)
+            quarter = int(request.query_params.get("quarter") or quarter)
+        except ValueError:
+            return Response({"detail": "year und quarter müssen Zahlen sein"}, status=status.HTTP_400_BAD_REQUEST)
+        basis = request.query_params.get("basis") or "invoiced"
+        if not 1 <= quarter <= 4:
+            return Response({"detail": "quarter muss zwischen 1 und 4 liegen"}, status=status.HTTP_400_BAD_REQUEST)
+        if basis not in BASES:
+            return Response({"detail": "basis muss invoiced oder paid sein"}, status=status.HTTP_400_BAD_REQUEST)
+
+        with read_from_replica():
+            return Response(vat_report(year, quarter, basis))
@@ -1,12 +1,48 @@
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from adminportal.utils.audit import log_audit_batch
+from adminportal.utils.live import publish_on_commit
+from main.utils.roles import is_staff_member
+
+BULK_MAX_IDS = 500
+
+
+def _forbidden():
+    return Response({"detail": "Nur Mitarbeiter dürfen Status ändern."}, status=status.HTTP_403_FORBIDDEN)
+
+
+def _parse_ids(raw):
+    if not isinstance(raw, list) or not raw:
+        return None
+    ids = []
+    for value in raw:
+        try:
+            ids.append(int(value))
+        except (TypeError, ValueError):
+            return None
+    return list(dict.fromkeys(ids))
+
+
+def _auto_now_fields(model):
+    # ``save(update_fields=...)`` und ``update()`` setzen auto_now-Felder nicht von selbst
+    return [field.name for field in model._meta.concrete_fields if getattr(field, "auto_now", False)]
+
 
 def add_status_actions(field_name="status", transitions=None):
     """
     Decorator: adds action endpoints for status transitions.
     Usage: @add_status_actions(field_name="status", transitions={...})
+
+    Pro Zielstatus entstehen ``POST <pk>/<status>/`` und ``POST bulk-<status>/`` mit ``{"ids": [...]}``.
+    Die Bulk-Variante prüft alle IDs mit einer Abfrage, ändert per UPDATE (ohne save()/Signals)
+    und schreibt die Audit-Einträge gesammelt; die Antwort enthält ein Ergebnis pro ID.
+    Hängen abgeleitete Daten an Signals, definiert das ViewSet
+    ``bulk_status_changing(queryset, target_status)``: wird vor dem UPDATE mit den betroffenen
+    Objekten aufgerufen und führt diese Daten nach.
     """
     transitions = transitions or {}
 
@@ -14,26 +50,78 @@ def add_status_actions(field_name="status", transitions=None):
         for new_status, allowed_from in transitions.items():
             def make_action(target_status, allowed):
                 def _action(self, request, pk=None):
-                    if not request.user or not (
-                        request.user.is_staff
-                        or request.user.groups.filter(name__in=["admin", "manager", "employee"]).exists()
-                    ):
-                        return Response({"detail": "Nur Mitarbeiter dürfen Status ändern."},
-                                        status=status.HTTP_403_FORBIDDEN)
+                    if not is_staff_member(request.user):
+                        return _forbidden()
                     obj = self.get_object()
                     current = getattr(obj, field_name)
                     if allowed and current not in allowed:
                         return Response({"detail": f"Statuswechsel von {current} nach {target_status} nicht erlaubt."},
                                         status=status.HTTP_400_BAD_REQUEST)
                     setattr(obj, field_name, target_status)
-                    obj.save(update_fields=[field_name])
+                    obj.save(update_fields=[field_name, *_auto_now_fields(type(obj))])
                     serializer = self.get_serializer(obj)
                     return Response(serializer.data)
                 _action.__name__ = target_status  # unique per loop
                 return action(detail=True, methods=["post"], url_path=target_status, url_name=target_status)(_action)
 
-            action_fn = make_action(new_status, allowed_from)
-            setattr(viewset_cls, new_status, action_fn)
+            def make_bulk_action(target_status, allowed):
+                def _bulk_action(self, request):
+                    if not is_staff_member(request.user):
+                        return _forbidden()
+                    ids = _parse_ids(request.data.get("ids"))
+                    if ids is None:
+                        return Response({"detail": "ids muss eine Liste von IDs sein."}, status=status.HTTP_400_BAD_REQUEST)
+                    if len(ids) > BULK_MAX_IDS:
+                        return Response({"detail": f"Maximal {BULK_MAX_IDS} IDs pro Anfrage erlaubt."},
+                                        status=status.HTTP_400_BAD_REQUEST)
+
+                    queryset = self.filter_queryset(self.get_queryset()).order_by()
+                    model = queryset.model
+                    changes = {field_name: target_status}
+                    changes.update({name: timezone.now() for name in _auto_now_fields(model)})
+                    results = {}
+                    with transaction.atomic():
+                        current = dict(
+                            queryset.select_for_update().filter(pk__in=ids).values_list("pk", field_name)
+                        )
+                        eligible = []
+                        for pk in ids:
+                            if pk not in current:
+                                results[pk] = {"id": pk, "ok": False, "detail": "Nicht gefunden."}
+                            elif allowed and current[pk] not in allowed:
+                                results[pk] = {
+                                    "id": pk,
+                                    "ok": False,
+                                    "detail": f"Statuswechsel von {current[pk]} nach {target_status} nicht erlaubt.",
+                                }
+                            else:
+                                eligible.append(pk)
+                                results[pk] = {"id": pk, "ok": True, "from": current[pk], field_name: target_status}
+                        if eligible:
+                            changing = getattr(self, "bulk_status_changing", None)
+                            if changing:
+                                changing(model._default_manager.filter(pk__in=eligible), target_status)
+                            model._default_manager.filter(pk__in=eligible).update(**changes)
+                            # UPDATE ohne Signals → Live-Update fürs Portal selbst auslösen
+                            publish_on_commit(model._meta.model_name, ids=eligible, status=target_status)
+                            log_audit_batch(
+                                f"{model._meta.model_name}_status_{target_status}",
+                                [{"id": pk, "from": current[pk], "to": target_status, "bulk": True} for pk in eligible],
+                                request=request,
+                                actor=request.user,
+                            )
+                    return Response({"updated": len(eligible), "results": [results[pk] for pk in ids]})
+
+                _bulk_action.__name__ = f"bulk_{target_status}"
+                return action(
+                    detail=False,
+                    methods=["post"],
+                    url_path=f"bulk-{target_status}",
+                    url_name=f"bulk-{target_status}",
+                )(_bulk_action)
+
+            setattr(viewset_cls, new_status, make_action(new_status, allowed_from))
+            setattr(viewset_cls, f"bulk_{new_status}", make_bulk_action(new_status, allowed_from))
         return viewset_cls
 
     return decorator
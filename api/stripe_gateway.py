@@ -0,0 +1,178 @@
+"""
+Stripe-Anbindung für den Checkout: ein PaymentIntent pro Buchung.
+
+``payment_intent_for`` verwendet den an der Buchung gespeicherten Intent weiter, solange Betrag
+und Währung gleich sind und er noch bezahlt werden kann; bei geändertem Betrag wird er angepasst
+statt ein neuer angelegt. Nur ein bei Stripe unbekannter oder abgebrochener Intent wird ersetzt; wird er gerade
+bezahlt oder ist er bezahlt, gibt es keinen zweiten (``PaymentInProgress``). Neue Intents werden mit einem Idempotency-Key erzeugt, der Buchung,
+Betrag, Währung und den bisherigen Intent enthält – ein Doppelklick oder ein wiederholter Request
+liefert so denselben Intent. Der Zustand (inkl. ``client_secret``) liegt nur kurz im Cache
+(``STRIPE_INTENT_CACHE_SECONDS``) und wird bei jedem ``payment_intent.*``-Webhook verworfen
+(``forget_intent``); in der DB stehen ID, Betrag und Währung.
+
+Mit ``STRIPE_BACKEND=fake`` ersetzt ``FakeStripe`` die Stripe-API im Prozess (Tests, Lasttests,
+Entwicklung ohne Netz). Nie in Produktion verwenden.
+
+Alle Funktionen hier machen Netzwerkaufrufe und keine DB-Zugriffe: aus async Views über
+``main.utils.aio.run_io`` aufrufen und die Buchung danach speichern.
+"""
+import threading
+from uuid import uuid4
+
+import stripe
+from django.conf import settings
+from django.core.cache import cache
+
+stripe.api_key = settings.STRIPE_SECRET_KEY
+
+# In diesen Zuständen kann der Kunde den Intent noch bezahlen bzw. der Betrag geändert werden
+REUSABLE_STATUSES = {"requires_payment_method", "requires_confirmation", "requires_action"}
+# Zahlung läuft oder ist erfolgt (Webhook evtl. noch ausstehend): kein neuer Intent, sonst doppelte Belastung
+PAID_STATUSES = {"processing", "requires_capture", "succeeded"}
+
+
+class PaymentInProgress(Exception):
+    """Der Intent der Buchung wird gerade bezahlt oder ist bezahlt."""
+
+    def __init__(self, status):
+        super().__init__(status)
+        self.status = status
+
+
+class FakePaymentIntents:
+    """Nachbildung von ``stripe.PaymentIntent`` (create/retrieve/modify) im Speicher."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._intents = {}
+        self._idempotency = {}
+        self.requests = 0
+
+    def _object(self, values):
+        return stripe.PaymentIntent.construct_from(dict(values), "sk_test_fake")
+
+    def create(self, idempotency_key=None, **params):
+        with self._lock:
+            self.requests += 1
+            if idempotency_key in self._idempotency:
+                previous_params, intent_id = self._idempotency[idempotency_key]
+                if previous_params != params:
+                    raise stripe.error.IdempotencyError("Keys for idempotent requests can only be used with the same parameters.")
+                return self._object(self._intents[intent_id])
+            intent_id = f"pi_fake_{uuid4().hex[:24]}"
+            self._intents[intent_id] = {
+                "id": intent_id,
+                "object": "payment_intent",
+                "amount": params["amount"],
+                "currency": params["currency"],
+                "status": "requires_payment_method",
+                "client_secret": f"{intent_id}_secret_{uuid4().hex[:24]}",
+                "metadata": dict(params.get("metadata") or {}),
+                "receipt_email": params.get("receipt_email"),
+            }
+            if idempotency_key:
+                self._idempotency[idempotency_key] = (params, intent_id)
+            return self._object(self._intents[intent_id])
+
+    def retrieve(self, intent_id):
+        with self._lock:
+            self.requests += 1
+            if intent_id not in self._intents:
+                raise stripe.error.InvalidRequestError(f"No such payment_intent: '{intent_id}'", "id")
+            return self._object(self._intents[intent_id])
+
+    def modify(self, intent_id, idempotency_key=None, **params):
+        with self._lock:
+            self.requests += 1
+            if idempotency_key in self._idempotency:
+                # Wie Stripe: gespeicherte Antwort, die Änderung wird nicht erneut ausgeführt
+                return self._object(self._idempotency[idempotency_key][1])
+            intent = self._intents.get(intent_id)
+            if intent is None:
+                raise stripe.error.InvalidRequestError(f"No such payment_intent: '{intent_id}'", "id")
+            if intent["status"] not in REUSABLE_STATUSES:
+                raise stripe.error.InvalidRequestError(f"PaymentIntent has status {intent['status']}.", "amount")
+            intent.update(params)
+            if idempotency_key:
+                self._idempotency[idempotency_key] = (params, dict(intent))
+            return self._object(intent)
+
+    def set_status(self, intent_id, status):
+        """Nur Fake: Zustand setzen, z. B. ``succeeded`` nach einer simulierten Zahlung."""
+        with self._lock:
+            self._intents[intent_id]["status"] = status
+
+
+class FakeStripe:
+    def __init__(self):
+        self.PaymentIntent = FakePaymentIntents()
+
+
+fake_stripe = FakeStripe()
+
+
+def stripe_backend():
+    return fake_stripe if settings.STRIPE_BACKEND == "fake" else stripe
+
+
+def _cache_key(intent_id):
+    return f"stripe-intent:{intent_id}"
+
+
+def _state(intent):
+    state = {
+        "id": intent.id,
+        "client_secret": intent.client_secret,
+        "status": intent.status,
+        "amount": intent.amount,
+        "currency": intent.currency,
+    }
+    cache.set(_cache_key(intent.id), state, settings.STRIPE_INTENT_CACHE_SECONDS)
+    return state
+
+
+def forget_intent(intent_id):
+    """Verwirft den gecachten Zustand, z. B. wenn Stripe per Webhook eine Änderung meldet."""
+    cache.delete(_cache_key(intent_id))
+
+
+def payment_intent_for(booking, amount, currency="chf"):
+    """
+    Zustand des zu verwendenden PaymentIntents (``id``, ``client_secret``, ``status``, ``amount``,
+    ``currency``). Der Aufrufer speichert ``id``/``amount``/``currency`` an der Buchung.
+    Wirft ``PaymentInProgress``, wenn der bisherige Intent in ``PAID_STATUSES`` ist.
+    """
+    backend = stripe_backend()
+    previous = booking.payment_intent_id
+    if previous:
+        state = cache.get(_cache_key(previous))
+        if state and state["status"] in REUSABLE_STATUSES and (state["amount"], state["currency"]) == (amount, currency):
+            return state
+        if state is None:
+            try:
+                state = _state(backend.PaymentIntent.retrieve(previous))
+            except stripe.error.InvalidRequestError:
+                # Bei Stripe unbekannt (gelöscht, anderer Account/Modus): neuen Intent anlegen
+                state = None
+        if state and state["status"] in PAID_STATUSES:
+            raise PaymentInProgress(state["status"])
+        if state and state["status"] in REUSABLE_STATUSES and state["currency"] == currency:
+            if state["amount"] == amount:
+                return state
+            # Eindeutiger Key pro Versuch: bei A→B→A→B innerhalb von 24 h würde Stripe sonst die
+            # gespeicherte Antwort liefern, ohne den Betrag zu ändern. Doppelt ausgeführt ist harmlos.
+            return _state(
+                backend.PaymentIntent.modify(
+                    previous,
+                    amount=amount,
+                    idempotency_key=f"booking-{booking.pk}-modify-{previous}-{uuid4().hex}",
+                )
+            )
+    intent = backend.PaymentIntent.create(
+        amount=amount,
+        currency=currency,
+        metadata={"booking_id": str(booking.pk)},
+        receipt_email=booking.customer_email or None,
+        idempotency_key=f"booking-{booking.pk}-{amount}-{currency}-{previous or 'new'}",
+    )
+    return _state(intent)
@@ -5,30 +5,37 @@ from django.conf import settings
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
 from main.models import Booking
+from main.utils.aio import run_io
+from .async_views import AsyncAPIView
+from .stripe_gateway import PaymentInProgress, forget_intent, payment_intent_for
+from .throttling import TokenBucketThrottle
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
 
-
-class PaymentIntentCreateView(APIView):
+class PaymentIntentCreateView(AsyncAPIView):
     """
-    Erstellt ein Stripe PaymentIntent für eine Buchung.
-    Erwartet POST JSON: { "booking_id": <id> }
+    Erstellt ein Stripe PaymentIntent für eine Buchung bzw. verwendet den bestehenden weiter
+    (``api.stripe_gateway``). Erwartet POST JSON: { "booking_id": <id> }
+    Der Stripe-Aufruf läuft im I/O-Pool (``main.utils.aio``), nicht im Request-Thread.
     """
 
     permission_classes = [AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "writes"
 
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         booking_id = request.data.get("booking_id")
         if not booking_id:
             return Response({"detail": "booking_id ist erforderlich."}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            booking = Booking.objects.get(pk=booking_id)
+            booking = await Booking.objects.aget(pk=booking_id)
         except Booking.DoesNotExist:
             return Response({"detail": "Buchung nicht gefunden."}, status=status.HTTP_404_NOT_FOUND)
 
+        if booking.payment_status == "paid":
+            return Response({"detail": "Buchung ist bereits bezahlt."}, status=status.HTTP_409_CONFLICT)
+
         if not booking.total_price:
             return Response({"detail": "Kein Betrag für diese Buchung hinterlegt."}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -42,33 +49,42 @@ class PaymentIntentCreateView(APIView):
             return Response({"detail": "Betrag muss größer als 0 sein."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            intent = stripe.PaymentIntent.create(
-                amount=amount_cents,
-                currency="chf",
-                metadata={"booking_id": str(booking.id)},
-                receipt_email=booking.customer_email or None,
+            intent = await run_io(payment_intent_for, booking, amount_cents, "chf")
+        except PaymentInProgress:
+            return Response(
+                {"detail": "Die Zahlung für diese Buchung läuft bereits oder ist erfolgt."},
+                status=status.HTTP_409_CONFLICT,
             )
         except Exception as e:
             return Response({"detail": f"Stripe-Fehler: {e}"}, status=status.HTTP_400_BAD_REQUEST)
 
+        stored = (booking.payment_intent_id, booking.payment_intent_amount, booking.payment_intent_currency)
+        if stored != (intent["id"], intent["amount"], intent["currency"]):
+            booking.payment_intent_id = intent["id"]
+            booking.payment_intent_amount = intent["amount"]
+            booking.payment_intent_currency = intent["currency"]
+            await booking.asave(
+                update_fields=["payment_intent_id", "payment_intent_amount", "payment_intent_currency", "updated_at"]
+            )
+
         return Response(
             {
-                "client_secret": intent.client_secret,
-                "payment_intent_id": intent.id,
+                "client_secret": intent["client_secret"],
+                "payment_intent_id": intent["id"],
                 "publishable_key": settings.STRIPE_PUBLIC_KEY,
             },
             status=status.HTTP_200_OK,
         )
 
 
-class StripeWebhookView(APIView):
+class StripeWebhookView(AsyncAPIView):
     """
     Stripe Webhook: verarbeitet PaymentIntent-Events.
     """
 
     permission_classes = [AllowAny]
 
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         payload = request.body
         sig_header = request.META.get("HTTP_STRIPE_SIGNATURE", "")
 
@@ -86,11 +102,14 @@ class StripeWebhookView(APIView):
         booking_id = data.get("metadata", {}).get("booking_id")
         payment_intent_id = data.get("id")
 
+        if event_type and event_type.startswith("payment_intent.") and payment_intent_id:
+            await run_io(forget_intent, payment_intent_id)
+
         if not booking_id:
             return Response({"detail": "Keine booking_id im PaymentIntent."}, status=status.HTTP_200_OK)
 
         try:
-            booking = Booking.objects.get(pk=booking_id)
+            booking = await Booking.objects.aget(pk=booking_id)
         except Booking.DoesNotExist:
             return Response({"detail": "Buchung nicht gefunden."}, status=status.HTTP_200_OK)
 
@@ -99,10 +118,10 @@ class StripeWebhookView(APIView):
             if booking.status == "pending":
                 booking.status = "confirmed"
             booking.transaction_id = payment_intent_id or ""
-            booking.save(update_fields=["payment_status", "status", "transaction_id", "updated_at"])
+            await booking.asave(update_fields=["payment_status", "status", "transaction_id", "updated_at"])
         elif event_type == "payment_intent.payment_failed":
             booking.payment_status = "unpaid"
             booking.transaction_id = payment_intent_id or ""
-            booking.save(update_fields=["payment_status", "transaction_id", "updated_at"])
+            await booking.asave(update_fields=["payment_status", "transaction_id", "updated_at"])
 
         return Response({"status": "ok"}, status=status.HTTP_200_OK)
@@ -1,10 +1,25 @@
+import asyncio
+import io
+import threading
+from unittest import mock
+
+from django.conf import settings
 from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import TestCase
+from django.db import IntegrityError
+from django.test import AsyncClient, TestCase, override_settings
 from django.urls import reverse
 from django.utils import timezone
 
+from adminportal.models import AuditLog, CustomerLedger, TransporterDailyStats
+from adminportal.models import Customer as PortalCustomer
+from adminportal.utils.gdpr import anonymize_personal_data
+from config import db_router
 from main.models import Booking, Customer, DamageReport, Invoice, Transporter, Vehicle
+from rest_framework.response import Response
 from rest_framework.test import APIClient
 from api.serializers import InvoiceSerializer
 from api.validators import booking_range_conflict_exists
@@ -214,3 +229,400 @@ class ApiSmokeTests(TestCase):
         self.assertEqual(response.status_code, 201)
         report.refresh_from_db()
         self.assertTrue(report.documents)
+        self.assertTrue(report.documents[0].startswith("damage_docs/"))
+        self.assertTrue(response.json()["documents"][0].startswith("/media/damage_docs/"))
+
+
+class BookingRaceTests(TestCase):
+    def test_lost_race_on_create_returns_validation_error(self):
+        today = timezone.localdate()
+        transporter = Transporter.objects.create(name="Van", kennzeichen="RC-1", verfuegbar_ab=today, preis_chf=100)
+        payload = {
+            "transporter": transporter.pk,
+            "date": today.isoformat(),
+            "time_slot": "MORNING",
+            "pickup_date": today.isoformat(),
+            "return_date": today.isoformat(),
+            "customer_name": "Anna Muster",
+            "customer_email": "anna@example.com",
+            "customer_phone": "+41790000000",
+            "customer_address": "Weg 1",
+            "driver_license_number": "AN12345",
+            "km_package": "100km",
+            "insurance": "basic",
+        }
+        # Parallele Buchung nach der Prüfung gespeichert: die Exclusion-Constraint (Postgres) greift
+        violation = IntegrityError('conflicting key value violates exclusion constraint "booking_halfday_no_overlap"')
+        with override_settings(API_THROTTLES={}), mock.patch(
+            "rest_framework.serializers.ModelSerializer.create", side_effect=violation
+        ):
+            response = APIClient().post(reverse("booking-list"), payload, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {"non_field_errors": ["Buchung kollidiert mit bestehender Reservierung."]})
+
+
+class UtilizationStatsApiTests(TestCase):
+    def test_monthly_series_requires_staff(self):
+        today = timezone.localdate()
+        transporter = Transporter.objects.create(name="Van", kennzeichen="AP-1", verfuegbar_ab=today, preis_chf=100)
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                transporter=transporter,
+                date=today,
+                time_slot="AFTERNOON",
+                customer_name="Kunde",
+                customer_email="kunde@example.com",
+                driver_license_number="X1",
+                total_price=50,
+            )
+        client = APIClient()
+        url = reverse("stats-utilization")
+        self.assertEqual(client.get(url).status_code, 403)
+        client.force_authenticate(User.objects.create_user(username="staff", password="pass12345", is_staff=True))
+        response = client.get(url, {"start": today.replace(day=1).isoformat(), "end": today.isoformat(), "group": "month"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["booked_slots"], 1)
+
+        for params in ({"transporter": "abc"}, {"start": "2026-13-40"}, {"end": "gestern"}):
+            self.assertEqual(client.get(url, params).status_code, 400, params)
+
+
+class BulkStatusActionTests(TestCase):
+    def test_bulk_transition_validates_each_id(self):
+        pending = [DamageReport.objects.create(email=f"k{i}@example.com") for i in range(3)]
+        done = DamageReport.objects.create(email="done@example.com", status="completed")
+        client = APIClient()
+        url = reverse("damage-report-bulk-completed")
+        self.assertEqual(client.post(url, {"ids": [done.pk]}, format="json").status_code, 403)
+
+        client.force_authenticate(User.objects.create_user(username="staff", password="pass12345", is_staff=True))
+        ids = [report.pk for report in pending] + [done.pk, 999999]
+        with self.assertNumQueries(5):  # Savepoint + Prüfung + UPDATE + Audit + Release
+            response = client.post(url, {"ids": ids}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], 3)
+        self.assertEqual([row["ok"] for row in response.data["results"]], [True, True, True, False, False])
+        self.assertEqual(DamageReport.objects.filter(status="completed").count(), 4)
+        self.assertEqual(AuditLog.objects.filter(action="damagereport_status_completed").count(), 3)
+
+    def test_bulk_cancel_refreshes_fleet_stats_and_ledger(self):
+        today = timezone.localdate()
+        transporter = Transporter.objects.create(name="Van", kennzeichen="BU-1", verfuegbar_ab=today, preis_chf=100)
+        customer = PortalCustomer.objects.create(first_name="Anna", last_name="Muster", email="anna@example.com")
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = Booking.objects.create(
+                transporter=transporter,
+                date=today,
+                time_slot="MORNING",
+                customer_name="Anna Muster",
+                customer_email="anna@example.com",
+                driver_license_number="X1",
+                total_price=70,
+            )
+        stats = TransporterDailyStats.objects.get(transporter=transporter, date=today)
+        self.assertEqual((stats.booked_slots, stats.revenue_chf), (1, 70))
+        CustomerLedger.objects.filter(customer=customer).delete()
+
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="staff", password="pass12345", is_staff=True))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(reverse("booking-bulk-cancelled"), {"ids": [booking.pk]}, format="json")
+        self.assertEqual(response.data["updated"], 1)
+        self.assertFalse(TransporterDailyStats.objects.filter(transporter=transporter, date=today, booked_slots__gt=0).exists())
+        self.assertEqual(CustomerLedger.objects.get(customer=customer).booking_count, 1)
+
+
+class SparseFieldsTests(TestCase):
+    def test_fields_and_compact_view_with_expand(self):
+        today = timezone.localdate()
+        transporter = Transporter.objects.create(name="Van", kennzeichen="SF-1", verfuegbar_ab=today, preis_chf=100)
+        customer = Customer.objects.create(first_name="Anna", last_name="Muster", email="anna@example.com")
+        for slot in ["MORNING", "AFTERNOON"]:
+            Booking.objects.create(
+                transporter=transporter,
+                customer=customer,
+                date=today,
+                time_slot=slot,
+                customer_name="Anna Muster",
+                customer_email="anna@example.com",
+                driver_license_number="X1",
+            )
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="staff", password="pass12345", is_staff=True))
+        url = reverse("booking-list")
+
+        response = client.get(url, {"fields": "id,status"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()[0]), {"id", "status"})
+
+        compact = client.get(url, {"view": "compact"}).json()[0]
+        self.assertNotIn("transporter_detail", compact)
+        self.assertEqual(compact["customer"], customer.pk)
+
+        with self.assertNumQueries(1):  # Buchungen samt Transporter per JOIN
+            expanded = client.get(url, {"view": "compact", "expand": "transporter", "fields": "id,date"}).json()
+        self.assertEqual(set(expanded[0]), {"id", "date", "transporter_detail"})
+        self.assertEqual(expanded[0]["transporter_detail"]["kennzeichen"], "SF-1")
+
+    def test_detail_keeps_full_representation(self):
+        report = DamageReport.objects.create(email="k@example.com", documents=[])
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="staff", password="pass12345", is_staff=True))
+        data = client.get(reverse("damage-report-detail", args=[report.pk]), {"view": "compact"}).json()
+        self.assertIn("photos", data)
+        self.assertEqual(data["documents"], [])
+
+
+@override_settings(SYNC_LAG_SECONDS=0)
+class ChangeFeedTests(TestCase):
+    def test_pages_updates_and_tombstones(self):
+        vehicles = [
+            Vehicle.objects.create(type="small", license_plate=f"ZH-{i}", brand="VW", model="Crafter")
+            for i in range(3)
+        ]
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="staff", password="pass12345", is_staff=True))
+        url = reverse("vehicle-changes")
+
+        first = client.get(url, {"limit": 2}).json()
+        self.assertTrue(first["has_more"])
+        second = client.get(url, {"limit": 2, "token": first["token"]}).json()
+        self.assertFalse(second["has_more"])
+        seen = [row["id"] for row in first["results"] + second["results"]]
+        self.assertEqual(seen, [vehicle.pk for vehicle in vehicles])
+
+        vehicles[0].mileage = 1200
+        vehicles[0].save()
+        deleted_pk = vehicles[1].pk
+        vehicles[1].delete()
+        delta = client.get(url, {"token": second["token"], "fields": "id,mileage"}).json()
+        self.assertEqual(delta["results"], [{"id": vehicles[0].pk, "mileage": 1200}])
+        self.assertEqual(delta["deleted"], [deleted_pk])
+
+        self.assertEqual(client.get(url, {"token": "kaputt"}).status_code, 400)
+        other = client.get(reverse("booking-changes")).json()["token"]
+        self.assertEqual(client.get(url, {"token": other}).status_code, 400)
+
+    def test_anonymized_rows_are_resent(self):
+        transporter = Transporter.objects.create(name="Sprinter", kennzeichen="ZH-9", verfuegbar_ab=timezone.localdate())
+        booking = Booking.objects.create(
+            transporter=transporter,
+            date=timezone.localdate(),
+            time_slot="FULLDAY",
+            customer_name="Erika Muster",
+            customer_email="erika@example.com",
+            customer_phone="+41 44 123 45 67",
+            driver_license_number="ABC12345",
+        )
+        report = DamageReport.objects.create(email="hans@example.com", phone="+41 44 765 43 21")
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(username="staff", password="pass12345", is_staff=True))
+        tokens = {name: client.get(reverse(name)).json()["token"] for name in ("booking-changes", "damage-report-changes")}
+
+        anonymize_personal_data("erika@example.com")
+        delta = client.get(reverse("booking-changes"), {"token": tokens["booking-changes"]}).json()
+        self.assertEqual([(row["id"], row["customer_phone"]) for row in delta["results"]], [(booking.pk, "")])
+
+        call_command("anonymize_personal_data", email="hans@example.com", stdout=io.StringIO())
+        delta = client.get(reverse("damage-report-changes"), {"token": tokens["damage-report-changes"]}).json()
+        self.assertEqual([(row["id"], row["phone"]) for row in delta["results"]], [(report.pk, "")])
+
+
+@override_settings(API_THROTTLES={"availability": {"rate": "6/min", "burst": 2}, "writes": {"rate": "1/hour", "burst": 1}})
+class ThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_token_bucket_with_burst_and_retry_after(self):
+        transporter = Transporter.objects.create(name="Sprinter", kennzeichen="ZH-2", verfuegbar_ab=timezone.localdate())
+        url = reverse("booking-availability")
+        params = {"transporter": transporter.pk, "date": timezone.localdate().isoformat(), "time_slot": "MORNING"}
+        client = APIClient()
+        self.assertEqual([client.get(url, params).status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual(client.get(url, params).headers["Retry-After"], "10")
+        # Andere IP hat einen eigenen Bucket, Mitarbeitende werden nicht gedrosselt
+        self.assertEqual(client.get(url, params, REMOTE_ADDR="10.0.0.2").status_code, 200)
+        client.force_authenticate(User.objects.create_user(username="staff", password="pass12345", is_staff=True))
+        self.assertEqual(client.get(url, params).status_code, 200)
+
+    def test_spoofed_forwarded_for_does_not_reset_bucket(self):
+        transporter = Transporter.objects.create(name="Sprinter", kennzeichen="ZH-2", verfuegbar_ab=timezone.localdate())
+        url = reverse("booking-availability")
+        params = {"transporter": transporter.pk, "date": timezone.localdate().isoformat(), "time_slot": "MORNING"}
+        client = APIClient()
+        with self.settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}):
+            codes = [
+                client.get(url, params, HTTP_X_FORWARDED_FOR=f"198.51.100.{idx}, 203.0.113.7").status_code
+                for idx in range(3)
+            ]
+        self.assertEqual(codes, [200, 200, 429])
+
+    def test_only_public_create_is_throttled(self):
+        client = APIClient()
+        url = reverse("damage-report-list")
+        self.assertEqual(client.post(url, {}, format="json").status_code, 400)
+        self.assertEqual(client.post(url, {}, format="json").status_code, 429)
+        self.assertEqual(client.get(url).status_code, 403)
+
+
+class ConditionalGetTests(TestCase):
+    def test_transporter_list_revalidates_without_serializing(self):
+        for idx in range(12):
+            Transporter.objects.create(name=f"Sprinter {idx}", kennzeichen=f"ZH-{idx}", verfuegbar_ab=timezone.localdate())
+        client = APIClient()
+        url = reverse("transporter-list")
+        first = client.get(url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(first["Content-Encoding"], "br")
+        self.assertTrue(first["ETag"].startswith('W/"'))
+        with self.assertNumQueries(1):
+            cached = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+        Transporter.objects.filter(kennzeichen="ZH-3").delete()
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+
+    @mock.patch("config.db_router.replica_configured", return_value=True)
+    def test_list_validators_read_from_same_database_as_body(self, _configured):
+        router = db_router.PrimaryReplicaRouter()
+        reads = []
+
+        def fingerprint(model):
+            reads.append(("etag", router.db_for_read(model)))
+            return {"latest": None, "count": 0}
+
+        def body(viewset, request, *args, **kwargs):
+            reads.append(("list", router.db_for_read(Transporter)))
+            return Response([])
+
+        with mock.patch("api.conditional.table_fingerprint", fingerprint), mock.patch(
+            "rest_framework.mixins.ListModelMixin.list", body
+        ):
+            self.assertEqual(APIClient().get(reverse("transporter-list")).status_code, 200)
+        self.assertEqual(reads, [("etag", db_router.REPLICA_ALIAS), ("list", db_router.REPLICA_ALIAS)])
+
+    def test_meta_options_long_cache(self):
+        client = APIClient()
+        response = client.get(reverse("meta-options"))
+        self.assertIn("max-age=86400", response["Cache-Control"])
+        self.assertEqual(client.get(reverse("meta-options"), HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+
+@override_settings(STRIPE_BACKEND="fake")
+class PaymentIntentTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_intent_is_reused_and_adjusted_per_booking(self):
+        from api.stripe_gateway import fake_stripe
+
+        transporter = Transporter.objects.create(name="Sprinter", kennzeichen="ZH-3", verfuegbar_ab=timezone.localdate())
+        booking = Booking.objects.create(
+            transporter=transporter,
+            date=timezone.localdate(),
+            time_slot="FULLDAY",
+            customer_name="Test Kunde",
+            customer_email="kunde@example.com",
+            customer_phone="+41 44 123 45 67",
+            customer_address="Teststrasse 1",
+            driver_license_number="ABC12345",
+            total_price="120.00",
+        )
+        client = APIClient()
+        url = reverse("stripe-create-intent")
+        before = fake_stripe.PaymentIntent.requests
+        first = client.post(url, {"booking_id": booking.pk}, format="json").json()
+        second = client.post(url, {"booking_id": booking.pk}, format="json").json()
+        self.assertEqual(first["payment_intent_id"], second["payment_intent_id"])
+        self.assertEqual(fake_stripe.PaymentIntent.requests - before, 1)
+        booking.refresh_from_db()
+        self.assertEqual((booking.payment_intent_id, booking.payment_intent_amount), (first["payment_intent_id"], 12000))
+
+        Booking.objects.filter(pk=booking.pk).update(total_price="150.00")
+        third = client.post(url, {"booking_id": booking.pk}, format="json").json()
+        self.assertEqual(third["payment_intent_id"], first["payment_intent_id"])
+        booking.refresh_from_db()
+        self.assertEqual(booking.payment_intent_amount, 15000)
+
+        # A→B→A→B: jede Änderung wird bei Stripe ausgeführt, nicht aus dem Idempotency-Key wiederholt
+        for price in ("120.00", "150.00"):
+            Booking.objects.filter(pk=booking.pk).update(total_price=price)
+            client.post(url, {"booking_id": booking.pk}, format="json")
+        cache.clear()
+        self.assertEqual(fake_stripe.PaymentIntent.retrieve(first["payment_intent_id"]).amount, 15000)
+
+        Booking.objects.filter(pk=booking.pk).update(payment_status="paid")
+        self.assertEqual(client.post(url, {"booking_id": booking.pk}, format="json").status_code, 409)
+
+    def test_unknown_or_finished_intent_is_replaced(self):
+        from api.stripe_gateway import fake_stripe
+
+        transporter = Transporter.objects.create(name="Sprinter", kennzeichen="ZH-3", verfuegbar_ab=timezone.localdate())
+        booking = Booking.objects.create(
+            transporter=transporter,
+            date=timezone.localdate(),
+            time_slot="FULLDAY",
+            customer_name="Test Kunde",
+            customer_email="kunde@example.com",
+            driver_license_number="ABC12345",
+            total_price="120.00",
+            payment_intent_id="pi_live_unbekannt",
+        )
+        client = APIClient()
+        url = reverse("stripe-create-intent")
+        first = client.post(url, {"booking_id": booking.pk}, format="json").json()
+        self.assertTrue(first["payment_intent_id"].startswith("pi_fake_"))
+
+        # Abgebrochen: der Webhook verwirft den gecachten Zustand, danach gibt es einen neuen Intent
+        fake_stripe.PaymentIntent.set_status(first["payment_intent_id"], "canceled")
+        event = {
+            "type": "payment_intent.canceled",
+            "data": {"object": {"id": first["payment_intent_id"], "metadata": {"booking_id": str(booking.pk)}}},
+        }
+        with mock.patch("stripe.Webhook.construct_event", return_value=event):
+            self.assertEqual(client.post(reverse("stripe-webhook"), {}, format="json").status_code, 200)
+        second = client.post(url, {"booking_id": booking.pk}, format="json").json()
+        self.assertNotEqual(second["payment_intent_id"], first["payment_intent_id"])
+
+        # Bezahlt, Webhook noch ausstehend: kein zweiter bezahlbarer Intent, auch nach Cache-Ablauf
+        fake_stripe.PaymentIntent.set_status(second["payment_intent_id"], "succeeded")
+        cache.clear()
+        before = fake_stripe.PaymentIntent.requests
+        self.assertEqual(client.post(url, {"booking_id": booking.pk}, format="json").status_code, 409)
+        self.assertEqual(fake_stripe.PaymentIntent.requests - before, 1)
+
+
+class AsyncEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    async def test_slow_storage_does_not_block_availability(self):
+        transporter = await Transporter.objects.acreate(name="Sprinter", kennzeichen="ZH-1", verfuegbar_ab=timezone.localdate())
+        report = await DamageReport.objects.acreate(email="k@example.com", documents=[])
+        answered = threading.Event()
+        waited = []
+        save = default_storage.save
+
+        def slow_save(name, content, **kwargs):
+            # Hängender S3-PUT: endet erst, wenn die Verfügbarkeitsabfrage beantwortet ist
+            waited.append(answered.wait(5))
+            return save(name, content, **kwargs)
+
+        async def check_availability():
+            await asyncio.sleep(0.05)
+            response = await client.get(
+                reverse("booking-availability"),
+                {"transporter": transporter.pk, "date": timezone.localdate().isoformat(), "time_slot": "MORNING"},
+            )
+            answered.set()
+            return response
+
+        client = AsyncClient()
+        pdf = SimpleUploadedFile("police.pdf", b"%PDF-1.4 test", content_type="application/pdf")
+        with mock.patch.object(default_storage, "save", side_effect=slow_save):
+            upload, availability = await asyncio.gather(
+                client.post(reverse("damage-report-upload-document", args=[report.pk]), {"document": pdf}),
+                check_availability(),
+            )
+        self.assertEqual(availability.json(), {"available": True})
+        self.assertEqual(waited, [True])
+        self.assertEqual(upload.status_code, 201)
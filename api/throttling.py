@@ -0,0 +1,90 @@
+"""
+Token-Bucket-Throttling für die öffentlichen API-Endpunkte.
+
+Pro Scope (``availability``, ``uploads``, ``writes``) und Client gibt es einen Bucket im Cache:
+``burst`` Anfragen sind sofort möglich, danach füllt er sich mit ``rate`` wieder auf (siehe
+``API_THROTTLES``). Ist der Bucket leer, antwortet DRF mit 429 und ``Retry-After``.
+
+Clients sind angemeldete Benutzer (per ID) bzw. anonyme Clients (per IP, ``get_ident`` mit
+``NUM_PROXIES``: massgebend ist der vom vertrauenswürdigen Proxy angehängte X-Forwarded-For-Eintrag);
+Mitarbeitende werden nicht gedrosselt. Der Bucket liegt im ``default``-Cache. Ohne ``CACHE_URL``
+ist das LocMem pro Worker – die Grenze gilt dann je Worker, nicht für den ganzen Server.
+Lesen und Schreiben sind nicht atomar; bei parallelen Anfragen desselben Clients kann eine
+einzelne Anfrage zu viel durchkommen, was für den Schutz vor Scrapern reicht.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+from main.utils.roles import is_staff_member
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """``"60/min"`` → Tokens pro Sekunde."""
+    num, period = rate.split("/")
+    return int(num) / PERIODS[period[0]]
+
+
+def take_token(key, rate, burst, now=None):
+    """
+    Entnimmt ein Token aus dem Bucket ``key``. Gibt 0 zurück, wenn die Anfrage erlaubt ist,
+    sonst die Wartezeit in Sekunden bis zum nächsten Token.
+    """
+    now = time.time() if now is None else now
+    state = cache.get(key)
+    tokens, stamp = state if state else (burst, now)
+    tokens = min(burst, tokens + max(now - stamp, 0) * rate)
+    if tokens < 1:
+        return (1 - tokens) / rate
+    # Nach dieser Zeit ist der Bucket wieder voll – dann entspricht ein fehlender Eintrag dem Zustand
+    cache.set(key, (tokens - 1, now), math.ceil(burst / rate))
+    return 0
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Verwendet ``throttle_scope`` der View; ohne Konfiguration für den Scope wird nicht gedrosselt."""
+
+    cache_prefix = "throttle"
+
+    def __init__(self):
+        self._wait = None
+
+    def get_cache_key(self, request, view, scope):
+        user = request.user
+        if user and user.is_authenticated:
+            if is_staff_member(user):
+                return None
+            ident = f"user-{user.pk}"
+        else:
+            ident = self.get_ident(request)
+        return f"{self.cache_prefix}:{scope}:{ident}"
+
+    def allow_request(self, request, view):
+        scope = getattr(view, "throttle_scope", None)
+        config = getattr(settings, "API_THROTTLES", {}).get(scope)
+        if not config:
+            return True
+        key = self.get_cache_key(request, view, scope)
+        if key is None:
+            return True
+        self._wait = take_token(key, parse_rate(config["rate"]), config["burst"])
+        return not self._wait
+
+    def wait(self):
+        return self._wait
+
+
+class PublicCreateThrottleMixin:
+    """ViewSet-Mixin: drosselt nur das (öffentliche) Anlegen per POST auf die Liste, Scope ``writes``."""
+
+    throttle_scope = "writes"
+
+    def get_throttles(self):
+        if self.action == "create":
+            return [TokenBucketThrottle()]
+        return super().get_throttles()
@@ -9,8 +9,11 @@ from .views import (
     TransporterViewSet,
     VehicleViewSet,
 )
+from .async_views import BookingAvailabilityView
 from .viewsets_uploads import DamageDocumentUploadView, DamagePhotoUploadView
 from .meta import MetaOptionsView
+from .stats import UtilizationStatsView, VatReportView
+from .imports import BulkImportView
 from .auth_views import LoginView, LogoutView, MeView
 from .stripe_views import PaymentIntentCreateView, StripeWebhookView
 
@@ -23,10 +26,15 @@ router.register(r"vehicles", VehicleViewSet, basename="vehicle")
 router.register(r"invoices", InvoiceViewSet, basename="invoice")
 
 urlpatterns = [
+    # Vor dem Router, sonst greift die Detail-Route bookings/<pk>/
+    path("bookings/availability/", BookingAvailabilityView.as_view(), name="booking-availability"),
     path("", include(router.urls)),
     path("damage-reports/<int:pk>/upload-photo/", DamagePhotoUploadView.as_view(), name="damage-report-upload-photo"),
     path("damage-reports/<int:pk>/upload-document/", DamageDocumentUploadView.as_view(), name="damage-report-upload-document"),
     path("meta/options/", MetaOptionsView.as_view(), name="meta-options"),
+    path("stats/utilization/", UtilizationStatsView.as_view(), name="stats-utilization"),
+    path("stats/vat/", VatReportView.as_view(), name="stats-vat"),
+    path("imports/<str:kind>/", BulkImportView.as_view(), name="bulk-import"),
     path("auth/login/", LoginView.as_view(), name="auth-login"),
     path("auth/logout/", LogoutView.as_view(), name="auth-logout"),
     path("auth/me/", MeView.as_view(), name="auth-me"),
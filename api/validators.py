@@ -1,9 +1,21 @@
+import re
+from contextlib import contextmanager
 from datetime import date
 
+from django.db import IntegrityError, transaction
 from django.db.models import Q
 from django.core.exceptions import ValidationError
 from main.models import Booking
 
+BOOKING_CONFLICT_MESSAGE = "Buchung kollidiert mit bestehender Reservierung."
+# Exclusion-Constraint (Postgres) bzw. unique_together (transporter, date, time_slot) in beiden DBs
+BOOKING_OVERLAP_CONSTRAINTS = (
+    "booking_halfday_no_overlap",
+    "booking_slot_no_overlap",
+    "main_booking_transporter_id_date_time_slot",
+    "main_booking.transporter_id, main_booking.date, main_booking.time_slot",
+)
+
 
 def validate_pickup_return(pickup_date, return_date):
     if pickup_date and return_date and pickup_date > return_date:
@@ -35,18 +47,41 @@ def validate_phone(phone: str):
         raise ValidationError("Telefonnummer ist zu kurz.")
 
 
+def clean_plate(plate: str):
+    """Kontrollschild normalisieren: ``ZH 123456``/``zh-123456`` → ``ZH123456``."""
+    plate = (plate or "").strip().upper()
+    match = re.match(r"^(?P<canton>[A-Z]{2})[\s-]?(?P<number>\d{1,6})$", plate)
+    if not match:
+        raise ValidationError("Kontrollschild muss dem Format 'ZH123456' oder 'ZH 123456' entsprechen.")
+    return f"{match.group('canton')}{match.group('number')}"
+
+
+def clean_vin(vin: str, allow_iso=False):
+    """
+    Stammnummer normalisieren (``123456789`` → ``123.456.789``).
+    Mit ``allow_iso`` wird auch eine 17-stellige Fahrgestellnummer (VIN) akzeptiert.
+    """
+    vin = (vin or "").strip()
+    if not vin:
+        return vin
+    compact = re.sub(r"[\s.-]", "", vin).upper()
+    if allow_iso and re.fullmatch(r"[A-HJ-NPR-Z0-9]{17}", compact):
+        return compact
+    digits = re.sub(r"\D", "", vin)
+    if len(digits) != 9:
+        raise ValidationError("Stammnummer muss 9-stellig sein (z.B. 123.456.789).")
+    return f"{digits[:3]}.{digits[3:6]}.{digits[6:]}"
+
+
 def validate_date_not_future(d: date, label: str):
     if d and d > date.today():
         raise ValidationError(f"{label} darf nicht in der Zukunft liegen.")
 
 
-def booking_slot_conflict_exists(transporter, booking_date, time_slot, instance_id=None):
-    """
-    Prüft Überschneidungen mit bestehenden Buchungen.
-    FULLDAY blockiert alle, MORNING/AFTERNOON blockieren sich gegenseitig und FULLDAY.
-    """
+def _slot_conflicts(transporter, booking_date, time_slot, instance_id=None):
+    """Queryset der kollidierenden Slot-Buchungen oder ``None``, wenn nichts zu prüfen ist."""
     if not (transporter and booking_date and time_slot):
-        return False
+        return None
     if time_slot == "FULLDAY":
         conflict_slots = ["MORNING", "AFTERNOON", "FULLDAY"]
     elif time_slot == "MORNING":
@@ -57,16 +92,13 @@ def booking_slot_conflict_exists(transporter, booking_date, time_slot, instance_
     qs = Booking.objects.filter(transporter=transporter, date=booking_date, time_slot__in=conflict_slots)
     if instance_id:
         qs = qs.exclude(pk=instance_id)
-    return qs.exists()
+    return qs
 
 
-def booking_range_conflict_exists(transporter, pickup_date, return_date, vehicle=None, instance_id=None):
-    """
-    Prüft Überschneidungen über Datumsbereiche (pickup/return).
-    Konflikte werden für Transporter und/oder Vehicle geprüft.
-    """
+def _range_conflicts(transporter, pickup_date, return_date, vehicle=None, instance_id=None):
+    """Querysets der überlappenden Buchungen (Transporter, dann Fahrzeug) in Prüfreihenfolge."""
     if not pickup_date or not return_date:
-        return False
+        return []
     if pickup_date > return_date:
         raise ValidationError("Abholdatum darf nicht nach dem Rückgabedatum liegen.")
 
@@ -74,25 +106,69 @@ def booking_range_conflict_exists(transporter, pickup_date, return_date, vehicle
         Q(pickup_date__isnull=False, return_date__isnull=False, pickup_date__lte=return_date, return_date__gte=pickup_date)
         | Q(date__range=(pickup_date, return_date))
     )
-
-    def _overlap_exists(qs):
-        if instance_id:
-            qs = qs.exclude(pk=instance_id)
-        return qs.filter(overlap_filter).exists()
-
-    conflict = False
+    querysets = []
     if transporter:
-        conflict = conflict or _overlap_exists(Booking.objects.filter(transporter=transporter))
+        querysets.append(Booking.objects.filter(transporter=transporter))
     if vehicle:
-        conflict = conflict or _overlap_exists(Booking.objects.filter(vehicle=vehicle))
-    return conflict
+        querysets.append(Booking.objects.filter(vehicle=vehicle))
+    if instance_id:
+        querysets = [qs.exclude(pk=instance_id) for qs in querysets]
+    return [qs.filter(overlap_filter) for qs in querysets]
+
+
+def booking_slot_conflict_exists(transporter, booking_date, time_slot, instance_id=None):
+    """
+    Prüft Überschneidungen mit bestehenden Buchungen.
+    FULLDAY blockiert alle, MORNING/AFTERNOON blockieren sich gegenseitig und FULLDAY.
+    """
+    qs = _slot_conflicts(transporter, booking_date, time_slot, instance_id=instance_id)
+    return qs is not None and qs.exists()
+
+
+async def abooking_slot_conflict_exists(transporter, booking_date, time_slot, instance_id=None):
+    """Async-Variante von ``booking_slot_conflict_exists`` (für async Views)."""
+    qs = _slot_conflicts(transporter, booking_date, time_slot, instance_id=instance_id)
+    return qs is not None and await qs.aexists()
+
+
+def booking_range_conflict_exists(transporter, pickup_date, return_date, vehicle=None, instance_id=None):
+    """
+    Prüft Überschneidungen über Datumsbereiche (pickup/return).
+    Konflikte werden für Transporter und/oder Vehicle geprüft.
+    """
+    return any(qs.exists() for qs in _range_conflicts(transporter, pickup_date, return_date, vehicle, instance_id))
+
+
+async def abooking_range_conflict_exists(transporter, pickup_date, return_date, vehicle=None, instance_id=None):
+    """Async-Variante von ``booking_range_conflict_exists`` (für async Views)."""
+    for qs in _range_conflicts(transporter, pickup_date, return_date, vehicle, instance_id):
+        if await qs.aexists():
+            return True
+    return False
 
 
 def validate_booking_conflict(transporter, booking_date, time_slot, instance_id=None):
     if booking_slot_conflict_exists(transporter, booking_date, time_slot, instance_id=instance_id):
-        raise ValidationError("Buchung kollidiert mit bestehender Reservierung.")
+        raise ValidationError(BOOKING_CONFLICT_MESSAGE)
 
 
 def validate_booking_range_conflict(transporter, pickup_date, return_date, vehicle=None, instance_id=None):
     if booking_range_conflict_exists(transporter, pickup_date, return_date, vehicle=vehicle, instance_id=instance_id):
-        raise ValidationError("Buchung kollidiert mit bestehender Reservierung.")
+        raise ValidationError(BOOKING_CONFLICT_MESSAGE)
+
+
+@contextmanager
+def booking_overlap_guard():
+    """
+    Um das Speichern einer Buchung legen. Gewinnt eine parallele Anfrage das Rennen zwischen
+    Prüfung und Speichern, greift die DB-Constraint; der ``IntegrityError`` wird dann zur selben
+    ``ValidationError`` wie bei ``validate_booking_conflict``. Der Savepoint hält eine
+    umgebende Transaktion benutzbar.
+    """
+    try:
+        with transaction.atomic():
+            yield
+    except IntegrityError as exc:
+        if not any(name in str(exc) for name in BOOKING_OVERLAP_CONSTRAINTS):
+            raise
+        raise ValidationError(BOOKING_CONFLICT_MESSAGE) from exc
@@ -1,24 +1,42 @@
 from django.db.models import Q
 from django.utils.dateparse import parse_date
-from rest_framework import permissions, status, viewsets
+from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from adminportal.utils.fleet_stats import booking_keys, schedule_fleet_stats_refresh
+from adminportal.utils.ledger import schedule_ledger_refresh
+from adminportal.utils.timeline import invalidate_booking_calendar
+from config.db_router import read_from_replica
 from main.models import Booking, Customer, DamageReport, Invoice, Transporter, Vehicle
+from .changes import ChangeFeedMixin
+from .conditional import ConditionalGetMixin
 from .permissions import AdminOrReadOnly, StaffOnly, StaffOrPostOnly
 from .serializers import (
+    BookingCompactSerializer,
     BookingSerializer,
     CustomerSerializer,
+    DamageReportCompactSerializer,
     DamageReportSerializer,
+    InvoiceCompactSerializer,
     InvoiceSerializer,
     TransporterSerializer,
     VehicleSerializer,
 )
+from .sparse import SparseFieldsViewSetMixin
 from .status_actions import add_status_actions
-from .validators import booking_range_conflict_exists, booking_slot_conflict_exists
+from .throttling import PublicCreateThrottleMixin
 
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class ReplicaListMixin:
+    """Listen-Endpunkte lesen von der Replica (Berechtigungen und Detail-/Schreibzugriffe nicht)."""
+
+    def list(self, request, *args, **kwargs):
+        with read_from_replica():
+            return super().list(request, *args, **kwargs)
+
+
+class CustomerViewSet(ReplicaListMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = Customer.objects.all().order_by("last_name", "first_name")
     serializer_class = CustomerSerializer
     permission_classes = [StaffOnly]
@@ -38,7 +56,7 @@ class CustomerViewSet(viewsets.ModelViewSet):
         return qs
 
 
-class VehicleViewSet(viewsets.ModelViewSet):
+class VehicleViewSet(ConditionalGetMixin, ReplicaListMixin, ChangeFeedMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
     queryset = Vehicle.objects.all().order_by("brand", "model")
     serializer_class = VehicleSerializer
     permission_classes = [AdminOrReadOnly]
@@ -69,7 +87,7 @@ class VehicleViewSet(viewsets.ModelViewSet):
         return qs
 
 
-class TransporterViewSet(viewsets.ReadOnlyModelViewSet):
+class TransporterViewSet(ConditionalGetMixin, ReplicaListMixin, SparseFieldsViewSetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Transporter.objects.all().order_by("name")
     serializer_class = TransporterSerializer
     permission_classes = [AdminOrReadOnly]
@@ -83,58 +101,28 @@ class TransporterViewSet(viewsets.ReadOnlyModelViewSet):
         "cancelled": ["pending", "confirmed"],
     },
 )
-class BookingViewSet(viewsets.ModelViewSet):
-    queryset = (
-        Booking.objects.select_related("transporter", "vehicle", "customer")
-        .all()
-        .order_by("-created_at")
-    )
+class BookingViewSet(PublicCreateThrottleMixin, ReplicaListMixin, ChangeFeedMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
+    queryset = Booking.objects.all().order_by("-created_at")
     serializer_class = BookingSerializer
+    list_serializer_class = BookingCompactSerializer
+    related_lookups = {
+        "transporter_detail": ("select", "transporter"),
+        "vehicle_detail": ("select", "vehicle"),
+        "customer_detail": ("select", "customer"),
+    }
     permission_classes = [StaffOrPostOnly]
 
-    @action(detail=False, methods=["get"], permission_classes=[permissions.AllowAny])
-    def availability(self, request):
-        transporter_id = request.query_params.get("transporter")
-        vehicle_id = request.query_params.get("vehicle")
-        pickup_date = parse_date(request.query_params.get("pickup_date") or "")
-        return_date = parse_date(request.query_params.get("return_date") or "")
-        booking_date = parse_date(request.query_params.get("date") or "")
-        time_slot = request.query_params.get("time_slot")
-
-        if not transporter_id and not vehicle_id:
-            return Response(
-                {"detail": "transporter oder vehicle erforderlich."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        transporter = Transporter.objects.filter(pk=transporter_id).first() if transporter_id else None
-        vehicle = Vehicle.objects.filter(pk=vehicle_id).first() if vehicle_id else None
-        if transporter_id and not transporter:
-            return Response({"detail": "Transporter nicht gefunden."}, status=status.HTTP_404_NOT_FOUND)
-        if vehicle_id and not vehicle:
-            return Response({"detail": "Fahrzeug nicht gefunden."}, status=status.HTTP_404_NOT_FOUND)
-
-        if pickup_date and return_date:
-            conflict = booking_range_conflict_exists(
-                transporter=transporter,
-                vehicle=vehicle,
-                pickup_date=pickup_date,
-                return_date=return_date,
-            )
-            return Response({"available": not conflict})
-
-        if booking_date and time_slot and transporter:
-            conflict = booking_slot_conflict_exists(
-                transporter=transporter,
-                booking_date=booking_date,
-                time_slot=time_slot,
-            )
-            return Response({"available": not conflict})
-
-        return Response(
-            {"detail": "Ungültige Parameter. Nutze pickup_date/return_date oder date/time_slot."},
-            status=status.HTTP_400_BAD_REQUEST,
+    def bulk_status_changing(self, queryset, target_status):
+        # Bulk-UPDATE ohne Signals: wie ``BookingImporter.after_write`` nachführen (Refresh nach dem Commit)
+        bookings = list(
+            queryset.only("transporter_id", "date", "time_slot", "pickup_date", "return_date", "status", "customer_email")
         )
+        keys = set()
+        for booking in bookings:
+            keys |= booking_keys(booking)
+        schedule_fleet_stats_refresh(keys)
+        schedule_ledger_refresh(emails=[booking.customer_email for booking in bookings])
+        invalidate_booking_calendar()
 
 
 @add_status_actions(
@@ -145,9 +133,15 @@ class BookingViewSet(viewsets.ModelViewSet):
         "cancelled": ["pending", "in_progress"],
     },
 )
-class DamageReportViewSet(viewsets.ModelViewSet):
-    queryset = DamageReport.objects.select_related("customer").all().order_by("-created_at")
+class DamageReportViewSet(PublicCreateThrottleMixin, ReplicaListMixin, ChangeFeedMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
+    queryset = DamageReport.objects.all().order_by("-created_at")
     serializer_class = DamageReportSerializer
+    list_serializer_class = DamageReportCompactSerializer
+    related_lookups = {
+        "customer": ("select", "customer"),
+        "customer_detail": ("select", "customer"),
+        "photos": ("prefetch", "photos"),
+    }
     permission_classes = [StaffOrPostOnly]
 
 
@@ -159,9 +153,13 @@ class DamageReportViewSet(viewsets.ModelViewSet):
         "cancelled": ["unpaid", "overdue"],
     },
 )
-class InvoiceViewSet(viewsets.ModelViewSet):
-    queryset = Invoice.objects.select_related("customer").all().order_by("-invoice_date")
+class InvoiceViewSet(ReplicaListMixin, ChangeFeedMixin, SparseFieldsViewSetMixin, viewsets.ModelViewSet):
+    queryset = Invoice.objects.all().order_by("-invoice_date")
     serializer_class = InvoiceSerializer
+    list_serializer_class = InvoiceCompactSerializer
+    related_lookups = {
+        "customer_detail": ("select", "customer"),
+    }
     permission_classes = [StaffOnly]
 
     @action(detail=False, methods=["get"], permission_classes=[StaffOnly])
@@ -1,32 +1,43 @@
+import asyncio
 from uuid import uuid4
 
 from django.core.files.storage import default_storage
 from django.utils import timezone
-from rest_framework import permissions, status, views
+from rest_framework import permissions, status
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 
+from config.metrics import track
 from main.models import DamageReport, DamagePhoto
+from main.utils.aio import run_io
+from main.utils.media import attach_photo_urls, document_links
+from .async_views import AsyncAPIView
+from .throttling import TokenBucketThrottle
 
 
-class DamagePhotoUploadView(views.APIView):
+class DamagePhotoUploadView(AsyncAPIView):
     """
     Ermöglicht Upload eines Schadenfotos zu einem bestehenden DamageReport.
     POST multipart: { image: <file> }
+    Dateien werden im I/O-Pool abgelegt (``main.utils.aio``), die DB-Zeilen danach async gespeichert.
     """
 
     parser_classes = [MultiPartParser, FormParser]
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "uploads"
 
-    def post(self, request, pk):
+    async def post(self, request, pk):
         try:
-            report = DamageReport.objects.get(pk=pk)
+            report = await DamageReport.objects.aget(pk=pk)
         except DamageReport.DoesNotExist:
             return Response({"detail": "Report nicht gefunden."}, status=status.HTTP_404_NOT_FOUND)
 
-        files = request.FILES.getlist("images") or request.FILES.getlist("image")
+        # Multipart-Parsing kann grosse Dateien auf die Platte schreiben
+        uploads = await run_io(lambda: request.FILES)
+        files = uploads.getlist("images") or uploads.getlist("image")
         if not files:
-            single = request.FILES.get("image")
+            single = uploads.get("image")
             files = [single] if single else []
         if not files:
             return Response({"detail": "Keine Bilddateien übermittelt."}, status=status.HTTP_400_BAD_REQUEST)
@@ -37,7 +48,6 @@ class DamagePhotoUploadView(views.APIView):
 
         max_size_mb = 5
         allowed_types = {"image/jpeg", "image/png", "image/webp"}
-        created = []
 
         for file_obj in files:
             if file_obj.size > max_size_mb * 1024 * 1024:
@@ -45,17 +55,17 @@ class DamagePhotoUploadView(views.APIView):
             if file_obj.content_type not in allowed_types:
                 return Response({"detail": f"{file_obj.name}: Nur JPEG, PNG oder WEBP erlaubt."}, status=status.HTTP_400_BAD_REQUEST)
 
-            photo = DamagePhoto.objects.create(report=report, image=file_obj)
-            if photo.image:
-                photo.file_url = photo.image.url
-                photo.save(update_fields=["file_url"])
-            created.append(
-                {
-                    "id": photo.id,
-                    "url": photo.file_url or (photo.image.url if photo.image else ""),
-                    "uploaded_at": photo.uploaded_at,
-                }
-            )
+        # Erst alle Dateien prüfen, dann parallel ablegen
+        photos = [DamagePhoto(report=report, image=file_obj) for file_obj in files]
+        with track("storage"):
+            await asyncio.gather(*(run_io(photo.store_image) for photo in photos))
+        for photo in photos:
+            await photo.asave()
+
+        created = [
+            {"id": photo.id, "url": photo.public_url, "uploaded_at": photo.uploaded_at}
+            for photo in await run_io(attach_photo_urls, photos)
+        ]
 
         response_data = {"uploaded": created}
         if len(created) == 1:
@@ -63,7 +73,7 @@ class DamagePhotoUploadView(views.APIView):
         return Response(response_data, status=status.HTTP_201_CREATED)
 
 
-class DamageDocumentUploadView(views.APIView):
+class DamageDocumentUploadView(AsyncAPIView):
     """
     Upload von Dokumenten zu einem bestehenden DamageReport.
     POST multipart: { documents: <file>, ... }
@@ -71,16 +81,19 @@ class DamageDocumentUploadView(views.APIView):
 
     parser_classes = [MultiPartParser, FormParser]
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [TokenBucketThrottle]
+    throttle_scope = "uploads"
 
-    def post(self, request, pk):
+    async def post(self, request, pk):
         try:
-            report = DamageReport.objects.get(pk=pk)
+            report = await DamageReport.objects.aget(pk=pk)
         except DamageReport.DoesNotExist:
             return Response({"detail": "Report nicht gefunden."}, status=status.HTTP_404_NOT_FOUND)
 
-        files = request.FILES.getlist("documents") or request.FILES.getlist("document")
+        uploads = await run_io(lambda: request.FILES)
+        files = uploads.getlist("documents") or uploads.getlist("document")
         if not files:
-            single = request.FILES.get("document")
+            single = uploads.get("document")
             files = [single] if single else []
         if not files:
             return Response({"detail": "Keine Dateien übermittelt."}, status=status.HTTP_400_BAD_REQUEST)
@@ -103,11 +116,15 @@ class DamageDocumentUploadView(views.APIView):
 
             safe_name = f"{uuid4().hex}_{file_obj.name}"
             storage_path = f"damage_docs/{date_path}/{safe_name}"
-            stored_path = default_storage.save(storage_path, file_obj)
-            file_url = default_storage.url(stored_path)
-            uploaded.append({"name": file_obj.name, "url": file_url})
-
-        report.documents = list(report.documents or []) + [item["url"] for item in uploaded]
-        report.save(update_fields=["documents"])
-
-        return Response({"uploaded": uploaded, "documents": report.documents}, status=status.HTTP_201_CREATED)
+            with track("storage"):
+                stored_path = await run_io(default_storage.save, storage_path, file_obj)
+            uploaded.append({"name": file_obj.name, "key": stored_path})
+
+        report.documents = list(report.documents or []) + [item["key"] for item in uploaded]
+        await report.asave(update_fields=["documents", "updated_at"])
+
+        links = await run_io(document_links, report.documents)
+        urls = {link["key"]: link["url"] for link in links}
+        for item in uploaded:
+            item["url"] = urls.get(item.pop("key"), "")
+        return Response({"uploaded": uploaded, "documents": [link["url"] for link in links]}, status=status.HTTP_201_CREATED)
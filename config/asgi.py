@@ -5,6 +5,17 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
+
+ASGI-Betrieb (Live-Updates im Portal per Server-Sent Events, siehe ``adminportal.utils.live``):
+
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker --workers 1
+
+Der Event-Broker lebt im Prozess; bei mehreren Workern erreichen Events nur die Clients
+desselben Workers. Unter WSGI (``config.wsgi``) laufen die Seiten unverändert, nur ohne Live-Updates.
+
+Verfügbarkeit, Uploads und Stripe sind async Views (``api.async_views``); die eigenen Middlewares
+sind sync und async fähig. Unter ASGI hält ein Upload, der auf S3 wartet, daher keinen Thread;
+Vergleich mit sync Workern: ``PERF_BENCHMARK=1 pytest perf -m perf -k concurrency``.
 """
 
 import os
@@ -0,0 +1,100 @@
+"""
+Lese-Replica für schwere, rein lesende Pfade (Exporte, Auswertungen, Zeitplan, API-Listen).
+
+Die Replica ist optional (``DATABASE_REPLICA_URL``). Gelesen wird von ihr nur innerhalb von
+``read_from_replica()`` und nur, solange der Request bzw. der Client nicht kurz zuvor geschrieben hat:
+nach einem Schreibzugriff setzt ``DatabaseRoutingMiddleware`` ein Cookie, das Lesezugriffe für
+``DATABASE_REPLICA_PIN_SECONDS`` auf die Primary pinnt (read-your-writes).
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+REPLICA_ALIAS = "replica"
+PIN_COOKIE = "db_pinned"
+
+_state = ContextVar("db_routing", default=None)
+
+
+class RoutingState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica_depth = 0
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def begin_request(pinned=False):
+    return _state.set(RoutingState(pinned=pinned))
+
+
+def end_request(token):
+    state = _state.get()
+    _state.reset(token)
+    return state
+
+
+def _current_state():
+    state = _state.get()
+    if state is None:
+        # Ausserhalb eines Requests (Commands, Tests) eigener Zustand pro Kontext
+        state = RoutingState()
+        _state.set(state)
+    return state
+
+
+@contextmanager
+def read_from_replica():
+    """Lesezugriffe im Block dürfen auf die Replica (auch als Decorator nutzbar)."""
+    state = _current_state()
+    state.replica_depth += 1
+    try:
+        yield
+    finally:
+        state.replica_depth -= 1
+
+
+def replica_view(view):
+    """
+    Decorator für Views: GET/HEAD lesen von der Replica, alles andere bleibt auf der Primary.
+    Ausnahme: das Nachladen nach einem Live-Event (``X-Requested-With: live``) – es folgt direkt auf
+    den Commit eines anderen Benutzers, eine verzögerte Replica zeigte den alten Stand, und ein
+    weiteres Event, das ihn korrigiert, kommt nicht.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD") or request.headers.get("X-Requested-With") == "live":
+            return view(request, *args, **kwargs)
+        with read_from_replica():
+            return view(request, *args, **kwargs)
+
+    return wrapper
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica_depth or state.pinned or state.wrote:
+            return None
+        if not replica_configured():
+            return None
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica ist eine Kopie der Primary, Objekte beider Verbindungen gehören zusammen
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA_ALIAS
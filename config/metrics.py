@@ -0,0 +1,314 @@
+"""
+Request-Metriken: Queries, DB-Zeit, Cache, Templates, E-Mail/Storage/PDF.
+
+Die Werte werden pro Request in einem ContextVar gesammelt (``RequestMetrics``),
+von ``config.middleware.RequestMetricsMiddleware`` als ``Server-Timing`` ausgegeben
+und stichprobenartig in einem Ringpuffer abgelegt, den das Portal anzeigt.
+"""
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import PyMemcacheCache
+from django.core.cache.backends.redis import RedisCache
+
+_current = ContextVar("request_metrics", default=None)
+_buffer_lock = threading.Lock()
+_buffer = None
+_slow_queries = {}
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\((?:\s*(?:\?|%s)\s*,?)+\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+UNRESOLVED_ROUTE = "(ohne Route)"
+
+
+def fingerprint_sql(sql):
+    """Normalisiert SQL (Literale → ?, IN-Listen zusammengefasst) und liefert (hash, normalisiert)."""
+    normalized = _STRING_LITERAL.sub("?", sql or "")
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = _WHITESPACE.sub(" ", normalized).strip()
+    digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+    return digest, normalized
+
+
+class RequestMetrics:
+    TIMED_KINDS = ("template", "email", "storage", "pdf")
+
+    def __init__(self, method="", path=""):
+        self.method = method
+        self.path = path
+        self.route = None
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.timings = {kind: 0.0 for kind in self.TIMED_KINDS}
+        self.slow_queries = []
+        self.total_ms = 0.0
+        self.status = None
+
+    def add_timing(self, kind, elapsed_ms):
+        self.timings[kind] = self.timings.get(kind, 0.0) + elapsed_ms
+
+    def record_query(self, sql, elapsed_ms):
+        self.queries += 1
+        self.db_ms += elapsed_ms
+        threshold = getattr(settings, "SLOW_QUERY_MS", 100)
+        if elapsed_ms >= threshold:
+            digest, normalized = fingerprint_sql(sql)
+            self.slow_queries.append({"fingerprint": digest, "sql": normalized[:500], "ms": round(elapsed_ms, 2)})
+
+    def finish(self, status=None):
+        self.total_ms = (time.perf_counter() - self.started) * 1000
+        self.status = status
+
+    def server_timing(self):
+        parts = [f'db;dur={self.db_ms:.1f};desc="{self.queries} queries"']
+        parts.append(f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"')
+        for kind in self.TIMED_KINDS:
+            if self.timings.get(kind):
+                parts.append(f"{kind};dur={self.timings[kind]:.1f}")
+        parts.append(f"total;dur={self.total_ms:.1f}")
+        return ", ".join(parts)
+
+    def as_dict(self):
+        return {
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "total_ms": round(self.total_ms, 2),
+            "queries": self.queries,
+            "db_ms": round(self.db_ms, 2),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            **{f"{kind}_ms": round(value, 2) for kind, value in self.timings.items()},
+            "slow_queries": list(self.slow_queries),
+            "ts": time.time(),
+        }
+
+
+def current_metrics():
+    return _current.get()
+
+
+def activate(metrics):
+    return _current.set(metrics)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+@contextmanager
+def track(kind):
+    """
+    Misst die Dauer eines Blocks für den laufenden Request.
+    Ausserhalb eines Requests (Commands, Tests) ist das ein No-op.
+    """
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.add_timing(kind, (time.perf_counter() - started) * 1000)
+
+
+def query_timer(execute, sql, params, many, context):
+    """``connection.execute_wrapper``-Hook: zählt Queries und misst DB-Zeit (ohne Request: No-op)."""
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if metrics is not None:
+            metrics.record_query(sql, (time.perf_counter() - started) * 1000)
+
+
+def _get_buffer():
+    global _buffer
+    size = getattr(settings, "REQUEST_METRICS_BUFFER_SIZE", 200)
+    if _buffer is None or _buffer.maxlen != size:
+        _buffer = deque(_buffer or [], maxlen=size)
+    return _buffer
+
+
+def should_sample():
+    rate = getattr(settings, "REQUEST_METRICS_SAMPLE_RATE", 1.0)
+    return rate >= 1 or random.random() < rate
+
+
+def store_sample(metrics):
+    sample = metrics.as_dict()
+    with _buffer_lock:
+        _get_buffer().append(sample)
+        for slow in sample["slow_queries"]:
+            entry = _slow_queries.setdefault(
+                slow["fingerprint"], {"fingerprint": slow["fingerprint"], "sql": slow["sql"], "count": 0, "max_ms": 0.0}
+            )
+            entry["count"] += 1
+            entry["max_ms"] = max(entry["max_ms"], slow["ms"])
+            entry["last_path"] = sample["path"]
+
+
+def recent_samples(limit=None):
+    with _buffer_lock:
+        samples = list(_get_buffer())
+    samples.reverse()
+    return samples[:limit] if limit else samples
+
+
+def path_summary(samples=None):
+    """
+    Aggregiert die Stichproben pro URL-Muster (Anzahl, Ø/p95 Gesamtzeit, Ø Queries, Ø DB-Zeit).
+    ``/portal/buchungen/1/`` und ``/portal/buchungen/2/`` landen so in einer Zeile; nicht
+    aufgelöste Pfade (404) werden zusammengefasst, statt pro gescannter URL eine Zeile zu belegen.
+    """
+    grouped = {}
+    for sample in samples if samples is not None else recent_samples():
+        grouped.setdefault((sample["method"], sample.get("route") or UNRESOLVED_ROUTE), []).append(sample)
+    rows = []
+    for (method, route), items in grouped.items():
+        totals = sorted(item["total_ms"] for item in items)
+        p95_index = max(0, int(round(0.95 * len(totals))) - 1)
+        rows.append(
+            {
+                "method": method,
+                "route": route,
+                "count": len(items),
+                "avg_ms": round(sum(totals) / len(totals), 1),
+                "p95_ms": round(totals[p95_index], 1),
+                "avg_queries": round(sum(item["queries"] for item in items) / len(items), 1),
+                "avg_db_ms": round(sum(item["db_ms"] for item in items) / len(items), 1),
+                "avg_template_ms": round(sum(item["template_ms"] for item in items) / len(items), 1),
+                "avg_pdf_ms": round(sum(item["pdf_ms"] for item in items) / len(items), 1),
+                "avg_email_ms": round(sum(item["email_ms"] for item in items) / len(items), 1),
+            }
+        )
+    rows.sort(key=lambda row: row["p95_ms"], reverse=True)
+    return rows
+
+
+def route_of(request):
+    """URL-Muster des aufgelösten Views (``/portal/buchungen/<int:pk>/``), sonst ``None``."""
+    match = getattr(request, "resolver_match", None)
+    return f"/{match.route}" if match is not None else None
+
+
+def slow_query_summary(limit=20):
+    with _buffer_lock:
+        entries = [dict(entry) for entry in _slow_queries.values()]
+    entries.sort(key=lambda e: (e["count"], e["max_ms"]), reverse=True)
+    return entries[:limit]
+
+
+def reset_samples():
+    with _buffer_lock:
+        _get_buffer().clear()
+        _slow_queries.clear()
+
+
+_template_patch_installed = False
+
+
+def install_template_timing():
+    """Misst Template-Renderzeit am Backend-Template (einmal pro render()/render_to_string)."""
+    global _template_patch_installed
+    if _template_patch_installed:
+        return
+    from django.template.backends.django import Template as BackendTemplate
+
+    original_render = BackendTemplate.render
+
+    def timed_render(self, context=None, request=None):
+        with track("template"):
+            return original_render(self, context=context, request=request)
+
+    BackendTemplate.render = timed_render
+    _template_patch_installed = True
+
+
+def _add_query_timer(connection, **kwargs):
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+def install_query_timing():
+    """
+    Hängt ``query_timer`` dauerhaft an jede Verbindung (auch an die der Worker-Threads, in denen
+    async Views ihre ORM-Aufrufe ausführen); gezählt wird über den ContextVar des Requests.
+    """
+    from django.db import connections
+    from django.db.backends.signals import connection_created
+
+    connection_created.connect(_add_query_timer, dispatch_uid="request_metrics.query_timer")
+    for connection in connections.all(initialized_only=True):
+        _add_query_timer(connection)
+
+
+class CacheMetricsMixin:
+    """Zählt Treffer/Fehlschläge des Cache-Backends im laufenden Request."""
+
+    _missing = object()
+
+    @staticmethod
+    def _count(hits=0, misses=0):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.cache_hits += hits
+            metrics.cache_misses += misses
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self._missing, version=version)
+        if value is self._missing:
+            self._count(misses=1)
+            return default
+        self._count(hits=1)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        # BaseCache.get_many ruft get() pro Schlüssel auf – hier nur einmal für alle zählen
+        token = _current.set(None)
+        try:
+            values = super().get_many(keys, version=version)
+        finally:
+            _current.reset(token)
+        self._count(hits=len(values), misses=len(keys) - len(values))
+        return values
+
+    def get_or_set(self, key, default, timeout=DEFAULT_TIMEOUT, version=None):
+        # Wie BaseCache.get_or_set, aber ein Fehlschlag zählt nicht zusätzlich als Treffer
+        value = self.get(key, self._missing, version=version)
+        if value is self._missing:
+            if callable(default):
+                default = default()
+            self.add(key, default, timeout=timeout, version=version)
+            return super().get(key, default, version=version)
+        return value
+
+
+class InstrumentedLocMemCache(CacheMetricsMixin, LocMemCache):
+    """LocMemCache mit Request-Metriken (Standard, pro Prozess)."""
+
+
+class InstrumentedRedisCache(CacheMetricsMixin, RedisCache):
+    """RedisCache mit Request-Metriken (geteilt zwischen Workern, Paket ``redis``)."""
+
+
+class InstrumentedPyMemcacheCache(CacheMetricsMixin, PyMemcacheCache):
+    """PyMemcacheCache mit Request-Metriken (geteilt zwischen Workern, Paket ``pymemcache``)."""
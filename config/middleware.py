@@ -1,4 +1,29 @@
+import logging
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
 from django.http import HttpResponsePermanentRedirect
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import db_router
+from . import metrics as request_metrics
+
+try:  # optional, sonst nur gzip
+    import brotli
+except ImportError:  # pragma: no cover - abhängig von der Installation
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+metrics_logger = logging.getLogger("metrics")
+
+ACCEPTS_BROTLI = re.compile(r"\bbr\b")
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
 
 class WwwRedirectMiddleware:
     def __init__(self, get_response):
@@ -11,4 +36,215 @@ class WwwRedirectMiddleware:
             new_url = "https://www.roberts-lackwerk.ch" + request.get_full_path()
             return HttpResponsePermanentRedirect(new_url)
 
-        return self.get_response(request)
\ No newline at end of file
+        return self.get_response(request)
+
+
+class RequestMetricsMiddleware:
+    """
+    Sammelt pro Request Query-Anzahl, DB-Zeit, Cache-Treffer sowie Template-,
+    E-Mail-, Storage- und PDF-Zeiten. Ausgabe als Server-Timing-Header und
+    strukturierte Log-Zeile; Stichproben landen im Ringpuffer fürs Portal.
+
+    Sync und async: unter ASGI hält die Middleware für async Views keinen Thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, "REQUEST_METRICS_ENABLED", True)
+        if self.enabled:
+            request_metrics.install_template_timing()
+            request_metrics.install_query_timing()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        metrics = request_metrics.RequestMetrics(method=request.method, path=request.path)
+        token = request_metrics.activate(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            request_metrics.deactivate(token)
+        return self._finish(request, metrics, response)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        metrics = request_metrics.RequestMetrics(method=request.method, path=request.path)
+        token = request_metrics.activate(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_metrics.deactivate(token)
+        return self._finish(request, metrics, response)
+
+    def _finish(self, request, metrics, response):
+        metrics.route = request_metrics.route_of(request)
+        metrics.finish(status=response.status_code)
+        response["Server-Timing"] = metrics.server_timing()
+        self._log(metrics)
+        if request_metrics.should_sample():
+            request_metrics.store_sample(metrics)
+        return response
+
+    def _log(self, metrics):
+        fields = metrics.as_dict()
+        fields.pop("ts", None)
+        slow = fields.pop("slow_queries")
+        metrics_logger.info(
+            "%s %s status=%s total_ms=%.1f queries=%d db_ms=%.1f cache_hits=%d cache_misses=%d",
+            metrics.method,
+            metrics.path,
+            metrics.status,
+            metrics.total_ms,
+            metrics.queries,
+            metrics.db_ms,
+            metrics.cache_hits,
+            metrics.cache_misses,
+            extra={"request_metrics": fields},
+        )
+        for entry in slow:
+            metrics_logger.warning(
+                "Langsame Query %s (%.1f ms) auf %s: %s",
+                entry["fingerprint"],
+                entry["ms"],
+                metrics.path,
+                entry["sql"],
+                extra={"slow_query": entry},
+            )
+
+
+class DatabaseRoutingMiddleware:
+    """
+    Hält den Routing-Zustand pro Request (``config.db_router``). Hat der Request geschrieben,
+    werden Lesezugriffe des Clients per Cookie kurz auf die Primary gepinnt.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, "DATABASE_REPLICA_PIN_SECONDS", 15)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = db_router.begin_request(pinned=bool(request.COOKIES.get(db_router.PIN_COOKIE)))
+        try:
+            response = self.get_response(request)
+        finally:
+            state = db_router.end_request(token)
+        return self._pin(request, response, state)
+
+    async def __acall__(self, request):
+        token = db_router.begin_request(pinned=bool(request.COOKIES.get(db_router.PIN_COOKIE)))
+        try:
+            response = await self.get_response(request)
+        finally:
+            state = db_router.end_request(token)
+        return self._pin(request, response, state)
+
+    def _pin(self, request, response, state):
+        if state.wrote and db_router.replica_configured():
+            response.set_cookie(
+                db_router.PIN_COOKIE,
+                "1",
+                max_age=self.pin_seconds,
+                httponly=True,
+                samesite="Lax",
+                secure=request.is_secure(),
+            )
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise, zusätzlich async-fähig: WhiteNoise selbst ist nur sync und würde unter ASGI jeden
+    Request (auch async Views) für die ganze Dauer an einen Thread binden.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class JSONCompressionMiddleware:
+    """
+    Komprimiert JSON-Antworten (API) mit Brotli oder gzip, je nach ``Accept-Encoding``.
+    HTML bleibt unkomprimiert (CSRF-Token, BREACH); statische Dateien liefert WhiteNoise bereits
+    vorkomprimiert aus. Starke ETags werden wie bei Djangos ``GZipMiddleware`` abgeschwächt.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_length = getattr(settings, "JSON_COMPRESSION_MIN_BYTES", 512)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if (
+            response.streaming
+            or response.has_header("Content-Encoding")
+            or not response.get("Content-Type", "").startswith("application/json")
+        ):
+            return response
+        content = response.content
+        if len(content) < self.min_length:
+            return response
+        patch_vary_headers(response, ("Accept-Encoding",))
+        accepted = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if brotli is not None and ACCEPTS_BROTLI.search(accepted):
+            compressed, encoding = brotli.compress(content, quality=5), "br"
+        elif ACCEPTS_GZIP.search(accepted):
+            compressed, encoding = compress_string(content), "gzip"
+        else:
+            return response
+        if len(compressed) >= len(content):
+            return response
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
@@ -59,13 +59,64 @@ SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 LOGIN_RATE_LIMIT = int(os.getenv("LOGIN_RATE_LIMIT", "5"))
 LOGIN_RATE_WINDOW = int(os.getenv("LOGIN_RATE_WINDOW", "900"))
 
-# Cache (für Rate Limiting)
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "roberts-lackwerk",
+# Cache (Rate Limiting, Throttling, Seiten-/Rollen-Cache); zählt Treffer/Fehlschläge für die Request-Metriken.
+# Ohne CACHE_URL (bzw. REDIS_URL des Heroku-Add-ons) LocMem pro Prozess: mehrere Gunicorn-Worker teilen
+# dann weder Buckets noch Invalidierungen. redis://… braucht das Paket ``redis``, memcached://host:port
+# das Paket ``pymemcache``.
+CACHE_URL = os.getenv("CACHE_URL") or os.getenv("REDIS_URL", "")
+SHARED_CACHE = bool(CACHE_URL)
+if CACHE_URL.startswith(("redis://", "rediss://")):
+    CACHES = {"default": {"BACKEND": "config.metrics.InstrumentedRedisCache", "LOCATION": CACHE_URL}}
+elif CACHE_URL.startswith("memcached://"):
+    CACHES = {
+        "default": {
+            "BACKEND": "config.metrics.InstrumentedPyMemcacheCache",
+            "LOCATION": CACHE_URL.removeprefix("memcached://"),
+        }
     }
-}
+elif CACHE_URL:
+    raise ValueError(f"CACHE_URL nicht unterstützt: {CACHE_URL}")
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "config.metrics.InstrumentedLocMemCache",
+            "LOCATION": "roberts-lackwerk",
+        }
+    }
+
+# Request-Metriken (Server-Timing, Log-Felder, Ringpuffer im Portal)
+REQUEST_METRICS_ENABLED = os.getenv("REQUEST_METRICS_ENABLED", "True") == "True"
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv("REQUEST_METRICS_SAMPLE_RATE", "1.0"))
+REQUEST_METRICS_BUFFER_SIZE = int(os.getenv("REQUEST_METRICS_BUFFER_SIZE", "200"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+# Seiten-/Fragment-Cache für öffentliche Seiten. Der LocMem-Cache ist pro Prozess, Invalidierung
+# per Versionsschlüssel greift daher sofort nur im schreibenden Worker – Timeout entsprechend kurz halten.
+PUBLIC_PAGE_CACHE_SECONDS = int(os.getenv("PUBLIC_PAGE_CACHE_SECONDS", "300"))
+PUBLIC_PAGE_MAX_AGE = int(os.getenv("PUBLIC_PAGE_MAX_AGE", "60"))
+PUBLIC_PAGE_S_MAXAGE = int(os.getenv("PUBLIC_PAGE_S_MAXAGE", "300"))
+
+# Rollen (Gruppen) pro Benutzer im Cache, siehe main.utils.roles. Nur mit geteiltem Cache, sonst
+# würde eine Invalidierung die übrigen Worker nicht erreichen (0 = nur pro Request merken).
+ROLE_CACHE_SECONDS = int(os.getenv("ROLE_CACHE_SECONDS", "300" if SHARED_CACHE else "0"))
+
+# Mietablauf: Zustand im signierten Cookie (main.utils.booking_flow)
+BOOKING_FLOW_MAX_AGE = int(os.getenv("BOOKING_FLOW_MAX_AGE", str(60 * 60 * 2)))
+
+# iCal-Feeds (adminportal.utils.ical): ICAL_FEED_KEY ändern sperrt alle verteilten Feed-URLs
+ICAL_FEED_KEY = os.getenv("ICAL_FEED_KEY", "")
+ICAL_UID_DOMAIN = os.getenv("ICAL_UID_DOMAIN", "roberts-lackwerk.ch")
+ICAL_FEED_MAX_AGE = int(os.getenv("ICAL_FEED_MAX_AGE", "300"))
+
+# Live-Updates im Portal per Server-Sent Events (adminportal.utils.live, nur unter ASGI)
+LIVE_STREAM_MAX_SECONDS = int(os.getenv("LIVE_STREAM_MAX_SECONDS", "300"))
+LIVE_HEARTBEAT_SECONDS = int(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+LIVE_RETRY_MS = int(os.getenv("LIVE_RETRY_MS", "3000"))
+
+# Änderungs-Feed der API (api.changes)
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "500"))
+SYNC_LAG_SECONDS = float(os.getenv("SYNC_LAG_SECONDS", "2"))
+SYNC_TOMBSTONE_DAYS = int(os.getenv("SYNC_TOMBSTONE_DAYS", "30"))
 
 # Application definition
 
@@ -90,7 +141,10 @@ if os.getenv("AWS_STORAGE_BUCKET_NAME"):
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "config.middleware.JSONCompressionMiddleware",
+    "config.middleware.RequestMetricsMiddleware",
+    "config.middleware.DatabaseRoutingMiddleware",
+    "config.middleware.StaticFilesMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -140,6 +194,14 @@ else:
         }
     }
 
+# Optionale Lese-Replica für Exporte, Auswertungen und API-Listen (siehe config/db_router.py)
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+if DATABASE_REPLICA_URL:
+    DATABASES["replica"] = dj_database_url.parse(DATABASE_REPLICA_URL, conn_max_age=600, ssl_require=True)
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+DATABASE_ROUTERS = ["config.db_router.PrimaryReplicaRouter"]
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv("DATABASE_REPLICA_PIN_SECONDS", "15"))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -200,6 +262,8 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # Media / Uploads
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+# Thread-Pool für Storage-/Stripe-Aufrufe aus async Views (main.utils.aio)
+IO_THREAD_POOL_SIZE = int(os.getenv("IO_THREAD_POOL_SIZE", "16"))
 
 if os.getenv("AWS_STORAGE_BUCKET_NAME"):
     AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
@@ -210,6 +274,9 @@ if os.getenv("AWS_STORAGE_BUCKET_NAME"):
     AWS_S3_CUSTOM_DOMAIN = os.getenv("AWS_S3_CUSTOM_DOMAIN") or None
     AWS_S3_FORCE_PATH_STYLE = os.getenv("AWS_S3_FORCE_PATH_STYLE", "False") == "True"
     AWS_QUERYSTRING_AUTH = os.getenv("AWS_QUERYSTRING_AUTH", "True") == "True"
+    AWS_QUERYSTRING_EXPIRE = int(os.getenv("AWS_QUERYSTRING_EXPIRE", "3600"))
+    # Signierte URLs werden bis MEDIA_URL_REFRESH_MARGIN Sekunden vor Ablauf aus dem Cache bedient
+    MEDIA_URL_REFRESH_MARGIN = int(os.getenv("MEDIA_URL_REFRESH_MARGIN", "300"))
     AWS_DEFAULT_ACL = None
     AWS_S3_FILE_OVERWRITE = False
     AWS_S3_OBJECT_PARAMETERS = {"CacheControl": "86400"}
@@ -235,6 +302,7 @@ LOGGING = {
         "django": {"handlers": ["console"], "level": "INFO"},
         # Unser App-Logger:
         "schaden": {"handlers": ["console"], "level": "DEBUG", "propagate": False},
+        "metrics": {"handlers": ["console"], "level": os.getenv("METRICS_LOG_LEVEL", "INFO"), "propagate": False},
     },
 }
 
@@ -247,6 +315,34 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
+    # orjson (optional) beschleunigt grosse Listen; ohne orjson identisch zum Standard-Renderer
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    # Anzahl vertrauenswürdiger Proxies vor der App (Heroku-Router: 1). Die Client-IP fürs Throttling
+    # ist dann der vom letzten Proxy angehängte X-Forwarded-For-Eintrag, nicht der vom Client gesetzte.
+    "NUM_PROXIES": int(os.getenv("NUM_PROXIES", "0" if DEBUG else "1")),
+}
+
+# Bedingte GETs/Kompression der API (api.conditional, config.middleware.JSONCompressionMiddleware)
+META_OPTIONS_MAX_AGE = int(os.getenv("META_OPTIONS_MAX_AGE", str(60 * 60 * 24)))
+JSON_COMPRESSION_MIN_BYTES = int(os.getenv("JSON_COMPRESSION_MIN_BYTES", "512"))
+
+# Token-Bucket-Throttling öffentlicher API-Endpunkte (api.throttling): Nachfüllrate und Burst pro Scope
+API_THROTTLES = {
+    "availability": {
+        "rate": os.getenv("THROTTLE_AVAILABILITY_RATE", "60/min"),
+        "burst": int(os.getenv("THROTTLE_AVAILABILITY_BURST", "20")),
+    },
+    "uploads": {
+        "rate": os.getenv("THROTTLE_UPLOADS_RATE", "60/hour"),
+        "burst": int(os.getenv("THROTTLE_UPLOADS_BURST", "10")),
+    },
+    "writes": {
+        "rate": os.getenv("THROTTLE_WRITES_RATE", "20/hour"),
+        "burst": int(os.getenv("THROTTLE_WRITES_BURST", "5")),
+    },
 }
 
 _raw_cors = os.getenv("CORS_ALLOWED_ORIGINS", "")
@@ -265,6 +361,9 @@ SERVER_EMAIL = CONTACT_EMAIL
 STRIPE_PUBLIC_KEY = os.getenv("STRIPE_PUBLIC_KEY", "")
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "")
 STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+# "fake": Stripe-Nachbildung im Prozess für Tests/Lasttests (api.stripe_gateway), nie in Produktion
+STRIPE_BACKEND = os.getenv("STRIPE_BACKEND", "stripe")
+STRIPE_INTENT_CACHE_SECONDS = int(os.getenv("STRIPE_INTENT_CACHE_SECONDS", "300"))
 
 # SMTP / Mail
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
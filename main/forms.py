@@ -3,6 +3,8 @@ from django import forms
 import logging
 import re
 
+from api.validators import clean_plate, clean_vin
+
 from .models import CAR_PART_CHOICES, TIME_SLOTS, INSURER_CHOICES, INSURER_OTHER, INSURER_NO, Booking, DAMAGE_PART_CODES, DAMAGED_PART_CHOICES
 
 class MultipleFileInput(forms.ClearableFileInput):
@@ -90,20 +92,10 @@ class CarDetailsForm(forms.Form):
     )
 
     def clean_plate(self):
-        plate = (self.cleaned_data.get("plate") or "").strip().upper()
-        match = re.match(r"^(?P<canton>[A-Z]{2})\s?(?P<number>\d{1,6})$", plate)
-        if not match:
-            raise forms.ValidationError("Kontrollschild muss dem Format 'ZH123456' oder 'ZH 123456' entsprechen.")
-        return f"{match.group('canton')}{match.group('number')}"
+        return clean_plate(self.cleaned_data.get("plate"))
 
     def clean_vin(self):
-        vin = (self.cleaned_data.get("vin") or "").strip()
-        if not vin:
-            return vin
-        digits = re.sub(r"\D", "", vin)
-        if len(digits) != 9:
-            raise forms.ValidationError("Stammnummer muss 9-stellig sein (z.B. 123.456.789).")
-        return f"{digits[:3]}.{digits[3:6]}.{digits[6:]}"
+        return clean_vin(self.cleaned_data.get("vin"))
 
     def clean_type_certificate_number(self):
         num = (self.cleaned_data.get("type_certificate_number") or "").strip()
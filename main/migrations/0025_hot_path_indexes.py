@@ -0,0 +1,62 @@
+# Generated by Django 4.2.23 on 2026-10-19 12:10
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0024_vehicle_half_day_rate_transporter_halbtag'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', '-date'], name='booking_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['pickup_date'], name='booking_pickup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['return_date'], name='booking_return_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['vehicle', 'pickup_date'], name='booking_vehicle_pickup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(django.db.models.functions.text.Upper('customer_email'), name='booking_email_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'confirmed', 'active'])), fields=['date', 'transporter'], name='booking_open_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='damagereport',
+            index=models.Index(fields=['-created_at'], name='damage_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='damagereport',
+            index=models.Index(fields=['status', '-created_at'], name='damage_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='damagereport',
+            index=models.Index(fields=['insurer'], name='damage_insurer_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='damagereport',
+            index=models.Index(fields=['damage_type'], name='damage_type_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='damagereport',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='damage_email_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='damagereport',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'in_progress'])), fields=['-created_at'], name='damage_open_created_idx'),
+        ),
+    ]
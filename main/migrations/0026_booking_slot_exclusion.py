@@ -0,0 +1,50 @@
+from django.db import migrations
+
+# Vormittag = [0,1), Nachmittag = [1,2), Ganzer Tag = [0,2): überlappende Slots desselben
+# Transporters am selben Tag schliessen sich aus (stornierte Buchungen ausgenommen).
+SLOT_RANGE = (
+    "int4range("
+    "CASE WHEN time_slot = 'AFTERNOON' THEN 1 ELSE 0 END, "
+    "CASE WHEN time_slot = 'MORNING' THEN 1 ELSE 2 END)"
+)
+
+CONFLICTS_SQL = f"""
+    SELECT a.id, b.id FROM main_booking a
+    JOIN main_booking b
+      ON a.transporter_id = b.transporter_id AND a.date = b.date AND a.id < b.id
+    WHERE a.status <> 'cancelled' AND b.status <> 'cancelled'
+      AND {SLOT_RANGE.replace("time_slot", "a.time_slot")} && {SLOT_RANGE.replace("time_slot", "b.time_slot")}
+    LIMIT 20
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0025_hot_path_indexes"),
+    ]
+
+    def _add_constraint(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            # SQLite (lokal/Tests): Überlappungen prüft weiterhin validate_booking_conflict
+            return
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(CONFLICTS_SQL)
+            conflicts = cursor.fetchall()
+        if conflicts:
+            pairs = ", ".join(f"BU-{a}/BU-{b}" for a, b in conflicts)
+            raise RuntimeError(f"Überlappende Buchungen vorhanden, bitte zuerst bereinigen: {pairs}")
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        schema_editor.execute(
+            "ALTER TABLE main_booking ADD CONSTRAINT booking_slot_no_overlap "
+            f"EXCLUDE USING gist (transporter_id WITH =, date WITH =, ({SLOT_RANGE}) WITH &&) "
+            "WHERE (status <> 'cancelled')"
+        )
+
+    def _drop_constraint(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        schema_editor.execute("ALTER TABLE main_booking DROP CONSTRAINT IF EXISTS booking_slot_no_overlap")
+
+    operations = [
+        migrations.RunPython(_add_constraint, _drop_constraint),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.23 on 2026-10-19 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0026_booking_slot_exclusion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='damagephoto',
+            name='phash',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='damagephoto',
+            name='phash_0',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='damagephoto',
+            name='phash_1',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='damagephoto',
+            name='phash_2',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='damagephoto',
+            name='phash_3',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='damagephoto',
+            index=models.Index(fields=['phash_0'], name='damagephoto_phash0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='damagephoto',
+            index=models.Index(fields=['phash_1'], name='damagephoto_phash1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='damagephoto',
+            index=models.Index(fields=['phash_2'], name='damagephoto_phash2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='damagephoto',
+            index=models.Index(fields=['phash_3'], name='damagephoto_phash3_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0027_damagephoto_phash"),
+    ]
+
+    def _copy_created_at(apps, schema_editor):
+        DamageReport = apps.get_model("main", "DamageReport")
+        DamageReport.objects.update(updated_at=F("created_at"))
+
+    def _noop(apps, schema_editor):
+        pass
+
+    operations = [
+        migrations.AddField(
+            model_name="damagereport",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(_copy_created_at, _noop),
+    ]
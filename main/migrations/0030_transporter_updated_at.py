@@ -0,0 +1,20 @@
+# Generated by Django 4.2.23 on 2026-10-19 14:10
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0029_sync_updated_at_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transporter',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0030_transporter_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='payment_intent_amount',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='payment_intent_currency',
+            field=models.CharField(blank=True, default='', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='payment_intent_id',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
@@ -0,0 +1,62 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# Belegung als Halbtage seit 2000-01-01: Tag d = [2d, 2d+2), Vormittag [2d, 2d+1), Nachmittag
+# [2d+1, 2d+2). Mehrtägige Mieten (Rückgabe nach Abholung) belegen alle Tage ganz – wie
+# ``booking_range_conflict_exists``. Ersetzt ``booking_slot_no_overlap`` (nur gleicher Tag).
+HALFDAY_RANGE = (
+    "CASE WHEN {t}pickup_date IS NOT NULL AND {t}return_date > {t}pickup_date "
+    "THEN int4range(({t}pickup_date - DATE '2000-01-01') * 2, ({t}return_date - DATE '2000-01-01') * 2 + 2) "
+    "ELSE int4range("
+    "({t}date - DATE '2000-01-01') * 2 + CASE WHEN {t}time_slot = 'AFTERNOON' THEN 1 ELSE 0 END, "
+    "({t}date - DATE '2000-01-01') * 2 + CASE WHEN {t}time_slot = 'MORNING' THEN 1 ELSE 2 END) END"
+)
+
+CONFLICTS_SQL = f"""
+    SELECT a.id, b.id FROM main_booking a
+    JOIN main_booking b ON a.transporter_id = b.transporter_id AND a.id < b.id
+    WHERE a.status <> 'cancelled' AND b.status <> 'cancelled'
+      AND ({HALFDAY_RANGE.format(t="a.")}) && ({HALFDAY_RANGE.format(t="b.")})
+    LIMIT 20
+"""
+
+
+def _previous():
+    return import_module("main.migrations.0026_booking_slot_exclusion")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0031_booking_payment_intent"),
+    ]
+
+    def _add_constraint(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute(CONFLICTS_SQL)
+            conflicts = cursor.fetchall()
+        if conflicts:
+            pairs = ", ".join(f"BU-{a}/BU-{b}" for a, b in conflicts)
+            raise RuntimeError(f"Überlappende Buchungen vorhanden, bitte zuerst bereinigen: {pairs}")
+        schema_editor.execute("ALTER TABLE main_booking DROP CONSTRAINT IF EXISTS booking_slot_no_overlap")
+        schema_editor.execute(
+            "ALTER TABLE main_booking ADD CONSTRAINT booking_halfday_no_overlap "
+            f"EXCLUDE USING gist (transporter_id WITH =, ({HALFDAY_RANGE.format(t='')}) WITH &&) "
+            "WHERE (status <> 'cancelled')"
+        )
+
+    def _restore_slot_constraint(apps, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        schema_editor.execute("ALTER TABLE main_booking DROP CONSTRAINT IF EXISTS booking_halfday_no_overlap")
+        schema_editor.execute(
+            "ALTER TABLE main_booking ADD CONSTRAINT booking_slot_no_overlap "
+            f"EXCLUDE USING gist (transporter_id WITH =, date WITH =, ({_previous().SLOT_RANGE}) WITH &&) "
+            "WHERE (status <> 'cancelled')"
+        )
+
+    operations = [
+        migrations.RunPython(_add_constraint, _restore_slot_constraint),
+    ]
@@ -1,6 +1,13 @@
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Upper
 from django.utils import timezone
 
+from PIL import Image
+
+from main.utils.media import signed_url, storage_key
+from main.utils.phash import dhash, hash_fields
+
 # -----------------------------
 # Schaden melden (DamageReport)
 # -----------------------------
@@ -123,6 +130,12 @@ class Vehicle(models.Model):
     next_service = models.DateField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=VEHICLE_STATUSES, default="available")
     photo = models.ImageField(upload_to="vehicle_photos/%Y/%m/%d/", null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="vehicle_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.brand} {self.model} ({self.license_plate})"
@@ -158,8 +171,14 @@ class Invoice(models.Model):
     notes = models.TextField(blank=True)
     public_notes = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     sent_at = models.DateTimeField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="invoice_updated_idx"),
+        ]
+
     def __str__(self):
         return f"Rechnung {self.invoice_number or self.id} ({self.customer})"
 
@@ -267,6 +286,23 @@ class DamageReport(models.Model):
     assigned_mechanic = models.CharField("Zugewiesener Mechaniker", max_length=120, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-created_at"], name="damage_created_idx"),
+            models.Index(fields=["status", "-created_at"], name="damage_status_created_idx"),
+            models.Index(fields=["insurer"], name="damage_insurer_idx"),
+            models.Index(fields=["updated_at", "id"], name="damage_updated_idx"),
+            models.Index(fields=["damage_type"], name="damage_type_idx"),
+            # iexact-Lookups (Kundendetail, DSGVO, Kundenkonto) laufen auf Postgres über UPPER(email)
+            models.Index(Upper("email"), name="damage_email_upper_idx"),
+            models.Index(
+                fields=["-created_at"],
+                name="damage_open_created_idx",
+                condition=Q(status__in=["pending", "in_progress"]),
+            ),
+        ]
 
 
 class DamagePhoto(models.Model):
@@ -278,8 +314,15 @@ class DamagePhoto(models.Model):
         verbose_name="Zugehöriger Report",
     )
     image       = models.ImageField(upload_to="damage_photos/%Y/%m/%d/")
+    # Veraltet: früher gespeicherte (ablaufende) URL, wird von backfill_media_keys geleert
     file_url    = models.URLField(blank=True, default="")
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Perzeptueller Hash (dHash) und seine 16-Bit-Blöcke für die Duplikatsuche (main.utils.phash)
+    phash   = models.BigIntegerField(null=True, blank=True)
+    phash_0 = models.IntegerField(null=True, blank=True)
+    phash_1 = models.IntegerField(null=True, blank=True)
+    phash_2 = models.IntegerField(null=True, blank=True)
+    phash_3 = models.IntegerField(null=True, blank=True)
 
     def __str__(self):
         display = getattr(self.report, "display_name", None) or f"{(self.report.first_name or '').strip()} {(self.report.last_name or '').strip()}".strip()
@@ -287,18 +330,50 @@ class DamagePhoto(models.Model):
 
     @property
     def public_url(self):
-        """Gibt eine nutzbare URL zurück (S3 oder lokal)."""
-        if self.file_url:
-            return self.file_url
-        if self.image:
+        """Gibt eine nutzbare URL zurück (S3 signiert oder lokal), gecacht über main.utils.media."""
+        cached = getattr(self, "_signed_url", None)
+        if cached is None:
+            key = self.image.name if self.image else storage_key(self.file_url)
+            cached = self._signed_url = signed_url(key)
+        return cached
+
+    def compute_phash(self):
+        """Berechnet den Hash aus der Bilddatei; nicht lesbare Bilder bleiben ohne Hash."""
+        try:
+            self.image.open("rb")
             try:
-                return self.image.url
-            except Exception:
-                return ""
-        return ""
+                value = dhash(self.image)
+            finally:
+                self.image.seek(0)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            return False
+        for field, field_value in hash_fields(value).items():
+            setattr(self, field, field_value)
+        return True
+
+    def store_image(self):
+        """
+        Hash berechnen und Datei ablegen, ohne DB-Zugriff (async Upload: läuft im I/O-Pool,
+        gespeichert wird danach mit ``asave``).
+        """
+        if self.phash is None:
+            self.compute_phash()
+        self.image.save(self.image.name, self.image.file, save=False)
+
+    def save(self, *args, **kwargs):
+        # Beim Hochladen liegt die Datei noch im Speicher – Hash vor dem Ablegen berechnen
+        if self._state.adding and self.phash is None and self.image and not self.image._committed:
+            self.compute_phash()
+        return super().save(*args, **kwargs)
 
     class Meta:
         ordering = ["-uploaded_at"]
+        indexes = [
+            models.Index(fields=["phash_0"], name="damagephoto_phash0_idx"),
+            models.Index(fields=["phash_1"], name="damagephoto_phash1_idx"),
+            models.Index(fields=["phash_2"], name="damagephoto_phash2_idx"),
+            models.Index(fields=["phash_3"], name="damagephoto_phash3_idx"),
+        ]
 
 
 # -----------------------------
@@ -348,6 +423,7 @@ class Transporter(models.Model):
         null=True,
         help_text="Verfügbare Buchungsoption"
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.name} ({self.kennzeichen})"
@@ -435,9 +511,42 @@ class Booking(models.Model):
     payment_method = models.CharField(max_length=10, choices=PAYMENT_METHOD_CHOICES, default="CASH")
     payment_status = models.CharField(max_length=10, choices=PAYMENT_STATUS_CHOICES, default="unpaid")
     transaction_id = models.CharField(max_length=100, blank=True)
+    # Zuletzt für diese Buchung erzeugter Stripe-PaymentIntent (api.stripe_gateway)
+    payment_intent_id = models.CharField(max_length=255, blank=True, default="")
+    payment_intent_amount = models.PositiveIntegerField(null=True, blank=True)
+    payment_intent_currency = models.CharField(max_length=3, blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ("transporter", "date", "time_slot")
-        indexes = [models.Index(fields=["transporter", "date"])]
+        indexes = [
+            models.Index(fields=["transporter", "date"]),
+            models.Index(fields=["status", "-date"], name="booking_status_date_idx"),
+            models.Index(fields=["pickup_date"], name="booking_pickup_idx"),
+            models.Index(fields=["return_date"], name="booking_return_idx"),
+            models.Index(fields=["vehicle", "pickup_date"], name="booking_vehicle_pickup_idx"),
+            models.Index(fields=["updated_at", "id"], name="booking_updated_idx"),
+            models.Index(Upper("customer_email"), name="booking_email_upper_idx"),
+            models.Index(
+                fields=["date", "transporter"],
+                name="booking_open_date_idx",
+                condition=Q(status__in=["pending", "confirmed", "active"]),
+            ),
+        ]
+
+
+class Tombstone(models.Model):
+    """Gelöschter Datensatz für den Änderungs-Feed der API (``api.changes``)."""
+
+    resource = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["resource", "deleted_at"], name="tombstone_resource_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.resource}#{self.object_id}"
@@ -0,0 +1,45 @@
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from main.models import Transporter, Vehicle
+from main.utils.page_cache import invalidate_public_content
+from main.utils.roles import invalidate_all_roles, invalidate_user_roles
+
+
+@receiver(post_save, sender=Transporter)
+@receiver(post_delete, sender=Transporter)
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+@receiver(post_save, sender="adminportal.PortalSettings")
+@receiver(post_delete, sender="adminportal.PortalSettings")
+def public_content_changed(sender, **kwargs):
+    invalidate_public_content()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def group_membership_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == "pre_clear":
+        # group.user_set.clear(): betroffene Benutzer sind danach nicht mehr ermittelbar
+        instance._cleared_user_ids = list(instance.user_set.values_list("pk", flat=True))
+    elif action in ("post_add", "post_remove", "post_clear"):
+        if not reverse:
+            invalidate_user_roles([instance.pk])
+        elif action == "post_clear":
+            invalidate_user_roles(getattr(instance, "_cleared_user_ids", []))
+        else:
+            invalidate_user_roles(pk_set or [])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, created=False, **kwargs):
+    # Neue Benutzer können die ID eines gelöschten erhalten (z. B. SQLite) – keine alten Rollen übernehmen
+    if created or kwargs.get("signal") is post_delete:
+        invalidate_user_roles([instance.pk])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, **kwargs):
+    invalidate_all_roles()
@@ -1,14 +1,26 @@
+import io
+import tempfile
+from unittest import mock
 from decimal import Decimal
-from django.test import TestCase, Client, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageDraw
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client, RequestFactory, override_settings
 from django.urls import reverse
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core import mail
 
-from main.models import Transporter, Booking, DamageReport
+from main.models import Transporter, Booking, DamageReport, DamagePhoto
 from api.validators import validate_booking_conflict
 from main.utils.emailing import send_templated_mail
 from main.utils.pdf import render_booking_invoice_pdf
+from main.utils.booking_flow import BookingFlow
+from main.utils.media import document_links
+from main.utils.phash import near_duplicates
+from main.utils.roles import has_any_role, is_staff_member
 from adminportal.models import PortalSettings, Invoice as PortalInvoice, Customer as PortalCustomer
 
 
@@ -27,7 +39,7 @@ class MietfahrzeugeViewTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertContains(resp, "Bitte Abholdatum und Zeitblock auswählen.")
 
-    def test_valid_post_sets_session_and_redirects(self):
+    def test_valid_post_sets_flow_and_redirects(self):
         today = timezone.localdate().isoformat()
         resp = self.client.post(
             reverse("mietfahrzeuge"),
@@ -40,15 +52,60 @@ class MietfahrzeugeViewTests(TestCase):
         # Erfolgreiches Redirect zum nächsten Schritt
         self.assertEqual(resp.status_code, 302)
         self.assertIn(reverse("booking_create", args=[self.transporter.id]), resp.url)
-        # Session enthält Step-1-Daten
-        session = self.client.session
-        step1 = session.get("rental_step1")
-        self.assertIsNotNone(step1)
+        # Ablauf-Cookie enthält Step-1-Daten
+        request = RequestFactory().get("/")
+        request.COOKIES = {name: morsel.value for name, morsel in self.client.cookies.items()}
+        step1 = BookingFlow.from_request(request).step1
         self.assertEqual(step1["transporter_id"], self.transporter.id)
         self.assertEqual(step1["date"], today)
         self.assertEqual(step1["time_slot"], "MORNING")
 
 
+class BookingFlowTests(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.transporter = Transporter.objects.create(
+            name="Flow Van",
+            kennzeichen="ZH-55555",
+            verfuegbar_ab=self.today,
+            preis_chf=100,
+        )
+        PortalSettings.objects.create(pk=1)
+        self.client.post(
+            reverse("mietfahrzeuge"),
+            {"transporter_id": self.transporter.id, "pickup_date": self.today.isoformat(), "time_block": "fullday"},
+        )
+        self.client.post(
+            reverse("booking_create", args=[self.transporter.id]),
+            {
+                "customer_name": "Flow Kunde",
+                "customer_address": "Weg 1",
+                "customer_phone": "+41790000000",
+                "customer_email": "flow@example.com",
+                "driver_license_number": "FL12345",
+            },
+        )
+
+    def test_steps_load_booking_once_and_total_includes_extras(self):
+        booking = Booking.objects.get(customer_email="flow@example.com")
+        self.assertEqual((booking.date, booking.time_slot), (self.today, "FULLDAY"))
+        self.client.post(reverse("booking_options"), {"extras": ["moving_blankets"]})
+        self.client.get(reverse("booking_review"))  # Extras-Cache füllen
+        with self.assertNumQueries(1):
+            review = self.client.get(reverse("booking_review"))
+        self.assertEqual(review.context["total_price"], Decimal("115.00"))
+        with self.assertNumQueries(1):
+            self.client.get(reverse("booking_payment"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(reverse("booking_payment"))
+        self.assertRedirects(resp, reverse("booking_success", args=[booking.id]), fetch_redirect_response=False)
+        booking.refresh_from_db()
+        self.assertEqual(booking.total_price, Decimal("115.00"))
+        # Buchung ist aus dem Ablauf entfernt, Schritt 1 bleibt erhalten
+        self.assertRedirects(self.client.get(reverse("booking_review")), reverse("mietfahrzeuge"), fetch_redirect_response=False)
+
+
 class BookingConflictTests(TestCase):
     def setUp(self):
         self.transporter = Transporter.objects.create(
@@ -87,6 +144,27 @@ class BookingConflictTests(TestCase):
         except ValidationError:
             self.fail("validate_booking_conflict raised for non-overlapping slot")
 
+    def test_lost_race_on_save_shows_conflict_instead_of_error(self):
+        # Parallele Buchung zwischen Prüfung und Speichern: die DB-Constraint greift
+        self.client.post(
+            reverse("mietfahrzeuge"),
+            {"transporter_id": self.transporter.id, "pickup_date": self.booking_date.isoformat(), "time_block": "morning"},
+        )
+        with mock.patch("main.views.validate_booking_conflict"):
+            resp = self.client.post(
+                reverse("booking_create", args=[self.transporter.id]),
+                {
+                    "customer_name": "Eva Muster",
+                    "customer_address": "Weg 2",
+                    "customer_phone": "+41790000001",
+                    "customer_email": "eva@example.com",
+                    "driver_license_number": "EV12345",
+                },
+            )
+        self.assertEqual(resp.status_code, 200)
+        self.assertContains(resp, "Buchung kollidiert mit bestehender Reservierung.")
+        self.assertEqual(Booking.objects.filter(transporter=self.transporter).count(), 1)
+
 
 class DamageReportEmailTests(TestCase):
     @override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
@@ -115,6 +193,71 @@ class DamageReportEmailTests(TestCase):
         self.assertIn("Schadenmeldung", mail.outbox[0].subject)
 
 
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class PhotoHashTests(TestCase):
+    def _report(self):
+        return DamageReport.objects.create(first_name="Max", last_name="Muster", email="max@example.com")
+
+    def _image(self, name, size=(320, 240), fmt="PNG", inverted=False):
+        image = Image.new("L", (320, 240))
+        draw = ImageDraw.Draw(image)
+        for x in range(0, 320, 8):
+            draw.rectangle([x, 0, x + 7, 239], fill=(x * 3 + (x % 40) * 2) % 256)
+        draw.ellipse([60, 40, 200, 180], fill=255 if not inverted else 0)
+        if inverted:
+            image = image.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+        buffer = io.BytesIO()
+        image.convert("RGB").resize(size).save(buffer, fmt)
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type=f"image/{fmt.lower()}")
+
+    def test_reused_photo_found_in_other_report(self):
+        original = DamagePhoto.objects.create(report=self._report(), image=self._image("a.png"))
+        other = DamagePhoto.objects.create(report=self._report(), image=self._image("c.png", inverted=True))
+        claim = self._report()
+        reused = DamagePhoto.objects.create(report=claim, image=self._image("b.jpg", size=(640, 480), fmt="JPEG"))
+        self.assertIsNotNone(reused.phash)
+        with Image.open(reused.image.path) as stored:
+            self.assertEqual(stored.size, (640, 480))
+
+        with self.assertNumQueries(1):
+            matches = near_duplicates([reused], exclude_report_id=claim.pk)
+        found = [photo.pk for photo, _ in matches[reused.pk]]
+        self.assertIn(original.pk, found)
+        self.assertNotIn(other.pk, found)
+
+
+class RoleCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(ROLE_CACHE_SECONDS=300)
+    def test_roles_cached_until_membership_changes(self):
+        manager, _ = Group.objects.get_or_create(name="manager")
+        user = User.objects.create_user(username="rolle", password="pass12345")
+        user.groups.add(manager)
+
+        self.assertTrue(has_any_role(User.objects.get(pk=user.pk), ["manager"]))
+        fresh = User.objects.get(pk=user.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(is_staff_member(fresh))
+            self.assertFalse(has_any_role(fresh, ["admin"]))
+
+        manager.user_set.clear()
+        self.assertFalse(is_staff_member(User.objects.get(pk=user.pk)))
+        user.groups.add(Group.objects.get_or_create(name="admin")[0])
+        self.assertTrue(has_any_role(User.objects.get(pk=user.pk), ["admin"]))
+
+    @override_settings(ROLE_CACHE_SECONDS=0)
+    def test_without_shared_cache_roles_only_memoized_per_request(self):
+        user = User.objects.create_user(username="rolle", password="pass12345")
+        user.groups.add(Group.objects.get_or_create(name="manager")[0])
+        self.assertTrue(is_staff_member(User.objects.get(pk=user.pk)))
+        fresh = User.objects.get(pk=user.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(is_staff_member(fresh))
+            self.assertFalse(has_any_role(fresh, ["admin"]))
+
+
 class BookingEmailTests(TestCase):
     @override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
     def test_booking_email_attaches_pdf(self):
@@ -181,3 +324,47 @@ class AdminNotificationTests(TestCase):
         )
         self.assertTrue(ok)
         self.assertEqual(len(mail.outbox), 1)
+
+
+class MediaKeyTests(TestCase):
+    def test_backfill_converts_stored_urls_to_keys(self):
+        report = DamageReport.objects.create(
+            email="kunde@example.com",
+            phone="+41 44 123 45 67",
+            car_brand="VW",
+            car_model="Golf",
+            damage_type="Unfallschaden",
+            message="Dokumente vorhanden.",
+            documents=[
+                "/media/damage_docs/2025/01/02/abc_police.pdf",
+                "https://bucket.s3.amazonaws.com/damage_docs/2025/01/02/x.pdf?X-Amz-Signature=dead",
+            ],
+        )
+        call_command("backfill_media_keys", stdout=io.StringIO())
+        report.refresh_from_db()
+        self.assertEqual(
+            report.documents,
+            ["damage_docs/2025/01/02/abc_police.pdf", "damage_docs/2025/01/02/x.pdf"],
+        )
+        self.assertEqual(document_links(report.documents)[0]["url"], "/media/damage_docs/2025/01/02/abc_police.pdf")
+
+
+class PublicPageCacheTests(TestCase):
+    def test_home_is_served_from_cache_until_settings_change(self):
+        PortalSettings.objects.create(homepage_services=[{"name": "Karosseriereparatur", "active": True}])
+        first = self.client.get(reverse("home"))
+        self.assertIn("public", first["Cache-Control"])
+        self.assertIn("s-maxage", first["Cache-Control"])
+        with self.assertNumQueries(0):
+            cached = self.client.get(reverse("home"), {"utm_source": "radio"})
+        self.assertEqual(cached.content, first.content)
+
+        self.assertNotContains(first, "Spot-Reparaturen")
+
+        settings_obj = PortalSettings.objects.first()
+        settings_obj.homepage_services = [{"name": "Autolackierung", "active": True}]
+        with self.captureOnCommitCallbacks(execute=True):
+            settings_obj.save()
+            # Bis zum Commit bleibt die alte Version gültig
+            self.assertEqual(self.client.get(reverse("home")).content, first.content)
+        self.assertContains(self.client.get(reverse("home")), "Spot-Reparaturen")
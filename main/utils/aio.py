@@ -0,0 +1,39 @@
+"""
+Blockierende I/O (Storage, Stripe) aus async Views.
+
+``sync_to_async`` führt Aufrufe standardmässig im Thread des Requests aus, der auch die
+Datenbankverbindung hält; ohne ASGI teilen sich alle Requests eines Workers diesen Thread.
+Storage-Uploads und Stripe-Aufrufe laufen deshalb in einem eigenen, begrenzten Thread-Pool
+(``IO_THREAD_POOL_SIZE``): ein hängender S3-PUT belegt dort einen Thread, blockiert aber weder
+den Event-Loop noch die ORM-Zugriffe anderer Requests (z. B. Verfügbarkeitsabfragen).
+
+Der Aufruf läuft im Kontext des Requests, ``config.metrics.track`` zählt also weiterhin mit.
+"""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def io_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "IO_THREAD_POOL_SIZE", 16),
+                thread_name_prefix="blocking-io",
+            )
+    return _executor
+
+
+async def run_io(func, *args, **kwargs):
+    """Führt ``func(*args, **kwargs)`` im I/O-Pool aus. Nicht für ORM-Zugriffe verwenden."""
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(io_executor(), call)
@@ -0,0 +1,195 @@
+"""
+Zustand des Mietablaufs (Fahrzeugwahl → Kundendaten → Extras → Übersicht → Zahlung).
+
+Der Zustand liegt kompakt in einem signierten Cookie (``id|transporter|datum|slot|rückgabe``)
+statt als ``rental_step1``/``current_booking_id`` in der DB-Session. Geschrieben wird das Cookie
+nur, wenn sich der Zustand ändert. Jeder Schritt lädt die Buchung samt Transporter mit einer
+Abfrage; die Mietextras kommen aus dem Cache (Version wie bei den öffentlichen Seiten).
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.dateparse import parse_date
+
+from main.models import Booking
+from main.utils.page_cache import content_version
+from main.utils.rental_extras import normalize_rental_extras
+
+COOKIE_NAME = "rental_flow"
+COOKIE_SALT = "main.booking_flow"
+SLOT_CODES = {"MORNING": "M", "AFTERNOON": "A", "FULLDAY": "F"}
+SLOTS_BY_CODE = {code: slot for slot, code in SLOT_CODES.items()}
+TIMEBLOCKS = {"MORNING": "morning", "AFTERNOON": "afternoon", "FULLDAY": "fullday"}
+LEGACY_EXTRA_FIELDS = ["additional_insurance", "moving_blankets", "hand_truck", "tie_down_straps"]
+VAT_RATE = Decimal("0.077")
+
+
+def _iso_date(value):
+    parsed = parse_date(value) if isinstance(value, str) and value else value
+    return parsed.isoformat() if parsed else ""
+
+
+def _int_or_none(value):
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+class BookingFlow:
+    def __init__(self, booking_id=None, transporter_id=None, date="", time_slot="", return_date=""):
+        self.booking_id = booking_id
+        self.transporter_id = transporter_id
+        self.date = date
+        self.time_slot = time_slot
+        self.return_date = return_date
+        self._stored = self.dumps()
+        self._booking = None
+
+    @classmethod
+    def from_request(cls, request):
+        try:
+            raw = request.get_signed_cookie(
+                COOKIE_NAME, salt=COOKIE_SALT, max_age=settings.BOOKING_FLOW_MAX_AGE
+            )
+        except (KeyError, signing.BadSignature):
+            return cls()
+        parts = (raw.split("|") + [""] * 5)[:5]
+        return cls(
+            booking_id=_int_or_none(parts[0]),
+            transporter_id=_int_or_none(parts[1]),
+            date=parts[2],
+            time_slot=SLOTS_BY_CODE.get(parts[3], ""),
+            return_date=parts[4],
+        )
+
+    def dumps(self):
+        return "|".join(
+            [
+                str(self.booking_id or ""),
+                str(self.transporter_id or ""),
+                self.date or "",
+                SLOT_CODES.get(self.time_slot, ""),
+                self.return_date or "",
+            ]
+        ).rstrip("|")
+
+    def select(self, transporter_id, pickup_date, time_slot, return_date=""):
+        """Schritt 1: Fahrzeug, Datum und Zeitblock übernehmen."""
+        self.transporter_id = _int_or_none(transporter_id)
+        self.date = _iso_date(pickup_date)
+        self.time_slot = time_slot if time_slot in SLOT_CODES else ""
+        self.return_date = _iso_date(return_date)
+
+    @property
+    def step1(self):
+        """Werte für das Formular in Schritt 1 (gleiche Schlüssel wie früher ``rental_step1``)."""
+        if not (self.date or self.time_slot or self.transporter_id):
+            return {}
+        return {
+            "transporter_id": self.transporter_id,
+            "date": self.date,
+            "time_slot": self.time_slot,
+            "timeblock": TIMEBLOCKS.get(self.time_slot),
+            "return_date": self.return_date,
+        }
+
+    @property
+    def pickup_date(self):
+        return parse_date(self.date) if self.date else None
+
+    def booking(self):
+        """Aktuelle Buchung samt Transporter (eine Abfrage, danach gemerkt) oder ``None``."""
+        if self.booking_id and self._booking is None:
+            self._booking = Booking.objects.select_related("transporter").filter(pk=self.booking_id).first()
+            if self._booking is None:
+                self.booking_id = None
+        return self._booking
+
+    def set_booking(self, booking):
+        self._booking = booking
+        self.booking_id = booking.pk
+
+    def finish(self):
+        """Nach der Zahlung: Buchung vergessen, Auswahl aus Schritt 1 bleibt für einen neuen Durchlauf."""
+        self._booking = None
+        self.booking_id = None
+
+    def save(self, response):
+        value = self.dumps()
+        if value == self._stored:
+            return response
+        if value:
+            response.set_signed_cookie(
+                COOKIE_NAME,
+                value,
+                salt=COOKIE_SALT,
+                max_age=settings.BOOKING_FLOW_MAX_AGE,
+                httponly=True,
+                samesite="Lax",
+                secure=settings.SESSION_COOKIE_SECURE,
+            )
+        else:
+            response.delete_cookie(COOKIE_NAME, samesite="Lax")
+        self._stored = value
+        return response
+
+
+def rental_extras():
+    """Normalisierte Mietextras aus den PortalSettings, gecacht bis zur nächsten Inhaltsänderung."""
+    key = f"rental-extras:{content_version()}"
+    extras = cache.get(key)
+    if extras is None:
+        from adminportal.models import PortalSettings
+
+        portal_settings = PortalSettings.objects.filter(pk=1).first() or PortalSettings(pk=1)
+        extras = normalize_rental_extras(portal_settings.rental_extras)
+        cache.set(key, extras, settings.PUBLIC_PAGE_CACHE_SECONDS)
+    return extras
+
+
+def selected_extra_keys(booking, extras_map):
+    if booking.extras:
+        return [key for key in booking.extras if key in extras_map]
+    return [key for key in LEGACY_EXTRA_FIELDS if getattr(booking, key) and key in extras_map]
+
+
+def apply_extras(booking, keys):
+    booking.extras = keys
+    for field in LEGACY_EXTRA_FIELDS:
+        setattr(booking, field, field in keys)
+
+
+def booking_quote(booking, extras_map):
+    """Preisberechnung für Übersicht, Zahlung und Rechnungs-PDF."""
+    daily_price = booking.transporter.preis_chf
+    half_day_price = booking.transporter.halbtag_preis_chf or (daily_price / 2 if daily_price else None)
+    is_half_day = booking.time_slot in ("MORNING", "AFTERNOON")
+    if booking.pickup_date and booking.return_date and not is_half_day:
+        rental_days = (booking.return_date - booking.pickup_date).days + 1
+    else:
+        rental_days = 1
+    if is_half_day:
+        base_price = half_day_price
+    else:
+        base_price = daily_price * rental_days if daily_price else None
+
+    extras = [
+        (extras_map[key]["name"], extras_map[key]["price"])
+        for key in selected_extra_keys(booking, extras_map)
+    ]
+    extras_total = sum((Decimal(str(price)) for _, price in extras), Decimal("0.00"))
+    net_total = (base_price or Decimal("0.00")) + extras_total
+    vat_amount = (net_total * VAT_RATE / (Decimal("1.0") + VAT_RATE)).quantize(Decimal("0.01"))
+    return {
+        "base_price": base_price,
+        "rental_days": rental_days,
+        "is_half_day": is_half_day,
+        "extras": extras,
+        "extras_total": extras_total,
+        "net_total": net_total,
+        "vat_amount": vat_amount,
+        "total_price": net_total.quantize(Decimal("0.01")),
+    }
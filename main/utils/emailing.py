@@ -5,6 +5,8 @@ from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 
+from config.metrics import track
+
 logger = logging.getLogger("schaden")
 
 def apply_smtp_override(portal_settings):
@@ -57,7 +59,8 @@ def send_templated_mail(
         for attachment in attachments:
             email.attach(*attachment)
     try:
-        email.send(fail_silently=fail_silently)
+        with track("email"):
+            email.send(fail_silently=fail_silently)
         return True
     except Exception:
         logger.exception("E-Mail Versand fehlgeschlagen: %s", subject)
@@ -0,0 +1,96 @@
+"""
+Medien-URLs für Fotos und Dokumente.
+
+In der DB liegen nur Storage-Keys (``DamagePhoto.image.name``, Einträge in ``DamageReport.documents``).
+URLs entstehen erst beim Ausliefern: pro Seite gesammelt, mit einem ``get_many`` gegen den Cache
+und nur für fehlende Keys neu signiert. Signaturen werden bis kurz vor Ablauf gecacht.
+"""
+import hashlib
+import os
+from urllib.parse import unquote, urlsplit
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+CACHE_PREFIX = "media-url:"
+
+
+def storage_key(value):
+    """Liefert den Storage-Key zu einem Key oder einer (ggf. abgelaufenen) Medien-URL."""
+    if not value:
+        return ""
+    parsed = urlsplit(value)
+    if not parsed.scheme and not parsed.netloc and not value.startswith("/"):
+        return value
+    path = unquote(parsed.path)
+    bucket = getattr(settings, "AWS_STORAGE_BUCKET_NAME", "") or ""
+    media_path = urlsplit(settings.MEDIA_URL).path or "/"
+    if bucket and path.startswith(f"/{bucket}/") and not parsed.netloc.startswith(f"{bucket}."):
+        path = path[len(bucket) + 1:]
+    elif path.startswith(media_path):
+        path = path[len(media_path):]
+    return path.lstrip("/")
+
+
+def signature_ttl(storage=None):
+    """Cache-Dauer einer URL: bei signierten S3-URLs bis kurz vor Ablauf, sonst lange."""
+    storage = storage or default_storage
+    if getattr(storage, "querystring_auth", False):
+        expire = getattr(storage, "querystring_expire", 3600)
+        return max(expire - getattr(settings, "MEDIA_URL_REFRESH_MARGIN", 300), 0)
+    return getattr(settings, "MEDIA_URL_CACHE_SECONDS", 60 * 60 * 24)
+
+
+def _cache_key(key):
+    return CACHE_PREFIX + hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def signed_urls(keys):
+    """Signiert eine Menge Keys in einem Durchgang und gibt ``{key: url}`` zurück."""
+    keys = [key for key in dict.fromkeys(keys) if key]
+    if not keys:
+        return {}
+    lookup = {_cache_key(key): key for key in keys}
+    urls = {lookup[cache_key]: url for cache_key, url in cache.get_many(list(lookup)).items()}
+    missing = [key for key in keys if key not in urls]
+    if missing:
+        fresh = {}
+        for key in missing:
+            try:
+                fresh[key] = default_storage.url(key)
+            except Exception:
+                fresh[key] = ""
+        ttl = signature_ttl()
+        if ttl:
+            cache.set_many({_cache_key(key): url for key, url in fresh.items() if url}, ttl)
+        urls.update(fresh)
+    return urls
+
+
+def signed_url(key):
+    return signed_urls([key]).get(key, "") if key else ""
+
+
+def attach_photo_urls(photos):
+    """Setzt ``public_url`` für alle Fotos einer Seite mit einem einzigen Signier-Durchgang."""
+    photos = list(photos)
+    urls = signed_urls(photo.image.name for photo in photos if photo.image)
+    for photo in photos:
+        photo._signed_url = urls.get(photo.image.name, "") if photo.image else ""
+    return photos
+
+
+def document_name(key):
+    name = os.path.basename(key)
+    prefix, sep, rest = name.partition("_")
+    # Upload-Namen sind "<uuid4 hex>_<Originalname>"
+    return rest if sep and len(prefix) == 32 else name
+
+
+def document_links(documents, urls=None):
+    """Dokument-Keys (oder Alt-URLs) → ``[{"key", "name", "url"}]`` (``urls``: bereits signierte Keys)."""
+    keys = [storage_key(doc) for doc in documents or []]
+    if urls is None or any(key not in urls for key in keys if key):
+        urls = signed_urls(keys)
+    return [{"key": key, "name": document_name(key), "url": urls.get(key, "")} for key in keys if key]
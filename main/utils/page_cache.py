@@ -0,0 +1,76 @@
+"""
+Seiten- und Fragment-Cache für öffentliche Seiten (Marketing, Flotte).
+
+Alle Schlüssel enthalten eine Inhaltsversion, die nach dem Commit von Änderungen an
+PortalSettings, Transporter oder Vehicle neu gesetzt wird (siehe ``main.signals``).
+"""
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import has_vary_header, patch_cache_control
+
+CONTENT_VERSION_KEY = "site-content:version"
+
+
+def content_version():
+    version = cache.get(CONTENT_VERSION_KEY)
+    if version is None:
+        cache.add(CONTENT_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CONTENT_VERSION_KEY)
+    return version
+
+
+def invalidate_public_content():
+    """Neue Inhaltsversion nach dem Commit – vorher würde ein paralleler Request den alten Stand neu cachen."""
+    transaction.on_commit(lambda: cache.set(CONTENT_VERSION_KEY, uuid.uuid4().hex, None))
+
+
+def _is_shareable(request, response):
+    """Nur Antworten ohne Session-/CSRF-Bezug dürfen geteilt (gecacht/öffentlich) werden."""
+    session = getattr(request, "session", None)
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not (session is not None and session.accessed)
+        and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+        and not has_vary_header(response, "Cookie")
+    )
+
+
+def cached_public_page(view):
+    """
+    Cacht GET/HEAD-Antworten einer Seite pro Pfad (Query-Parameter wie UTM werden ignoriert)
+    und setzt CDN-taugliche Cache-Control-Header.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            return view(request, *args, **kwargs)
+        key = f"page:{content_version()}:{request.path}"
+        cached = cache.get(key)
+        if cached is not None:
+            response = HttpResponse(cached["content"], content_type=cached["content_type"])
+        else:
+            response = view(request, *args, **kwargs)
+            if not _is_shareable(request, response):
+                return response
+            cache.set(
+                key,
+                {"content": response.content, "content_type": response["Content-Type"]},
+                settings.PUBLIC_PAGE_CACHE_SECONDS,
+            )
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.PUBLIC_PAGE_MAX_AGE,
+            s_maxage=settings.PUBLIC_PAGE_S_MAXAGE,
+        )
+        return response
+
+    return wrapper
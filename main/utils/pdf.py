@@ -5,7 +5,10 @@ from django.utils import timezone
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
 
+from config.metrics import track
 
+
+@track("pdf")
 def render_booking_invoice_pdf(booking, rental_days, base_price, extras_total, vat_amount, total_price):
     """
     Simple PDF invoice for booking confirmation emails.
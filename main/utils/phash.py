@@ -0,0 +1,106 @@
+"""
+Perzeptueller Hash (dHash, 64 Bit) für Schadenfotos und Suche nach Beinahe-Duplikaten.
+
+Der Hash wird beim Hochladen berechnet und zusätzlich in vier 16-Bit-Blöcken gespeichert
+(Multi-Index-Hashing): Liegen zwei Hashes höchstens ``r`` Bit auseinander, stimmt mindestens
+ein Block bis auf ``r // 4`` Bit überein. Die Suche fragt daher nur die indexierten Blöcke mit
+ihren wenigen Bit-Varianten ab und prüft die Hamming-Distanz anschliessend auf den Kandidaten.
+"""
+from itertools import combinations
+
+from django.conf import settings
+from django.db.models import Q
+from PIL import Image, ImageOps
+
+HASH_BITS = 64
+CHUNKS = 4
+CHUNK_BITS = HASH_BITS // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+CHUNK_FIELDS = [f"phash_{index}" for index in range(CHUNKS)]
+
+
+def dhash(fileobj):
+    """Differenz-Hash eines Bildes (robust gegen Skalierung, Kompression, leichte Farbänderungen)."""
+    with Image.open(fileobj) as image:
+        image = ImageOps.exif_transpose(image).convert("L").resize((9, 8), Image.Resampling.LANCZOS)
+        pixels = list(image.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = (value << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def to_signed(value):
+    """64-Bit-Hash → Wert für ``BigIntegerField`` (vorzeichenbehaftet)."""
+    return value - (1 << HASH_BITS) if value >= 1 << (HASH_BITS - 1) else value
+
+
+def to_unsigned(value):
+    return value + (1 << HASH_BITS) if value < 0 else value
+
+
+def chunks(value):
+    return [(value >> (CHUNK_BITS * index)) & CHUNK_MASK for index in range(CHUNKS)]
+
+
+def hash_fields(value):
+    """Modellfelder (``phash`` und Blöcke) zu einem Hash."""
+    fields = {"phash": to_signed(value)}
+    fields.update(zip(CHUNK_FIELDS, chunks(value)))
+    return fields
+
+
+def hamming(a, b):
+    return bin(to_unsigned(a) ^ to_unsigned(b)).count("1")
+
+
+def chunk_variants(chunk, radius):
+    """Alle Blockwerte mit höchstens ``radius`` gekippten Bits."""
+    variants = {chunk}
+    for flips in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), flips):
+            value = chunk
+            for bit in bits:
+                value ^= 1 << bit
+            variants.add(value)
+    return variants
+
+
+def max_distance():
+    return getattr(settings, "PHOTO_DUPLICATE_MAX_DISTANCE", 6)
+
+
+def near_duplicates(photos, distance=None, exclude_report_id=None, limit=50):
+    """
+    Beinahe-Duplikate zu ``photos`` aus anderen Schadenfällen.
+    Rückgabe: ``{photo_id: [(treffer, distanz), ...]}``, sortiert nach Distanz; eine Abfrage für alle Fotos.
+    """
+    from main.models import DamagePhoto
+
+    distance = max_distance() if distance is None else distance
+    radius = distance // CHUNKS
+    hashed = [photo for photo in photos if photo.phash is not None]
+    if not hashed:
+        return {}
+    candidates_by_chunk = [set() for _ in range(CHUNKS)]
+    for photo in hashed:
+        for index, chunk in enumerate(chunks(to_unsigned(photo.phash))):
+            candidates_by_chunk[index] |= chunk_variants(chunk, radius)
+    query = Q()
+    for field, values in zip(CHUNK_FIELDS, candidates_by_chunk):
+        query |= Q(**{f"{field}__in": sorted(values)})
+    candidates = DamagePhoto.objects.filter(query).select_related("report").exclude(pk__in=[photo.pk for photo in hashed])
+    if exclude_report_id:
+        candidates = candidates.exclude(report_id=exclude_report_id)
+
+    matches = {}
+    for candidate in candidates:
+        for photo in hashed:
+            diff = hamming(photo.phash, candidate.phash)
+            if diff <= distance:
+                matches.setdefault(photo.pk, []).append((candidate, diff))
+    for photo_id, items in matches.items():
+        items.sort(key=lambda item: (item[1], -item[0].pk))
+        matches[photo_id] = items[:limit]
+    return matches
@@ -0,0 +1,65 @@
+"""
+Rollen (Gruppen) eines Benutzers für Portal- und API-Berechtigungen.
+
+Die Gruppennamen werden pro Request einmal am User-Objekt gemerkt. Nur mit geteiltem Cache
+(``CACHE_URL``) werden sie zusätzlich requestübergreifend gehalten (``ROLE_CACHE_SECONDS``):
+Änderungen an Gruppenmitgliedschaften (``m2m_changed``) löschen den Eintrag des Benutzers,
+Änderungen an Gruppen selbst erhöhen die Version aller Einträge (``main.signals``). Im LocMem
+pro Prozess erreichte das nur den schreibenden Worker – entzogene Rechte blieben anderswo gültig.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+STAFF_ROLES = ("admin", "manager", "employee")
+VERSION_KEY = "user-roles:version"
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def _cache_key(user_id, version=None):
+    return f"user-roles:{version or _version()}:{user_id}"
+
+
+def user_roles(user):
+    """Gruppennamen des Benutzers als ``frozenset`` (leer für anonyme Benutzer)."""
+    if not user or not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, "_cached_roles", None)
+    if roles is None:
+        timeout = getattr(settings, "ROLE_CACHE_SECONDS", 0)
+        key = _cache_key(user.pk) if timeout else None
+        roles = cache.get(key) if key else None
+        if roles is None:
+            roles = frozenset(user.groups.values_list("name", flat=True))
+            if key:
+                cache.set(key, roles, timeout)
+        user._cached_roles = roles
+    return roles
+
+
+def has_any_role(user, roles):
+    return bool(user_roles(user) & set(roles))
+
+
+def is_staff_member(user):
+    """Staff-Flag oder Mitglied einer Mitarbeitergruppe (admin/manager/employee)."""
+    if not user or not user.is_authenticated:
+        return False
+    return user.is_staff or has_any_role(user, STAFF_ROLES)
+
+
+def invalidate_user_roles(user_ids):
+    version = _version()
+    cache.delete_many([_cache_key(user_id, version) for user_id in user_ids if user_id])
+
+
+def invalidate_all_roles():
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
@@ -3,9 +3,13 @@ from django.core.cache import cache
 
 
 def get_client_ip(request):
+    # Wie DRF ``get_ident``: nur die von ``NUM_PROXIES`` vertrauenswürdigen Proxies angehängten
+    # X-Forwarded-For-Einträge zählen, vorangestellte Einträge kann der Client frei wählen.
     xff = request.META.get("HTTP_X_FORWARDED_FOR")
-    if xff:
-        return xff.split(",")[0].strip()
+    num_proxies = getattr(settings, "REST_FRAMEWORK", {}).get("NUM_PROXIES")
+    if xff and num_proxies:
+        addrs = [addr.strip() for addr in xff.split(",")]
+        return addrs[-min(num_proxies, len(addrs))]
     return request.META.get("REMOTE_ADDR", "")
 
 
@@ -5,19 +5,21 @@ import os
 import logging
 from uuid import uuid4
 from django.conf import settings
+from django.core.cache import cache
 from django.http import HttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.core.mail import send_mail
 from django.utils.dateparse import parse_date
 from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.exceptions import ValidationError
 from formtools.wizard.views import SessionWizardView
 from django.db.models import Exists, OuterRef
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django import forms
 from .models import Transporter, Booking, DamageReport, DamagePhoto, DAMAGE_PART_CODES, Vehicle
-from api.validators import validate_booking_conflict
+from api.validators import booking_overlap_guard, validate_booking_conflict
 from .forms import (
     BookingForm,
     AvailabilitySearchForm,
@@ -28,10 +30,13 @@ from .forms import (
     ReviewForm,
 )
 from adminportal.utils.audit import log_audit
-from main.utils.rental_extras import normalize_rental_extras
+from main.utils.booking_flow import BookingFlow, apply_extras, booking_quote, rental_extras, selected_extra_keys
 from .utils.emailing import send_templated_mail, resolve_admin_recipients
 from .utils.security import get_client_ip, is_rate_limited, register_failed_attempt, reset_rate_limit
 from .utils.pdf import render_booking_invoice_pdf
+from config.metrics import track
+from .utils.media import signature_ttl
+from .utils.page_cache import cached_public_page, content_version
 
 # Admin Seite
 class AdminLoginForm(forms.Form):
@@ -57,6 +62,7 @@ logger = logging.getLogger("schaden")
 
 # ---------- Statische Seiten ----------
 
+@cached_public_page
 def home(request):
     def _active_names(items):
         names = []
@@ -88,15 +94,19 @@ def home(request):
 def healthz(request):
     return HttpResponse("ok", content_type="text/plain")
 
+@cached_public_page
 def dienstleistungen(request):
     return render(request, "dienstleistungen.html")
 
+@cached_public_page
 def ueber_uns(request):
     return render(request, "ueber_uns.html")
 
+@cached_public_page
 def impressum(request):
     return render(request, "impressum.html")
 
+@cached_public_page
 def datenschutz(request):
     return render(request, "datenschutz.html")
 
@@ -218,22 +228,20 @@ class ClaimWizard(SessionWizardView):
         # Mehrfach-Fotos speichern (lokal oder S3)
         photos = accident.get("photos") or []
         for file_obj in photos:
-            photo = DamagePhoto.objects.create(report=report, image=file_obj)
-            if photo.image:
-                photo.file_url = photo.image.url
-                photo.save(update_fields=["file_url"])
+            with track("storage"):
+                DamagePhoto.objects.create(report=report, image=file_obj)
 
         documents = accident.get("documents") or []
         if documents:
             now = timezone.now()
             date_path = now.strftime("%Y/%m/%d")
-            stored_urls = []
+            stored_keys = []
             for file_obj in documents:
                 safe_name = f"{uuid4().hex}_{file_obj.name}"
                 storage_path = f"damage_docs/{date_path}/{safe_name}"
-                stored_path = default_storage.save(storage_path, file_obj)
-                stored_urls.append(default_storage.url(stored_path))
-            report.documents = stored_urls
+                with track("storage"):
+                    stored_keys.append(default_storage.save(storage_path, file_obj))
+            report.documents = stored_keys
             report.save(update_fields=["documents"])
 
         # E-Mails via Templates + Settings
@@ -271,28 +279,20 @@ def schaden_success(request, pk):
     return render(request, "schaden_success.html", {"report": report})
 
 # ---------- Transporter / Mietfahrzeuge ----------
+def _fleet_fragment_context():
+    return {
+        "fleet_cache_version": content_version(),
+        "fleet_cache_timeout": min(settings.PUBLIC_PAGE_CACHE_SECONDS, signature_ttl() or settings.PUBLIC_PAGE_CACHE_SECONDS),
+    }
+
+
 def mietfahrzeuge(request):
     _sync_transporters_from_vehicles()
     transporters = Transporter.objects.all()
 
-    # Step-1-Daten aus Session
-    step1_data = request.session.get("rental_step1", {}).copy()
-
-    # Falls leer, aber bereits Booking vorhanden → aus Booking befüllen (wie vorher besprochen)
-    if not step1_data:
-        current_booking_id = request.session.get("current_booking_id")
-        if current_booking_id:
-            try:
-                booking = Booking.objects.get(pk=current_booking_id)
-                step1_data = {
-                    "transporter_id": booking.transporter_id,
-                    "date": booking.date.isoformat() if booking.date else "",
-                    "time_slot": booking.time_slot,
-                    "timeblock": None,  # kannst du bei Bedarf aus time_slot zurückmappen
-                }
-                request.session["rental_step1"] = step1_data
-            except Booking.DoesNotExist:
-                pass
+    # Step-1-Daten aus dem Buchungsablauf (signiertes Cookie)
+    flow = BookingFlow.from_request(request)
+    step1_data = flow.step1
 
     if request.method == "POST":
         transporter_id = request.POST.get("transporter_id")
@@ -308,17 +308,11 @@ def mietfahrzeuge(request):
             }
             time_slot_code = slot_map.get(timeblock, "MORNING")
 
-            step1_data = {
-                "transporter_id": int(transporter_id) if transporter_id else None,
-                "date": pickup_date,
-                "time_slot": time_slot_code,
-                "timeblock": timeblock,
-                "return_date": return_date,
-            }
-            request.session["rental_step1"] = step1_data
+            flow.select(transporter_id, pickup_date, time_slot_code, return_date)
+            step1_data = flow.step1
 
             if transporter_id:
-                return redirect("booking_create", transporter_id=transporter_id)
+                return flow.save(redirect("booking_create", transporter_id=transporter_id))
 
         if not pickup_date or not timeblock:
             context = {
@@ -330,8 +324,9 @@ def mietfahrzeuge(request):
                 "available_count": transporters.count(),
                 "total_count": transporters.count(),
                 "form_error": "Bitte Abholdatum und Zeitblock auswählen.",
+                **_fleet_fragment_context(),
             }
-            return render(request, "mietfahrzeuge.html", context)
+            return flow.save(render(request, "mietfahrzeuge.html", context))
 
     # 🔹 Verfügbarkeit pro Transporter prüfen (nur wenn Datum + Slot gewählt)
     selected_date_str = step1_data.get("date")
@@ -343,12 +338,12 @@ def mietfahrzeuge(request):
     vehicle_by_plate = {v.license_plate: v for v in Vehicle.objects.all()}
 
     if selected_date and selected_slot_code:
+        booked_ids = set(
+            Booking.objects.filter(date=selected_date, time_slot=selected_slot_code)
+            .values_list("transporter_id", flat=True)
+        )
         for t in transporters:
-            booked = Booking.objects.filter(
-                transporter=t,
-                date=selected_date,
-                time_slot=selected_slot_code,
-            ).exists()
+            booked = t.id in booked_ids
             vehicle = vehicle_by_plate.get(t.kennzeichen)
             is_inactive = vehicle and vehicle.status != "available"
             t.is_unavailable = booked or bool(is_inactive)
@@ -378,21 +373,33 @@ def mietfahrzeuge(request):
         "any_unavailable": any_unavailable,
         "available_count": available_count,
         "total_count": total_count,
+        **_fleet_fragment_context(),
     }
-    return render(request, "mietfahrzeuge.html", context)
+    return flow.save(render(request, "mietfahrzeuge.html", context))
 
 def _sync_transporters_from_vehicles():
-    for vehicle in Vehicle.objects.all():
-        defaults = {
-            "name": f"{vehicle.brand} {vehicle.model}".strip() or vehicle.license_plate,
-            "preis_chf": vehicle.daily_rate or 0,
-            "halbtag_preis_chf": vehicle.half_day_rate or 0,
-            "verfuegbar_ab": timezone.localdate(),
-        }
-        transporter, created = Transporter.objects.get_or_create(
-            kennzeichen=vehicle.license_plate,
-            defaults=defaults,
-        )
+    # Solange sich an der Flotte nichts geändert hat (gleiche Inhaltsversion), ist nichts zu tun
+    if cache.get(f"fleet-synced:{content_version()}"):
+        return
+    vehicles = list(Vehicle.objects.all())
+    # Ein Lookup für alle Kennzeichen statt get_or_create pro Fahrzeug
+    existing = {
+        t.kennzeichen: t
+        for t in Transporter.objects.filter(kennzeichen__in=[v.license_plate for v in vehicles])
+    }
+    for vehicle in vehicles:
+        transporter = existing.get(vehicle.license_plate)
+        if transporter is None:
+            defaults = {
+                "name": f"{vehicle.brand} {vehicle.model}".strip() or vehicle.license_plate,
+                "preis_chf": vehicle.daily_rate or 0,
+                "halbtag_preis_chf": vehicle.half_day_rate or 0,
+                "verfuegbar_ab": timezone.localdate(),
+            }
+            transporter, created = Transporter.objects.get_or_create(
+                kennzeichen=vehicle.license_plate,
+                defaults=defaults,
+            )
         updates = {}
         name = f"{vehicle.brand} {vehicle.model}".strip() or vehicle.license_plate
         if transporter.name != name:
@@ -406,7 +413,8 @@ def _sync_transporters_from_vehicles():
         if updates:
             for key, value in updates.items():
                 setattr(transporter, key, value)
-            transporter.save(update_fields=list(updates.keys()))
+            transporter.save(update_fields=[*updates, "updated_at"])
+    cache.set(f"fleet-synced:{content_version()}", True, settings.PUBLIC_PAGE_CACHE_SECONDS)
 
 def transporter_list(request):
     # Falls separat verlinkt – identisch zu 'mietfahrzeuge'
@@ -415,22 +423,14 @@ def transporter_list(request):
     return render(request, "mietfahrzeuge.html", {"transporters": transporters})
 
 def book_transporter(request, transporter_id):
-    transporter = get_object_or_404(Transporter, id=transporter_id)
+    flow = BookingFlow.from_request(request)
 
-    # 1) Versuch, eine existierende Buchung zu laden (zurück von Schritt 3 etc.)
-    booking_instance = None
-    current_booking_id = request.session.get("current_booking_id")
-    if current_booking_id:
-        try:
-            booking_instance = Booking.objects.get(pk=current_booking_id)
-        except Booking.DoesNotExist:
-            booking_instance = None
-
-    # 2) Step-1-Daten aus Session (für den allerersten Durchlauf)
-    step1_data = request.session.get("rental_step1", {})
-    date_raw = step1_data.get("date")
-    step1_date = parse_date(date_raw) if isinstance(date_raw, str) else date_raw
-    step1_time_slot = step1_data.get("time_slot")
+    # 1) Existierende Buchung (zurück von Schritt 3 etc.) samt Transporter laden
+    booking_instance = flow.booking()
+    if booking_instance and booking_instance.transporter_id == int(transporter_id):
+        transporter = booking_instance.transporter
+    else:
+        transporter = get_object_or_404(Transporter, id=transporter_id)
 
     if request.method == "POST":
         # Form enthält NUR Kundendaten
@@ -443,8 +443,8 @@ def book_transporter(request, transporter_id):
             # Datum & Slot:
             if booking_instance is None:
                 # erster Durchlauf: aus Schritt 1 setzen
-                booking.date = step1_date
-                booking.time_slot = step1_time_slot
+                booking.date = flow.pickup_date
+                booking.time_slot = flow.time_slot
             else:
                 # Zurück von Schritt 3: bestehende Werte beibehalten
                 # (booking_instance enthält bereits gültiges date/time_slot)
@@ -461,9 +461,14 @@ def book_transporter(request, transporter_id):
             except Exception as e:
                 form.add_error(None, str(e))
             else:
-                booking.save()
-                request.session["current_booking_id"] = booking.id
-                return redirect("booking_options")
+                try:
+                    with booking_overlap_guard():
+                        booking.save()
+                except ValidationError as e:
+                    form.add_error(None, e)
+                else:
+                    flow.set_booking(booking)
+                    return flow.save(redirect("booking_options"))
     else:
         # GET → Formular befüllen
         if booking_instance:
@@ -471,7 +476,7 @@ def book_transporter(request, transporter_id):
         else:
             form = BookingForm()
 
-    return render(request, "booking_form.html", {"form": form, "transporter": transporter})
+    return flow.save(render(request, "booking_form.html", {"form": form, "transporter": transporter}))
 
 def transporter_availability(request, transporter_id):
     transporter = get_object_or_404(Transporter, id=transporter_id)
@@ -510,14 +515,7 @@ def transporter_availability(request, transporter_id):
     })
 
 def booking_success(request, booking_id):
-    booking = get_object_or_404(Booking, pk=booking_id)
-    try:
-        from adminportal.models import PortalSettings
-        portal_settings, _ = PortalSettings.objects.get_or_create(pk=1)
-    except Exception:
-        portal_settings = None
-    extras_data = normalize_rental_extras(portal_settings.rental_extras if portal_settings else [])
-    extras_map = {extra["key"]: extra for extra in extras_data}
+    booking = get_object_or_404(Booking.objects.select_related("transporter"), pk=booking_id)
     return render(request, "booking_success.html", {"booking": booking})
 
 def available_transporters(request):
@@ -565,162 +563,66 @@ def available_transporters(request):
     })
 
 def booking_options(request):
-    booking_id = request.session.get("current_booking_id")
-    if not booking_id:
+    flow = BookingFlow.from_request(request)
+    booking = flow.booking()
+    if booking is None:
         # Wenn keine aktive Buchung vorhanden ist, zurück zu Schritt 1
-        return redirect("mietfahrzeuge")
+        return flow.save(redirect("mietfahrzeuge"))
 
-    booking = get_object_or_404(Booking, pk=booking_id)
-    transporter = booking.transporter
-    try:
-        from adminportal.models import PortalSettings
-        portal_settings, _ = PortalSettings.objects.get_or_create(pk=1)
-    except Exception:
-        portal_settings = None
-    extras_data = normalize_rental_extras(portal_settings.rental_extras if portal_settings else [])
+    extras_data = rental_extras()
     extras_map = {extra["key"]: extra for extra in extras_data}
 
-    def selected_extra_keys():
-        if booking.extras:
-            return [key for key in booking.extras if key in extras_map]
-        legacy = {
-            "additional_insurance": booking.additional_insurance,
-            "moving_blankets": booking.moving_blankets,
-            "hand_truck": booking.hand_truck,
-            "tie_down_straps": booking.tie_down_straps,
-        }
-        return [key for key, enabled in legacy.items() if enabled and key in extras_map]
-
     if request.method == "POST":
-        selected_keys = [key for key in request.POST.getlist("extras") if key in extras_map]
-        booking.extras = selected_keys
-        booking.additional_insurance = "additional_insurance" in selected_keys
-        booking.moving_blankets = "moving_blankets" in selected_keys
-        booking.hand_truck = "hand_truck" in selected_keys
-        booking.tie_down_straps = "tie_down_straps" in selected_keys
+        apply_extras(booking, [key for key in request.POST.getlist("extras") if key in extras_map])
         booking.additional_notes     = (request.POST.get("additional_notes") or "").strip()
         booking.save()
 
-        # 🔴 WICHTIG: current_booking_id NICHT löschen – wir brauchen es für Schritt 4, 5 und fürs Zurückgehen
+        # 🔴 WICHTIG: Buchung im Ablauf NICHT vergessen – wir brauchen sie für Schritt 4, 5 und fürs Zurückgehen
         return redirect("booking_review")   # Schritt 4
 
     # GET → einfach Booking an Template geben; dort lesen wir die Booleans wieder aus
     context = {
         "booking": booking,
-        "transporter": transporter,
+        "transporter": booking.transporter,
         "extras": [extra for extra in extras_data if extra["active"]],
-        "selected_extras": set(selected_extra_keys()),
+        "selected_extras": set(selected_extra_keys(booking, extras_map)),
     }
     return render(request, "booking_options.html", context)
 
 def booking_review(request):
-    booking_id = request.session.get("current_booking_id")
-    if not booking_id:
-        return redirect("mietfahrzeuge")
-
-    booking = get_object_or_404(Booking, pk=booking_id)
-    try:
-        from adminportal.models import PortalSettings
-        portal_settings, _ = PortalSettings.objects.get_or_create(pk=1)
-    except Exception:
-        portal_settings = None
-    extras_data = normalize_rental_extras(portal_settings.rental_extras if portal_settings else [])
-    extras_map = {extra["key"]: extra for extra in extras_data}
-
-    # ❗ Basispreis direkt aus dem Transporter-Modell
-    daily_price = booking.transporter.preis_chf  # DecimalField
-    half_day_price = booking.transporter.halbtag_preis_chf or (daily_price / 2 if daily_price else None)
-    is_half_day = booking.time_slot in ("MORNING", "AFTERNOON")
-    rental_days = 1  # ggf. später über Dauer berechnen
-    if is_half_day:
-        base_price = half_day_price
-    else:
-        base_price = daily_price * rental_days if daily_price else None
-
-    selected_keys = list(booking.extras or [])
-    if not selected_keys:
-        legacy = {
-            "additional_insurance": booking.additional_insurance,
-            "moving_blankets": booking.moving_blankets,
-            "hand_truck": booking.hand_truck,
-            "tie_down_straps": booking.tie_down_straps,
-        }
-        selected_keys = [key for key, enabled in legacy.items() if enabled]
-    extras = [
-        (extras_map[key]["name"], extras_map[key]["price"])
-        for key in selected_keys
-        if key in extras_map
-    ]
-
-    extras_total = sum(Decimal(str(price)) for _, price in extras) if extras else Decimal("0.00")
-
-    # ❗ Gesamt = Fahrzeug + Extras
-    net_total = (base_price or Decimal("0.00")) + extras_total
-    vat_rate = Decimal("0.077")
-    vat_amount = (net_total * vat_rate / (Decimal("1.0") + vat_rate)).quantize(Decimal("0.01"))
-    total_price = net_total.quantize(Decimal("0.01"))
-
-    context = {
-        "booking": booking,
-        "base_price": base_price,
-        "rental_days": rental_days,
-        "extras": extras,
-        "extras_total": extras_total,
-        "net_total": net_total,
-        "vat_amount": vat_amount,
-        "total_price": total_price,
-        "is_half_day": is_half_day,
-    }
+    flow = BookingFlow.from_request(request)
+    booking = flow.booking()
+    if booking is None:
+        return flow.save(redirect("mietfahrzeuge"))
 
     if request.method == "POST":
         return redirect("booking_payment")
 
-    return render(request, "booking_review.html", context)
+    # ❗ Basispreis aus dem Transporter, Gesamt = Fahrzeug + Extras
+    quote = booking_quote(booking, {extra["key"]: extra for extra in rental_extras()})
+    return render(request, "booking_review.html", {"booking": booking, **quote})
 
 def booking_payment(request):
-    booking_id = request.session.get("current_booking_id")
-    if not booking_id:
-        return redirect("mietfahrzeuge")
-
-    booking = get_object_or_404(Booking, pk=booking_id)
-
-    daily_price = booking.transporter.preis_chf
-    half_day_price = booking.transporter.halbtag_preis_chf or (daily_price / 2 if daily_price else None)
-    is_half_day = booking.time_slot in ("MORNING", "AFTERNOON")
-    if booking.pickup_date and booking.return_date:
-        rental_days = (booking.return_date - booking.pickup_date).days + 1
-    else:
-        rental_days = 1
-    if is_half_day:
-        base_price = half_day_price
-        rental_days = 1
-    else:
-        base_price = daily_price * rental_days if daily_price else None
-
-    selected_keys = list(booking.extras or [])
-    if not selected_keys:
-        legacy = {
-            "additional_insurance": booking.additional_insurance,
-            "moving_blankets": booking.moving_blankets,
-            "hand_truck": booking.hand_truck,
-            "tie_down_straps": booking.tie_down_straps,
-        }
-        selected_keys = [key for key, enabled in legacy.items() if enabled]
-    extras_total = sum(
-        (extras_map[key]["price"] for key in selected_keys if key in extras_map),
-        Decimal("0.00"),
-    )
+    flow = BookingFlow.from_request(request)
+    booking = flow.booking()
+    if booking is None:
+        return flow.save(redirect("mietfahrzeuge"))
 
-    net_total = (base_price or Decimal("0.00")) + extras_total
-    vat_rate = Decimal("0.077")
-    vat_amount = (net_total * vat_rate / (Decimal("1.0") + vat_rate)).quantize(Decimal("0.01"))
-    total_price = net_total.quantize(Decimal("0.01"))
+    quote = booking_quote(booking, {extra["key"]: extra for extra in rental_extras()})
 
     if request.method == "POST":
         booking.payment_method = "CASH"
         booking.payment_status = "unpaid"
-        booking.total_price = total_price
-        booking.save()
+        booking.total_price = quote["total_price"]
+        try:
+            with booking_overlap_guard():
+                booking.save()
+        except ValidationError as e:
+            return render(
+                request,
+                "booking_payment.html",
+                {"booking": booking, "total_price": quote["total_price"], "payment_error": e.messages[0]},
+            )
 
         try:
             from adminportal.models import PortalSettings
@@ -741,11 +643,11 @@ def booking_payment(request):
                         f"rechnung-bu-{booking.id}.pdf",
                         render_booking_invoice_pdf(
                             booking,
-                            rental_days=rental_days,
-                            base_price=base_price,
-                            extras_total=extras_total,
-                            vat_amount=vat_amount,
-                            total_price=total_price,
+                            rental_days=quote["rental_days"],
+                            base_price=quote["base_price"],
+                            extras_total=quote["extras_total"],
+                            vat_amount=quote["vat_amount"],
+                            total_price=quote["total_price"],
                         ),
                         "application/pdf",
                     )
@@ -774,14 +676,12 @@ def booking_payment(request):
         except Exception:
             pass
 
-        if "current_booking_id" in request.session:
-            del request.session["current_booking_id"]
-
-        return redirect("booking_success", booking_id=booking.id)
+        flow.finish()
+        return flow.save(redirect("booking_success", booking_id=booking.id))
 
     context = {
         "booking": booking,
-        "total_price": total_price,
+        "total_price": quote["total_price"],
     }
     return render(request, "booking_payment.html", context)
 
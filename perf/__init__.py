@@ -0,0 +1 @@
+"""Performance-Suite: Query-Budgets und Latenz-Benchmarks für die meistgenutzten Views."""
@@ -0,0 +1,99 @@
+"""
+Latenz-Messung der Szenarien und Vergleich mit einer JSON-Baseline.
+
+Aufruf über die Test-Suite:
+
+    PERF_BENCHMARK=1 PERF_OUTPUT=perf/results.json pytest perf -m perf
+    PERF_BENCHMARK=1 PERF_BASELINE=perf/baseline.json pytest perf -m perf
+"""
+import json
+import math
+import subprocess
+import time
+from pathlib import Path
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+def percentile(samples, pct):
+    """Nearest-rank Perzentil (pct 0–100) über eine Liste von Messwerten."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples_ms):
+    return {
+        "count": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 2),
+        "p95_ms": round(percentile(samples_ms, 95), 2),
+        "p99_ms": round(percentile(samples_ms, 99), 2),
+        "max_ms": round(max(samples_ms), 2) if samples_ms else 0.0,
+    }
+
+
+def measure_scenario(client, scenario, dataset, iterations=20):
+    url = scenario.url(dataset)
+    params = scenario.query(dataset)
+    client.get(url, params)  # Warm-up
+    samples = []
+    queries = 0
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            client.get(url, params)
+            samples.append((time.perf_counter() - started) * 1000)
+        queries = len(ctx.captured_queries)
+    result = summarize(samples)
+    result["queries"] = queries
+    return result
+
+
+def current_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return out.stdout.strip()
+    except Exception:
+        return ""
+
+
+def build_report(results, scale):
+    return {
+        "commit": current_commit(),
+        "generated_at": timezone.now().isoformat(),
+        "scale": scale,
+        "views": results,
+    }
+
+
+def write_report(report, path):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2, sort_keys=True))
+
+
+def compare_reports(baseline, current, tolerance=0.25):
+    """
+    Vergleicht p95 und Query-Anzahl pro View.
+    Gibt eine Liste von Regressionen (Text) zurück; leer = alles im Rahmen.
+    """
+    regressions = []
+    for name, now in current.get("views", {}).items():
+        before = baseline.get("views", {}).get(name)
+        if not before:
+            continue
+        if now["queries"] > before["queries"]:
+            regressions.append(f"{name}: Queries {before['queries']} -> {now['queries']}")
+        limit = before["p95_ms"] * (1 + tolerance)
+        if before["p95_ms"] and now["p95_ms"] > limit:
+            regressions.append(f"{name}: p95 {before['p95_ms']}ms -> {now['p95_ms']}ms (Limit {limit:.2f}ms)")
+    return regressions
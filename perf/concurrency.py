@@ -0,0 +1,138 @@
+"""
+Nebenläufigkeit: Verfügbarkeitsabfragen während langsamer Uploads, sync (WSGI) gegen async (ASGI).
+
+- ``sync``: WSGI-Handler mit ``workers`` Threads – entspricht ``gunicorn config.wsgi`` mit
+  ``workers`` sync Workern. Ein Upload belegt seinen Worker, bis der Storage-PUT fertig ist.
+- ``async``: ASGI-Handler in einem Event-Loop – entspricht einem Uvicorn-Worker (``config.asgi``).
+
+``concurrency`` Clients senden ihre Anfragen nacheinander. Der Storage-PUT wird um
+``storage_delay_ms`` verzögert (langsamer S3). Gemessen wird die Latenz ab Eingang des Requests,
+also inklusive Wartezeit auf einen freien Worker.
+
+    PERF_BENCHMARK=1 pytest perf -m perf -k concurrency
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from asgiref.sync import ThreadSensitiveContext
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .benchmark import summarize
+
+
+def _workload(dataset, requests, upload_share):
+    """Liste ``(art, Methode, URL, Daten)``; jede ``1/upload_share``-te Anfrage ist ein Upload."""
+    today = timezone.localdate().isoformat()
+    transporters = dataset["transporters"]
+    reports = dataset["reports"]
+    every = max(1, round(1 / upload_share)) if upload_share else 0
+    items = []
+    for idx in range(requests):
+        if every and idx % every == 0:
+            report = reports[idx % len(reports)]
+            items.append(("upload", "post", reverse("damage-report-upload-document", args=[report.pk]), None))
+        else:
+            transporter = transporters[idx % len(transporters)]
+            params = {"transporter": transporter.pk, "date": today, "time_slot": "MORNING"}
+            items.append(("availability", "get", reverse("booking-availability"), params))
+    return items
+
+
+def _document():
+    return {"document": SimpleUploadedFile("protokoll.pdf", b"%PDF-1.4 perf", content_type="application/pdf")}
+
+
+def _slow_storage(delay_ms):
+    save = default_storage.save
+
+    def slow_save(name, content, **kwargs):
+        time.sleep(delay_ms / 1000)
+        return save(name, content, **kwargs)
+
+    return mock.patch.object(default_storage, "save", side_effect=slow_save)
+
+
+def _result(samples, errors, elapsed):
+    total = sum(len(values) for values in samples.values())
+    return {
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        **{kind: summarize(values) for kind, values in samples.items()},
+    }
+
+
+def run_sync(items, workers, concurrency):
+    """``concurrency`` Clients gegen einen Server mit ``workers`` sync Workern."""
+    samples = {"availability": [], "upload": []}
+    errors = 0
+    server = threading.Semaphore(workers)
+
+    def call(item):
+        kind, method, url, params = item
+        queued = time.perf_counter()
+        with server:
+            response = getattr(Client(), method)(url, params if params is not None else _document())
+        return kind, (time.perf_counter() - queued) * 1000, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as clients:
+        for kind, elapsed_ms, status in clients.map(call, items):
+            samples[kind].append(elapsed_ms)
+            errors += status >= 400
+    return _result(samples, errors, time.perf_counter() - started)
+
+
+async def _run_async(items, concurrency):
+    samples = {"availability": [], "upload": []}
+    errors = 0
+    clients = asyncio.Semaphore(concurrency)
+
+    async def call(item):
+        nonlocal errors
+        kind, method, url, params = item
+        async with clients:
+            queued = time.perf_counter()
+            # Wie ``ASGIHandler``: eigener Thread für die sync Teile jedes Requests
+            async with ThreadSensitiveContext():
+                response = await getattr(AsyncClient(), method)(url, params if params is not None else _document())
+            samples[kind].append((time.perf_counter() - queued) * 1000)
+        errors += response.status_code >= 400
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call(item) for item in items))
+    return _result(samples, errors, time.perf_counter() - started)
+
+
+def run_async(items, concurrency):
+    """``concurrency`` Clients gegen einen ASGI-Worker."""
+    return asyncio.run(_run_async(items, concurrency))
+
+
+def compare_concurrency(dataset, requests=200, workers=4, concurrency=20, upload_share=0.2, storage_delay_ms=200):
+    """Gleiche Last gegen beide Betriebsarten; Ergebnis ``{"sync": {...}, "async": {...}}``."""
+    items = _workload(dataset, requests, upload_share)
+    # Warm-up (URL-Auflösung, Middleware, Verbindungen)
+    with override_settings(API_THROTTLES={}):
+        run_sync(items[:2], 1, 1)
+        run_async(items[:2], 1)
+    # Alle Anfragen kommen von derselben IP – Throttling (api.throttling) hier abschalten
+    with _slow_storage(storage_delay_ms), override_settings(API_THROTTLES={}):
+        return {
+            "settings": {
+                "requests": requests,
+                "workers": workers,
+                "concurrency": concurrency,
+                "upload_share": upload_share,
+                "storage_delay_ms": storage_delay_ms,
+            },
+            "sync": run_sync(items, workers, concurrency),
+            "async": run_async(items, concurrency),
+        }
@@ -0,0 +1,26 @@
+import os
+
+import pytest
+
+from .factories import build_dataset, build_staff_user
+
+
+def _scales():
+    raw = os.getenv("PERF_SCALES", "1,10")
+    return [int(s) for s in raw.split(",") if s.strip()]
+
+
+@pytest.fixture
+def staff_user(db):
+    return build_staff_user()
+
+
+@pytest.fixture
+def dataset_factory(db):
+    """Gibt eine Funktion zurück, die einen Datensatz in gewünschter Grösse anlegt."""
+    return build_dataset
+
+
+def pytest_generate_tests(metafunc):
+    if "scale" in metafunc.fixturenames:
+        metafunc.parametrize("scale", _scales(), ids=lambda s: f"{s}x")
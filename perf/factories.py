@@ -0,0 +1,246 @@
+"""
+Testdaten-Generatoren für die Performance-Suite.
+
+Erzeugt eine realistische Flotte mit Buchungen, Schadenmeldungen und Rechnungen.
+``scale=1`` entspricht einem kleinen Betrieb, 10/100 simulieren Wachstum.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from itertools import cycle
+
+from django.contrib.auth.models import Group, User
+from django.utils import timezone
+
+from adminportal.models import Customer as PortalCustomer, Invoice as PortalInvoice, PortalSettings
+from adminportal.utils.fleet_stats import rebuild_fleet_stats
+from adminportal.utils.invoice_lines import rebuild_invoice_lines
+from adminportal.utils.ledger import rebuild_customer_ledgers
+from main.models import Booking, Customer, DamageReport, Invoice, Transporter, Vehicle
+
+BASE_VEHICLES = 4
+BASE_BOOKINGS = 30
+BASE_REPORTS = 15
+BASE_CUSTOMERS = 12
+BASE_INVOICES = 20
+
+BRANDS = [("Mercedes", "Sprinter"), ("VW", "Crafter"), ("Fiat", "Ducato"), ("Ford", "Transit")]
+VEHICLE_TYPES = ["small", "medium", "large"]
+SLOTS = ["MORNING", "AFTERNOON", "FULLDAY"]
+BOOKING_STATUSES = ["pending", "confirmed", "completed", "cancelled"]
+REPORT_STATUSES = ["pending", "in_progress", "completed", "cancelled"]
+INSURERS = ["AXA", "Mobiliar", "Zurich", "Helvetia", "NO_INSURANCE"]
+DAMAGE_TYPES = ["Unfallschaden", "Hagelschaden", "Parkschaden", "Vandalismus"]
+INVOICE_STATUSES = ["pending", "paid", "overdue", "draft"]
+SOURCES = ["rental", "damage-report", "manual", "both"]
+
+
+def build_fleet(scale=1):
+    """Legt Vehicles samt gespiegelten Transportern an (wie ``_sync_transporters_from_vehicles``)."""
+    today = timezone.localdate()
+    vehicles = []
+    transporters = []
+    for idx in range(BASE_VEHICLES * scale):
+        brand, model = BRANDS[idx % len(BRANDS)]
+        plate = f"SO-{10000 + idx}"
+        vehicles.append(
+            Vehicle(
+                type=VEHICLE_TYPES[idx % len(VEHICLE_TYPES)],
+                license_plate=plate,
+                brand=brand,
+                model=model,
+                daily_rate=Decimal("120.00"),
+                half_day_rate=Decimal("70.00"),
+                status="maintenance" if idx % 7 == 6 else "available",
+                next_service=today + timedelta(days=idx % 90),
+            )
+        )
+        transporters.append(
+            Transporter(
+                name=f"{brand} {model}",
+                kennzeichen=plate,
+                preis_chf=Decimal("120.00"),
+                halbtag_preis_chf=Decimal("70.00"),
+                verfuegbar_ab=today,
+            )
+        )
+    Vehicle.objects.bulk_create(vehicles)
+    Transporter.objects.bulk_create(transporters)
+    return list(Vehicle.objects.order_by("id")), list(Transporter.objects.order_by("id"))
+
+
+def build_customers(scale=1):
+    main_customers = []
+    portal_customers = []
+    for idx in range(BASE_CUSTOMERS * scale):
+        email = f"kunde{idx}@example.com"
+        main_customers.append(
+            Customer(
+                first_name=f"Vorname{idx}",
+                last_name=f"Nachname{idx}",
+                email=email,
+                phone="+41 44 123 45 67",
+                address=f"Musterstrasse {idx}",
+                city="Olten",
+                postal_code="4600",
+                source=SOURCES[idx % len(SOURCES)],
+            )
+        )
+        portal_customers.append(
+            PortalCustomer(
+                first_name=f"Vorname{idx}",
+                last_name=f"Nachname{idx}",
+                email=email,
+                phone="+41 44 123 45 67",
+                city="Olten",
+                postal_code="4600",
+                source=SOURCES[idx % len(SOURCES)],
+            )
+        )
+    Customer.objects.bulk_create(main_customers)
+    PortalCustomer.objects.bulk_create(portal_customers)
+    return list(Customer.objects.order_by("id")), list(PortalCustomer.objects.order_by("id"))
+
+
+def build_bookings(transporters, vehicles, customers, scale=1):
+    """Verteilt Buchungen konfliktfrei über die nächsten Wochen (unique transporter/date/slot)."""
+    today = timezone.localdate()
+    bookings = []
+    occupied = {}
+    slots = cycle(SLOTS)
+    total = BASE_BOOKINGS * scale
+    idx = 0
+    offset = -14
+    while len(bookings) < total:
+        transporter = transporters[idx % len(transporters)]
+        day = today + timedelta(days=offset + (idx // len(transporters)) % 60)
+        slot = next(slots)
+        taken = occupied.setdefault((transporter.id, day), set())
+        if "FULLDAY" in taken or (slot == "FULLDAY" and taken) or slot in taken:
+            idx += 1
+            continue
+        taken.add(slot)
+        customer = customers[idx % len(customers)]
+        vehicle = vehicles[idx % len(vehicles)]
+        bookings.append(
+            Booking(
+                transporter=transporter,
+                vehicle=vehicle,
+                customer=customer,
+                date=day,
+                time_slot=slot,
+                pickup_date=day,
+                return_date=day,
+                customer_name=f"{customer.first_name} {customer.last_name}",
+                customer_email=customer.email,
+                customer_phone=customer.phone,
+                customer_address=customer.address,
+                driver_license_number="ABC12345",
+                status=BOOKING_STATUSES[idx % len(BOOKING_STATUSES)],
+                extras=["moving_blankets"] if idx % 3 == 0 else [],
+                total_price=Decimal("70.00") if slot != "FULLDAY" else Decimal("120.00"),
+            )
+        )
+        idx += 1
+    Booking.objects.bulk_create(bookings)
+    return list(Booking.objects.order_by("id"))
+
+
+def build_damage_reports(customers, scale=1):
+    today = timezone.localdate()
+    reports = []
+    for idx in range(BASE_REPORTS * scale):
+        customer = customers[idx % len(customers)]
+        reports.append(
+            DamageReport(
+                customer=customer,
+                first_name=customer.first_name,
+                last_name=customer.last_name,
+                email=customer.email,
+                phone=customer.phone,
+                car_brand="VW",
+                car_model="Golf",
+                plate=f"SO {20000 + idx}",
+                insurer=INSURERS[idx % len(INSURERS)],
+                policy_number=f"POL-{idx}",
+                damage_type=DAMAGE_TYPES[idx % len(DAMAGE_TYPES)],
+                damaged_parts=["FRONT_BUMPER", "HOOD"],
+                accident_date=today - timedelta(days=idx % 120),
+                accident_location="Olten",
+                message="Stossstange und Motorhaube nach Auffahrunfall beschädigt.",
+                status=REPORT_STATUSES[idx % len(REPORT_STATUSES)],
+            )
+        )
+    DamageReport.objects.bulk_create(reports)
+    return list(DamageReport.objects.order_by("id"))
+
+
+def build_invoices(main_customers, portal_customers, bookings, reports, scale=1):
+    today = timezone.localdate()
+    portal_invoices = []
+    main_invoices = []
+    for idx in range(BASE_INVOICES * scale):
+        issue_date = today - timedelta(days=idx % 90)
+        portal_invoices.append(
+            PortalInvoice(
+                invoice_number=f"PF-{idx:06d}",
+                customer=portal_customers[idx % len(portal_customers)],
+                related_booking=bookings[idx % len(bookings)] if idx % 2 == 0 else None,
+                related_report=reports[idx % len(reports)] if idx % 2 == 1 else None,
+                items=[
+                    {"description": "Arbeit", "quantity": 2, "unit_price": 95.0, "total": 190.0},
+                    {"description": "Material", "quantity": 1, "unit_price": 45.5, "total": 45.5},
+                ],
+                amount_chf=Decimal("235.50"),
+                status=INVOICE_STATUSES[idx % len(INVOICE_STATUSES)],
+                issue_date=issue_date,
+                due_date=issue_date + timedelta(days=30),
+                payment_date=issue_date + timedelta(days=5) if idx % 4 == 1 else None,
+            )
+        )
+        main_invoices.append(
+            Invoice(
+                invoice_number=f"MF-{idx:06d}",
+                customer=main_customers[idx % len(main_customers)],
+                invoice_date=issue_date,
+                due_date=issue_date + timedelta(days=30),
+                items=[{"description": "Arbeit", "quantity": 2, "unitPrice": 95, "vatRate": 8.1, "total": 190}],
+                subtotal=Decimal("190.00"),
+                vat_amount=Decimal("15.39"),
+                total_amount=Decimal("205.39"),
+                type="rental" if idx % 2 == 0 else "damage-report",
+            )
+        )
+    PortalInvoice.objects.bulk_create(portal_invoices)
+    Invoice.objects.bulk_create(main_invoices)
+    return list(PortalInvoice.objects.order_by("id")), list(Invoice.objects.order_by("id"))
+
+
+def build_staff_user(username="perf-staff", role="admin"):
+    group, _ = Group.objects.get_or_create(name=role)
+    user = User.objects.create_user(username=username, password="Perf-Test-12345", is_staff=True)
+    user.groups.add(group)
+    return user
+
+
+def build_dataset(scale=1):
+    """Erzeugt einen vollständigen Datensatz und gibt die Objekte als dict zurück."""
+    PortalSettings.objects.get_or_create(pk=1)
+    vehicles, transporters = build_fleet(scale)
+    main_customers, portal_customers = build_customers(scale)
+    bookings = build_bookings(transporters, vehicles, main_customers, scale)
+    reports = build_damage_reports(main_customers, scale)
+    portal_invoices, main_invoices = build_invoices(main_customers, portal_customers, bookings, reports, scale)
+    rebuild_customer_ledgers()
+    rebuild_fleet_stats()
+    rebuild_invoice_lines()
+    return {
+        "scale": scale,
+        "vehicles": vehicles,
+        "transporters": transporters,
+        "customers": main_customers,
+        "portal_customers": portal_customers,
+        "bookings": bookings,
+        "reports": reports,
+        "portal_invoices": portal_invoices,
+        "invoices": main_invoices,
+    }
@@ -0,0 +1,497 @@
+"""
+Synthetische Last gegen einen laufenden Server: Mietablauf und Schadenmeldung.
+
+Jeder virtuelle Kunde hat eine eigene Session (Cookies, CSRF) und spielt den Ablauf so ab wie
+ein Browser ohne JavaScript:
+
+- ``rental``: ``mietfahrzeuge`` (Transporter, Datum, Zeitblock) → Kundendaten → Optionen →
+  Review → Zahlung → Bestätigung
+- ``claim``: ``ClaimWizard`` mit Fahrzeugausweis (Schritt 1) und Schadenfotos (Schritt 4)
+
+Die Abläufe starten als Poisson-Prozess mit der angegebenen Rate (offenes Lastmodell: neue Kunden
+kommen auch dann, wenn der Server langsam wird) und laufen auf ``concurrency`` Threads. Gemessen
+wird pro Request inkl. Verbindungsaufbau; ``start_lag`` zeigt, wie weit der Generator selbst den
+geplanten Starts hinterherläuft (dann ``concurrency`` erhöhen).
+
+Ein abgelehnter Slot („kollidiert mit bestehender Reservierung“) ist kein Fehler, sondern der
+erwartete Ausgang bei Konkurrenz um denselben Transporter. Doppelbuchungen werden zweimal
+gesucht: aus Sicht der Clients (zwei angenommene Buchungen mit kollidierenden Slots) und – wenn
+der Befehl dieselbe DB wie der Server sieht – direkt in der Tabelle.
+
+Der Lauf legt echte Buchungen und Schadenmeldungen an (E-Mail ``…@loadtest.example``); nur gegen
+lokale oder Staging-Datenbanken verwenden. Aufruf über ``manage.py loadtest``.
+"""
+import html
+import http.cookiejar
+import io
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from itertools import combinations
+from uuid import uuid4
+
+from django.urls import reverse
+from django.utils import timezone
+
+from main.models import Booking
+from .benchmark import summarize
+
+TIME_BLOCKS = {"morning": "MORNING", "afternoon": "AFTERNOON", "fullday": "FULLDAY"}
+EMAIL_DOMAIN = "loadtest.example"
+CONFLICT_MARKER = "kollidiert mit bestehender Reservierung"
+
+
+class StepFailed(Exception):
+    pass
+
+
+def next_saturday(today=None):
+    today = today or timezone.localdate()
+    return today + timedelta(days=(5 - today.weekday()) % 7 or 7)
+
+
+def slots_collide(a, b):
+    """Gleiche Regeln wie ``api.validators``: FULLDAY blockiert alles, sonst nur der gleiche Halbtag."""
+    return a == b or "FULLDAY" in (a, b)
+
+
+def find_double_bookings(holds):
+    """
+    ``holds``: Dicts mit ``transporter``, ``date``, ``time_slot`` (und beliebigen weiteren Keys).
+    Gibt die Paare mit kollidierenden Slots zurück.
+    """
+    groups = defaultdict(list)
+    for hold in holds:
+        groups[(hold["transporter"], str(hold["date"]))].append(hold)
+    anomalies = []
+    for items in groups.values():
+        for first, second in combinations(items, 2):
+            if slots_collide(first["time_slot"], second["time_slot"]):
+                anomalies.append((first, second))
+    return anomalies
+
+
+def db_double_bookings(dates, transporter_ids=None):
+    """Doppelbuchungen in der Tabelle für die Lauftage (stornierte Buchungen zählen nicht)."""
+    qs = Booking.objects.filter(date__in=dates).exclude(status="cancelled")
+    if transporter_ids:
+        qs = qs.filter(transporter_id__in=transporter_ids)
+    holds = [
+        {"booking": pk, "transporter": transporter_id, "date": day, "time_slot": slot}
+        for pk, transporter_id, day, slot in qs.values_list("pk", "transporter_id", "date", "time_slot")
+    ]
+    return find_double_bookings(holds)
+
+
+def encode_multipart(fields, files):
+    """``fields``: Liste ``(Name, Wert)``, ``files``: Liste ``(Name, Dateiname, Content-Type, Bytes)``."""
+    boundary = uuid4().hex
+    body = io.BytesIO()
+    for name, value in fields:
+        body.write(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8"))
+    for name, filename, content_type, content in files:
+        body.write(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n".encode("utf-8")
+        )
+        body.write(content)
+        body.write(b"\r\n")
+    body.write(f"--{boundary}--\r\n".encode("utf-8"))
+    return body.getvalue(), f"multipart/form-data; boundary={boundary}"
+
+
+def form_choices(page, name):
+    """Werte eines Select- oder Checkbox-Felds aus dem HTML (ohne leere Auswahl und „Andere“)."""
+    select = re.search(rf'<select[^>]*name="{re.escape(name)}"[^>]*>(.*?)</select>', page, re.S)
+    if select:
+        values = re.findall(r'<option[^>]*value="([^"]*)"', select.group(1))
+    else:
+        values = []
+        for tag in re.findall(rf'<input[^>]*name="{re.escape(name)}"[^>]*>', page):
+            match = re.search(r'value="([^"]*)"', tag)
+            if match:
+                values.append(match.group(1))
+    # „OTHER“ (Andere/Sonstiges) verlangt ein zusätzliches Freitextfeld
+    return [html.unescape(value) for value in values if value and value != "OTHER"]
+
+
+def jpeg_bytes(rng, size=(640, 480)):
+    from PIL import Image
+
+    color = tuple(rng.randrange(256) for _ in range(3))
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Redirects selbst auswerten: jeder Schritt wird einzeln gemessen und geprüft
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+@dataclass
+class Response:
+    status: int
+    headers: dict
+    text: str
+
+    @property
+    def location(self):
+        return self.headers.get("Location", "")
+
+
+class Recorder:
+    """Sammelt Messwerte aller Threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.failures = defaultdict(int)
+        self.outcomes = defaultdict(lambda: defaultdict(int))
+        self.start_lag = []
+        self.errors = []
+        self.holds = []
+
+    def request(self, step, ms, ok):
+        with self._lock:
+            self.samples[step].append(ms)
+            if not ok:
+                self.failures[step] += 1
+
+    def outcome(self, flow, outcome, lag_ms, error=None):
+        with self._lock:
+            self.outcomes[flow][outcome] += 1
+            self.start_lag.append(lag_ms)
+            if error and len(self.errors) < 20:
+                self.errors.append(f"{flow}: {error}")
+
+    def hold(self, **values):
+        with self._lock:
+            self.holds.append(values)
+
+
+class Session:
+    """Ein virtueller Kunde: Cookie-Jar, CSRF-Token und gemessene Requests."""
+
+    def __init__(self, base_url, recorder, flow, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.recorder = recorder
+        self.flow = flow
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+        self.csrf_token = ""
+
+    def _remember_csrf(self, page):
+        match = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', page)
+        if match:
+            self.csrf_token = match.group(1)
+        else:
+            self.csrf_token = next((c.value for c in self.cookies if c.name == "csrftoken"), self.csrf_token)
+
+    def request(self, step, path, data=None, files=None, expect=(200,)):
+        headers = {"User-Agent": "roberts-lackwerk-loadtest"}
+        body = None
+        if data is not None or files:
+            fields = [("csrfmiddlewaretoken", self.csrf_token), *(data or [])]
+            body, headers["Content-Type"] = encode_multipart(fields, files or [])
+            headers["Referer"] = self.base_url + path
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers)
+
+        started = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as raw:
+                response = Response(raw.status, dict(raw.headers), raw.read().decode("utf-8", "replace"))
+        except urllib.error.HTTPError as exc:
+            response = Response(exc.code, dict(exc.headers), exc.read().decode("utf-8", "replace"))
+        except OSError as exc:
+            self.recorder.request(f"{self.flow}:{step}", (time.perf_counter() - started) * 1000, ok=False)
+            raise StepFailed(f"{step}: {exc}") from exc
+        ok = response.status in expect
+        self.recorder.request(f"{self.flow}:{step}", (time.perf_counter() - started) * 1000, ok=ok)
+        if not ok:
+            raise StepFailed(f"{step}: HTTP {response.status}")
+        if response.status == 200:
+            self._remember_csrf(response.text)
+        return response
+
+    def follow(self, step, response, expected):
+        """Prüft, dass der Redirect auf ``expected`` zeigt, und ruft die Zielseite auf."""
+        location = urllib.parse.urlsplit(response.location).path
+        if location != expected:
+            raise StepFailed(f"{step}: Redirect auf {location or '-'} statt {expected}")
+        return self.request(step, location)
+
+
+@dataclass
+class LoadProfile:
+    base_url: str
+    rental_rate: float = 1.0
+    claim_rate: float = 0.5
+    duration: float = 60.0
+    concurrency: int = 20
+    booking_dates: list = field(default_factory=list)
+    transporter_ids: list = field(default_factory=list)
+    time_blocks: tuple = ("morning", "afternoon", "fullday")
+    photos: int = 2
+    think_time: float = 0.0
+    timeout: float = 30.0
+    seed: int = None
+
+
+class LoadGenerator:
+    def __init__(self, profile):
+        self.profile = profile
+        self.recorder = Recorder()
+        self.run_id = uuid4().hex[:8]
+        self.rng = random.Random(profile.seed)
+        self._rng_lock = threading.Lock()
+
+    # -- Hilfen ------------------------------------------------------------------------------
+
+    def _pick(self, items):
+        with self._rng_lock:
+            return self.rng.choice(items)
+
+    def _jpeg(self):
+        with self._rng_lock:
+            seed = self.rng.random()
+        return jpeg_bytes(random.Random(seed))
+
+    def _think(self):
+        if self.profile.think_time:
+            time.sleep(self.profile.think_time)
+
+    def discover_transporters(self):
+        """IDs der am ersten Lauftag freien Transporter (falls nicht vorgegeben)."""
+        session = Session(self.profile.base_url, Recorder(), "setup", self.profile.timeout)
+        session.request("mietfahrzeuge", reverse("mietfahrzeuge"))
+        # Die Modellauswahl erscheint erst mit Datum und Zeitblock
+        page = session.request(
+            "auswahl",
+            reverse("mietfahrzeuge"),
+            data=[("pickup_date", self.profile.booking_dates[0].isoformat()), ("time_block", "morning")],
+        ).text
+        ids = sorted({int(value) for value in re.findall(r'name="transporter_id" value="(\d+)"', page)})
+        if not ids:
+            raise StepFailed("Keine freien Transporter auf /mietfahrzeuge/ gefunden.")
+        return ids
+
+    # -- Abläufe -----------------------------------------------------------------------------
+
+    def rental_flow(self, number):
+        profile = self.profile
+        session = Session(profile.base_url, self.recorder, "rental", profile.timeout)
+        transporter_id = self._pick(profile.transporter_ids)
+        booking_date = self._pick(profile.booking_dates)
+        time_block = self._pick(list(profile.time_blocks))
+
+        session.request("mietfahrzeuge", reverse("mietfahrzeuge"))
+        self._think()
+        selected = session.request(
+            "auswahl",
+            reverse("mietfahrzeuge"),
+            data=[
+                ("transporter_id", transporter_id),
+                ("pickup_date", booking_date.isoformat()),
+                ("time_block", time_block),
+            ],
+            expect=(302,),
+        )
+        session.follow("kundendaten_formular", selected, reverse("booking_create", args=[transporter_id]))
+        self._think()
+        customer = session.request(
+            "kundendaten",
+            reverse("booking_create", args=[transporter_id]),
+            data=[
+                ("customer_name", f"Lasttest Kunde {number}"),
+                ("customer_address", f"Lastweg {number}, 8000 Zürich"),
+                ("customer_phone", f"+4179{number % 10_000_000:07d}"),
+                ("customer_email", f"rental-{self.run_id}-{number}@{EMAIL_DOMAIN}"),
+                ("driver_license_number", f"LT{self.run_id}{number}"),
+            ],
+            expect=(200, 302),
+        )
+        if customer.status == 200:
+            if CONFLICT_MARKER in customer.text:
+                return "abgelehnt"
+            raise StepFailed("kundendaten: Formular nicht angenommen")
+        # Ab hier belegt die Buchung den Slot
+        self.recorder.hold(
+            flow=number,
+            transporter=transporter_id,
+            date=booking_date.isoformat(),
+            time_slot=TIME_BLOCKS[time_block],
+        )
+
+        options_page = session.follow("optionen_formular", customer, reverse("booking_options"))
+        extras = form_choices(options_page.text, "extras")
+        self._think()
+        options = session.request(
+            "optionen",
+            reverse("booking_options"),
+            data=[("extras", key) for key in extras[:1]],
+            expect=(302,),
+        )
+        session.follow("review_formular", options, reverse("booking_review"))
+        self._think()
+        review = session.request("review", reverse("booking_review"), data=[], expect=(302,))
+        session.follow("zahlung_formular", review, reverse("booking_payment"))
+        self._think()
+        payment = session.request("zahlung", reverse("booking_payment"), data=[], expect=(302,))
+        match = re.search(r"/erfolg/(\d+)/", payment.location)
+        if not match:
+            raise StepFailed(f"zahlung: Redirect auf {payment.location or '-'}")
+        session.follow("bestaetigung", payment, reverse("booking_success", args=[match.group(1)]))
+        return "abgeschlossen"
+
+    def _wizard_step(self, session, step, data, files=None, next_step=None):
+        response = session.request(
+            step,
+            reverse("schaden_melden"),
+            data=[("claim_wizard-current_step", step), *[(f"{step}-{name}", value) for name, value in data]],
+            files=[(f"{step}-{name}", *rest) for name, *rest in files or []],
+            expect=(200,) if next_step else (302,),
+        )
+        if next_step and f'value="{next_step}"' not in response.text:
+            raise StepFailed(f"{step}: Schritt nicht angenommen")
+        self._think()
+        return response
+
+    def claim_flow(self, number):
+        profile = self.profile
+        session = Session(profile.base_url, self.recorder, "claim", profile.timeout)
+        session.request("formular", reverse("schaden_melden"))
+        self._think()
+        self._wizard_step(
+            session,
+            "car",
+            [("plate", f"ZH{number % 1_000_000}"), ("car_brand", "VW"), ("car_model", "Crafter")],
+            files=[("registration_document", "fahrzeugausweis.jpg", "image/jpeg", self._jpeg())],
+            next_step="personal",
+        )
+        personal = self._wizard_step(
+            session,
+            "personal",
+            [
+                ("first_name", "Lasttest"),
+                ("last_name", f"Kunde {number}"),
+                ("phone", f"+4179{number % 10_000_000:07d}"),
+                ("email", f"claim-{self.run_id}-{number}@{EMAIL_DOMAIN}"),
+            ],
+            next_step="insurance",
+        )
+        # Auswahlwerte kommen aus den Portal-Einstellungen – aus dem ausgelieferten Formular lesen
+        insurers = form_choices(personal.text, "insurance-insurer")
+        if not insurers:
+            raise StepFailed("insurance: Auswahlfeld nicht gefunden")
+        insurance = self._wizard_step(session, "insurance", [("insurer", insurers[0])], next_step="accident")
+        parts = form_choices(insurance.text, "accident-damaged_parts")
+        damage_types = form_choices(insurance.text, "accident-damage_type")
+        if not parts or not damage_types:
+            raise StepFailed("accident: Auswahlfelder nicht gefunden")
+        photos = [
+            ("photos", f"schaden-{idx + 1}.jpg", "image/jpeg", self._jpeg()) for idx in range(profile.photos)
+        ]
+        self._wizard_step(
+            session,
+            "accident",
+            [
+                ("damaged_parts", parts[0]),
+                ("accident_date", timezone.localdate().isoformat()),
+                ("accident_location", "Zürich"),
+                ("damage_type", damage_types[0]),
+                ("message", "Lasttest"),
+            ],
+            files=photos,
+            next_step="review",
+        )
+        done = self._wizard_step(session, "review", [("confirm", "on")])
+        match = re.search(r"/erfolg/(\d+)/", done.location)
+        if not match:
+            raise StepFailed(f"review: Redirect auf {done.location or '-'}")
+        session.follow("bestaetigung", done, reverse("schaden_success", args=[match.group(1)]))
+        return "abgeschlossen"
+
+    # -- Ausführung --------------------------------------------------------------------------
+
+    def schedule(self):
+        """Geplante Starts ``(Sekunde, Ablauf)`` über die Laufzeit, Poisson-verteilt pro Ablauf."""
+        arrivals = []
+        for flow, rate in (("rental", self.profile.rental_rate), ("claim", self.profile.claim_rate)):
+            if rate <= 0:
+                continue
+            at = self.rng.expovariate(rate)
+            while at < self.profile.duration:
+                arrivals.append((at, flow))
+                at += self.rng.expovariate(rate)
+        return sorted(arrivals)
+
+    def _run_flow(self, flow, number, planned):
+        lag_ms = max(time.perf_counter() - planned, 0) * 1000
+        try:
+            outcome = getattr(self, f"{flow}_flow")(number)
+        except StepFailed as exc:
+            self.recorder.outcome(flow, "fehler", lag_ms, error=str(exc))
+        except Exception as exc:  # Generator-Fehler nicht als Serverfehler verschweigen
+            self.recorder.outcome(flow, "fehler", lag_ms, error=f"{type(exc).__name__}: {exc}")
+        else:
+            self.recorder.outcome(flow, outcome, lag_ms)
+
+    def run(self):
+        if not self.profile.booking_dates:
+            self.profile.booking_dates = [next_saturday()]
+        if not self.profile.transporter_ids:
+            self.profile.transporter_ids = self.discover_transporters()
+
+        arrivals = self.schedule()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.profile.concurrency) as pool:
+            for number, (at, flow) in enumerate(arrivals, start=1):
+                delay = started + at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self._run_flow, flow, number, started + at)
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed):
+        recorder = self.recorder
+        steps = {}
+        total = failed = 0
+        for step, samples in sorted(recorder.samples.items()):
+            steps[step] = {**summarize(samples), "errors": recorder.failures[step]}
+            total += len(samples)
+            failed += recorder.failures[step]
+        flows = {flow: dict(outcomes) for flow, outcomes in recorder.outcomes.items()}
+        completed = sum(outcomes.get("abgeschlossen", 0) for outcomes in flows.values())
+        flow_count = sum(sum(outcomes.values()) for outcomes in flows.values())
+        flow_errors = sum(outcomes.get("fehler", 0) for outcomes in flows.values())
+        return {
+            "run_id": self.run_id,
+            "base_url": self.profile.base_url,
+            "elapsed_s": round(elapsed, 2),
+            "rates": {"rental": self.profile.rental_rate, "claim": self.profile.claim_rate},
+            "concurrency": self.profile.concurrency,
+            "booking_dates": [day.isoformat() for day in self.profile.booking_dates],
+            "requests": total,
+            "requests_per_s": round(total / elapsed, 2) if elapsed else 0.0,
+            "completed_flows_per_min": round(completed / elapsed * 60, 2) if elapsed else 0.0,
+            "request_error_rate": round(failed / total, 4) if total else 0.0,
+            "flow_error_rate": round(flow_errors / flow_count, 4) if flow_count else 0.0,
+            "flows": flows,
+            "steps": steps,
+            "start_lag": summarize(recorder.start_lag),
+            "errors": recorder.errors,
+            "double_bookings": [
+                {"first": first, "second": second} for first, second in find_double_bookings(recorder.holds)
+            ],
+        }
@@ -0,0 +1,89 @@
+"""
+Gemessene Views inkl. Query-Budget.
+
+Das Budget ist eine obere Grenze pro Request und muss unabhängig von der
+Datenmenge gelten – wächst die Query-Anzahl mit ``scale``, ist das ein N+1.
+"""
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.urls import reverse
+from django.utils import timezone
+
+
+@dataclass
+class Scenario:
+    name: str
+    url_name: str
+    budget: int
+    staff: bool = False
+    params: dict = field(default_factory=dict)
+    setup: str = ""
+
+    def url(self, dataset):
+        return reverse(self.url_name)
+
+    def query(self, dataset):
+        today = timezone.localdate().isoformat()
+        params = dict(self.params)
+        for key, value in params.items():
+            if value == "{today}":
+                params[key] = today
+            elif value == "{transporter}":
+                params[key] = dataset["transporters"][0].id
+        return params
+
+
+SCENARIOS = [
+    Scenario("home", "home", budget=0),
+    Scenario("mietfahrzeuge", "mietfahrzeuge", budget=4, setup="rental_step1"),
+    Scenario(
+        "available_transporters",
+        "available_transporters",
+        budget=1,
+        params={"date": "{today}", "time_slot": "MORNING"},
+    ),
+    Scenario("booking_review", "booking_review", budget=1, setup="booking_flow"),
+    Scenario("portal_bookings", "portal_bookings", budget=11, staff=True),
+    Scenario("portal_schedule", "portal_schedule", budget=11, staff=True),
+    Scenario("portal_customers", "portal_customers", budget=12, staff=True),
+    Scenario("portal_invoices", "portal_invoices", budget=12, staff=True),
+    # +1 für die Rollenprüfung (admin/manager): ohne geteilten Cache nur pro Request gemerkt
+    Scenario("portal_utilization", "portal_utilization", budget=14, staff=True),
+    Scenario(
+        "api_booking_availability",
+        "booking-availability",
+        budget=4,
+        params={"transporter": "{transporter}", "date": "{today}", "time_slot": "MORNING"},
+    ),
+]
+
+
+def prepare_client(client, scenario, dataset, staff_user=None):
+    """Bringt den Client in den Zustand, den der Request benötigt (Login, Session)."""
+    if scenario.staff and staff_user is not None:
+        client.force_login(staff_user)
+    if scenario.setup == "rental_step1":
+        client.post(
+            reverse("mietfahrzeuge"),
+            {"pickup_date": timezone.localdate().isoformat(), "time_block": "morning"},
+        )
+    if scenario.setup == "booking_flow":
+        # Datum ausserhalb der Factory-Buchungen, damit keine Kollision entsteht
+        transporter = dataset["transporters"][-1]
+        pickup = (timezone.localdate() + timedelta(days=400)).isoformat()
+        client.post(
+            reverse("mietfahrzeuge"),
+            {"transporter_id": transporter.id, "pickup_date": pickup, "time_block": "fullday"},
+        )
+        client.post(
+            reverse("booking_create", args=[transporter.id]),
+            {
+                "customer_name": "Perf Kunde",
+                "customer_address": "Perfweg 1",
+                "customer_phone": "+41790000000",
+                "customer_email": "perf-flow@example.com",
+                "driver_license_number": "PERF123",
+            },
+        )
+    return client
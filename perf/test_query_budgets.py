@@ -0,0 +1,26 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .scenarios import SCENARIOS, prepare_client
+
+
+def _measure(client, scenario, dataset):
+    # Erster Request wärmt Session, Sync und Caches auf; gemessen wird der zweite.
+    client.get(scenario.url(dataset), scenario.query(dataset))
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(scenario.url(dataset), scenario.query(dataset))
+    assert response.status_code == 200, f"{scenario.name}: HTTP {response.status_code}"
+    return len(ctx.captured_queries), ctx.captured_queries
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("scenario", SCENARIOS, ids=lambda s: s.name)
+def test_query_budget(client, staff_user, dataset_factory, scenario, scale):
+    dataset = dataset_factory(scale)
+    prepare_client(client, scenario, dataset, staff_user)
+    count, queries = _measure(client, scenario, dataset)
+    assert count <= scenario.budget, (
+        f"{scenario.name} @ {scale}x: {count} Queries (Budget {scenario.budget})\n"
+        + "\n".join(q["sql"] for q in queries)
+    )
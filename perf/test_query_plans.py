@@ -0,0 +1,51 @@
+"""
+Prüft per ``EXPLAIN``, dass die heissen Portal- und API-Filter einen Index treffen.
+
+SQLite (lokal/CI) liefert ``EXPLAIN QUERY PLAN``, auf Postgres wird ``enable_seqscan`` für den
+Test abgeschaltet, damit der Planer trotz kleiner Tabellen den Index zeigt, den er nutzen kann.
+"""
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from adminportal.models import AuditLog, Invoice as PortalInvoice
+from main.models import Booking, DamageReport
+
+
+def _plans():
+    today = timezone.localdate()
+    week_ago = timezone.now() - timedelta(days=7)
+    plans = [
+        ("damage_status_created_idx", DamageReport.objects.filter(status="pending").order_by("-created_at")),
+        ("damage_insurer_idx", DamageReport.objects.filter(insurer="AXA")),
+        ("damage_type_idx", DamageReport.objects.filter(damage_type="Hagelschaden")),
+        ("damage_created_idx", DamageReport.objects.filter(created_at__gte=week_ago)),
+        ("booking_status_date_idx", Booking.objects.filter(status="confirmed").order_by("-date")),
+        ("booking_pickup_idx", Booking.objects.filter(pickup_date__gte=today)),
+        ("booking_return_idx", Booking.objects.filter(return_date__lt=today)),
+        ("booking_vehicle_pickup_idx", Booking.objects.filter(vehicle_id=1, pickup_date__gte=today)),
+        ("portal_invoice_status_idx", PortalInvoice.objects.filter(status="paid").order_by("-issue_date")),
+        ("portal_invoice_due_idx", PortalInvoice.objects.filter(due_date__lt=today)),
+        ("auditlog_created_idx", AuditLog.objects.order_by("-created_at")[:50]),
+    ]
+    if connection.vendor == "postgresql":
+        # SQLite übersetzt iexact in LIKE; der UPPER()-Ausdrucksindex greift nur auf Postgres.
+        plans += [
+            ("damage_email_upper_idx", DamageReport.objects.filter(email__iexact="kunde@example.com")),
+            ("booking_email_upper_idx", Booking.objects.filter(customer_email__iexact="kunde@example.com")),
+            ("portal_invoice_open_due_idx", PortalInvoice.objects.filter(status__in=["pending", "overdue"], due_date__lt=today)),
+            ("damage_open_created_idx", DamageReport.objects.filter(status__in=["pending", "in_progress"]).order_by("-created_at")),
+        ]
+    return plans
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("index_name, queryset", _plans(), ids=lambda value: value if isinstance(value, str) else "")
+def test_hot_filters_use_index(index_name, queryset):
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+    plan = queryset.explain()
+    assert index_name in plan, f"{index_name} nicht im Plan:\n{plan}"